@@ -0,0 +1,199 @@
+#==============================================================
+# Copyright (C) Intel Corporation
+#
+# SPDX-License-Identifier: MIT
+# =============================================================
+
+# Measures Level Zero header parsing and tracing code generation time
+# for the given headers and for a synthetic header with every function
+# and enum replicated <scale> times
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import ze_api_parser
+
+ROOT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+GENERATOR_LIST = [
+  os.path.join(ROOT_PATH, "tools", "ze_tracer", "gen_tracing_callbacks.py"),
+  os.path.join(ROOT_PATH, "sdk", "src", "levelzero", "gen_tracing_callbacks.py"),
+  os.path.join(ROOT_PATH, "sdk", "src", "gen_tracing_common_header.py")]
+
+def get_copy_name(name, copy):
+  if copy == 0:
+    return name
+  return name + "Copy" + str(copy)
+
+def get_copy_type(name, copy):
+  if copy == 0:
+    return name
+  assert name.endswith("_t")
+  return name[0:len(name) - 2] + "_copy" + str(copy) + "_t"
+
+def write_enums(f, ze_api, copy):
+  for enum_name, fields in ze_api.enum_map.items():
+    # Result and structure type enums are referenced by generators
+    if copy > 0 and (enum_name == "ze_result_t" or enum_name == "ze_structure_type_t"):
+      continue
+    type_name = get_copy_type(enum_name, copy)
+    f.write("///////////////////////////////////////////////////////////////////////////////\n")
+    f.write("/// @brief " + type_name + "\n")
+    f.write("typedef enum _" + type_name + "\n")
+    f.write("{\n")
+    for name, value in fields.items():
+      if copy > 0:
+        name += "_COPY" + str(copy)
+      f.write("    " + name + " = " + value + ",\n")
+    f.write("\n")
+    f.write("} " + type_name + ";\n")
+    f.write("\n")
+
+def write_functions(f, ze_api, copy, group_list):
+  for func in ze_api.func_list:
+    name = get_copy_name(func, copy)
+    struct_name = ze_api_parser.get_param_struct_name(name)
+    f.write("///////////////////////////////////////////////////////////////////////////////\n")
+    f.write("/// @brief Callback function parameters for " + name + "\n")
+    f.write("/// @details Each entry is a pointer to the parameter passed to the function;\n")
+    f.write("///     allowing the callback the ability to modify the parameter's value\n")
+    f.write("typedef struct _" + struct_name + "\n")
+    f.write("{\n")
+    for param in ze_api.param_map[func]:
+      f.write("    " + param.type + "* p" + param.name + ";\n")
+    f.write("} " + struct_name + ";\n")
+    f.write("\n")
+    f.write("///////////////////////////////////////////////////////////////////////////////\n")
+    f.write("/// @brief Callback function-pointer for " + name + "\n")
+    f.write("typedef void (ZE_APICALL *ze_pfn" + name[2:] + "Cb_t)(\n")
+    f.write("    " + struct_name + "* params,\n")
+    f.write("    ze_result_t result,\n")
+    f.write("    void* pTracerUserData,\n")
+    f.write("    void** ppTracerInstanceUserData\n")
+    f.write("    );\n")
+    f.write("\n")
+
+    if func in ze_api.group_map:
+      group, callback = ze_api.group_map[func]
+      assert callback.field.endswith("Cb")
+      field = callback.field[0:len(callback.field) - 2]
+      group_list.setdefault(group.field, []).append(
+        ("ze_pfn" + name[2:] + "Cb_t", get_copy_name(field, copy) + "Cb", callback.cond))
+
+def write_callbacks(f, group_list):
+  for group, callback_list in group_list.items():
+    f.write("typedef struct _ze_" + group.lower() + "_callbacks_t\n")
+    f.write("{\n")
+    for type_name, field, cond in callback_list:
+      if cond:
+        f.write("#if " + cond + "\n")
+      f.write("    " + type_name + " " + field + ";\n")
+      if cond:
+        f.write("#endif\n")
+    f.write("} ze_" + group.lower() + "_callbacks_t;\n")
+    f.write("\n")
+
+  f.write("typedef struct _ze_callbacks_t\n")
+  f.write("{\n")
+  for group in group_list:
+    f.write("    ze_" + group.lower() + "_callbacks_t " + group + ";\n")
+  f.write("} ze_callbacks_t;\n")
+
+def write_synthetic_header(ze_api, scale, include_path):
+  f = open(os.path.join(include_path, "ze_api.h"), "wt")
+  f.write("#ifndef _ZE_API_H\n")
+  f.write("#define _ZE_API_H\n")
+  f.write("\n")
+  group_list = {}
+  for copy in range(scale):
+    write_enums(f, ze_api, copy)
+    write_functions(f, ze_api, copy, group_list)
+  write_callbacks(f, group_list)
+  f.write("\n")
+  f.write("#endif // _ZE_API_H\n")
+  f.close()
+
+def get_header_size(include_path):
+  size = 0
+  for file_name in ze_api_parser.get_header_list(include_path):
+    size += os.path.getsize(os.path.join(include_path, file_name))
+  return size
+
+def measure(function, repeat=3):
+  best = None
+  for i in range(repeat):
+    start = time.perf_counter()
+    function()
+    duration = time.perf_counter() - start
+    if best is None or duration < best:
+      best = duration
+  return best
+
+def run_generator(generator, output_path, include_path):
+  subprocess.check_call(
+    [sys.executable, generator, output_path, include_path],
+    stdout=subprocess.DEVNULL)
+
+def bench(title, include_path):
+  ze_api = ze_api_parser.load(include_path)
+  print(title + ": " + str(get_header_size(include_path)) + " bytes, " +
+        str(len(ze_api.func_list)) + " functions, " +
+        str(len(ze_api.enum_map)) + " enums")
+
+  content_map = ze_api_parser.read_headers(include_path)
+  parse_time = measure(lambda: ze_api_parser.parse(content_map))
+
+  work_path = tempfile.mkdtemp()
+  try:
+    ze_api_parser.load(include_path, work_path)
+    cache_time = measure(lambda: ze_api_parser.load(include_path, work_path))
+    print("  %-44s %10.2f ms" % ("parse", parse_time * 1000))
+    print("  %-44s %10.2f ms" % ("load from cache", cache_time * 1000))
+
+    # Generators of one build share the cache, so the first one run
+    # in a clean directory parses headers and the others reuse the result
+    for generator in GENERATOR_LIST:
+      name = os.path.relpath(generator, ROOT_PATH)
+      def cold():
+        output_path = tempfile.mkdtemp(dir=work_path)
+        run_generator(generator, output_path, include_path)
+      output_path = tempfile.mkdtemp(dir=work_path)
+      run_generator(generator, output_path, include_path)
+      def warm():
+        run_generator(generator, output_path, include_path)
+      print("  %-44s %10.2f ms (cold) %10.2f ms (cached)" %
+            (name, measure(cold) * 1000, measure(warm) * 1000))
+  finally:
+    shutil.rmtree(work_path)
+
+def main():
+  if len(sys.argv) < 2:
+    print("Usage: python ze_api_parser_bench.py <l0_include_path> [scale]")
+    return 1
+
+  # Benchmark must not pick up shared cache
+  if ze_api_parser.CACHE_DIR_ENV in os.environ:
+    del os.environ[ze_api_parser.CACHE_DIR_ENV]
+
+  include_path = sys.argv[1]
+  scale = 10
+  if len(sys.argv) > 2:
+    scale = int(sys.argv[2])
+
+  bench("Current header", include_path)
+
+  synthetic_path = tempfile.mkdtemp()
+  try:
+    write_synthetic_header(ze_api_parser.load(include_path), scale, synthetic_path)
+    bench("Synthetic header (x" + str(scale) + ")", synthetic_path)
+  finally:
+    shutil.rmtree(synthetic_path)
+
+  return 0
+
+if __name__ == "__main__":
+  sys.exit(main())
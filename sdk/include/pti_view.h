@@ -46,8 +46,23 @@ typedef enum _pti_view_kind {
   PTI_VIEW_EXTERNAL_CORRELATION = 7,      //!< Correlation of external operations
   PTI_VIEW_DEVICE_GPU_MEM_COPY = 8,       //!< Memory copies between Host and Device
   PTI_VIEW_DEVICE_GPU_MEM_FILL = 9,       //!< Device memory fills
+  PTI_VIEW_CLOCK_CONVERSION = 10,         //!< Conversion of record timestamps to CLOCK_REALTIME
+  PTI_VIEW_RECORDS_LOST = 11,             //!< Records dropped because of buffer queue overflow
+  PTI_VIEW_RECORDS_FILTERED = 12,         //!< Records left out by the record filter
+  PTI_VIEW_DEVICE_GPU_KERNEL_STATS = 13,  //!< Device kernel statistics, aggregated per kernel
 } pti_view_kind;
 
+/**
+ * @brief Size of pti_view_record_records_lost::_records_lost, not less than
+ * the number of view kinds
+ */
+#define PTI_VIEW_RECORDS_LOST_KINDS 16
+
+/**
+ * @brief Size of pti_view_record_kernel_stats::_duration_histogram
+ */
+#define PTI_VIEW_KERNEL_STATS_BUCKETS 30
+
 /**
  * @brief Memory type
  */
@@ -241,6 +256,182 @@ typedef struct pti_view_record_overhead {
   pti_view_overhead_kind  _overhead_kind;   //!< Type of overhead
 } pti_view_record_overhead;
 
+/**
+ * @brief Clock conversion View record type
+ *
+ * Timestamps of view records are taken from CLOCK_MONOTONIC_RAW and converted
+ * to CLOCK_REALTIME. If the view is enabled, the record starts every buffer
+ * and describes the conversion used for all the records in the buffer:
+ * real = _real_base_timestamp + (raw - _raw_base_timestamp) * _raw_to_real_rate
+ */
+typedef struct pti_view_record_clock_conversion {
+  pti_view_record_base _view_kind;          //!< Base record
+  uint64_t _raw_base_timestamp;             //!< CLOCK_MONOTONIC_RAW base point, ns
+  uint64_t _real_base_timestamp;            //!< CLOCK_REALTIME at the base point, ns
+  double _raw_to_real_rate;                 //!< CLOCK_REALTIME rate relative to
+                                            //!< CLOCK_MONOTONIC_RAW
+  uint64_t _uncertainty_ns;                 //!< Max error of the base point, ns
+} pti_view_record_clock_conversion;
+
+/**
+ * @brief Records lost View record type
+ *
+ * Emitted (at the start of a buffer) after buffers were dropped by
+ * PTI_VIEW_OVERFLOW_DROP_NEWEST or PTI_VIEW_OVERFLOW_DROP_OLDEST policy.
+ * Counts are exact and cover the drops since the previous such record.
+ */
+typedef struct pti_view_record_records_lost {
+  pti_view_record_base _view_kind;          //!< Base record
+  uint64_t _timestamp;                      //!< Time of the record emission, ns
+  uint64_t _buffers_lost;                   //!< Number of dropped buffers
+  uint64_t _records_lost[PTI_VIEW_RECORDS_LOST_KINDS];  //!< Number of dropped records,
+                                                        //!< indexed by pti_view_kind
+} pti_view_record_records_lost;
+
+/**
+ * @brief Records filtered View record type
+ *
+ * Emitted at the start of a buffer and at ptiFlushAllViews, if records of the
+ * thread were filtered out by the filter set with ptiViewSetRecordFilter.
+ * Counts cover the records of the thread filtered out since its previous
+ * such record.
+ */
+typedef struct pti_view_record_records_filtered {
+  pti_view_record_base _view_kind;          //!< Base record
+  uint64_t _timestamp;                      //!< Time of the record emission, ns
+  uint64_t _records_filtered[PTI_VIEW_RECORDS_LOST_KINDS];  //!< Number of filtered out
+                                                            //!< records, indexed by pti_view_kind
+  uint64_t _by_name;                        //!< Filtered out by name patterns
+  uint64_t _by_duration;                    //!< Filtered out by minimum duration
+  uint64_t _by_device;                      //!< Filtered out by device or queue selection
+  uint64_t _by_rate_limit;                  //!< Filtered out by rate limit per name
+} pti_view_record_records_filtered;
+
+/**
+ * @brief Kernel statistics View record type
+ *
+ * Emitted at ptiFlushAllViews, one record per kernel name, device and group
+ * size launched since the previous flush. Bucket i of the duration histogram
+ * counts launches of [2^i, 2^(i+1)) ns, bucket 0 also counts launches under
+ * 1 ns and the last bucket all the longer ones.
+ */
+typedef struct pti_view_record_kernel_stats {
+  pti_view_record_base _view_kind;          //!< Base record
+  const char* _name;                        //!< Kernel name
+  ze_device_handle_t _device_handle;        //!< Device handle
+  uint32_t _group_size[3];                  //!< Work group size, x, y and z
+  uint64_t _start_timestamp;                //!< Start time of the earliest launch, ns
+  uint64_t _end_timestamp;                  //!< End time of the latest launch, ns
+  uint64_t _count;                          //!< Number of launches
+  uint64_t _total_duration_ns;              //!< Sum of launch durations, ns
+  uint64_t _min_duration_ns;                //!< Shortest launch duration, ns
+  uint64_t _max_duration_ns;                //!< Longest launch duration, ns
+  uint64_t _duration_histogram[PTI_VIEW_KERNEL_STATS_BUCKETS];  //!< Launches per log2
+                                                                //!< duration bucket
+} pti_view_record_kernel_stats;
+
+/**
+ * @brief Encoding of view records in buffers, passed to ptiViewSetRecordEncoding
+ */
+typedef enum _pti_view_record_encoding {
+  PTI_VIEW_RECORD_ENCODING_FIXED = 0,     //!< Records are stored as view record structures
+  PTI_VIEW_RECORD_ENCODING_COMPACT = 1,   //!< Records are stored variable-length encoded,
+                                          //!< ptiViewGetNextRecord decodes them
+} pti_view_record_encoding;
+
+/**
+ * @brief Kind of entry of a compact buffer
+ */
+typedef enum _pti_view_compact_entry_kind {
+  PTI_VIEW_COMPACT_ENTRY_RECORD = 0,      //!< Encoded view record
+  PTI_VIEW_COMPACT_ENTRY_DICTIONARY = 1,  //!< Value referenced by ID from the following records
+} pti_view_compact_entry_kind;
+
+/**
+ * @brief Entry of a compact buffer, as returned by ptiViewGetNextCompactEntry
+ *
+ * Dictionary entries hold values (handles, name pointers, PCI addresses)
+ * of the records following them, the rest of the record fields are
+ * varint encoded, timestamps as deltas from the previous timestamp
+ * of the buffer.
+ */
+typedef struct pti_view_compact_entry {
+  pti_view_compact_entry_kind _entry_kind;  //!< Entry kind
+  pti_view_kind _view_kind;                 //!< Kind of encoded record,
+                                            //!< PTI_VIEW_INVALID for dictionary entries
+  uint32_t _dictionary_id;                  //!< ID defined by dictionary entry
+  uint32_t _size;                           //!< Size of _data, bytes
+  const uint8_t* _data;                     //!< Encoded record fields or dictionary value
+} pti_view_compact_entry;
+
+/**
+ * @brief Options of the buffer pool, passed to ptiViewSetBufferPool (may be OR-ed)
+ */
+typedef enum _pti_view_buffer_pool_flags {
+  PTI_VIEW_BUFFER_POOL_DEFAULT = 0,       //!< Regular pages, faulted in on first use
+  PTI_VIEW_BUFFER_POOL_HUGE_PAGES = 1,    //!< Huge pages if reserved, transparent huge
+                                          //!< pages otherwise
+  PTI_VIEW_BUFFER_POOL_PRE_TOUCH = 2,     //!< Fault in all the pages when the pool is set
+} pti_view_buffer_pool_flags;
+
+/**
+ * @brief What traced threads do with a completed buffer if the delivery
+ * queue is full, passed to ptiViewSetOverflowPolicy
+ */
+typedef enum _pti_view_overflow_policy {
+  PTI_VIEW_OVERFLOW_BLOCK = 0,            //!< Wait until the queue has room
+  PTI_VIEW_OVERFLOW_DROP_NEWEST = 1,      //!< Drop the completed buffer
+  PTI_VIEW_OVERFLOW_DROP_OLDEST = 2,      //!< Drop the oldest queued buffer
+  PTI_VIEW_OVERFLOW_SPILL = 3,            //!< Write the buffer to a file, deliver it later
+} pti_view_overflow_policy;
+
+/**
+ * @brief Selection of device command records (kernels, memory copies and
+ * fills), passed to ptiViewSetRecordFilter
+ *
+ * Name patterns match the whole name, '*' matches any characters and '?' any
+ * one character. Empty lists (count of 0) select everything.
+ */
+typedef struct pti_view_record_filter {
+  const char* const* _include_names;        //!< Records pass if a pattern matches the name
+  uint32_t _include_name_count;             //!< Number of include patterns
+  const char* const* _exclude_names;        //!< Records are left out if a pattern matches
+  uint32_t _exclude_name_count;             //!< Number of exclude patterns
+  uint64_t _min_duration_ns;                //!< Shorter commands are left out, 0 for no limit
+  const ze_device_handle_t* _device_handles;  //!< Records pass if executed on these devices
+  uint32_t _device_handle_count;            //!< Number of device handles
+  const ze_command_queue_handle_t* _queue_handles;  //!< Records pass if executed on these queues
+  uint32_t _queue_handle_count;             //!< Number of queue handles
+  uint64_t _max_records_per_name;           //!< Records per name and period, 0 for no limit
+  uint64_t _rate_limit_period_ns;           //!< Rate limit period, 0 for one second
+} pti_view_record_filter;
+
+/**
+ * @brief Order of buffer delivery, passed to ptiViewSetConsumerThreads
+ */
+typedef enum _pti_view_delivery_order {
+  PTI_VIEW_DELIVERY_ORDERED = 0,            //!< Buffers filled by a thread are delivered one
+                                            //!< at a time, in the order they were filled
+  PTI_VIEW_DELIVERY_UNORDERED = 1,          //!< Buffers are delivered in parallel, in any order
+  PTI_VIEW_DELIVERY_TIMESTAMP_ORDERED = 2,  //!< Records of all the threads are merged by
+                                            //!< start timestamp, with one consumer thread
+} pti_view_delivery_order;
+
+/**
+ * @brief Counters of buffer delivery, as returned by ptiViewGetDeliveryStats
+ */
+typedef struct pti_view_delivery_stats {
+  uint64_t _buffers_delivered;              //!< Buffers passed to pti_fptr_buffer_completed
+  uint64_t _queue_depth;                    //!< Buffers waiting for delivery now
+  uint64_t _max_queue_depth;                //!< Max number of buffers waiting for delivery
+  uint64_t _producer_waits;                 //!< Times a traced thread waited for the queue
+  uint64_t _producer_wait_ns;               //!< Time traced threads waited for the queue, ns
+  uint64_t _total_delivery_latency_ns;      //!< Sum of times from buffer completion until
+                                            //!< pti_fptr_buffer_completed returned, ns
+  uint64_t _max_delivery_latency_ns;        //!< Max time from buffer completion until
+                                            //!< pti_fptr_buffer_completed returned, ns
+} pti_view_delivery_stats;
+
 typedef void (*pti_fptr_buffer_completed)(unsigned char* buffer,
                                              size_t buffer_size_in_bytes,
                                              size_t used_bytes);
@@ -275,6 +466,27 @@ pti_result PTI_EXPORT ptiViewEnable(pti_view_kind view_kind);
  */
 pti_result PTI_EXPORT ptiViewDisable(pti_view_kind view_kind);
 
+/**
+ * @brief Starts a tracing window, collection is running after ptiViewEnable
+ *
+ * Running collection traces the calls of all enabled views.
+ *
+ * @return pti_result
+ */
+pti_result PTI_EXPORT ptiViewStart();
+
+/**
+ * @brief Stops tracing until the next ptiViewStart
+ *
+ * Stopped collection keeps track of command list, event and kernel lifetimes
+ * and of submissions and synchronizations only, other Level Zero calls run
+ * without tracer callbacks. Commands appended in a window are reported when
+ * they complete, also if they are submitted or complete after the window.
+ *
+ * @return pti_result
+ */
+pti_result PTI_EXPORT ptiViewStop();
+
 /**
  * @brief Flushes all view records by calling bufferCompleted callback
  *
@@ -296,10 +508,180 @@ ptiViewGetNextRecord(uint8_t* buffer, size_t valid_bytes,
                        pti_view_record_base** record);
 
 /**
- * @brief Pushes ExternelCorrelationId kind and id for generation of external correlation records
+ * @brief Sets encoding of view records, applied to buffers started afterwards
  *
+ * Compact buffers are several times smaller for the same records, so they
+ * are delivered less often. ptiViewGetNextRecord decodes them transparently
+ * into a per-thread record, valid until the next ptiViewGetNextRecord call.
+ *
+ * @param encoding
  * @return pti_result
  */
+pti_result PTI_EXPORT ptiViewSetRecordEncoding(pti_view_record_encoding encoding);
+
+/**
+ * @brief Gets next entry of a compact buffer without decoding it.
+ *
+ * @param buffer the buffer passed to pti_fptr_buffer_completed
+ * @param valid_bytes size of portion of the buffer filled with view records
+ * @param offset position of the entry in the buffer, start with 0, moved to
+ * the next entry on success
+ * @param entry next entry
+ * @return pti_result, PTI_ERROR_BAD_ARGUMENT if the buffer is not compact
+ */
+pti_result PTI_EXPORT
+ptiViewGetNextCompactEntry(uint8_t* buffer, size_t valid_bytes, size_t* offset,
+                           pti_view_compact_entry* entry);
+
+/**
+ * @brief Makes the library take buffers from its own pool instead of
+ * pti_fptr_buffer_requested
+ *
+ * The pool is allocated once, up front. Buffers passed to
+ * pti_fptr_buffer_completed are given back to the pool with
+ * ptiViewReturnBuffer once consumed. If all of them are taken,
+ * pti_fptr_buffer_requested is used as before. The pool can be set once.
+ *
+ * @param buffer_size size of every buffer, bytes
+ * @param buffer_count number of buffers
+ * @param flags pti_view_buffer_pool_flags
+ * @return pti_result
+ */
+pti_result PTI_EXPORT
+ptiViewSetBufferPool(size_t buffer_size, size_t buffer_count, uint32_t flags);
+
+/**
+ * @brief Gives a consumed buffer back to the pool set by ptiViewSetBufferPool
+ *
+ * @param buffer the buffer passed to pti_fptr_buffer_completed
+ * @return pti_result, PTI_ERROR_BAD_ARGUMENT if the buffer is not from the pool
+ * (it is released the same way as without the pool then)
+ */
+pti_result PTI_EXPORT ptiViewReturnBuffer(unsigned char* buffer);
+
+/**
+ * @brief Makes the library take buffers from slices of a memory-mapped file
+ *
+ * Slices are marked committed in the file header once completed, so the
+ * records are left in the file even if the application dies before they
+ * are delivered. Slices are reused in the order they were completed after
+ * they are given back with ptiViewReturnBuffer, so the file keeps the most
+ * recent records. If PTI_VIEW_RING_FILE environment variable holds a path,
+ * the ring file is set up from it on library load. The ring file takes
+ * precedence over the buffer pool and can be set once.
+ *
+ * @param path file to create, truncated if it exists
+ * @param slice_size size of every slice (buffer), bytes
+ * @param slice_count number of slices
+ * @return pti_result
+ */
+pti_result PTI_EXPORT
+ptiViewSetRingFile(const char* path, size_t slice_size, size_t slice_count);
+
+/**
+ * @brief Ring file opened for reading, see ptiViewRingFileOpen
+ */
+typedef struct _pti_view_ring_file_reader* pti_view_ring_file_reader;
+
+/**
+ * @brief Opens a ring file written by ptiViewSetRingFile, e.g. by a crashed
+ * process
+ *
+ * @param path ring file
+ * @param reader opened file, to be closed with ptiViewRingFileClose
+ * @return pti_result, PTI_ERROR_BAD_ARGUMENT if the file is not a ring file
+ */
+pti_result PTI_EXPORT
+ptiViewRingFileOpen(const char* path, pti_view_ring_file_reader* reader);
+
+/**
+ * @brief Gets the next committed slice of a ring file, in the order
+ * the slices were completed
+ *
+ * Records of the slice are walked with ptiViewGetNextRecord.
+ *
+ * @param reader opened ring file
+ * @param buffer slice records, valid until the file is closed
+ * @param valid_bytes size of the records
+ * @return pti_result, PTI_STATUS_END_OF_BUFFER after the last slice
+ */
+pti_result PTI_EXPORT
+ptiViewRingFileGetNextSlice(pti_view_ring_file_reader reader, uint8_t** buffer,
+                            size_t* valid_bytes);
+
+/**
+ * @brief Closes a ring file opened with ptiViewRingFileOpen
+ *
+ * @return pti_result
+ */
+pti_result PTI_EXPORT ptiViewRingFileClose(pti_view_ring_file_reader reader);
+
+/**
+ * @brief Sets number of threads calling pti_fptr_buffer_completed
+ *
+ * By default a single thread delivers all the buffers. With more threads a
+ * slow pti_fptr_buffer_completed doesn't hold up the traced threads, but
+ * it is called concurrently.
+ *
+ * With PTI_VIEW_DELIVERY_TIMESTAMP_ORDERED the consumer thread merges the
+ * records of all the traced threads by start timestamp and delivers them
+ * in buffers of fixed size records, thread_count must be 1. External
+ * correlation records are matched to kernel records by _correlation_id.
+ *
+ * @param thread_count number of threads, 1 to 64
+ * @param order whether buffers of a traced thread are delivered in order
+ * @return pti_result
+ */
+pti_result PTI_EXPORT
+ptiViewSetConsumerThreads(uint32_t thread_count, pti_view_delivery_order order);
+
+/**
+ * @brief Gets counters of buffer delivery
+ *
+ * @param stats counters since the library was loaded
+ * @return pti_result
+ */
+pti_result PTI_EXPORT ptiViewGetDeliveryStats(pti_view_delivery_stats* stats);
+
+/**
+ * @brief Sets what happens to completed buffers while the delivery queue is full
+ *
+ * By default traced threads wait (PTI_VIEW_OVERFLOW_BLOCK), which stalls the
+ * application. Dropped buffers are reported by PTI_VIEW_RECORDS_LOST records.
+ * Spilled buffers are delivered in order once the queue has room,
+ * ptiFlushAllViews delivers all of them.
+ *
+ * @param policy
+ * @param spill_file_path file for PTI_VIEW_OVERFLOW_SPILL, truncated; an unnamed
+ * temporary file if nullptr
+ * @return pti_result
+ */
+pti_result PTI_EXPORT
+ptiViewSetOverflowPolicy(pti_view_overflow_policy policy, const char* spill_file_path);
+
+/**
+ * @brief Sets the filter of device command records
+ *
+ * Records are filtered before they are built, so filtered out records take
+ * no buffer space and are not delivered. They are counted by
+ * PTI_VIEW_RECORDS_FILTERED records. External correlation records go with
+ * the next kernel record that passes. The filter is copied, a later call
+ * replaces it.
+ *
+ * @param filter nullptr removes the filter
+ * @return pti_result
+ */
+pti_result PTI_EXPORT ptiViewSetRecordFilter(const pti_view_record_filter* filter);
+
+/**
+ * @brief Pushes ExternelCorrelationId kind and id for generation of external correlation records
+ *
+ * Ids are kept per thread, up to 64 of a kind. Every kernel record of the
+ * thread gets a correlation record per kind with a pushed id, holding the last
+ * pushed id of the kind and the _correlation_id of the kernel record.
+ *
+ * @return pti_result, PTI_ERROR_BAD_ARGUMENT if 64 ids of the kind are pushed
+ */
 pti_result PTI_EXPORT
 ptiViewPushExternalCorrelationId(pti_view_external_kind external_kind, uint64_t external_id);
 
@@ -11,8 +11,10 @@
 #include <string.h>
 
 #include <CL/sycl.hpp>
+#include <chrono>
 #include <cstdlib>
 #include <memory>
+#include <mutex>
 #include <thread>
 #include <stdarg.h>
 
@@ -119,12 +121,20 @@ void StopTracing() {
 const unsigned max_thread_count = 64;
 const unsigned max_size = 8192;
 const unsigned min_size = 32;
+const unsigned max_consumer_count = 64;
+
+// Simulated cost of processing a buffer, e.g. writing it to a slow disk
+unsigned callback_delay_ms = 0;
+// Records of buffers delivered in parallel are printed one at a time
+std::mutex print_mutex;
 
 void Usage(const char* name) {
 
   std::cout << " Calculating floating point matrix multiply on gpu, submitting the work from many CPU threads\n";
   std::cout << name << " [ [number of threads, default=2, max=" << max_thread_count
-            << "],  [matrix size, default=1024, max=" << max_size << "], [repetition count, default=4]] \n";
+            << "],  [matrix size, default=1024, max=" << max_size << "], [repetition count, default=4]"
+            << ", [number of buffer consumer threads, default=1, max=" << max_consumer_count
+            << "], [buffer callback delay in ms, default=0]] \n";
 }
 
 int main(int argc, char* argv[]) {
@@ -133,6 +143,7 @@ int main(int argc, char* argv[]) {
   unsigned thread_count = 2;
   unsigned repeat_count = 4;
   unsigned size = 1024;
+  unsigned consumer_count = 1;
 
   if (argc == 2 &&
       ( strcmp(argv[1], "-?") == 0 or strcmp(argv[1], "-h") == 0  or strcmp(argv[1], "--help" ) == 0) ){
@@ -157,6 +168,16 @@ int main(int argc, char* argv[]) {
       temp = std::stoul(argv[3]);
       repeat_count = (temp < 1) ? 1 : temp;
     }
+
+    if (argc > 4) {
+      temp = std::stoul(argv[4]);
+      consumer_count = (temp < 1) ? 1 :
+                    (temp > max_consumer_count) ?  max_consumer_count : temp;
+    }
+
+    if (argc > 5) {
+      callback_delay_ms = std::stoul(argv[5]);
+    }
   }
 
   catch(...) {
@@ -205,6 +226,8 @@ int main(int argc, char* argv[]) {
           return;
 
         };
+        // Consumer threads may call this concurrently, keep the output readable
+        std::unique_lock<std::mutex> print_lock(print_mutex);
         while (true) {
           auto buf_status =
               ptiViewGetNextRecord(buf, valid_buf_size, &ptr);
@@ -295,9 +318,15 @@ int main(int argc, char* argv[]) {
             }
           }
         }
+        print_lock.unlock();
+        std::this_thread::sleep_for(std::chrono::milliseconds(callback_delay_ms));
         ::operator delete(buf);
       });
+  // Slow callbacks of different threads' buffers run in parallel, while the
+  // buffers of one thread are still delivered in order
+  ptiViewSetConsumerThreads(consumer_count, PTI_VIEW_DELIVERY_ORDERED);
   StartTracing();
+  auto tracing_start = std::chrono::steady_clock::now();
   sycl::device dev;
   try {
     dev = sycl::device(sycl::gpu_selector_v);
@@ -363,5 +392,21 @@ int main(int argc, char* argv[]) {
 
   StopTracing();
   auto flush_results = ptiFlushAllViews();
+
+  std::chrono::duration<float> tracing_time = std::chrono::steady_clock::now() - tracing_start;
+  pti_view_delivery_stats stats;
+  if (ptiViewGetDeliveryStats(&stats) == pti_result::PTI_SUCCESS) {
+    std::cout << "Traced run with " << consumer_count << " buffer consumer thread(s): "
+              << tracing_time.count() << " sec" << std::endl;
+    std::cout << "\tBuffers delivered: " << stats._buffers_delivered
+              << ", max queue depth: " << stats._max_queue_depth << std::endl;
+    std::cout << "\tProducer waits: " << stats._producer_waits
+              << ", waited: " << stats._producer_wait_ns / 1e6 << " ms" << std::endl;
+    if (stats._buffers_delivered) {
+      std::cout << "\tDelivery latency, avg: "
+                << stats._total_delivery_latency_ns / stats._buffers_delivered / 1e6
+                << " ms, max: " << stats._max_delivery_latency_ns / 1e6 << " ms" << std::endl;
+    }
+  }
   return exit_code;
 }
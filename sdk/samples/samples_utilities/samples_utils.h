@@ -168,5 +168,65 @@ void dump_record(pti_view_record_external_correlation* record) {
             << record->_external_id << '\n';
 
 }
+
+void dump_record(pti_view_record_clock_conversion* record) {
+    if (NULL==record) return;
+    std::cout << "Clock Raw Base Timestamp(ns): "
+            << record->_raw_base_timestamp << '\n';
+    std::cout << "Clock Real Base Timestamp(ns): "
+            << record->_real_base_timestamp << '\n';
+    std::cout << "Clock Raw To Real Rate: "
+            << record->_raw_to_real_rate << '\n';
+    std::cout << "Clock Uncertainty(ns): "
+            << record->_uncertainty_ns << '\n';
+}
+
+void dump_record(pti_view_record_records_lost* record) {
+    if (NULL==record) return;
+    std::cout << "Records Lost Timestamp(ns): "
+            << record->_timestamp << '\n';
+    std::cout << "Buffers Lost: "
+            << record->_buffers_lost << '\n';
+    for (int kind = 0; kind < PTI_VIEW_RECORDS_LOST_KINDS; ++kind) {
+      if (record->_records_lost[kind]) {
+        std::cout << "Records Lost of View Kind " << kind << ": "
+                << record->_records_lost[kind] << '\n';
+      }
+    }
+}
+
+void dump_record(pti_view_record_records_filtered* record) {
+    if (NULL==record) return;
+    std::cout << "Records Filtered Timestamp(ns): "
+            << record->_timestamp << '\n';
+    for (int kind = 0; kind < PTI_VIEW_RECORDS_LOST_KINDS; ++kind) {
+      if (record->_records_filtered[kind]) {
+        std::cout << "Records Filtered of View Kind " << kind << ": "
+                << record->_records_filtered[kind] << '\n';
+      }
+    }
+    std::cout << "Filtered by Name: " << record->_by_name << '\n';
+    std::cout << "Filtered by Duration: " << record->_by_duration << '\n';
+    std::cout << "Filtered by Device: " << record->_by_device << '\n';
+    std::cout << "Filtered by Rate Limit: " << record->_by_rate_limit << '\n';
+}
+
+void dump_record(pti_view_record_kernel_stats* record) {
+    if (NULL==record) return;
+    std::cout << "Kernel Name: " << record->_name << '\n';
+    std::cout << "Kernel Device Handle: " << record->_device_handle << '\n';
+    std::cout << "Kernel Group Size: " << record->_group_size[0] << ", "
+            << record->_group_size[1] << ", " << record->_group_size[2] << '\n';
+    std::cout << "Kernel Launches: " << record->_count << '\n';
+    std::cout << "Kernel Total Duration(ns): " << record->_total_duration_ns << '\n';
+    std::cout << "Kernel Min Duration(ns): " << record->_min_duration_ns << '\n';
+    std::cout << "Kernel Max Duration(ns): " << record->_max_duration_ns << '\n';
+    for (int bucket = 0; bucket < PTI_VIEW_KERNEL_STATS_BUCKETS; ++bucket) {
+      if (record->_duration_histogram[bucket]) {
+        std::cout << "Kernel Launches of Duration Bucket " << bucket << ": "
+                << record->_duration_histogram[bucket] << '\n';
+      }
+    }
+}
 }
 #endif
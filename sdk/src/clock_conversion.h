@@ -0,0 +1,148 @@
+//==============================================================
+// Copyright (C) Intel Corporation
+//
+// SPDX-License-Identifier: MIT
+// =============================================================
+
+#ifndef SRC_CLOCK_CONVERSION_H_
+#define SRC_CLOCK_CONVERSION_H_
+
+#include <time.h>
+
+#include <cstddef>
+#include <cstdint>
+#include <mutex>
+
+#include "utils.h"
+
+namespace pti {
+namespace view {
+namespace utilities {
+
+inline constexpr uint64_t kDefaultClockCalibrationPeriod = NSEC_IN_SEC;  // 1 s
+inline constexpr uint32_t kDefaultClockCalibrationSamples = 16;
+// Difference from the model prediction treated as CLOCK_REALTIME step
+inline constexpr uint64_t kClockStepThreshold = NSEC_IN_MSEC;  // 1 ms
+
+/**
+ * @brief Linear model converting CLOCK_MONOTONIC_RAW timestamps to
+ * CLOCK_REALTIME ones: real = real_base + (raw - raw_base) * rate
+ */
+struct ClockModel {
+  uint64_t raw_base = 0;
+  uint64_t real_base = 0;
+  double rate = 1.0;
+  // Half of the interval bracketing the base sample, ns
+  uint64_t uncertainty = 0;
+
+  inline uint64_t Convert(uint64_t raw) const {
+    const auto delta = static_cast<int64_t>(raw - raw_base);
+    return real_base + static_cast<int64_t>(static_cast<double>(delta) * rate);
+  }
+
+  inline void Convert(uint64_t* timestamps, std::size_t count) const {
+    for (std::size_t i = 0; i < count; ++i) {
+      timestamps[i] = Convert(timestamps[i]);
+    }
+  }
+};
+
+struct ClockSample {
+  uint64_t raw = 0;
+  uint64_t real = 0;
+  uint64_t uncertainty = 0;
+};
+
+/**
+ * @brief Periodically calibrated CLOCK_MONOTONIC_RAW -> CLOCK_REALTIME model.
+ *
+ * Every calibration takes several CLOCK_MONOTONIC_RAW/CLOCK_REALTIME/
+ * CLOCK_MONOTONIC_RAW readings and keeps the one with the shortest bracketing
+ * interval. The rate is estimated over the whole time since the first sample,
+ * so it corrects the drift between the clocks while staying stable. The model
+ * restarts if CLOCK_REALTIME is stepped.
+ */
+class ClockConverter {
+ public:
+  explicit ClockConverter(uint64_t period = kDefaultClockCalibrationPeriod,
+                          uint32_t sample_count = kDefaultClockCalibrationSamples)
+      : period_(period), sample_count_(sample_count ? sample_count : 1) {
+    Restart(TakeSample(sample_count_));
+  }
+
+  ClockConverter(const ClockConverter&) = delete;
+  ClockConverter& operator=(const ClockConverter&) = delete;
+  ClockConverter(ClockConverter&&) = delete;
+  ClockConverter& operator=(ClockConverter&&) = delete;
+
+  virtual ~ClockConverter() = default;
+
+  // Returns the current model, recalibrating it once per period
+  inline ClockModel GetModel() {
+    const auto now = utils::GetTime(CLOCK_MONOTONIC_RAW);
+    std::lock_guard<std::mutex> lock(model_mtx_);
+    if (now - last_calibration_ >= period_) {
+      Update(TakeSample(sample_count_));
+    }
+    return model_;
+  }
+
+  inline void Calibrate() {
+    auto sample = TakeSample(sample_count_);
+    std::lock_guard<std::mutex> lock(model_mtx_);
+    Update(sample);
+  }
+
+  static inline ClockSample TakeSample(uint32_t sample_count) {
+    ClockSample best;
+    uint64_t best_latency = UINT64_MAX;
+    for (uint32_t i = 0; i < sample_count; ++i) {
+      const auto raw_before = utils::GetTime(CLOCK_MONOTONIC_RAW);
+      const auto real = utils::GetTime(CLOCK_REALTIME);
+      const auto raw_after = utils::GetTime(CLOCK_MONOTONIC_RAW);
+      const auto latency = raw_after - raw_before;
+      if (latency < best_latency) {
+        best_latency = latency;
+        best.raw = raw_before + latency / 2;
+        best.real = real;
+        best.uncertainty = (latency + 1) / 2;
+      }
+    }
+    return best;
+  }
+
+ private:
+  inline void Restart(const ClockSample& sample) {
+    first_sample_ = sample;
+    last_calibration_ = sample.raw;
+    model_.raw_base = sample.raw;
+    model_.real_base = sample.real;
+    model_.rate = 1.0;
+    model_.uncertainty = sample.uncertainty;
+  }
+
+  inline void Update(const ClockSample& sample) {
+    const auto predicted = model_.Convert(sample.raw);
+    const auto error = (predicted > sample.real) ? predicted - sample.real : sample.real - predicted;
+    if (error > kClockStepThreshold || sample.raw <= first_sample_.raw) {
+      Restart(sample);
+      return;
+    }
+    last_calibration_ = sample.raw;
+    model_.rate = static_cast<double>(static_cast<int64_t>(sample.real - first_sample_.real)) /
+                  static_cast<double>(sample.raw - first_sample_.raw);
+  }
+
+  const uint64_t period_;
+  const uint32_t sample_count_;
+  std::mutex model_mtx_;
+  ClockSample first_sample_;
+  uint64_t last_calibration_ = 0;
+  ClockModel model_;
+};
+
+}  // namespace utilities
+}  // namespace view
+}  // namespace pti
+
+#endif  // SRC_CLOCK_CONVERSION_H_
@@ -0,0 +1,609 @@
+//==============================================================
+// Copyright (C) Intel Corporation
+//
+// SPDX-License-Identifier: MIT
+// =============================================================
+
+#ifndef SRC_COMPACT_ENCODING_H_
+#define SRC_COMPACT_ENCODING_H_
+
+#include <algorithm>
+#include <array>
+#include <cstddef>
+#include <cstdint>
+#include <cstring>
+#include <unordered_map>
+#include <vector>
+
+#include "pti_view.h"
+#include "view_record_info.h"
+
+//
+// Compact buffer layout
+//
+// header     := magic (4 bytes, kCompactBufferMagic)
+// entry      := dictionary | record
+// dictionary := 0, id (varint), size (1 byte), value (size bytes)
+// record     := view kind (1 byte, non-zero), fields
+//
+// Record fields follow the order of the kind's CompactFields table, every
+// field is written with its own encoding. Dictionaries, timestamps and
+// sequences are reset at the start of every buffer, so buffers decode
+// independently of each other.
+//
+
+namespace pti {
+namespace view {
+namespace utilities {
+
+inline constexpr uint32_t kCompactBufferMagic = 0x43495450;  // "PTIC"
+inline constexpr std::size_t kCompactBufferHeaderSize = sizeof(kCompactBufferMagic);
+inline constexpr uint8_t kCompactDictionaryTag = 0;
+inline constexpr std::size_t kMaxVarintSize = 10;
+inline constexpr std::size_t kMaxDictionaryValueSize = 16;
+
+enum class CompactEncoding : uint8_t {
+  kVarint = 0,      // Unsigned LEB128
+  kSequence = 1,    // Zigzag LEB128 delta from the previous value of the sequence
+  kTimestamp = 2,   // Zigzag LEB128 delta from the previous timestamp plus one, 0 for 0
+  kDictionary = 3,  // Varint ID of a value defined by a preceding dictionary entry
+  kRaw = 4,         // Bytes as they are
+};
+
+// Values expected to grow slowly from record to record
+enum CompactSequence : uint8_t {
+  kCorrelationIdSequence = 0,
+  kOperationIdSequence = 1,
+  kThreadIdSequence = 2,
+  kCompactSequenceCount = 3,
+};
+
+struct CompactField {
+  uint16_t offset;
+  uint8_t size;
+  CompactEncoding encoding;
+  uint8_t sequence;
+};
+
+struct CompactFieldList {
+  const CompactField* fields = nullptr;
+  std::size_t count = 0;
+};
+
+// clang-format off
+#define PTI_COMPACT_FIELD(type, field, encoding) \
+  CompactField{offsetof(type, field), sizeof(type::field), CompactEncoding::encoding, 0}
+#define PTI_COMPACT_SEQUENCE(type, field, sequence) \
+  CompactField{offsetof(type, field), sizeof(type::field), CompactEncoding::kSequence, sequence}
+
+inline constexpr CompactField kKernelCompactFields[] = {
+    PTI_COMPACT_FIELD(pti_view_record_kernel, _queue_handle, kDictionary),
+    PTI_COMPACT_FIELD(pti_view_record_kernel, _device_handle, kDictionary),
+    PTI_COMPACT_FIELD(pti_view_record_kernel, _context_handle, kDictionary),
+    PTI_COMPACT_FIELD(pti_view_record_kernel, _name, kDictionary),
+    PTI_COMPACT_FIELD(pti_view_record_kernel, _source_file_name, kDictionary),
+    PTI_COMPACT_FIELD(pti_view_record_kernel, _source_line_number, kVarint),
+    PTI_COMPACT_SEQUENCE(pti_view_record_kernel, _kernel_id, kOperationIdSequence),
+    PTI_COMPACT_SEQUENCE(pti_view_record_kernel, _correlation_id, kCorrelationIdSequence),
+    PTI_COMPACT_SEQUENCE(pti_view_record_kernel, _thread_id, kThreadIdSequence),
+    PTI_COMPACT_FIELD(pti_view_record_kernel, _pci_address, kDictionary),
+    PTI_COMPACT_FIELD(pti_view_record_kernel, _append_timestamp, kTimestamp),
+    PTI_COMPACT_FIELD(pti_view_record_kernel, _submit_timestamp, kTimestamp),
+    PTI_COMPACT_FIELD(pti_view_record_kernel, _start_timestamp, kTimestamp),
+    PTI_COMPACT_FIELD(pti_view_record_kernel, _end_timestamp, kTimestamp),
+    PTI_COMPACT_FIELD(pti_view_record_kernel, _sycl_task_begin_timestamp, kTimestamp),
+    PTI_COMPACT_FIELD(pti_view_record_kernel, _sycl_enqk_begin_timestamp, kTimestamp),
+    PTI_COMPACT_FIELD(pti_view_record_kernel, _sycl_node_id, kVarint),
+    PTI_COMPACT_FIELD(pti_view_record_kernel, _sycl_invocation_id, kVarint),
+};
+
+inline constexpr CompactField kOverheadCompactFields[] = {
+    PTI_COMPACT_FIELD(pti_view_record_overhead, _overhead_start_timestamp_ns, kTimestamp),
+    PTI_COMPACT_FIELD(pti_view_record_overhead, _overhead_end_timestamp_ns, kTimestamp),
+    PTI_COMPACT_SEQUENCE(pti_view_record_overhead, _overhead_thread_id, kThreadIdSequence),
+    PTI_COMPACT_FIELD(pti_view_record_overhead, _overhead_count, kVarint),
+    PTI_COMPACT_FIELD(pti_view_record_overhead, _overhead_duration_ns, kVarint),
+    PTI_COMPACT_FIELD(pti_view_record_overhead, _overhead_kind, kVarint),
+};
+
+inline constexpr CompactField kSyclRuntimeCompactFields[] = {
+    PTI_COMPACT_FIELD(pti_view_record_sycl_runtime, _name, kDictionary),
+    PTI_COMPACT_FIELD(pti_view_record_sycl_runtime, _start_timestamp, kTimestamp),
+    PTI_COMPACT_FIELD(pti_view_record_sycl_runtime, _end_timestamp, kTimestamp),
+    PTI_COMPACT_FIELD(pti_view_record_sycl_runtime, _process_id, kDictionary),
+    PTI_COMPACT_SEQUENCE(pti_view_record_sycl_runtime, _thread_id, kThreadIdSequence),
+    PTI_COMPACT_SEQUENCE(pti_view_record_sycl_runtime, _correlation_id, kCorrelationIdSequence),
+};
+
+inline constexpr CompactField kExternalCorrelationCompactFields[] = {
+    PTI_COMPACT_SEQUENCE(pti_view_record_external_correlation, _correlation_id,
+                         kCorrelationIdSequence),
+    PTI_COMPACT_FIELD(pti_view_record_external_correlation, _external_id, kVarint),
+    PTI_COMPACT_FIELD(pti_view_record_external_correlation, _external_kind, kVarint),
+};
+
+inline constexpr CompactField kMemoryCopyCompactFields[] = {
+    PTI_COMPACT_FIELD(pti_view_record_memory_copy, _memcpy_type, kVarint),
+    PTI_COMPACT_FIELD(pti_view_record_memory_copy, _mem_src, kVarint),
+    PTI_COMPACT_FIELD(pti_view_record_memory_copy, _mem_dst, kVarint),
+    PTI_COMPACT_FIELD(pti_view_record_memory_copy, _queue_handle, kDictionary),
+    PTI_COMPACT_FIELD(pti_view_record_memory_copy, _device_handle, kDictionary),
+    PTI_COMPACT_FIELD(pti_view_record_memory_copy, _context_handle, kDictionary),
+    PTI_COMPACT_FIELD(pti_view_record_memory_copy, _name, kDictionary),
+    PTI_COMPACT_FIELD(pti_view_record_memory_copy, _pci_address, kDictionary),
+    PTI_COMPACT_SEQUENCE(pti_view_record_memory_copy, _mem_op_id, kOperationIdSequence),
+    PTI_COMPACT_SEQUENCE(pti_view_record_memory_copy, _correlation_id, kCorrelationIdSequence),
+    PTI_COMPACT_SEQUENCE(pti_view_record_memory_copy, _thread_id, kThreadIdSequence),
+    PTI_COMPACT_FIELD(pti_view_record_memory_copy, _append_timestamp, kTimestamp),
+    PTI_COMPACT_FIELD(pti_view_record_memory_copy, _submit_timestamp, kTimestamp),
+    PTI_COMPACT_FIELD(pti_view_record_memory_copy, _start_timestamp, kTimestamp),
+    PTI_COMPACT_FIELD(pti_view_record_memory_copy, _end_timestamp, kTimestamp),
+};
+
+inline constexpr CompactField kMemoryFillCompactFields[] = {
+    PTI_COMPACT_FIELD(pti_view_record_memory_fill, _mem_type, kVarint),
+    PTI_COMPACT_FIELD(pti_view_record_memory_fill, _queue_handle, kDictionary),
+    PTI_COMPACT_FIELD(pti_view_record_memory_fill, _device_handle, kDictionary),
+    PTI_COMPACT_FIELD(pti_view_record_memory_fill, _context_handle, kDictionary),
+    PTI_COMPACT_FIELD(pti_view_record_memory_fill, _name, kDictionary),
+    PTI_COMPACT_FIELD(pti_view_record_memory_fill, _pci_address, kDictionary),
+    PTI_COMPACT_SEQUENCE(pti_view_record_memory_fill, _mem_op_id, kOperationIdSequence),
+    PTI_COMPACT_SEQUENCE(pti_view_record_memory_fill, _correlation_id, kCorrelationIdSequence),
+    PTI_COMPACT_SEQUENCE(pti_view_record_memory_fill, _thread_id, kThreadIdSequence),
+    PTI_COMPACT_FIELD(pti_view_record_memory_fill, _append_timestamp, kTimestamp),
+    PTI_COMPACT_FIELD(pti_view_record_memory_fill, _submit_timestamp, kTimestamp),
+    PTI_COMPACT_FIELD(pti_view_record_memory_fill, _start_timestamp, kTimestamp),
+    PTI_COMPACT_FIELD(pti_view_record_memory_fill, _end_timestamp, kTimestamp),
+    PTI_COMPACT_FIELD(pti_view_record_memory_fill, _bytes, kVarint),
+    PTI_COMPACT_FIELD(pti_view_record_memory_fill, _value_for_set, kVarint),
+};
+
+inline constexpr CompactField kClockConversionCompactFields[] = {
+    PTI_COMPACT_FIELD(pti_view_record_clock_conversion, _raw_base_timestamp, kVarint),
+    PTI_COMPACT_FIELD(pti_view_record_clock_conversion, _real_base_timestamp, kVarint),
+    PTI_COMPACT_FIELD(pti_view_record_clock_conversion, _raw_to_real_rate, kRaw),
+    PTI_COMPACT_FIELD(pti_view_record_clock_conversion, _uncertainty_ns, kVarint),
+};
+
+inline constexpr CompactField kRecordsLostCompactFields[] = {
+    PTI_COMPACT_FIELD(pti_view_record_records_lost, _timestamp, kTimestamp),
+    PTI_COMPACT_FIELD(pti_view_record_records_lost, _buffers_lost, kVarint),
+    PTI_COMPACT_FIELD(pti_view_record_records_lost, _records_lost, kRaw),
+};
+
+inline constexpr CompactField kRecordsFilteredCompactFields[] = {
+    PTI_COMPACT_FIELD(pti_view_record_records_filtered, _timestamp, kTimestamp),
+    PTI_COMPACT_FIELD(pti_view_record_records_filtered, _records_filtered, kRaw),
+    PTI_COMPACT_FIELD(pti_view_record_records_filtered, _by_name, kVarint),
+    PTI_COMPACT_FIELD(pti_view_record_records_filtered, _by_duration, kVarint),
+    PTI_COMPACT_FIELD(pti_view_record_records_filtered, _by_device, kVarint),
+    PTI_COMPACT_FIELD(pti_view_record_records_filtered, _by_rate_limit, kVarint),
+};
+
+inline constexpr CompactField kKernelStatsCompactFields[] = {
+    PTI_COMPACT_FIELD(pti_view_record_kernel_stats, _name, kDictionary),
+    PTI_COMPACT_FIELD(pti_view_record_kernel_stats, _device_handle, kDictionary),
+    PTI_COMPACT_FIELD(pti_view_record_kernel_stats, _group_size, kRaw),
+    PTI_COMPACT_FIELD(pti_view_record_kernel_stats, _start_timestamp, kTimestamp),
+    PTI_COMPACT_FIELD(pti_view_record_kernel_stats, _end_timestamp, kTimestamp),
+    PTI_COMPACT_FIELD(pti_view_record_kernel_stats, _count, kVarint),
+    PTI_COMPACT_FIELD(pti_view_record_kernel_stats, _total_duration_ns, kVarint),
+    PTI_COMPACT_FIELD(pti_view_record_kernel_stats, _min_duration_ns, kVarint),
+    PTI_COMPACT_FIELD(pti_view_record_kernel_stats, _max_duration_ns, kVarint),
+    PTI_COMPACT_FIELD(pti_view_record_kernel_stats, _duration_histogram, kRaw),
+};
+
+#undef PTI_COMPACT_SEQUENCE
+#undef PTI_COMPACT_FIELD
+
+template <std::size_t N>
+constexpr CompactFieldList MakeCompactFieldList(const CompactField (&fields)[N]) {
+  return CompactFieldList{fields, N};
+}
+
+// Indexed by pti_view_kind, the same way as kViewSizeLookupTable
+inline constexpr std::array<CompactFieldList, kSizeOfViewRecordTable> kCompactFieldTable{
+    CompactFieldList{},                                         // PTI_VIEW_INVALID
+    MakeCompactFieldList(kKernelCompactFields),                 // PTI_VIEW_DEVICE_GPU_KERNEL
+    CompactFieldList{},                                         // PTI_VIEW_DEVICE_CPU_KERNEL
+    CompactFieldList{},                                         // PTI_VIEW_LEVEL_ZERO_CALLS
+    CompactFieldList{},                                         // PTI_VIEW_OPENCL_CALLS
+    MakeCompactFieldList(kOverheadCompactFields),               // PTI_VIEW_COLLECTION_OVERHEAD
+    MakeCompactFieldList(kSyclRuntimeCompactFields),            // PTI_VIEW_SYCL_RUNTIME_CALLS
+    MakeCompactFieldList(kExternalCorrelationCompactFields),    // PTI_VIEW_EXTERNAL_CORRELATION
+    MakeCompactFieldList(kMemoryCopyCompactFields),             // PTI_VIEW_DEVICE_GPU_MEM_COPY
+    MakeCompactFieldList(kMemoryFillCompactFields),             // PTI_VIEW_DEVICE_GPU_MEM_FILL
+    MakeCompactFieldList(kClockConversionCompactFields),        // PTI_VIEW_CLOCK_CONVERSION
+    MakeCompactFieldList(kRecordsLostCompactFields),            // PTI_VIEW_RECORDS_LOST
+    MakeCompactFieldList(kRecordsFilteredCompactFields),        // PTI_VIEW_RECORDS_FILTERED
+    MakeCompactFieldList(kKernelStatsCompactFields),            // PTI_VIEW_DEVICE_GPU_KERNEL_STATS
+};
+// clang-format on
+
+constexpr std::size_t MaxCompactFieldSize(const CompactField& field) {
+  switch (field.encoding) {
+    case CompactEncoding::kRaw:
+      return field.size;
+    case CompactEncoding::kDictionary:
+      // The ID plus the dictionary entry defining it
+      return 2 * kMaxVarintSize + 2 + field.size;
+    default:
+      return kMaxVarintSize;
+  }
+}
+
+// Upper bound of an encoded record size, including dictionary entries
+constexpr std::size_t MaxCompactRecordSize() {
+  std::size_t max_size = 0;
+  for (const auto& list : kCompactFieldTable) {
+    std::size_t size = 1;
+    for (std::size_t i = 0; i < list.count; ++i) {
+      size += MaxCompactFieldSize(list.fields[i]);
+    }
+    max_size = std::max(max_size, size);
+  }
+  return max_size;
+}
+
+inline constexpr std::size_t kMaxCompactRecordSize = MaxCompactRecordSize();
+
+inline std::size_t WriteVarint(uint64_t value, uint8_t* out) {
+  std::size_t size = 0;
+  while (value >= 0x80) {
+    out[size++] = static_cast<uint8_t>(value | 0x80);
+    value >>= 7;
+  }
+  out[size++] = static_cast<uint8_t>(value);
+  return size;
+}
+
+// Returns 0 if the varint is truncated or too long
+inline std::size_t ReadVarint(const uint8_t* in, std::size_t size, uint64_t* value) {
+  uint64_t result = 0;
+  for (std::size_t i = 0; i < size && i < kMaxVarintSize; ++i) {
+    result |= static_cast<uint64_t>(in[i] & 0x7F) << (7 * i);
+    if (!(in[i] & 0x80)) {
+      *value = result;
+      return i + 1;
+    }
+  }
+  return 0;
+}
+
+inline uint64_t ZigzagEncode(uint64_t delta) {
+  return (delta << 1) ^ static_cast<uint64_t>(static_cast<int64_t>(delta) >> 63);
+}
+
+inline uint64_t ZigzagDecode(uint64_t value) { return (value >> 1) ^ (~(value & 1) + 1); }
+
+// Integer fields are 4 or 8 bytes wide
+inline uint64_t LoadField(const unsigned char* record, const CompactField& field) {
+  if (field.size == sizeof(uint32_t)) {
+    uint32_t value = 0;
+    std::memcpy(&value, record + field.offset, sizeof(value));
+    return value;
+  }
+  uint64_t value = 0;
+  std::memcpy(&value, record + field.offset, sizeof(value));
+  return value;
+}
+
+inline void StoreField(unsigned char* record, const CompactField& field, uint64_t value) {
+  if (field.size == sizeof(uint32_t)) {
+    const auto narrow = static_cast<uint32_t>(value);
+    std::memcpy(record + field.offset, &narrow, sizeof(narrow));
+    return;
+  }
+  std::memcpy(record + field.offset, &value, sizeof(value));
+}
+
+inline bool IsCompactBuffer(const uint8_t* buffer, std::size_t valid_bytes) {
+  if (!buffer || valid_bytes < kCompactBufferHeaderSize) {
+    return false;
+  }
+  uint32_t magic = 0;
+  std::memcpy(&magic, buffer, sizeof(magic));
+  return magic == kCompactBufferMagic;
+}
+
+inline std::size_t WriteCompactBufferHeader(uint8_t* out) {
+  std::memcpy(out, &kCompactBufferMagic, sizeof(kCompactBufferMagic));
+  return kCompactBufferHeaderSize;
+}
+
+/**
+ * @brief Encoder of view records into a compact buffer.
+ *
+ * Keeps the state shared by the records of one buffer, so it has to be reset
+ * every time a new buffer is started.
+ */
+class CompactEncoder {
+ public:
+  CompactEncoder() = default;
+  CompactEncoder(const CompactEncoder&) = delete;
+  CompactEncoder& operator=(const CompactEncoder&) = delete;
+  CompactEncoder(CompactEncoder&&) = delete;
+  CompactEncoder& operator=(CompactEncoder&&) = delete;
+  virtual ~CompactEncoder() = default;
+
+  inline void Reset() {
+    dictionary_.clear();
+    last_timestamp_ = 0;
+    sequences_.fill(0);
+  }
+
+  // Writes the record (preceded by dictionary entries for its new values)
+  // and returns the number of bytes written, at most kMaxCompactRecordSize
+  template <typename T>
+  inline std::size_t Encode(const T& view_record, uint8_t* out) {
+    const auto kind = view_record._view_kind._view_kind;
+    const auto* record = reinterpret_cast<const unsigned char*>(&view_record);
+    const auto& list = kCompactFieldTable[kind];
+
+    // Dictionary entries go first, so the record itself stays contiguous
+    std::array<uint64_t, kMaxCompactFields> ids = {};
+    std::size_t size = 0;
+    for (std::size_t i = 0; i < list.count; ++i) {
+      const auto& field = list.fields[i];
+      if (field.encoding == CompactEncoding::kDictionary) {
+        ids[i] = Lookup(record + field.offset, field.size, out, &size);
+      }
+    }
+
+    out[size++] = static_cast<uint8_t>(kind);
+    for (std::size_t i = 0; i < list.count; ++i) {
+      const auto& field = list.fields[i];
+      switch (field.encoding) {
+        case CompactEncoding::kVarint:
+          size += WriteVarint(LoadField(record, field), out + size);
+          break;
+        case CompactEncoding::kSequence: {
+          const auto value = LoadField(record, field);
+          size += WriteVarint(ZigzagEncode(value - sequences_[field.sequence]), out + size);
+          sequences_[field.sequence] = value;
+          break;
+        }
+        case CompactEncoding::kTimestamp: {
+          const auto timestamp = LoadField(record, field);
+          if (!timestamp) {
+            out[size++] = 0;
+            break;
+          }
+          size += WriteVarint(ZigzagEncode(timestamp - last_timestamp_) + 1, out + size);
+          last_timestamp_ = timestamp;
+          break;
+        }
+        case CompactEncoding::kDictionary:
+          size += WriteVarint(ids[i], out + size);
+          break;
+        case CompactEncoding::kRaw:
+          std::memcpy(out + size, record + field.offset, field.size);
+          size += field.size;
+          break;
+      }
+    }
+    return size;
+  }
+
+ private:
+  static constexpr std::size_t kMaxCompactFields = 32;
+
+  struct DictionaryKey {
+    std::array<uint8_t, kMaxDictionaryValueSize> value = {};
+    uint8_t size = 0;
+    bool operator==(const DictionaryKey& other) const {
+      return size == other.size && value == other.value;
+    }
+  };
+
+  struct DictionaryKeyHash {
+    std::size_t operator()(const DictionaryKey& key) const {
+      uint64_t low = 0;
+      uint64_t high = 0;
+      std::memcpy(&low, key.value.data(), sizeof(low));
+      std::memcpy(&high, key.value.data() + sizeof(low), sizeof(high));
+      return std::hash<uint64_t>{}(low ^ (high * 0x9E3779B97F4A7C15ULL) ^ key.size);
+    }
+  };
+
+  inline uint64_t Lookup(const unsigned char* value, uint8_t value_size, uint8_t* out,
+                         std::size_t* size) {
+    DictionaryKey key;
+    std::memcpy(key.value.data(), value, value_size);
+    key.size = value_size;
+    const auto [it, inserted] = dictionary_.emplace(key, dictionary_.size());
+    if (inserted) {
+      out[(*size)++] = kCompactDictionaryTag;
+      *size += WriteVarint(it->second, out + *size);
+      out[(*size)++] = value_size;
+      std::memcpy(out + *size, value, value_size);
+      *size += value_size;
+    }
+    return it->second;
+  }
+
+  std::unordered_map<DictionaryKey, uint64_t, DictionaryKeyHash> dictionary_;
+  uint64_t last_timestamp_ = 0;
+  std::array<uint64_t, kCompactSequenceCount> sequences_ = {};
+};
+
+// Parses the entry at *offset of a compact buffer and moves *offset past it
+inline pti_result ReadCompactEntry(const uint8_t* buffer, std::size_t valid_bytes,
+                                   std::size_t* offset, pti_view_compact_entry* entry) {
+  if (!offset || !entry || !IsCompactBuffer(buffer, valid_bytes)) {
+    return pti_result::PTI_ERROR_BAD_ARGUMENT;
+  }
+  auto pos = std::max(*offset, kCompactBufferHeaderSize);
+  if (pos >= valid_bytes) {
+    return pti_result::PTI_STATUS_END_OF_BUFFER;
+  }
+
+  const auto tag = buffer[pos++];
+  if (tag == kCompactDictionaryTag) {
+    uint64_t id = 0;
+    const auto id_size = ReadVarint(buffer + pos, valid_bytes - pos, &id);
+    if (!id_size || pos + id_size >= valid_bytes) {
+      return pti_result::PTI_ERROR_BAD_ARGUMENT;
+    }
+    pos += id_size;
+    const auto value_size = buffer[pos++];
+    if (value_size > kMaxDictionaryValueSize || pos + value_size > valid_bytes) {
+      return pti_result::PTI_ERROR_BAD_ARGUMENT;
+    }
+    entry->_entry_kind = PTI_VIEW_COMPACT_ENTRY_DICTIONARY;
+    entry->_view_kind = PTI_VIEW_INVALID;
+    entry->_dictionary_id = static_cast<uint32_t>(id);
+    entry->_data = buffer + pos;
+    entry->_size = value_size;
+    *offset = pos + value_size;
+    return pti_result::PTI_SUCCESS;
+  }
+
+  if (tag >= kCompactFieldTable.size() || !kCompactFieldTable[tag].count) {
+    return pti_result::PTI_ERROR_BAD_ARGUMENT;
+  }
+  const auto& list = kCompactFieldTable[tag];
+  const auto begin = pos;
+  for (std::size_t i = 0; i < list.count; ++i) {
+    const auto& field = list.fields[i];
+    if (field.encoding == CompactEncoding::kRaw) {
+      if (pos + field.size > valid_bytes) {
+        return pti_result::PTI_ERROR_BAD_ARGUMENT;
+      }
+      pos += field.size;
+      continue;
+    }
+    uint64_t value = 0;
+    const auto value_size = ReadVarint(buffer + pos, valid_bytes - pos, &value);
+    if (!value_size) {
+      return pti_result::PTI_ERROR_BAD_ARGUMENT;
+    }
+    pos += value_size;
+  }
+  entry->_entry_kind = PTI_VIEW_COMPACT_ENTRY_RECORD;
+  entry->_view_kind = static_cast<pti_view_kind>(tag);
+  entry->_dictionary_id = 0;
+  entry->_data = buffer + begin;
+  entry->_size = static_cast<uint32_t>(pos - begin);
+  *offset = pos;
+  return pti_result::PTI_SUCCESS;
+}
+
+/**
+ * @brief Decoder of compact buffers into regular view records.
+ *
+ * Decoded record is kept inside the decoder and is valid until the next call.
+ * Iteration continues only if the record passed in is the one returned by the
+ * previous call for the same buffer, nullptr restarts it.
+ */
+class CompactDecoder {
+ public:
+  CompactDecoder() = default;
+  CompactDecoder(const CompactDecoder&) = delete;
+  CompactDecoder& operator=(const CompactDecoder&) = delete;
+  CompactDecoder(CompactDecoder&&) = delete;
+  CompactDecoder& operator=(CompactDecoder&&) = delete;
+  virtual ~CompactDecoder() = default;
+
+  inline pti_result GetNextRecord(uint8_t* buffer, std::size_t valid_bytes,
+                                  pti_view_record_base** record) {
+    auto* current = reinterpret_cast<pti_view_record_base*>(record_.data());
+    if (!*record) {
+      Restart(buffer);
+    } else if (*record != current || buffer != buffer_) {
+      return pti_result::PTI_ERROR_BAD_ARGUMENT;
+    }
+
+    pti_view_compact_entry entry = {};
+    while (true) {
+      const auto result = ReadCompactEntry(buffer, valid_bytes, &offset_, &entry);
+      if (result != pti_result::PTI_SUCCESS) {
+        return result;
+      }
+      if (entry._entry_kind == PTI_VIEW_COMPACT_ENTRY_DICTIONARY) {
+        if (entry._dictionary_id != dictionary_.size()) {
+          return pti_result::PTI_ERROR_BAD_ARGUMENT;
+        }
+        DictionaryValue value = {};
+        std::memcpy(value.data(), entry._data, entry._size);
+        dictionary_.push_back(value);
+        continue;
+      }
+      if (!Decode(entry)) {
+        return pti_result::PTI_ERROR_BAD_ARGUMENT;
+      }
+      *record = current;
+      return pti_result::PTI_SUCCESS;
+    }
+  }
+
+ private:
+  using DictionaryValue = std::array<uint8_t, kMaxDictionaryValueSize>;
+
+  inline void Restart(uint8_t* buffer) {
+    buffer_ = buffer;
+    offset_ = kCompactBufferHeaderSize;
+    dictionary_.clear();
+    last_timestamp_ = 0;
+    sequences_.fill(0);
+  }
+
+  // Entry has already been validated by ReadCompactEntry
+  inline bool Decode(const pti_view_compact_entry& entry) {
+    const auto& list = kCompactFieldTable[entry._view_kind];
+    auto* record = record_.data();
+    std::memset(record, 0, record_.size());
+    reinterpret_cast<pti_view_record_base*>(record)->_view_kind = entry._view_kind;
+
+    const auto* data = entry._data;
+    std::size_t pos = 0;
+    for (std::size_t i = 0; i < list.count; ++i) {
+      const auto& field = list.fields[i];
+      if (field.encoding == CompactEncoding::kRaw) {
+        std::memcpy(record + field.offset, data + pos, field.size);
+        pos += field.size;
+        continue;
+      }
+      uint64_t value = 0;
+      pos += ReadVarint(data + pos, entry._size - pos, &value);
+      switch (field.encoding) {
+        case CompactEncoding::kVarint:
+          StoreField(record, field, value);
+          break;
+        case CompactEncoding::kSequence:
+          sequences_[field.sequence] += ZigzagDecode(value);
+          StoreField(record, field, sequences_[field.sequence]);
+          break;
+        case CompactEncoding::kTimestamp:
+          if (value) {
+            last_timestamp_ += ZigzagDecode(value - 1);
+            StoreField(record, field, last_timestamp_);
+          }
+          break;
+        case CompactEncoding::kDictionary:
+          if (value >= dictionary_.size()) {
+            return false;
+          }
+          std::memcpy(record + field.offset, dictionary_[value].data(), field.size);
+          break;
+        default:
+          return false;
+      }
+    }
+    return true;
+  }
+
+  uint8_t* buffer_ = nullptr;
+  std::size_t offset_ = 0;
+  std::vector<DictionaryValue> dictionary_;
+  uint64_t last_timestamp_ = 0;
+  std::array<uint64_t, kCompactSequenceCount> sequences_ = {};
+  alignas(alignof(std::max_align_t)) std::array<unsigned char, SizeOfLargestViewRecord()> record_ =
+      {};
+};
+
+}  // namespace utilities
+}  // namespace view
+}  // namespace pti
+
+#endif  // SRC_COMPACT_ENCODING_H_
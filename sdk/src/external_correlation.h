@@ -0,0 +1,104 @@
+//==============================================================
+// Copyright (C) Intel Corporation
+//
+// SPDX-License-Identifier: MIT
+// =============================================================
+
+#ifndef SRC_EXTERNAL_CORRELATION_H_
+#define SRC_EXTERNAL_CORRELATION_H_
+
+#include <array>
+#include <cstddef>
+#include <cstdint>
+
+#include "pti_view.h"
+
+namespace pti {
+namespace view {
+namespace utilities {
+
+inline constexpr std::size_t kExternalKindCount =
+    static_cast<std::size_t>(pti_view_external_kind::PTI_VIEW_EXTERNAL_KIND_CUSTOM_3) + 1;
+// IDs of one kind a thread can have pushed and not popped
+inline constexpr std::size_t kMaxExternalIdDepth = 64;
+
+/**
+ * @brief External correlation IDs pushed by one thread.
+ *
+ * A fixed size stack per external kind, so pushes and pops never allocate.
+ * Every device command of the thread gets a correlation record per kind with
+ * a pushed ID, carrying the innermost ID and the correlation ID of the
+ * command, so records can be matched in any delivery order.
+ */
+class ExternalCorrelationStacks {
+ public:
+  static inline bool IsValidKind(pti_view_external_kind external_kind) {
+    return static_cast<std::size_t>(external_kind) < kExternalKindCount;
+  }
+
+  // Returns false if the stack of the kind is full
+  inline bool Push(pti_view_external_kind external_kind, uint64_t external_id) {
+    auto& stack = stacks_[external_kind];
+    if (stack.depth == kMaxExternalIdDepth) {
+      return false;
+    }
+    stack.ids[stack.depth++] = external_id;
+    pushed_kinds_ |= KindBit(external_kind);
+    return true;
+  }
+
+  // Returns false if no ID of the kind is left
+  inline bool Pop(pti_view_external_kind external_kind, uint64_t* external_id) {
+    auto& stack = stacks_[external_kind];
+    if (!stack.depth) {
+      return false;
+    }
+    --stack.depth;
+    if (external_id) {
+      *external_id = stack.ids[stack.depth];
+    }
+    if (!stack.depth) {
+      pushed_kinds_ &= ~KindBit(external_kind);
+    }
+    return true;
+  }
+
+  // Calls insert with the correlation record of the innermost ID of every
+  // kind with a pushed ID, O(1) if no ID is pushed
+  template <typename Insert>
+  inline void ForEach(uint32_t correlation_id, Insert&& insert) const {
+    if (!pushed_kinds_) {
+      return;
+    }
+    for (std::size_t kind = 0; kind < kExternalKindCount; ++kind) {
+      if (!(pushed_kinds_ & KindBit(kind))) {
+        continue;
+      }
+      const auto& stack = stacks_[kind];
+      pti_view_record_external_correlation ext_record = pti_view_record_external_correlation();
+      ext_record._view_kind._view_kind = pti_view_kind::PTI_VIEW_EXTERNAL_CORRELATION;
+      ext_record._correlation_id = correlation_id;
+      ext_record._external_id = stack.ids[stack.depth - 1];
+      ext_record._external_kind = static_cast<pti_view_external_kind>(kind);
+      insert(ext_record);
+    }
+  }
+
+ private:
+  struct Stack {
+    std::array<uint64_t, kMaxExternalIdDepth> ids = {};
+    std::size_t depth = 0;
+  };
+
+  static inline uint32_t KindBit(std::size_t kind) { return 1U << kind; }
+
+  std::array<Stack, kExternalKindCount> stacks_;
+  // Kinds with a non-empty stack
+  uint32_t pushed_kinds_ = 0;
+};
+
+}  // namespace utilities
+}  // namespace view
+}  // namespace pti
+
+#endif  // SRC_EXTERNAL_CORRELATION_H_
@@ -6,7 +6,8 @@
 
 import os
 import sys
-import re
+
+import ze_api_parser
 
 FILE_OPEN_PERMISSIONS = 0o600
 
@@ -14,21 +15,14 @@ FILE_OPEN_PERMISSIONS = 0o600
 def default_file_opener(path, flags):
     return os.open(path, flags, mode=FILE_OPEN_PERMISSIONS)
 
-# Function scans ze_api.h file from given path (l0_path) and
-# generates list of l0 API of interest
-def get_l0_api_list(l0_path):
-  l0_file_path = os.path.join(l0_path, "ze_api.h")
-  l0_file = open(l0_file_path, "rt", opener=default_file_opener)
+# Function returns list of l0 API of interest (without "ze" prefix)
+# for ze_api.h file from given path (l0_path)
+def get_l0_api_list(l0_path, cache_path):
+  ze_api = ze_api_parser.load(l0_path, cache_path)
   func_list = []
-  for line in l0_file.readlines():
-    if line.find("ZE_APICALL") != -1 and line.find("ze_pfn") != -1:
-      items = line.split("ze_pfn")
-      assert len(items) == 2
-      assert items[1].find("Cb_t") != -1
-      items = items[1].split("Cb_t")
-      assert len(items) == 2
-      func_list.append(items[0].strip())
-  l0_file.close()
+  for func in ze_api.func_list:
+    assert func.find("ze") == 0
+    func_list.append(func[2:])
   return func_list
 
 # =================== generate common header =======================
@@ -114,7 +108,7 @@ def main():
   dst_file = open(dst_file_path, "wt", opener=default_file_opener)
 
   l0_path = sys.argv[2]
-  l0_api_list = get_l0_api_list(l0_path)
+  l0_api_list = get_l0_api_list(l0_path, dst_path)
 
   dst_file.write("#ifndef PTI_TOOLS_COMMON_H_\n")
   dst_file.write("#define PTI_TOOLS_COMMON_H_\n\n")
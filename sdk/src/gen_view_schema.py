@@ -0,0 +1,436 @@
+#==============================================================
+# Copyright (C) Intel Corporation
+#
+# SPDX-License-Identifier: MIT
+# =============================================================
+
+# Generates Python schema for PTI view records from pti_view.h:
+#   pti_view_schema.py - enums, ctypes structures and NumPy dtypes with
+#                        explicit offsets, plus helpers to reinterpret
+#                        delivered buffers as record arrays without copying
+#   view_schema_test.cc - test checking that sizes and offsets used
+#                         by the schema match the compiler layout
+# Layout is computed for LP64 ABI, which is the only one supported by SDK
+
+import collections
+import os
+import re
+import sys
+
+FILE_OPEN_PERMISSIONS = 0o600
+
+SCHEMA_FILE_NAME = "pti_view_schema.py"
+TEST_FILE_NAME = "view_schema_test.cc"
+
+# https://docs.python.org/3/library/functions.html#open
+def default_file_opener(path, flags):
+    return os.open(path, flags, mode=FILE_OPEN_PERMISSIONS)
+
+# Type name -> (size, NumPy format, ctypes type)
+BASIC_TYPES = {
+  "char": (1, "S1", "ctypes.c_char"),
+  "int8_t": (1, "i1", "ctypes.c_int8"),
+  "uint8_t": (1, "u1", "ctypes.c_uint8"),
+  "int16_t": (2, "i2", "ctypes.c_int16"),
+  "uint16_t": (2, "u2", "ctypes.c_uint16"),
+  "int32_t": (4, "i4", "ctypes.c_int32"),
+  "uint32_t": (4, "u4", "ctypes.c_uint32"),
+  "int64_t": (8, "i8", "ctypes.c_int64"),
+  "uint64_t": (8, "u8", "ctypes.c_uint64"),
+  "size_t": (8, "u8", "ctypes.c_size_t"),
+  "float": (4, "f4", "ctypes.c_float"),
+  "double": (8, "f8", "ctypes.c_double")}
+
+POINTER_SIZE = 8
+
+# Record size table of view kinds lives in SDK sources
+RECORD_INFO_PATH = os.path.join(
+  os.path.dirname(os.path.abspath(__file__)), "view_record_info.h")
+
+# Parse pti_view.h ############################################################
+
+# Field of a structure, count is 0 for non-array fields
+ViewField = collections.namedtuple(
+  "ViewField", ["name", "type", "count", "size", "align", "offset"])
+
+class ViewStruct:
+  def __init__(self, name):
+    self.name = name
+    self.field_list = []
+    self.size = 0
+    self.align = 1
+
+def remove_comments(content):
+  content = re.sub(r"/\*.*?\*/", "", content, flags=re.DOTALL)
+  return re.sub(r"//[^\n]*", "", content)
+
+def parse_enums(content):
+  enum_map = collections.OrderedDict()
+  pattern = r"typedef\s+enum\s*\w*\s*\{(.*?)\}\s*(\w+)\s*;"
+  for body, name in re.findall(pattern, content, flags=re.DOTALL):
+    fields = collections.OrderedDict()
+    value = 0
+    for item in body.split(","):
+      item = item.strip()
+      if not item:
+        continue
+      if item.find("=") != -1:
+        field_name, field_value = item.split("=")
+        value = int(field_value.strip(), 0)
+        item = field_name.strip()
+      assert re.match(r"^\w+$", item)
+      assert not item in fields
+      fields[item] = value
+      value += 1
+    assert len(fields) > 0
+    enum_map[name] = fields
+  return enum_map
+
+def get_type_layout(type, enum_map, struct_map):
+  if type.find("*") != -1 or type.endswith("_handle_t"):
+    return POINTER_SIZE, POINTER_SIZE
+  if type in BASIC_TYPES:
+    size = BASIC_TYPES[type][0]
+    return size, size
+  if type in enum_map:
+    return 4, 4
+  assert type in struct_map, "Unknown type " + type
+  return struct_map[type].size, struct_map[type].align
+
+# Integer constants, e.g. used as array sizes
+def parse_defines(content):
+  define_map = {}
+  for name, value in re.findall(r"^#define\s+(\w+)\s+(\d+)\s*$", content, flags=re.MULTILINE):
+    define_map[name] = int(value)
+  return define_map
+
+def parse_structs(content, enum_map, define_map):
+  struct_map = collections.OrderedDict()
+  pattern = r"typedef\s+struct\s*\w*\s*\{(.*?)\}\s*(\w+)\s*;"
+  for body, name in re.findall(pattern, content, flags=re.DOTALL):
+    struct = ViewStruct(name)
+    offset = 0
+    for item in body.split(";"):
+      item = " ".join(item.split())
+      if not item:
+        continue
+      match = re.match(r"^(.*?)\s*\b(\w+)\s*(\[\s*(\w+)\s*\])?$", item)
+      assert match, "Unable to parse field " + item
+      type = match.group(1).strip()
+      field_name = match.group(2)
+      count = 0
+      if match.group(4):
+        count = define_map.get(match.group(4)) or int(match.group(4))
+      size, align = get_type_layout(type, enum_map, struct_map)
+      if count > 0:
+        size *= count
+      offset = (offset + align - 1) // align * align
+      struct.field_list.append(
+        ViewField(field_name, type, count, size, align, offset))
+      offset += size
+      struct.align = max(struct.align, align)
+    assert len(struct.field_list) > 0
+    struct.size = (offset + struct.align - 1) // struct.align * struct.align
+    struct_map[name] = struct
+  return struct_map
+
+# Returns list of (view kind, record type) from view_record_info.h
+def parse_record_kinds(content):
+  kind_list = []
+  for type, kind in re.findall(r"sizeof\((\w+)\)\s*,\s*//\s*(PTI_VIEW_\w+)", content):
+    kind_list.append((kind, type))
+  assert len(kind_list) > 0
+  return kind_list
+
+# Generate Python Schema ######################################################
+
+def get_numpy_format(field, enum_map, struct_map):
+  if field.type.find("*") != -1 or field.type.endswith("_handle_t"):
+    format = "u8"
+  elif field.type in BASIC_TYPES:
+    format = BASIC_TYPES[field.type][1]
+  elif field.type in enum_map:
+    format = "u4"
+    if min(enum_map[field.type].values()) < 0:
+      format = "i4"
+  else:
+    return None
+  if field.count > 0:
+    if field.type == "char":
+      return "S" + str(field.count)
+    return "(" + str(field.count) + ",)" + format
+  return format
+
+def get_ctypes_type(field, enum_map, struct_map):
+  if field.type.find("*") != -1 or field.type.endswith("_handle_t"):
+    if field.type.replace("const", "").replace(" ", "") == "char*":
+      type = "ctypes.c_char_p"
+    else:
+      type = "ctypes.c_void_p"
+  elif field.type in BASIC_TYPES:
+    type = BASIC_TYPES[field.type][2]
+  elif field.type in enum_map:
+    type = "ctypes.c_uint32"
+    if min(enum_map[field.type].values()) < 0:
+      type = "ctypes.c_int32"
+  else:
+    type = field.type
+  if field.count > 0:
+    return type + " * " + str(field.count)
+  return type
+
+# NumPy fields are flat, so nested structures with a single field
+# (e.g. record base) are inlined under the name of the outer field
+def get_numpy_fields(struct, enum_map, struct_map):
+  field_list = []
+  for field in struct.field_list:
+    format = get_numpy_format(field, enum_map, struct_map)
+    if format is not None:
+      field_list.append((field.name, format, field.offset))
+      continue
+    nested = struct_map[field.type]
+    nested_list = get_numpy_fields(nested, enum_map, struct_map)
+    assert field.count == 0
+    if len(nested_list) == 1:
+      field_list.append((field.name, nested_list[0][1],
+                         field.offset + nested_list[0][2]))
+    else:
+      for name, format, offset in nested_list:
+        field_list.append((field.name + "_" + name, format, field.offset + offset))
+  return field_list
+
+def gen_enums(f, enum_map):
+  for name, fields in enum_map.items():
+    f.write("class " + name + "(enum.IntEnum):\n")
+    for field_name, value in fields.items():
+      f.write("  " + field_name + " = " + str(value) + "\n")
+    f.write("\n")
+
+def gen_structs(f, enum_map, struct_map):
+  for name, struct in struct_map.items():
+    f.write("class " + name + "(ctypes.Structure):\n")
+    f.write("  _fields_ = [\n")
+    for field in struct.field_list:
+      f.write("    (\"" + field.name + "\", " +
+              get_ctypes_type(field, enum_map, struct_map) + "),\n")
+    f.write("  ]\n")
+    f.write("\n")
+
+def gen_layout(f, struct_map):
+  f.write("# Record type -> (size, {field: offset}) as laid out by C compiler\n")
+  f.write("RECORD_LAYOUT = {\n")
+  for name, struct in struct_map.items():
+    f.write("  \"" + name + "\": (" + str(struct.size) + ", {\n")
+    for field in struct.field_list:
+      f.write("    \"" + field.name + "\": " + str(field.offset) + ",\n")
+    f.write("  }),\n")
+  f.write("}\n")
+  f.write("\n")
+
+def gen_dtypes(f, struct_map, numpy_map):
+  f.write("# Record type -> NumPy dtype specification\n")
+  f.write("DTYPE_SPECS = {\n")
+  for name, struct in struct_map.items():
+    field_list = numpy_map[name]
+    f.write("  \"" + name + "\": {\n")
+    f.write("    \"names\": [" +
+            ", ".join(["\"" + item[0] + "\"" for item in field_list]) + "],\n")
+    f.write("    \"formats\": [" +
+            ", ".join(["\"" + item[1] + "\"" for item in field_list]) + "],\n")
+    f.write("    \"offsets\": [" +
+            ", ".join([str(item[2]) for item in field_list]) + "],\n")
+    f.write("    \"itemsize\": " + str(struct.size) + "},\n")
+  f.write("}\n")
+  f.write("\n")
+
+def gen_kinds(f, kind_list):
+  f.write("# View kind -> record type, records of other kinds are never delivered\n")
+  f.write("RECORD_TYPES = {\n")
+  for kind, type in kind_list:
+    f.write("  pti_view_kind." + kind + ": " + type + ",\n")
+  f.write("}\n")
+  f.write("\n")
+  f.write("RECORD_SIZES = {kind: ctypes.sizeof(type) for kind, type in RECORD_TYPES.items()}\n")
+  f.write("\n")
+
+# Helpers are the same for any header, so they are written as is
+HELPERS = '''
+_dtype_cache = {}
+
+def get_dtype(kind):
+  """Returns NumPy dtype for records of the given pti_view_kind"""
+  import numpy
+  kind = pti_view_kind(kind)
+  if kind not in _dtype_cache:
+    _dtype_cache[kind] = numpy.dtype(DTYPE_SPECS[RECORD_TYPES[kind].__name__])
+  return _dtype_cache[kind]
+
+def get_record(buffer, offset=0):
+  """Returns ctypes record at the given offset of writable buffer
+  without copying, pointer fields are valid only inside traced process"""
+  kind = pti_view_kind(_kind_struct.unpack_from(buffer, offset)[0])
+  if kind not in RECORD_TYPES:
+    raise ValueError("Unsupported view kind " + str(kind) + " at offset " + str(offset))
+  return RECORD_TYPES[kind].from_buffer(buffer, offset)
+
+def iter_runs(buffer, used_bytes=None):
+  """Walks records of the buffer as ptiViewGetNextRecord does and yields
+  (kind, offset, count) for every run of adjacent records of one kind"""
+  if used_bytes is None:
+    used_bytes = len(memoryview(buffer).cast("B"))
+  offset = 0
+  run_kind = None
+  run_offset = 0
+  run_count = 0
+  while offset < used_bytes:
+    if offset + _kind_struct.size > used_bytes:
+      raise ValueError("Truncated record at offset " + str(offset))
+    kind = _kind_struct.unpack_from(buffer, offset)[0]
+    size = RECORD_SIZES.get(kind)
+    if size is None:
+      raise ValueError("Unsupported view kind " + str(kind) + " at offset " + str(offset))
+    if offset + size > used_bytes:
+      raise ValueError("Truncated record at offset " + str(offset))
+    if kind != run_kind:
+      if run_count > 0:
+        yield pti_view_kind(run_kind), run_offset, run_count
+      run_kind = kind
+      run_offset = offset
+      run_count = 0
+    run_count += 1
+    offset += size
+  if run_count > 0:
+    yield pti_view_kind(run_kind), run_offset, run_count
+
+def split_records(buffer, used_bytes=None):
+  """Returns {kind: [record array, ...]}, every array is a zero-copy view
+  of a run of adjacent records of the same kind"""
+  import numpy
+  result = {}
+  for kind, offset, count in iter_runs(buffer, used_bytes):
+    array = numpy.frombuffer(buffer, dtype=get_dtype(kind), count=count, offset=offset)
+    result.setdefault(kind, []).append(array)
+  return result
+
+def group_records(buffer, used_bytes=None):
+  """Returns {kind: record array}, arrays are zero-copy views if records of
+  the kind are adjacent in the buffer and copies otherwise"""
+  import numpy
+  result = {}
+  for kind, array_list in split_records(buffer, used_bytes).items():
+    if len(array_list) == 1:
+      result[kind] = array_list[0]
+    else:
+      result[kind] = numpy.concatenate(array_list)
+  return result
+
+def self_check():
+  """Checks ctypes and NumPy layouts against sizes and offsets of C records"""
+  for name, (size, offsets) in RECORD_LAYOUT.items():
+    type = globals()[name]
+    assert ctypes.sizeof(type) == size, name
+    for field, offset in offsets.items():
+      assert getattr(type, field).offset == offset, name + "." + field
+  try:
+    import numpy
+  except ImportError:
+    return
+  for name, spec in DTYPE_SPECS.items():
+    dtype = numpy.dtype(spec)
+    assert dtype.itemsize == RECORD_LAYOUT[name][0], name
+    for field, offset in zip(spec["names"], spec["offsets"]):
+      assert dtype.fields[field][1] == offset, name + "." + field
+
+if __name__ == "__main__":
+  self_check()
+  print("PTI view schema self-check passed")
+'''
+
+def gen_schema(f, enum_map, struct_map, kind_list):
+  f.write("# Auto-generated from pti_view.h by gen_view_schema.py, do not edit\n")
+  f.write("\n")
+  f.write("import ctypes\n")
+  f.write("import enum\n")
+  f.write("import struct\n")
+  f.write("\n")
+  gen_enums(f, enum_map)
+  gen_structs(f, enum_map, struct_map)
+  gen_layout(f, struct_map)
+
+  numpy_map = collections.OrderedDict()
+  for name, struct in struct_map.items():
+    numpy_map[name] = get_numpy_fields(struct, enum_map, struct_map)
+  gen_dtypes(f, struct_map, numpy_map)
+
+  gen_kinds(f, kind_list)
+  f.write("_kind_struct = struct.Struct(\"=I\")\n")
+  f.write(HELPERS)
+
+# Generate Self-Check Test ####################################################
+
+def gen_test(f, struct_map, kind_list):
+  f.write("// Auto-generated from pti_view.h by gen_view_schema.py, do not edit\n")
+  f.write("\n")
+  f.write("#include <gtest/gtest.h>\n")
+  f.write("\n")
+  f.write("#include <cstddef>\n")
+  f.write("\n")
+  f.write("#include \"pti_view.h\"\n")
+  f.write("#include \"view_record_info.h\"\n")
+  f.write("\n")
+  f.write("// Python schema (" + SCHEMA_FILE_NAME + ") is generated with these sizes and offsets\n")
+  f.write("TEST(ViewSchemaTest, RecordSizesMatchSchema) {\n")
+  for name, struct in struct_map.items():
+    f.write("  EXPECT_EQ(sizeof(" + name + "), " + str(struct.size) + "U);\n")
+  f.write("}\n")
+  f.write("\n")
+  f.write("TEST(ViewSchemaTest, FieldOffsetsMatchSchema) {\n")
+  for name, struct in struct_map.items():
+    for field in struct.field_list:
+      f.write("  EXPECT_EQ(offsetof(" + name + ", " + field.name + "), " +
+              str(field.offset) + "U);\n")
+  f.write("}\n")
+  f.write("\n")
+  f.write("TEST(ViewSchemaTest, ViewKindSizesMatchSchema) {\n")
+  for kind, type in kind_list:
+    f.write("  EXPECT_EQ(GetViewSize(" + kind + "), " +
+            str(struct_map[type].size) + "U);\n")
+  f.write("}\n")
+
+def main():
+  if len(sys.argv) < 3:
+    print("Usage: python gen_view_schema.py <output_path> <pti_view_header>")
+    return 1
+
+  dst_path = sys.argv[1]
+  if not os.path.exists(dst_path):
+    os.makedirs(dst_path)
+
+  header_file = open(sys.argv[2], "rt")
+  content = remove_comments(header_file.read())
+  header_file.close()
+
+  record_info_file = open(RECORD_INFO_PATH, "rt")
+  kind_list = parse_record_kinds(record_info_file.read())
+  record_info_file.close()
+
+  enum_map = parse_enums(content)
+  struct_map = parse_structs(content, enum_map, parse_defines(content))
+  for kind, type in kind_list:
+    assert kind in enum_map["pti_view_kind"]
+    assert type in struct_map
+
+  schema_file = open(os.path.join(dst_path, SCHEMA_FILE_NAME), "wt",
+                     opener=default_file_opener)
+  gen_schema(schema_file, enum_map, struct_map, kind_list)
+  schema_file.close()
+
+  test_file = open(os.path.join(dst_path, TEST_FILE_NAME), "wt",
+                   opener=default_file_opener)
+  gen_test(test_file, struct_map, kind_list)
+  test_file.close()
+
+  return 0
+
+if __name__ == "__main__":
+  sys.exit(main())
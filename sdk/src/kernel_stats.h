@@ -0,0 +1,121 @@
+//==============================================================
+// Copyright (C) Intel Corporation
+//
+// SPDX-License-Identifier: MIT
+// =============================================================
+
+#ifndef SRC_KERNEL_STATS_H_
+#define SRC_KERNEL_STATS_H_
+
+#include <algorithm>
+#include <array>
+#include <cstddef>
+#include <cstdint>
+#include <functional>
+#include <unordered_map>
+
+#include "pti_view.h"
+
+namespace pti {
+namespace view {
+namespace utilities {
+
+inline constexpr std::size_t kKernelStatsBuckets = PTI_VIEW_KERNEL_STATS_BUCKETS;
+
+// Bucket i counts durations of [2^i, 2^(i+1)) ns, the first and the last
+// buckets are open-ended
+inline std::size_t DurationBucket(uint64_t duration) {
+  std::size_t bucket = 0;
+  while (duration >>= 1) {
+    ++bucket;
+  }
+  return std::min(bucket, kKernelStatsBuckets - 1);
+}
+
+// Kernels are aggregated per name, device and group size. Names are interned,
+// so their pointers identify them.
+struct KernelStatsKey {
+  const char* name = nullptr;
+  ze_device_handle_t device = nullptr;
+  std::array<uint32_t, 3> group_size = {};
+
+  inline bool operator==(const KernelStatsKey& other) const {
+    return name == other.name && device == other.device && group_size == other.group_size;
+  }
+};
+
+struct KernelStatsKeyHash {
+  inline std::size_t operator()(const KernelStatsKey& key) const {
+    std::size_t hash = std::hash<const char*>{}(key.name);
+    const auto combine = [&hash](std::size_t value) {
+      hash ^= value + 0x9e3779b97f4a7c15ULL + (hash << 6) + (hash >> 2);
+    };
+    combine(std::hash<ze_device_handle_t>{}(key.device));
+    for (auto size : key.group_size) {
+      combine(size);
+    }
+    return hash;
+  }
+};
+
+struct KernelStats {
+  uint64_t start = UINT64_MAX;
+  uint64_t end = 0;
+  uint64_t count = 0;
+  uint64_t total_duration = 0;
+  uint64_t min_duration = UINT64_MAX;
+  uint64_t max_duration = 0;
+  std::array<uint64_t, kKernelStatsBuckets> histogram = {};
+
+  inline void Add(uint64_t start_time, uint64_t end_time) {
+    const auto duration = end_time > start_time ? end_time - start_time : 0;
+    start = std::min(start, start_time);
+    end = std::max(end, end_time);
+    ++count;
+    total_duration += duration;
+    min_duration = std::min(min_duration, duration);
+    max_duration = std::max(max_duration, duration);
+    ++histogram[DurationBucket(duration)];
+  }
+
+  inline void Merge(const KernelStats& other) {
+    start = std::min(start, other.start);
+    end = std::max(end, other.end);
+    count += other.count;
+    total_duration += other.total_duration;
+    min_duration = std::min(min_duration, other.min_duration);
+    max_duration = std::max(max_duration, other.max_duration);
+    for (std::size_t i = 0; i < histogram.size(); ++i) {
+      histogram[i] += other.histogram[i];
+    }
+  }
+};
+
+using KernelStatsTable = std::unordered_map<KernelStatsKey, KernelStats, KernelStatsKeyHash>;
+
+inline void MergeKernelStats(KernelStatsTable& table, const KernelStatsTable& other) {
+  for (const auto& [key, stats] : other) {
+    table[key].Merge(stats);
+  }
+}
+
+inline void FillKernelStatsRecord(pti_view_record_kernel_stats& record, const KernelStatsKey& key,
+                                  const KernelStats& stats) {
+  record._view_kind._view_kind = pti_view_kind::PTI_VIEW_DEVICE_GPU_KERNEL_STATS;
+  record._name = key.name;
+  record._device_handle = key.device;
+  std::copy(key.group_size.begin(), key.group_size.end(), record._group_size);
+  record._start_timestamp = stats.start;
+  record._end_timestamp = stats.end;
+  record._count = stats.count;
+  record._total_duration_ns = stats.total_duration;
+  record._min_duration_ns = stats.min_duration;
+  record._max_duration_ns = stats.max_duration;
+  std::copy(stats.histogram.begin(), stats.histogram.end(), record._duration_histogram);
+}
+
+}  // namespace utilities
+}  // namespace view
+}  // namespace pti
+
+#endif  // SRC_KERNEL_STATS_H_
@@ -6,248 +6,19 @@
 
 import os
 import sys
-import re
 
-# Parse Level Zero Headers ####################################################
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import ze_api_parser
 
-STATE_NORMAL = 0
-STATE_CONDITION = 1
-STATE_SKIP = 2
 FILE_OPEN_PERMISSIONS = 0o600
 
 # https://docs.python.org/3/library/functions.html#open
 def default_file_opener(path, flags):
     return os.open(path, flags, mode=FILE_OPEN_PERMISSIONS)
 
-def get_comma_count(line):
-  count = 0
-  level = 0
-  for symbol in line:
-    if symbol == "(":
-      level += 1
-    elif symbol == ")":
-      assert level > 0
-      level -= 1
-    elif symbol == "," and level == 0:
-      count += 1
-  return count
-
-def remove_comments(line):
-  pos = line.find("//")
-  if pos != -1:
-    line = line[0:pos]
-  return line
-
-def get_func_name(callback_struct_name):
-  assert callback_struct_name.strip().find("ze_pfn") == 0
-  assert callback_struct_name.strip().find("Cb_t") + len("Cb_t") == len(callback_struct_name.strip())
-  body = callback_struct_name.strip()
-  body = body.split("ze_pfn")[1]
-  body = body.split("Cb_t")[0]
-  return "ze" + body
-
-def get_struct_range(lines, struct_name):
-  start = -1
-  for i in range(len(lines)):
-    if lines[i].find(struct_name) != -1:
-      start = i
-      break
-  assert start >= 0
-
-  while lines[start].find("{") == -1:
-    start +=1
-  start += 1
-  assert start < len(lines)
-
-  end = start
-  while lines[end].find("}") == -1:
-    end += 1
-  assert end < len(lines)
-
-  return start, end
-
-def get_callback_struct_map(f, struct_name):
-  f.seek(0)
-  lines = f.readlines()
-
-  start, end = get_struct_range(lines, struct_name)
-
-  struct_map = {}
-  cond = ""
-  state = STATE_NORMAL
-  for i in range(start, end):
-    if lines[i].find("#if") >= 0:
-      items = lines[i].strip().split()
-      assert len(items) == 2
-      state = STATE_CONDITION
-      cond = items[1].strip()
-      continue
-    elif lines[i].find("#else") >= 0:
-      assert state == STATE_CONDITION
-      state = STATE_SKIP
-      continue
-    elif lines[i].find("#endif") >= 0:
-      assert state != STATE_NORMAL
-      state = STATE_NORMAL
-      cond = ""
-      continue
-
-    if state == STATE_SKIP:
-      continue
-
-    items = lines[i].strip().split()
-    assert len(items) == 2
-    type_name = items[0].strip()
-    field_name = items[1].strip().strip(";")
-    assert not (type_name in struct_map)
-    struct_map[type_name] = (field_name, cond)
-
-  return struct_map
-
-def get_params(f, func_name):
-  f.seek(0)
-  params = []
-
-  param_struct_name = get_param_struct_name(func_name)
-  lines = f.readlines()
-  start, end = get_struct_range(lines, param_struct_name)
-
-  for i in range(start, end):
-    items = lines[i].strip().split()
-    assert len(items) >= 2
-
-    type = ""
-    for j in range(len(items) - 1):
-      type += items[j] + " "
-    type = type.strip()
-    assert type[len(type) - 1] == "*"
-    type = type[0:len(type) - 1]
-
-    name = items[len(items) - 1].rstrip(";")
-    assert name[0] == "p"
-    name = name[1:len(name)]
-
-    assert not ((name, type) in params)
-    params.append((name, type))
-
-  return params
-
-def find_enums(f, enum_map):
-  f.seek(0)
-  lines = f.readlines()
-
-  enum_list = []
-  for line in lines:
-    if line.find("typedef enum") != -1:
-      items = line.strip().rstrip("{").split()
-      assert len(items) == 3
-      enum_list.append(items[2].strip().lstrip("_"))
-
-  for enum_name in enum_list:
-    params = {}
-    start, end = get_struct_range(lines, enum_name)
-    default_value = 0
-    has_unresolved_values = False
-    for i in range(start, end):
-      line = remove_comments(lines[i]).strip()
-      if not line:
-        continue
-      comma_count = get_comma_count(line)
-      assert comma_count == 0 or comma_count == 1
-      if line.find("=") == -1:
-        assert not has_unresolved_values
-        field_name = line.rstrip(",")
-        field_value = str(default_value)
-        default_value += 1
-      else:
-        items = line.split("=")
-        assert len(items) == 2
-        field_name = items[0].strip()
-        field_value = items[1].strip().rstrip(",")
-        if field_value.find("0x") == 0:
-          field_value = str(int(field_value, 16))
-        if all(symbol.isdigit() for symbol in field_value):
-          default_value = int(field_value)
-          default_value += 1
-        else:
-          has_unresolved_values = True
-      assert not (field_name in params)
-      params[field_name] = field_value
-    assert len(params) > 0
-    assert not (enum_name in enum_map)
-    enum_map[enum_name] = params
-
-def get_param_struct_name(func_name):
-  assert func_name[0] == 'z'
-  func_name = 'Z' + func_name[1:]
-  func_name = func_name.replace("CL", "Cl")
-  func_name = func_name.replace("IPC", "Ipc")
-  items = re.findall('[A-Z][^A-Z]*', func_name)
-  assert len(items) > 1
-  struct_name = ""
-  for item in items:
-    struct_name += item.lower() + "_"
-  struct_name += "params_t"
-  return struct_name
-
-def get_func_list(f):
-  f.seek(0)
-  func_list = []
-  for line in f.readlines():
-    if line.find("ZE_APICALL") != -1 and line.find("ze_pfn") != -1:
-      items = line.split("ze_pfn")
-      assert len(items) == 2
-      assert items[1].find("Cb_t") != -1
-      items = items[1].split("Cb_t")
-      assert len(items) == 2
-      func_list.append("ze" + items[0].strip())
-  return func_list
-
-def get_callback_group_map(f):
-  group_map = {}
-
-  base_map = get_callback_struct_map(f, "ze_callbacks_t")
-  assert len(base_map) > 0
-
-  for key, value in base_map.items():
-    func_map = get_callback_struct_map(f, key)
-    for fkey, fvalue in func_map.items():
-      func_name = get_func_name(fkey)
-      assert not (func_name in group_map)
-      group_map[func_name] = (value, fvalue)
-
-  return group_map
-
-def get_param_map(f):
-  param_map = {}
-  func_list = get_func_list(f)
-
-  for func in func_list:
-    assert not (func in param_map)
-    param_map[func] = get_params(f, func)
-
-  return param_map
-
-def get_enum_map(include_path):
-  enum_map = {}
-
-  for file_name in os.listdir(include_path):
-    if file_name.endswith(".h") or file_name.endswith(".hpp"):
-      file_path = os.path.join(include_path, file_name)
-      file = open(file_path, "rt", opener=default_file_opener)
-      find_enums(file, enum_map)
-      file.close()
-
-  return enum_map
-
 # Generate Callbacks ##########################################################
 
-def gen_api(f, func_list, kfunc_list, group_map):
-  f.write("void EnableTracing(zel_tracer_handle_t tracer) {\n")
-  f.write("  zet_core_callbacks_t prologue = {};\n")
-  f.write("  zet_core_callbacks_t epilogue = {};\n")
-  f.write("\n")
-  f.write("  if (options_.api_tracing) {\n")
+def gen_callback_table(f, func_list, group_map):
   for func in func_list:
     if not func in group_map:
       continue
@@ -264,32 +35,43 @@ def gen_api(f, func_list, kfunc_list, group_map):
     f.write("    epilogue." + group_name + "." + callback_name + " = " + func + "OnExit;\n")
     if callback_cond:
       f.write("#endif //" + callback_cond + "\n")
+
+def gen_api(f, func_list, kfunc_list, lifetime_func_list, group_map):
+  # Lifetime callbacks stay installed on a tracer of their own, the window
+  # tracer gets all the others
+  window_func_list = [func for func in func_list if not func in lifetime_func_list]
+  window_kfunc_list = [func for func in kfunc_list if not func in lifetime_func_list]
+  f.write("void SetTracingCallbacks(zel_tracer_handle_t tracer, bool lifetime) {\n")
+  f.write("  zet_core_callbacks_t prologue = {};\n")
+  f.write("  zet_core_callbacks_t epilogue = {};\n")
+  f.write("\n")
+  f.write("  if (lifetime) {\n")
+  f.write("    if (options_.api_tracing || options_.kernel_tracing) {\n")
+  gen_callback_table(f, lifetime_func_list, group_map)
+  f.write("    }\n")
+  f.write("  }\n")
+  f.write("  else if (options_.api_tracing) {\n")
+  gen_callback_table(f, window_func_list, group_map)
   f.write("  }\n")
   f.write("  else if (options_.kernel_tracing) {\n")
-  for func in kfunc_list:
-    if not func in group_map:
-      continue
-
-    group, callback = group_map[func]
-    group_name = group[0]
-    group_cond = group[1]
-    assert not group_cond
-    callback_name = callback[0]
-    callback_cond = callback[1]
-    if callback_cond:
-      f.write("#if " + callback_cond + "\n")
-    f.write("    prologue." + group_name + "." + callback_name + " = " + func + "OnEnter;\n")
-    f.write("    epilogue." + group_name + "." + callback_name + " = " + func + "OnExit;\n")
-    if callback_cond:
-      f.write("#endif //" + callback_cond + "\n")
+  gen_callback_table(f, window_kfunc_list, group_map)
   f.write("  }\n")
   f.write("\n")
   f.write("  ze_result_t status = ZE_RESULT_SUCCESS;\n")
-  f.write("  overhead::Init();\n")
   f.write("  status = zelTracerSetPrologues(tracer, &prologue);\n")
   f.write("  PTI_ASSERT(status == ZE_RESULT_SUCCESS);\n")
   f.write("  status = zelTracerSetEpilogues(tracer, &epilogue);\n")
   f.write("  PTI_ASSERT(status == ZE_RESULT_SUCCESS);\n")
+  f.write("}\n")
+  f.write("\n")
+
+  f.write("void EnableTracing(zel_tracer_handle_t tracer, zel_tracer_handle_t lifetime_tracer) {\n")
+  f.write("  ze_result_t status = ZE_RESULT_SUCCESS;\n")
+  f.write("  overhead::Init();\n")
+  f.write("  SetTracingCallbacks(lifetime_tracer, true);\n")
+  f.write("  SetTracingCallbacks(tracer, false);\n")
+  f.write("  status = zelTracerSetEnabled(lifetime_tracer, true);\n")
+  f.write("  PTI_ASSERT(status == ZE_RESULT_SUCCESS);\n")
   f.write("  status = zelTracerSetEnabled(tracer, true);\n")
   f.write("  PTI_ASSERT(status == ZE_RESULT_SUCCESS);\n")
   f.write("  {std::string o_api_string = \"zelTracerSet*\";overhead::FiniLevel0(overhead::OverheadRuntimeType::OVERHEAD_RUNTIME_TYPE_L0,o_api_string.c_str());};\n")
@@ -778,7 +560,7 @@ def gen_callbacks(f, func_list, command_list_func_list, command_queue_func_list,
     if callback_cond:
       f.write("#if " + callback_cond + "\n")
     f.write("static void " + func + "OnEnter(\n")
-    f.write("    " + "[[maybe_unused]]" + get_param_struct_name(func) + "* params,\n")
+    f.write("    " + "[[maybe_unused]]" + ze_api_parser.get_param_struct_name(func) + "* params,\n")
     f.write("    [[maybe_unused]]ze_result_t result,\n")
     f.write("    [[maybe_unused]]void* global_data,\n")
     f.write("    [[maybe_unused]]void** instance_user_data) {\n")
@@ -786,7 +568,7 @@ def gen_callbacks(f, func_list, command_list_func_list, command_queue_func_list,
     f.write("}\n")
     f.write("\n")
     f.write("static void " + func + "OnExit(\n")
-    f.write("    " + "[[maybe_unused]]" + get_param_struct_name(func) + "* params,\n")
+    f.write("    " + "[[maybe_unused]]" + ze_api_parser.get_param_struct_name(func) + "* params,\n")
     f.write("    [[maybe_unused]]ze_result_t result,\n")
     f.write("    [[maybe_unused]]void* global_data,\n")
     f.write("    [[maybe_unused]]void** instance_user_data) {\n")
@@ -812,27 +594,16 @@ def main():
   dst_file = open(dst_file_path, "wt", opener=default_file_opener)
 
   l0_path = sys.argv[2]
-  l0_file_path = os.path.join(l0_path, "ze_api.h")
-
-  l0_file = open(l0_file_path, "rt", opener=default_file_opener)
-  func_list = get_func_list(l0_file)
-  kfunc_list = [
+  ze_api = ze_api_parser.load(l0_path, dst_path)
+  func_list = ze_api.func_list
+  # Callbacks kept while collection is stopped, installed on a tracer that is
+  # never disabled: lifetimes of the objects traced commands refer to (command
+  # lists, queues, events, kernels, images), submission and completion of the
+  # commands appended while it was running
+  lifetime_func_list = [
       "zeEventDestroy",
       "zeEventHostReset",
       "zeEventPoolCreate",
-      "zeCommandListAppendLaunchKernel",
-      "zeCommandListAppendLaunchCooperativeKernel",
-      "zeCommandListAppendLaunchKernelIndirect",
-      "zeCommandListAppendMemoryCopy",
-      "zeCommandListAppendMemoryFill",
-      "zeCommandListAppendBarrier",
-      "zeCommandListAppendMemoryRangesBarrier",
-      "zeCommandListAppendMemoryCopyRegion",
-      "zeCommandListAppendMemoryCopyFromContext",
-      "zeCommandListAppendImageCopy",
-      "zeCommandListAppendImageCopyRegion",
-      "zeCommandListAppendImageCopyToMemory",
-      "zeCommandListAppendImageCopyFromMemory",
       "zeCommandQueueExecuteCommandLists",
       "zeCommandListCreate",
       "zeCommandListCreateImmediate",
@@ -863,6 +634,9 @@ def main():
       "zeCommandListAppendImageCopyRegion",
       "zeCommandListAppendImageCopyToMemory",
       "zeCommandListAppendImageCopyFromMemory"]
+  # Callbacks of kernel tracing: the ones kept while collection is stopped go
+  # to the lifetime tracer, appends go to the window tracer
+  kfunc_list = lifetime_func_list + command_list_func_list
 
   command_queue_func_list = [
       "zeCommandQueueExecuteCommandLists"]
@@ -883,16 +657,15 @@ def main():
       "zeFenceHostSynchronize",
       "zeCommandQueueSynchronize"]
 
-  group_map = get_callback_group_map(l0_file)
-  param_map = get_param_map(l0_file)
-  enum_map = get_enum_map(l0_path)
+  group_map = ze_api.group_map
+  param_map = ze_api.param_map
+  enum_map = ze_api.enum_map
 
   gen_result_converter(dst_file, enum_map)
   gen_structure_type_converter(dst_file, enum_map)
   gen_callbacks(dst_file, func_list, command_list_func_list, command_queue_func_list, submission_func_list, synchronize_func_list_on_enter, synchronize_func_list_on_exit, group_map, param_map, enum_map)
-  gen_api(dst_file, func_list, kfunc_list, group_map)
+  gen_api(dst_file, func_list, kfunc_list, lifetime_func_list, group_map)
 
-  l0_file.close()
   dst_file.close()
 
 if __name__ == "__main__":
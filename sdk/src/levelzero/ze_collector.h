@@ -18,6 +18,7 @@
 #include <level_zero/layers/zel_tracing_api.h>
 #include <level_zero/ze_api.h>
 
+#include <algorithm>
 #include <atomic>
 #include <chrono>
 #include <cstdint>
@@ -271,6 +272,9 @@ enum KERNEL_COMMAND_TYPE {
 struct ZeKernelCommandProps {
   std::string name;
   KERNEL_COMMAND_TYPE type;
+  ZeCommandKind kind;
+  ZeMemoryType src_mem_type;
+  ZeMemoryType dst_mem_type;
   size_t simd_width;
   size_t bytes_transferred;
   uint32_t group_count[3];
@@ -431,8 +435,12 @@ class ZeCollector {
     ze_result_t status = ZE_RESULT_SUCCESS;
     zel_tracer_desc_t tracer_desc = {ZEL_STRUCTURE_TYPE_TRACER_EXP_DESC, nullptr, collector};
     zel_tracer_handle_t tracer = nullptr;
+    zel_tracer_handle_t lifetime_tracer = nullptr;
     overhead::Init();
     status = zelTracerCreate(&tracer_desc, &tracer);
+    if (status == ZE_RESULT_SUCCESS) {
+      status = zelTracerCreate(&tracer_desc, &lifetime_tracer);
+    }
     {
       std::string o_api_string = "zelTracerCreate";
       overhead::FiniLevel0(overhead::OverheadRuntimeType::OVERHEAD_RUNTIME_TYPE_L0,
@@ -440,13 +448,17 @@ class ZeCollector {
     };
     if (status != ZE_RESULT_SUCCESS) {
       std::cerr << "[WARNING] Unable to create Level Zero tracer" << std::endl;
+      if (tracer != nullptr) {
+        zelTracerDestroy(tracer);
+      }
       delete collector;
       return nullptr;
     }
 
-    collector->EnableTracing(tracer);
+    collector->EnableTracing(tracer, lifetime_tracer);
 
     collector->tracer_ = tracer;
+    collector->lifetime_tracer_ = lifetime_tracer;
 
     ze_driver_handle_t driver;
     uint32_t count = 1;
@@ -497,6 +509,12 @@ class ZeCollector {
 #if !defined(_WIN32)
       ze_result_t status = zelTracerDestroy(tracer_);
       PTI_ASSERT(status == ZE_RESULT_SUCCESS);
+#endif
+    }
+    if (lifetime_tracer_ != nullptr) {
+#if !defined(_WIN32)
+      ze_result_t status = zelTracerDestroy(lifetime_tracer_);
+      PTI_ASSERT(status == ZE_RESULT_SUCCESS);
 #endif
     }
   }
@@ -613,6 +631,9 @@ class ZeCollector {
 #if !defined(_WIN32)
     overhead::Init();
     ze_result_t status = zelTracerSetEnabled(tracer_, false);
+    if (status == ZE_RESULT_SUCCESS) {
+      status = zelTracerSetEnabled(lifetime_tracer_, false);
+    }
     {
       std::string o_api_string = "zelTracerSetEnabled";
       overhead::FiniLevel0(overhead::OverheadRuntimeType::OVERHEAD_RUNTIME_TYPE_L0,
@@ -622,6 +643,32 @@ class ZeCollector {
 #endif
   }
 
+  // Callbacks of object lifetimes are on a tracer of their own that stays
+  // enabled, stopped collector disables the tracer of all the others
+  void StartTracing() { SetTracingRunning(true); }
+
+  void StopTracing() { SetTracingRunning(false); }
+
+  bool IsTracingRunning() const { return tracing_running_.load(std::memory_order_acquire); }
+
+  // Commands completed later start not earlier than the returned host
+  // timestamp: submitted commands not before their submission, commands not
+  // submitted yet not before now. 0 while records of completed commands are
+  // being handed over to the callbacks.
+  uint64_t GetCompletionWatermark() {
+    const std::lock_guard<std::mutex> lock(lock_);
+    if (completions_in_flight_.load(std::memory_order_acquire)) {
+      return 0;
+    }
+    uint64_t watermark = UniTimer::GetHostTimestamp();
+    for (const auto* command : kernel_command_list_) {
+      if (command->event != nullptr) {
+        watermark = std::min(watermark, command->submit_time);
+      }
+    }
+    return watermark;
+  }
+
   const ZeKernelInfoMap& GetKernelInfoMap() const { return kernel_info_map_; }
 
   const ZeFunctionInfoMap& GetFunctionInfoMap() const { return function_info_map_; }
@@ -681,6 +728,24 @@ class ZeCollector {
     CreateDeviceMap();
   }
 
+  void SetTracingRunning(bool running) {
+    const std::lock_guard<std::mutex> lock(tracing_lock_);
+    if (tracer_ == nullptr || tracing_running_.load(std::memory_order_acquire) == running) {
+      return;
+    }
+    // Callbacks are never swapped, so lifetime calls made meanwhile by other
+    // threads are traced
+    overhead::Init();
+    ze_result_t status = zelTracerSetEnabled(tracer_, running);
+    {
+      std::string o_api_string = "zelTracerSetEnabled";
+      overhead::FiniLevel0(overhead::OverheadRuntimeType::OVERHEAD_RUNTIME_TYPE_L0,
+                           o_api_string.c_str());
+    };
+    PTI_ASSERT(status == ZE_RESULT_SUCCESS);
+    tracing_running_.store(running, std::memory_order_release);
+  }
+
   void CreateDeviceMap() {
     ze_result_t status = ZE_RESULT_SUCCESS;
     uint32_t num_drivers = 0;
@@ -1495,6 +1560,9 @@ overhead::Init();
       PTI_ASSERT(it != device_descriptors_.end());
       rec.pci_prop_ = it->second.pci_properties;
       rec.name_ = std::move(name);
+      rec.kind_ = command->props.kind;
+      rec.src_mem_type_ = command->props.src_mem_type;
+      rec.dst_mem_type_ = command->props.dst_mem_type;
       rec.queue_ = command->queue;
       rec.device_ = command->device;
       if ((tile >= 0) && (device_map_.count(command->device) == 1) &&
@@ -1525,6 +1593,9 @@ overhead::Init();
 
         rec.source_file_name_ = command->source_file_name_;
         rec.source_line_number_ = command->source_line_number_;
+        rec.group_size_[0] = command->props.group_size[0];
+        rec.group_size_[1] = command->props.group_size[1];
+        rec.group_size_[2] = command->props.group_size[2];
       }
       if (command->props.type == KERNEL_COMMAND_TYPE_MEMORY) {
         rec.sycl_node_id_ = command->sycl_node_id_;
@@ -1684,6 +1755,18 @@ overhead::Init();
     // event_cache_.ResetEvent(command->event);
   }
 
+  // Records taken out of kernel_command_list_ are counted in
+  // completions_in_flight_ (under lock_) until the callbacks return
+  void ReportCompleted(std::vector<ZeKernelCommandExecutionRecord>& kcexec) {
+    if (kcallback_ != nullptr) {
+      kcallback_(callback_data_, kcexec);
+    }
+    if (cb_enabled_.acallback && acallback_ != nullptr) {
+      acallback_(callback_data_, kcexec);
+    }
+    completions_in_flight_.fetch_sub(1, std::memory_order_release);
+  }
+
   void ProcessCalls(std::vector<uint64_t>* kids,
                     std::vector<ZeKernelCommandExecutionRecord>* kcexecrec) {
     ze_result_t status = ZE_RESULT_SUCCESS;
@@ -2005,14 +2088,10 @@ overhead::Init();
       std::vector<ZeKernelCommandExecutionRecord> kcexec;
       collector->lock_.lock();
       collector->ProcessCall(*(params->phEvent), kids, &kcexec);
+      ++collector->completions_in_flight_;
       collector->lock_.unlock();
 
-      if (collector->kcallback_ != nullptr) {
-        collector->kcallback_(collector->callback_data_, kcexec);
-      }
-      if (collector->cb_enabled_.acallback && collector->acallback_ != nullptr) {
-        collector->acallback_(collector->callback_data_, kcexec);
-      }
+      collector->ReportCompleted(kcexec);
     }
   }
 
@@ -2024,14 +2103,10 @@ overhead::Init();
       std::vector<ZeKernelCommandExecutionRecord> kcexec;
       collector->lock_.lock();
       collector->ProcessCall(*(params->phEvent), kids, &kcexec);
+      ++collector->completions_in_flight_;
       collector->lock_.unlock();
 
-      if (collector->kcallback_ != nullptr) {
-        collector->kcallback_(collector->callback_data_, kcexec);
-      }
-      if (collector->cb_enabled_.acallback && collector->acallback_ != nullptr) {
-        collector->acallback_(collector->callback_data_, kcexec);
-      }
+      collector->ReportCompleted(kcexec);
     }
   }
 
@@ -2043,14 +2118,10 @@ overhead::Init();
       std::vector<ZeKernelCommandExecutionRecord> kcexec;
       collector->lock_.lock();
       collector->ProcessCall(*(params->phEvent), kids, &kcexec);
+      ++collector->completions_in_flight_;
       collector->lock_.unlock();
 
-      if (collector->kcallback_ != nullptr) {
-        collector->kcallback_(collector->callback_data_, kcexec);
-      }
-      if (collector->cb_enabled_.acallback && collector->acallback_ != nullptr) {
-        collector->acallback_(collector->callback_data_, kcexec);
-      }
+      collector->ReportCompleted(kcexec);
     }
   }
 
@@ -2063,14 +2134,10 @@ overhead::Init();
       std::vector<ZeKernelCommandExecutionRecord> kcexec;
       collector->lock_.lock();
       collector->ProcessCall(*(params->phEvent), kids, &kcexec);
+      ++collector->completions_in_flight_;
       collector->lock_.unlock();
 
-      if (collector->kcallback_ != nullptr) {
-        collector->kcallback_(collector->callback_data_, kcexec);
-      }
-      if (collector->cb_enabled_.acallback && collector->acallback_ != nullptr) {
-        collector->acallback_(collector->callback_data_, kcexec);
-      }
+      collector->ReportCompleted(kcexec);
     }
   }
 
@@ -2083,14 +2150,10 @@ overhead::Init();
       std::vector<ZeKernelCommandExecutionRecord> kcexec;
       collector->lock_.lock();
       collector->ProcessCall(*(params->phFence), kids, &kcexec);
+      ++collector->completions_in_flight_;
       collector->lock_.unlock();
 
-      if (collector->kcallback_ != nullptr) {
-        collector->kcallback_(collector->callback_data_, kcexec);
-      }
-      if (collector->cb_enabled_.acallback && collector->acallback_ != nullptr) {
-        collector->acallback_(collector->callback_data_, kcexec);
-      }
+      collector->ReportCompleted(kcexec);
     }
   }
 
@@ -2409,6 +2472,7 @@ overhead::Init();
     ZeKernelCommandProps props{};
     props.name = std::move(command);
     props.type = KERNEL_COMMAND_TYPE_COMMAND;
+    props.kind = GetCommandKind(props.name);
 
     AppendKernelCommandCommon(collector, props, signal_event, query, command_list,
                               command_list_info, instance_data, kids);
@@ -2455,6 +2519,8 @@ overhead::Init();
     PTI_ASSERT(!name.empty());
 
     std::string direction;
+    ZeMemoryType src_mem_type = ZeMemoryType::kMemory;
+    ZeMemoryType dst_mem_type = ZeMemoryType::kMemory;
 
     if (src_context != nullptr && src != nullptr) {
       ze_memory_allocation_properties_t props;
@@ -2472,15 +2538,19 @@ overhead::Init();
       switch (props.type) {
         case ZE_MEMORY_TYPE_UNKNOWN:
           direction.push_back('M');
+          src_mem_type = ZeMemoryType::kMemory;
           break;
         case ZE_MEMORY_TYPE_HOST:
           direction.push_back('H');
+          src_mem_type = ZeMemoryType::kHost;
           break;
         case ZE_MEMORY_TYPE_DEVICE:
           direction.push_back('D');
+          src_mem_type = ZeMemoryType::kDevice;
           break;
         case ZE_MEMORY_TYPE_SHARED:
           direction.push_back('S');
+          src_mem_type = ZeMemoryType::kShared;
           break;
         default:
           break;
@@ -2505,15 +2575,19 @@ overhead::Init();
       switch (props.type) {
         case ZE_MEMORY_TYPE_UNKNOWN:
           direction.push_back('M');
+          dst_mem_type = ZeMemoryType::kMemory;
           break;
         case ZE_MEMORY_TYPE_HOST:
           direction.push_back('H');
+          dst_mem_type = ZeMemoryType::kHost;
           break;
         case ZE_MEMORY_TYPE_DEVICE:
           direction.push_back('D');
+          dst_mem_type = ZeMemoryType::kDevice;
           break;
         case ZE_MEMORY_TYPE_SHARED:
           direction.push_back('S');
+          dst_mem_type = ZeMemoryType::kShared;
           break;
         default:
           break;
@@ -2529,6 +2603,9 @@ overhead::Init();
     props.bytes_transferred = bytes_transferred;
     props.value_size = pattern_size;
     props.type = KERNEL_COMMAND_TYPE_MEMORY;
+    props.kind = GetCommandKind(props.name);
+    props.src_mem_type = src_mem_type;
+    props.dst_mem_type = dst_mem_type;
     return props;
   }
 
@@ -2538,9 +2615,24 @@ overhead::Init();
     ZeKernelCommandProps props{};
     props.name = name;
     props.type = KERNEL_COMMAND_TYPE_COMMAND;
+    props.kind = GetCommandKind(props.name);
     return props;
   }
 
+  // Image copies and ranges barriers are reported as kernels
+  static ZeCommandKind GetCommandKind(const std::string& name) {
+    if (name.rfind("zeCommandListAppendMemoryCopy", 0) == 0) {
+      return ZeCommandKind::kMemoryCopy;
+    }
+    if (name.rfind("zeCommandListAppendMemoryFill", 0) == 0) {
+      return ZeCommandKind::kMemoryFill;
+    }
+    if (name.rfind("zeCommandListAppendBarrier", 0) == 0) {
+      return ZeCommandKind::kBarrier;
+    }
+    return ZeCommandKind::kKernel;
+  }
+
   static void OnEnterCommandListAppendLaunchKernel(
       ze_command_list_append_launch_kernel_params_t* params, ze_result_t result, void* global_data,
       void** instance_data) {
@@ -2983,14 +3075,10 @@ overhead::Init();
       collector->lock_.lock();
       collector->ProcessCalls(nullptr, &kcexec);
       // collector->RemoveCommandList(*params->phCommandList);
+      ++collector->completions_in_flight_;
       collector->lock_.unlock();
 
-      if (collector->kcallback_ != nullptr) {
-        collector->kcallback_(collector->callback_data_, kcexec);
-      }
-      if (collector->cb_enabled_.acallback && collector->acallback_ != nullptr) {
-        collector->acallback_(collector->callback_data_, kcexec);
-      }
+      collector->ReportCompleted(kcexec);
     }
   }
 
@@ -3003,14 +3091,10 @@ overhead::Init();
       collector->lock_.lock();
       collector->ProcessCalls(nullptr, &kcexec);
       // collector->ResetCommandList(*params->phCommandList);
+      ++collector->completions_in_flight_;
       collector->lock_.unlock();
 
-      if (collector->kcallback_ != nullptr) {
-        collector->kcallback_(collector->callback_data_, kcexec);
-      }
-      if (collector->cb_enabled_.acallback && collector->acallback_ != nullptr) {
-        collector->acallback_(collector->callback_data_, kcexec);
-      }
+      collector->ReportCompleted(kcexec);
     }
   }
 
@@ -3047,14 +3131,10 @@ overhead::Init();
       std::vector<ZeKernelCommandExecutionRecord> kcexec;
       collector->lock_.lock();
       collector->ProcessCalls(kids, &kcexec);
+      ++collector->completions_in_flight_;
       collector->lock_.unlock();
 
-      if (collector->kcallback_ != nullptr) {
-        collector->kcallback_(collector->callback_data_, kcexec);
-      }
-      if (collector->cb_enabled_.acallback && collector->acallback_ != nullptr) {
-        collector->acallback_(collector->callback_data_, kcexec);
-      }
+      collector->ReportCompleted(kcexec);
     }
   }
 
@@ -3091,14 +3171,10 @@ overhead::Init();
       collector->lock_.lock();
       collector->ProcessCalls(nullptr, &kcexec);
       collector->queue_ordinal_index_map_.erase(*params->phCommandQueue);
+      ++collector->completions_in_flight_;
       collector->lock_.unlock();
 
-      if (collector->kcallback_ != nullptr) {
-        collector->kcallback_(collector->callback_data_, kcexec);
-      }
-      if (collector->cb_enabled_.acallback && collector->acallback_ != nullptr) {
-        collector->acallback_(collector->callback_data_, kcexec);
-      }
+      collector->ReportCompleted(kcexec);
     }
   }
 
@@ -3153,8 +3229,12 @@ overhead::Init();
 
  private:  // Data
   zel_tracer_handle_t tracer_ = nullptr;
+  zel_tracer_handle_t lifetime_tracer_ = nullptr;
   CollectorOptions options_;
   CallbacksEnabled cb_enabled_ = {};
+  std::atomic<bool> tracing_running_ = true;
+  std::mutex tracing_lock_;
+  std::atomic<uint32_t> completions_in_flight_ = 0;
   OnZeKernelFinishCallback acallback_ = nullptr;
   OnZeKernelFinishCallback kcallback_ = nullptr;
   OnZeFunctionFinishCallback fcallback_ = nullptr;
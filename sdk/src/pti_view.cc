@@ -83,6 +83,284 @@ pti_result ptiViewGetNextRecord(uint8_t* buffer, size_t valid_bytes,
   }
 }
 
+//
+// TODO: parse different exception types, analyse caught exception and return
+// different error code.
+//
+pti_result ptiViewGetNextCompactEntry(uint8_t* buffer, size_t valid_bytes, size_t* offset,
+                                      pti_view_compact_entry* entry) {
+  try {
+    return pti::view::utilities::ReadCompactEntry(buffer, valid_bytes, offset, entry);
+  } catch (const std::overflow_error& e) {
+    return pti_result::PTI_ERROR_INTERNAL;
+  } catch (const std::runtime_error& e) {
+    return pti_result::PTI_ERROR_INTERNAL;
+  } catch (const std::exception& e) {
+    return pti_result::PTI_ERROR_INTERNAL;
+  } catch (...) {
+    return pti_result::PTI_ERROR_INTERNAL;
+  }
+}
+
+//
+// TODO: parse different exception types, analyse caught exception and return
+// different error code.
+//
+pti_result ptiViewSetRecordEncoding(pti_view_record_encoding encoding) {
+  try {
+    if (!(IsPtiViewRecordEncodingEnum(encoding))) {
+      return pti_result::PTI_ERROR_BAD_ARGUMENT;
+    }
+    return Instance().SetRecordEncoding(encoding);
+  } catch (const std::overflow_error& e) {
+    return pti_result::PTI_ERROR_INTERNAL;
+  } catch (const std::runtime_error& e) {
+    return pti_result::PTI_ERROR_INTERNAL;
+  } catch (const std::exception& e) {
+    return pti_result::PTI_ERROR_INTERNAL;
+  } catch (...) {
+    return pti_result::PTI_ERROR_INTERNAL;
+  }
+}
+
+//
+// TODO: parse different exception types, analyse caught exception and return
+// different error code.
+//
+pti_result ptiViewSetBufferPool(size_t buffer_size, size_t buffer_count, uint32_t flags) {
+  try {
+    return Instance().SetBufferPool(buffer_size, buffer_count, flags);
+  } catch (const std::overflow_error& e) {
+    return pti_result::PTI_ERROR_INTERNAL;
+  } catch (const std::runtime_error& e) {
+    return pti_result::PTI_ERROR_INTERNAL;
+  } catch (const std::exception& e) {
+    return pti_result::PTI_ERROR_INTERNAL;
+  } catch (...) {
+    return pti_result::PTI_ERROR_INTERNAL;
+  }
+}
+
+//
+// TODO: parse different exception types, analyse caught exception and return
+// different error code.
+//
+pti_result ptiViewReturnBuffer(unsigned char* buffer) {
+  try {
+    return Instance().ReturnBuffer(buffer);
+  } catch (const std::overflow_error& e) {
+    return pti_result::PTI_ERROR_INTERNAL;
+  } catch (const std::runtime_error& e) {
+    return pti_result::PTI_ERROR_INTERNAL;
+  } catch (const std::exception& e) {
+    return pti_result::PTI_ERROR_INTERNAL;
+  } catch (...) {
+    return pti_result::PTI_ERROR_INTERNAL;
+  }
+}
+
+//
+// TODO: parse different exception types, analyse caught exception and return
+// different error code.
+//
+pti_result ptiViewSetRingFile(const char* path, size_t slice_size, size_t slice_count) {
+  try {
+    return Instance().SetRingFile(path, slice_size, slice_count);
+  } catch (const std::overflow_error& e) {
+    return pti_result::PTI_ERROR_INTERNAL;
+  } catch (const std::runtime_error& e) {
+    return pti_result::PTI_ERROR_INTERNAL;
+  } catch (const std::exception& e) {
+    return pti_result::PTI_ERROR_INTERNAL;
+  } catch (...) {
+    return pti_result::PTI_ERROR_INTERNAL;
+  }
+}
+
+//
+// TODO: parse different exception types, analyse caught exception and return
+// different error code.
+//
+pti_result ptiViewRingFileOpen(const char* path, pti_view_ring_file_reader* reader) {
+  try {
+    if (!path || !reader) {
+      return pti_result::PTI_ERROR_BAD_ARGUMENT;
+    }
+    *reader = reinterpret_cast<pti_view_ring_file_reader>(
+        new pti::view::utilities::ViewRingFileReader(path));
+    return pti_result::PTI_SUCCESS;
+  } catch (const std::invalid_argument& e) {
+    return pti_result::PTI_ERROR_BAD_ARGUMENT;
+  } catch (const std::overflow_error& e) {
+    return pti_result::PTI_ERROR_INTERNAL;
+  } catch (const std::runtime_error& e) {
+    return pti_result::PTI_ERROR_INTERNAL;
+  } catch (const std::exception& e) {
+    return pti_result::PTI_ERROR_INTERNAL;
+  } catch (...) {
+    return pti_result::PTI_ERROR_INTERNAL;
+  }
+}
+
+//
+// TODO: parse different exception types, analyse caught exception and return
+// different error code.
+//
+pti_result ptiViewRingFileGetNextSlice(pti_view_ring_file_reader reader, uint8_t** buffer,
+                                       size_t* valid_bytes) {
+  try {
+    if (!reader) {
+      return pti_result::PTI_ERROR_BAD_ARGUMENT;
+    }
+    return reinterpret_cast<pti::view::utilities::ViewRingFileReader*>(reader)->GetNextSlice(
+        buffer, valid_bytes);
+  } catch (const std::overflow_error& e) {
+    return pti_result::PTI_ERROR_INTERNAL;
+  } catch (const std::runtime_error& e) {
+    return pti_result::PTI_ERROR_INTERNAL;
+  } catch (const std::exception& e) {
+    return pti_result::PTI_ERROR_INTERNAL;
+  } catch (...) {
+    return pti_result::PTI_ERROR_INTERNAL;
+  }
+}
+
+//
+// TODO: parse different exception types, analyse caught exception and return
+// different error code.
+//
+pti_result ptiViewRingFileClose(pti_view_ring_file_reader reader) {
+  try {
+    if (!reader) {
+      return pti_result::PTI_ERROR_BAD_ARGUMENT;
+    }
+    delete reinterpret_cast<pti::view::utilities::ViewRingFileReader*>(reader);
+    return pti_result::PTI_SUCCESS;
+  } catch (const std::overflow_error& e) {
+    return pti_result::PTI_ERROR_INTERNAL;
+  } catch (const std::runtime_error& e) {
+    return pti_result::PTI_ERROR_INTERNAL;
+  } catch (const std::exception& e) {
+    return pti_result::PTI_ERROR_INTERNAL;
+  } catch (...) {
+    return pti_result::PTI_ERROR_INTERNAL;
+  }
+}
+
+//
+// TODO: parse different exception types, analyse caught exception and return
+// different error code.
+//
+pti_result ptiViewSetConsumerThreads(uint32_t thread_count, pti_view_delivery_order order) {
+  try {
+    if (!(IsPtiViewDeliveryOrderEnum(order))) {
+      return pti_result::PTI_ERROR_BAD_ARGUMENT;
+    }
+    return Instance().SetConsumerThreads(thread_count, order);
+  } catch (const std::overflow_error& e) {
+    return pti_result::PTI_ERROR_INTERNAL;
+  } catch (const std::runtime_error& e) {
+    return pti_result::PTI_ERROR_INTERNAL;
+  } catch (const std::exception& e) {
+    return pti_result::PTI_ERROR_INTERNAL;
+  } catch (...) {
+    return pti_result::PTI_ERROR_INTERNAL;
+  }
+}
+
+//
+// TODO: parse different exception types, analyse caught exception and return
+// different error code.
+//
+pti_result ptiViewGetDeliveryStats(pti_view_delivery_stats* stats) {
+  try {
+    return Instance().GetDeliveryStats(stats);
+  } catch (const std::overflow_error& e) {
+    return pti_result::PTI_ERROR_INTERNAL;
+  } catch (const std::runtime_error& e) {
+    return pti_result::PTI_ERROR_INTERNAL;
+  } catch (const std::exception& e) {
+    return pti_result::PTI_ERROR_INTERNAL;
+  } catch (...) {
+    return pti_result::PTI_ERROR_INTERNAL;
+  }
+}
+
+//
+// TODO: parse different exception types, analyse caught exception and return
+// different error code.
+//
+pti_result ptiViewSetOverflowPolicy(pti_view_overflow_policy policy, const char* spill_file_path) {
+  try {
+    if (!(IsPtiViewOverflowPolicyEnum(policy))) {
+      return pti_result::PTI_ERROR_BAD_ARGUMENT;
+    }
+    return Instance().SetOverflowPolicy(policy, spill_file_path);
+  } catch (const std::overflow_error& e) {
+    return pti_result::PTI_ERROR_INTERNAL;
+  } catch (const std::runtime_error& e) {
+    return pti_result::PTI_ERROR_INTERNAL;
+  } catch (const std::exception& e) {
+    return pti_result::PTI_ERROR_INTERNAL;
+  } catch (...) {
+    return pti_result::PTI_ERROR_INTERNAL;
+  }
+}
+
+//
+// TODO: parse different exception types, analyse caught exception and return
+// different error code.
+//
+pti_result ptiViewSetRecordFilter(const pti_view_record_filter* filter) {
+  try {
+    return Instance().SetRecordFilter(filter);
+  } catch (const std::overflow_error& e) {
+    return pti_result::PTI_ERROR_INTERNAL;
+  } catch (const std::runtime_error& e) {
+    return pti_result::PTI_ERROR_INTERNAL;
+  } catch (const std::exception& e) {
+    return pti_result::PTI_ERROR_INTERNAL;
+  } catch (...) {
+    return pti_result::PTI_ERROR_INTERNAL;
+  }
+}
+
+//
+// TODO: parse different exception types, analyse caught exception and return
+// different error code.
+//
+pti_result ptiViewStart() {
+  try {
+    return Instance().StartTracing();
+  } catch (const std::overflow_error& e) {
+    return pti_result::PTI_ERROR_INTERNAL;
+  } catch (const std::runtime_error& e) {
+    return pti_result::PTI_ERROR_INTERNAL;
+  } catch (const std::exception& e) {
+    return pti_result::PTI_ERROR_INTERNAL;
+  } catch (...) {
+    return pti_result::PTI_ERROR_INTERNAL;
+  }
+}
+
+//
+// TODO: parse different exception types, analyse caught exception and return
+// different error code.
+//
+pti_result ptiViewStop() {
+  try {
+    return Instance().StopTracing();
+  } catch (const std::overflow_error& e) {
+    return pti_result::PTI_ERROR_INTERNAL;
+  } catch (const std::runtime_error& e) {
+    return pti_result::PTI_ERROR_INTERNAL;
+  } catch (const std::exception& e) {
+    return pti_result::PTI_ERROR_INTERNAL;
+  } catch (...) {
+    return pti_result::PTI_ERROR_INTERNAL;
+  }
+}
+
 //
 // TODO: parse different exception types, analyse caught exception and return
 // different error code.
@@ -0,0 +1,103 @@
+#==============================================================
+# Copyright (C) Intel Corporation
+#
+# SPDX-License-Identifier: MIT
+# =============================================================
+
+"""Reader of ring files written by ptiViewSetRingFile (or PTI_VIEW_RING_FILE)
+
+Works on files left by crashed processes, walks committed slices in the
+order they were completed, as ptiViewRingFileGetNextSlice does:
+
+  with pti_view_ring_file.RingFile("trace.ring") as ring:
+    for record in ring.records():
+      print(record._view_kind._view_kind)
+"""
+
+import mmap
+import struct
+import sys
+
+import pti_view_schema as schema
+
+# Layout of src/view_ring_file.h
+RING_FILE_MAGIC = 0x31474e4952495450  # "PTIRING1"
+RING_FILE_VERSION = 1
+COMPACT_BUFFER_MAGIC = 0x43495450  # "PTIC"
+
+_header_struct = struct.Struct("=QIIQQQQ")
+_slice_struct = struct.Struct("=QQ")
+_compact_magic_struct = struct.Struct("=I")
+
+class RingFile:
+  def __init__(self, path):
+    with open(path, "rb") as file:
+      # Private copy: records are returned as ctypes structures, no copies
+      self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_COPY)
+    if len(self._map) < _header_struct.size:
+      self.close()
+      raise ValueError("Not a ring file " + path)
+    (magic, version, _, self.header_size, self.slice_size, self.slice_stride,
+     self.slice_count) = _header_struct.unpack_from(self._map, 0)
+    if (magic != RING_FILE_MAGIC or version != RING_FILE_VERSION or
+        self.slice_size > self.slice_stride or
+        _header_struct.size + self.slice_count * _slice_struct.size > self.header_size or
+        self.header_size + self.slice_stride * self.slice_count > len(self._map)):
+      self.close()
+      raise ValueError("Not a ring file " + path)
+
+  def close(self):
+    # Unmapped once the records and slices returned are gone too
+    self._map = None
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *args):
+    self.close()
+
+  def slices(self):
+    """Yields (sequence, memoryview of the records) of committed slices
+    in the commit order"""
+    committed = []
+    for i in range(self.slice_count):
+      sequence, valid_bytes = _slice_struct.unpack_from(
+          self._map, _header_struct.size + i * _slice_struct.size)
+      if sequence and valid_bytes <= self.slice_size:
+        committed.append((sequence, self.header_size + i * self.slice_stride, valid_bytes))
+    view = memoryview(self._map)
+    for sequence, offset, valid_bytes in sorted(committed):
+      yield sequence, view[offset:offset + valid_bytes]
+
+  def records(self):
+    """Yields ctypes records of the committed slices, slices of compact
+    encoding are skipped (read them with ptiViewRingFileGetNextSlice)"""
+    for _, data in self.slices():
+      if is_compact(data):
+        continue
+      for kind, offset, count in schema.iter_runs(data):
+        size = schema.RECORD_SIZES[kind]
+        for i in range(count):
+          yield schema.get_record(data, offset + i * size)
+
+def is_compact(data):
+  return (len(data) >= _compact_magic_struct.size and
+          _compact_magic_struct.unpack_from(data, 0)[0] == COMPACT_BUFFER_MAGIC)
+
+if __name__ == "__main__":
+  if len(sys.argv) < 2:
+    print("Usage: python pti_view_ring_file.py <ring_file>")
+    sys.exit(1)
+  with RingFile(sys.argv[1]) as ring:
+    counts = {}
+    slices = 0
+    for _, data in ring.slices():
+      slices += 1
+      if is_compact(data):
+        counts["compact slices"] = counts.get("compact slices", 0) + 1
+        continue
+      for kind, _, count in schema.iter_runs(data):
+        counts[kind.name] = counts.get(kind.name, 0) + count
+    print("Committed slices: " + str(slices))
+    for name, count in sorted(counts.items()):
+      print(name + ": " + str(count))
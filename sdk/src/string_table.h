@@ -0,0 +1,118 @@
+//==============================================================
+// Copyright (C) Intel Corporation
+//
+// SPDX-License-Identifier: MIT
+// =============================================================
+
+#ifndef SRC_STRING_TABLE_H_
+#define SRC_STRING_TABLE_H_
+
+#include <array>
+#include <atomic>
+#include <cstddef>
+#include <functional>
+#include <memory>
+#include <string>
+#include <string_view>
+
+namespace pti {
+namespace view {
+namespace utilities {
+
+/**
+ * @brief Insert-only table of interned strings.
+ *
+ * Every distinct string is stored once and keeps its address until the table
+ * is destroyed, so the returned pointers may be put into view records.
+ * Buckets are lock-free linked lists: lookups of present strings never block,
+ * a new string is published with a single compare-and-swap.
+ */
+template <std::size_t BucketCount = 4096>
+struct StringTable {
+ public:
+  static_assert(BucketCount && !(BucketCount & (BucketCount - 1)),
+                "Bucket count must be a power of two");
+
+  StringTable() {
+    for (auto& bucket : buckets_) {
+      bucket.store(nullptr, std::memory_order_relaxed);
+    }
+  }
+
+  StringTable(const StringTable&) = delete;
+  StringTable& operator=(const StringTable&) = delete;
+  StringTable(StringTable&&) = delete;
+  StringTable& operator=(StringTable&&) = delete;
+
+  virtual ~StringTable() {
+    for (auto& bucket : buckets_) {
+      auto* entry = bucket.load(std::memory_order_acquire);
+      while (entry) {
+        auto* next = entry->next;
+        delete entry;
+        entry = next;
+      }
+    }
+  }
+
+  // Returns pointer to the stored copy of str, the same for equal strings
+  inline const char* Intern(std::string_view str) {
+    const auto hash = std::hash<std::string_view>{}(str);
+    auto& bucket = buckets_[hash & (BucketCount - 1)];
+
+    auto* head = bucket.load(std::memory_order_acquire);
+    if (auto* entry = Find(head, nullptr, hash, str)) {
+      return entry->value.c_str();
+    }
+
+    auto new_entry = std::make_unique<Entry>(hash, str);
+    new_entry->next = head;
+    while (!bucket.compare_exchange_weak(new_entry->next, new_entry.get(),
+                                         std::memory_order_release, std::memory_order_acquire)) {
+      // Somebody else extended the bucket, check only the entries added since
+      if (auto* entry = Find(new_entry->next, head, hash, str)) {
+        return entry->value.c_str();
+      }
+      head = new_entry->next;
+    }
+
+    size_.fetch_add(1, std::memory_order_relaxed);
+    bytes_.fetch_add(sizeof(Entry) + new_entry->value.capacity(), std::memory_order_relaxed);
+    return new_entry.release()->value.c_str();
+  }
+
+  // Number of distinct strings stored
+  inline std::size_t Size() const { return size_.load(std::memory_order_relaxed); }
+
+  // Approximate heap memory taken by the entries
+  inline std::size_t Bytes() const { return bytes_.load(std::memory_order_relaxed); }
+
+ private:
+  struct Entry {
+    Entry(std::size_t entry_hash, std::string_view str) : hash(entry_hash), value(str) {}
+    const std::size_t hash;
+    const std::string value;
+    Entry* next = nullptr;
+  };
+
+  // Looks through the bucket list from first up to (not including) last
+  static inline Entry* Find(Entry* first, const Entry* last, std::size_t hash,
+                            std::string_view str) {
+    for (auto* entry = first; entry != last; entry = entry->next) {
+      if (entry->hash == hash && entry->value == str) {
+        return entry;
+      }
+    }
+    return nullptr;
+  }
+
+  std::array<std::atomic<Entry*>, BucketCount> buckets_;
+  std::atomic<std::size_t> size_ = 0;
+  std::atomic<std::size_t> bytes_ = 0;
+};
+
+}  // namespace utilities
+}  // namespace view
+}  // namespace pti
+
+#endif  // SRC_STRING_TABLE_H_
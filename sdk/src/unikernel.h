@@ -10,8 +10,8 @@
 #include <level_zero/layers/zel_tracing_api.h>
 
 #include <atomic>
+#include <cstdint>
 #include <iostream>
-#include <stack>
 
 class UniCorrId {
  public:
@@ -39,6 +39,26 @@ enum FLOW_DIR {
   FLOW_H2D = 2,
 };
 
+// Kind of an appended command, classified once at append time so completed
+// commands are dispatched without looking at their names
+enum class ZeCommandKind : uint8_t {
+  kKernel = 0,  // Kernels and commands without a dedicated view
+  kMemoryCopy = 1,
+  kMemoryFill = 2,
+  kBarrier = 3,
+};
+
+// Memory type of a transfer side, in the pti_view_memory_type order, so a
+// copy direction (src, dst) maps to pti_view_memcpy_type as src * 4 + dst
+enum class ZeMemoryType : uint8_t {
+  kMemory = 0,  // Unknown
+  kHost = 1,
+  kDevice = 2,
+  kShared = 3,
+};
+
+inline constexpr uint32_t kZeMemoryTypeCount = 4;
+
 struct ZeKernelCommandExecutionRecord {
   uint64_t sycl_node_id_;
   uint32_t sycl_invocation_id_;
@@ -66,10 +86,16 @@ struct ZeKernelCommandExecutionRecord {
   ze_context_handle_t context_;
 
   bool implicit_scaling_;
+  ZeCommandKind kind_;
+  // Copy source and destination, fill destination is in src_mem_type_
+  ZeMemoryType src_mem_type_;
+  ZeMemoryType dst_mem_type_;
   std::string name_;
   const char* sycl_func_name_;
   size_t bytes_xfered_;
   size_t value_set_;
+  // Work group size of a kernel, x, y and z
+  uint32_t group_size_[3];
 };
 
 //
@@ -80,16 +106,6 @@ struct ZeKernelCommandExecutionRecord {
 inline thread_local ZeKernelCommandExecutionRecord
     overhead_data;  // Placeholder till we refactor the 2nd level callbacks.
 
-struct ExternalCorrIdKey {
-  pti_view_external_kind _external_kind;
-};
-
-struct ExternalKeyCompare {
-  bool operator()(const ExternalCorrIdKey& lhs, const ExternalCorrIdKey& rhs) const {
-    return (memcmp((char*)(&lhs), (char*)(&rhs), sizeof(ExternalCorrIdKey)) < 0);
-  }
-};
-
 struct OverheadKindKey {
   pti_view_overhead_kind _overhead_kind;
 };
@@ -102,9 +118,6 @@ struct OverheadKeyCompare {
 
 inline thread_local ZeKernelCommandExecutionRecord sycl_data_mview;
 inline thread_local ZeKernelCommandExecutionRecord sycl_data_kview;
-inline thread_local std::map<ExternalCorrIdKey, std::stack<pti_view_record_external_correlation>,
-                             ExternalKeyCompare>
-    map_ext_corrid_vectors;
 inline thread_local std::map<OverheadKindKey, pti_view_record_overhead, OverheadKeyCompare>
     map_overhead_per_kind;
 
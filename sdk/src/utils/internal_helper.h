@@ -32,11 +32,44 @@ bool is_valid(IntType val, EnumVal V, Next... oth) {
 /// @brief Checks is the provided value v belongs to pti_view_kind enums
 bool IsPtiViewKindEnum(int v) {
   return is_valid<int, pti_view_kind, pti_view_kind, pti_view_kind, pti_view_kind, pti_view_kind,
-                  pti_view_kind, pti_view_kind, pti_view_kind, pti_view_kind, pti_view_kind>(
+                  pti_view_kind, pti_view_kind, pti_view_kind, pti_view_kind, pti_view_kind,
+                  pti_view_kind, pti_view_kind, pti_view_kind, pti_view_kind>(
       v, pti_view_kind::PTI_VIEW_DEVICE_GPU_KERNEL, pti_view_kind::PTI_VIEW_DEVICE_CPU_KERNEL,
       pti_view_kind::PTI_VIEW_LEVEL_ZERO_CALLS, pti_view_kind::PTI_VIEW_OPENCL_CALLS,
       pti_view_kind::PTI_VIEW_COLLECTION_OVERHEAD, pti_view_kind::PTI_VIEW_SYCL_RUNTIME_CALLS,
       pti_view_kind::PTI_VIEW_EXTERNAL_CORRELATION, pti_view_kind::PTI_VIEW_DEVICE_GPU_MEM_COPY,
-      pti_view_kind::PTI_VIEW_DEVICE_GPU_MEM_FILL);
+      pti_view_kind::PTI_VIEW_DEVICE_GPU_MEM_FILL, pti_view_kind::PTI_VIEW_CLOCK_CONVERSION,
+      pti_view_kind::PTI_VIEW_RECORDS_LOST, pti_view_kind::PTI_VIEW_RECORDS_FILTERED,
+      pti_view_kind::PTI_VIEW_DEVICE_GPU_KERNEL_STATS);
+}
+
+///////////////////////////////////////////////////////////////////////////////
+/// @brief Checks is the provided value v belongs to pti_view_record_encoding enums
+bool IsPtiViewRecordEncodingEnum(int v) {
+  return is_valid<int, pti_view_record_encoding, pti_view_record_encoding,
+                  pti_view_record_encoding>(
+      v, pti_view_record_encoding::PTI_VIEW_RECORD_ENCODING_FIXED,
+      pti_view_record_encoding::PTI_VIEW_RECORD_ENCODING_COMPACT);
+}
+
+///////////////////////////////////////////////////////////////////////////////
+/// @brief Checks is the provided value v belongs to pti_view_delivery_order enums
+bool IsPtiViewDeliveryOrderEnum(int v) {
+  return is_valid<int, pti_view_delivery_order, pti_view_delivery_order,
+                  pti_view_delivery_order, pti_view_delivery_order>(
+      v, pti_view_delivery_order::PTI_VIEW_DELIVERY_ORDERED,
+      pti_view_delivery_order::PTI_VIEW_DELIVERY_UNORDERED,
+      pti_view_delivery_order::PTI_VIEW_DELIVERY_TIMESTAMP_ORDERED);
+}
+
+///////////////////////////////////////////////////////////////////////////////
+/// @brief Checks is the provided value v belongs to pti_view_overflow_policy enums
+bool IsPtiViewOverflowPolicyEnum(int v) {
+  return is_valid<int, pti_view_overflow_policy, pti_view_overflow_policy,
+                  pti_view_overflow_policy, pti_view_overflow_policy, pti_view_overflow_policy>(
+      v, pti_view_overflow_policy::PTI_VIEW_OVERFLOW_BLOCK,
+      pti_view_overflow_policy::PTI_VIEW_OVERFLOW_DROP_NEWEST,
+      pti_view_overflow_policy::PTI_VIEW_OVERFLOW_DROP_OLDEST,
+      pti_view_overflow_policy::PTI_VIEW_OVERFLOW_SPILL);
 }
 #endif  // INTERNAL_HELPER_H_
@@ -11,17 +11,27 @@
 #include <assert.h>
 
 #include <array>
+#include <algorithm>
+#include <atomic>
+#include <chrono>
 #include <condition_variable>
 #include <cstdint>
 #include <cstring>
+#include <deque>
 #include <functional>
+#include <memory>
 #include <mutex>
 #include <optional>
-#include <queue>
 #include <type_traits>
 #include <unordered_map>
+#include <unordered_set>
 #include <utility>
 
+#include "clock_conversion.h"
+#include "compact_encoding.h"
+#include "kernel_stats.h"
+#include "view_record_filter.h"
+
 namespace pti {
 namespace view {
 namespace utilities {
@@ -137,6 +147,12 @@ struct ViewRecordBuffer {
     return sizeof(T) >= FreeBytes();
   }
 
+  // Marks bytes written directly at GetRecordsEnd() as inserted
+  inline void Advance(SizeType bytes) {
+    assert(FreeBytes() >= bytes);
+    pos_ += bytes;
+  }
+
   friend void Swap(ViewRecordBuffer& lhs, ViewRecordBuffer& rhs) { std::swap(lhs, rhs); }
 
  private:
@@ -145,9 +161,30 @@ struct ViewRecordBuffer {
   SizeType pos_ = 0;
 };
 
+// Counters of a buffer queue, times in ns
+struct ViewRecordBufferQueueStats {
+  uint64_t delivered = 0;
+  uint64_t size = 0;
+  uint64_t max_size = 0;
+  uint64_t producer_waits = 0;
+  uint64_t producer_wait_time = 0;
+  uint64_t total_delivery_latency = 0;
+  uint64_t max_delivery_latency = 0;
+};
+
 template <typename T>
 struct ViewRecordBufferQueue {
  public:
+  using Clock = std::chrono::steady_clock;
+
+  // Element handed out for delivery, see PopForDelivery()
+  struct Entry {
+    T buffer;
+    // Buffers of the same producer are delivered in order, nullptr if unordered
+    const void* producer = nullptr;
+    Clock::time_point enqueued;
+  };
+
   ViewRecordBufferQueue() = default;
   explicit ViewRecordBufferQueue(std::size_t depth) : buffer_depth_(depth) {}
   ViewRecordBufferQueue& operator=(const ViewRecordBufferQueue&) = delete;
@@ -155,31 +192,131 @@ struct ViewRecordBufferQueue {
   ViewRecordBufferQueue(const ViewRecordBufferQueue&) = delete;
   ViewRecordBufferQueue(ViewRecordBufferQueue&& other) = delete;
 
-  inline void Push(T&& buffer) {
+  inline void Push(T&& buffer, const void* producer = nullptr) {
     std::unique_lock<std::mutex> buffer_lock(buffer_queue_mtx_);
-    if (buffer_depth_.has_value()) {
+    if (buffer_depth_.has_value() && buffer_queue_.size() >= buffer_depth_) {
+      const auto wait_begin = Clock::now();
       buffer_available_.wait(buffer_lock, [this] { return buffer_queue_.size() < buffer_depth_; });
+      ++stats_.producer_waits;
+      stats_.producer_wait_time += ElapsedNs(wait_begin, Clock::now());
     }
-    buffer_queue_.push(std::move(buffer));
+    buffer_queue_.push_back(Entry{std::move(buffer), producer, Clock::now()});
+    stats_.max_size = std::max<uint64_t>(stats_.max_size, buffer_queue_.size());
     buffer_lock.unlock();
-    buffer_available_.notify_one();
+    // Producers blocked on a full queue wait on the same condition, so waking
+    // only one thread might miss the consumer
+    buffer_available_.notify_all();
+  }
+
+  // Never waits, buffer is left untouched if the queue is full
+  inline bool TryPush(T&& buffer, const void* producer = nullptr) {
+    {
+      std::lock_guard<std::mutex> buffer_lock(buffer_queue_mtx_);
+      if (IsFull()) {
+        return false;
+      }
+      buffer_queue_.push_back(Entry{std::move(buffer), producer, Clock::now()});
+      stats_.max_size = std::max<uint64_t>(stats_.max_size, buffer_queue_.size());
+    }
+    buffer_available_.notify_all();
+    return true;
+  }
+
+  // Never waits, makes room by taking out the oldest queued buffer
+  inline std::optional<T> PushDropOldest(T&& buffer, const void* producer = nullptr) {
+    std::optional<T> dropped;
+    {
+      std::lock_guard<std::mutex> buffer_lock(buffer_queue_mtx_);
+      if (IsFull() && !buffer_queue_.empty()) {
+        dropped = std::move(buffer_queue_.front().buffer);
+        buffer_queue_.pop_front();
+      }
+      buffer_queue_.push_back(Entry{std::move(buffer), producer, Clock::now()});
+      stats_.max_size = std::max<uint64_t>(stats_.max_size, buffer_queue_.size());
+    }
+    buffer_available_.notify_all();
+    return dropped;
+  }
+
+  template <typename Condition>
+  inline void WaitUntilNotFullOr(const Condition& cond) {
+    std::unique_lock<std::mutex> buffer_lock(buffer_queue_mtx_);
+    buffer_available_.wait(buffer_lock, [this, &cond] { return !IsFull() || cond; });
+  }
+
+  inline bool Full() {
+    std::lock_guard<std::mutex> buffer_lock(buffer_queue_mtx_);
+    return IsFull();
   }
 
   inline T Pop() {
     std::unique_lock<std::mutex> buffer_lock(buffer_queue_mtx_);
     buffer_available_.wait(buffer_lock, [this] { return !buffer_queue_.empty(); });
-    auto buffer = std::move(buffer_queue_.front());
-    buffer_queue_.pop();
+    auto buffer = std::move(buffer_queue_.front().buffer);
+    buffer_queue_.pop_front();
     buffer_lock.unlock();
     buffer_available_.notify_all();
 
     return buffer;
   }
 
+  // Takes the oldest buffer to deliver, waits for one unless stop() is true.
+  // If ordered, buffers of a producer are not handed out while an earlier
+  // one is being delivered. Every entry must be given back to DeliveryDone().
+  template <typename Stop>
+  inline std::optional<Entry> PopForDelivery(bool ordered, const Stop& stop) {
+    std::unique_lock<std::mutex> buffer_lock(buffer_queue_mtx_);
+    auto next = buffer_queue_.end();
+    buffer_available_.wait(buffer_lock, [this, ordered, &stop, &next] {
+      next = std::find_if(buffer_queue_.begin(), buffer_queue_.end(), [this, ordered](auto& entry) {
+        return !ordered || !entry.producer || !delivering_.count(entry.producer);
+      });
+      return next != buffer_queue_.end() || stop();
+    });
+    if (next == buffer_queue_.end()) {
+      return std::nullopt;
+    }
+    auto entry = std::move(*next);
+    buffer_queue_.erase(next);
+    if (!ordered) {
+      entry.producer = nullptr;
+    } else if (entry.producer) {
+      delivering_.insert(entry.producer);
+    }
+    ++in_delivery_;
+    buffer_lock.unlock();
+    buffer_available_.notify_all();
+
+    return entry;
+  }
+
+  inline void DeliveryDone(const Entry& entry) {
+    const auto latency = ElapsedNs(entry.enqueued, Clock::now());
+    {
+      std::lock_guard<std::mutex> buffer_lock(buffer_queue_mtx_);
+      delivering_.erase(entry.producer);
+      --in_delivery_;
+      ++stats_.delivered;
+      stats_.total_delivery_latency += latency;
+      stats_.max_delivery_latency = std::max(stats_.max_delivery_latency, latency);
+    }
+    buffer_available_.notify_all();
+  }
+
+  // Wakes up all the waiting threads to check their conditions
+  inline void NotifyAll() {
+    { std::lock_guard<std::mutex> buffer_lock(buffer_queue_mtx_); }
+    buffer_available_.notify_all();
+  }
+
+  // Waits for the queue to be empty and the buffers taken by PopForDelivery()
+  // to be delivered
   template <typename Condition>
   inline void WaitUntilEmptyOr(const Condition& cond) {
     std::unique_lock<std::mutex> buffer_lock(buffer_queue_mtx_);
-    buffer_available_.wait(buffer_lock, [this, &cond] { return buffer_queue_.empty() || cond; });
+    buffer_available_.wait(buffer_lock, [this, &cond] {
+      return (buffer_queue_.empty() && !in_delivery_) || cond;
+    });
   }
 
   inline std::size_t Size() {
@@ -187,6 +324,13 @@ struct ViewRecordBufferQueue {
     return std::size(buffer_queue_);
   }
 
+  inline ViewRecordBufferQueueStats GetStats() {
+    std::lock_guard<std::mutex> buffer_lock(buffer_queue_mtx_);
+    auto stats = stats_;
+    stats.size = buffer_queue_.size();
+    return stats;
+  }
+
   inline void ResetBufferDepth() {
     std::lock_guard<std::mutex> buffer_lock(buffer_queue_mtx_);
     buffer_depth_.reset();
@@ -200,10 +344,22 @@ struct ViewRecordBufferQueue {
   virtual ~ViewRecordBufferQueue() = default;
 
  private:
-  std::queue<T> buffer_queue_;
+  static inline uint64_t ElapsedNs(Clock::time_point begin, Clock::time_point end) {
+    return std::chrono::duration_cast<std::chrono::nanoseconds>(end - begin).count();
+  }
+
+  inline bool IsFull() const {
+    return buffer_depth_.has_value() && buffer_queue_.size() >= buffer_depth_;
+  }
+
+  std::deque<Entry> buffer_queue_;
   mutable std::mutex buffer_queue_mtx_;
   std::condition_variable buffer_available_;
   std::optional<std::size_t> buffer_depth_;
+  // Producers with a buffer being delivered in order
+  std::unordered_set<const void*> delivering_;
+  std::size_t in_delivery_ = 0;
+  ViewRecordBufferQueueStats stats_;
 };
 
 // This is not a perfect abstraction.
@@ -257,8 +413,30 @@ struct ThreadSafeHashTable {
 
 using ViewBuffer = ViewRecordBuffer<unsigned char>;
 using ViewBufferQueue = ViewRecordBufferQueue<ViewBuffer>;
+
+// Buffer of a single producer thread. It is filled by the owner thread and
+// taken away by flushes, so it has its own (normally uncontended) lock.
+struct ThreadViewBuffer {
+  std::mutex buffer_mtx;
+  ViewBuffer buffer;
+  // Timestamp conversion used for all the records of the current buffer
+  ClockModel clock;
+  // Set if the current buffer is compact, the encoding is fixed per buffer
+  bool compact = false;
+  CompactEncoder encoder;
+  // Records of the thread filtered out since the last records filtered record
+  RecordFilterCounts filtered;
+  // Kernels of the thread completed since the last flush
+  KernelStatsTable kernel_stats;
+  // Oldest start timestamp of the records not handed over yet, tracked for
+  // timestamp ordered delivery only
+  std::atomic<uint64_t> oldest_timestamp = UINT64_MAX;
+  // Cleared once the table owning the buffer goes away
+  std::atomic<bool> attached = true;
+};
+
 template <typename KeyT>
-using ViewBufferTable = ThreadSafeHashTable<KeyT, ViewBuffer>;
+using ViewBufferTable = ThreadSafeHashTable<KeyT, std::shared_ptr<ThreadViewBuffer>>;
 
 }  // namespace utilities
 }  // namespace view
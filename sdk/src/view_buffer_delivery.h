@@ -0,0 +1,632 @@
+//==============================================================
+// Copyright (C) Intel Corporation
+//
+// SPDX-License-Identifier: MIT
+// =============================================================
+
+#ifndef SRC_VIEW_BUFFER_DELIVERY_H_
+#define SRC_VIEW_BUFFER_DELIVERY_H_
+
+#include <array>
+#include <atomic>
+#include <cstddef>
+#include <cstdint>
+#include <cstring>
+#include <functional>
+#include <memory>
+#include <mutex>
+#include <optional>
+#include <shared_mutex>
+#include <stdexcept>
+#include <thread>
+#include <utility>
+#include <vector>
+
+#include "default_buffer_callbacks.h"
+#include "pti_view.h"
+#include "spdlog/spdlog.h"
+#include "view_buffer.h"
+#include "view_buffer_pool.h"
+#include "view_buffer_spill.h"
+#include "view_record_info.h"
+#include "view_record_merge.h"
+#include "view_ring_file.h"
+
+inline pti_result GetNextRecord(uint8_t* buffer, size_t valid_bytes,
+                                pti_view_record_base** record);
+
+namespace pti {
+namespace view {
+namespace utilities {
+
+using AskForBufferEvent = std::function<void(unsigned char**, size_t*)>;
+using ReturnBufferEvent = std::function<void(unsigned char*, size_t, size_t)>;
+// Start timestamp no record handed over later starts before, 0 if unknown
+using MergeWatermark = std::function<uint64_t()>;
+
+constexpr auto kDefaultBufferQueueDepth = 50UL;
+constexpr uint32_t kMaxConsumerThreads = 64;
+
+/**
+ * @brief Delivery of completed view buffers to the user.
+ *
+ * Traced threads hand their buffers over to a queue, consumer threads pass
+ * them to the buffer completed callback, in order per thread or not, or
+ * merge their records by start timestamp first. When the queue is full, the
+ * overflow policy makes the thread wait, drops a buffer or spills it to a
+ * file. Buffer memory comes from the ring file, the buffer pool or the
+ * buffer requested callback, in that order.
+ */
+class ViewBufferDelivery {
+ public:
+  explicit ViewBufferDelivery(MergeWatermark&& merge_watermark)
+      : get_new_buffer_(pti::view::defaults::DefaultBufferAllocation),
+        deliver_buffer_(pti::view::defaults::DefaultRecordParser),
+        merge_watermark_(std::move(merge_watermark)) {
+    // Set queue depth based on number of hardware threads supported.
+    constexpr auto kBufQueueDepthMult = 2UL;
+    const auto threads_supported = std::thread::hardware_concurrency();
+    if (threads_supported) {
+      buffer_queue_.SetBufferDepth(kBufQueueDepthMult * threads_supported);
+    }
+  }
+
+  ViewBufferDelivery(const ViewBufferDelivery&) = delete;
+  ViewBufferDelivery& operator=(const ViewBufferDelivery&) = delete;
+  ViewBufferDelivery(ViewBufferDelivery&&) = delete;
+  ViewBufferDelivery& operator=(ViewBufferDelivery&&) = delete;
+
+  virtual ~ViewBufferDelivery() { Stop(); }
+
+  // Consumers finish their current delivery, waiting producers are released
+  inline void Stop() {
+    stop_consumer_thread_ = true;
+    buffer_queue_.ResetBufferDepth();
+    buffer_queue_.NotifyAll();  // Stop consumers
+    std::lock_guard<std::mutex> consumers_lock(buffer_consumers_mtx_);
+    for (auto& buffer_consumer : buffer_consumers_) {
+      if (buffer_consumer.joinable()) {
+        buffer_consumer.join();
+      }
+    }
+    buffer_consumers_.clear();
+  }
+
+  // The callbacks are taken if the first buffer they give is large enough,
+  // buffer gets it (or one of the callbacks kept)
+  inline pti_result SetBufferCallbacks(AskForBufferEvent&& get_new_buf,
+                                       ReturnBufferEvent&& return_new_buf, ViewBuffer& buffer) {
+    pti_result result = pti_result::PTI_ERROR_BAD_ARGUMENT;
+    auto get_new_buffer = std::move(get_new_buf);
+    auto deliver_buffer = std::move(return_new_buf);
+
+    unsigned char* raw_buffer = nullptr;
+    std::size_t raw_buffer_size = 0;
+    get_new_buffer(&raw_buffer, &raw_buffer_size);
+    if (raw_buffer_size < SizeOfLargestViewRecord() || !raw_buffer) {
+      // Keep using default callbacks
+      result = pti_result::PTI_ERROR_BAD_ARGUMENT;
+      deliver_buffer(raw_buffer, raw_buffer_size, 0);
+    } else {
+      // User callback is fine, keep memory they gave us
+      result = pti_result::PTI_SUCCESS;
+    }
+
+    if (result == pti_result::PTI_SUCCESS) {
+      // Use user-defined callbacks
+      {
+        std::lock_guard<std::mutex> cb_lock(get_new_buffer_mtx_);
+        get_new_buffer_ = std::move(get_new_buffer);
+      }
+      {
+        std::lock_guard<std::shared_mutex> cb_lock(deliver_buffer_mtx_);
+        deliver_buffer_ = std::move(deliver_buffer);
+      }
+    } else {
+      get_new_buffer_(&raw_buffer, &raw_buffer_size);
+    }
+    buffer.Refresh(raw_buffer, raw_buffer_size);
+    return result;
+  }
+
+  // Buffers are delivered to user callbacks from now on
+  inline void SetCallbacksInUse() { callbacks_set_ = true; }
+
+  inline bool CallbacksInUse() const { return callbacks_set_; }
+
+  inline pti_result SetBufferPool(std::size_t buffer_size, std::size_t buffer_count,
+                                  uint32_t flags) {
+    constexpr uint32_t kKnownFlags = pti_view_buffer_pool_flags::PTI_VIEW_BUFFER_POOL_HUGE_PAGES |
+                                     pti_view_buffer_pool_flags::PTI_VIEW_BUFFER_POOL_PRE_TOUCH;
+    if (buffer_size < SizeOfLargestViewRecord() || !buffer_count || (flags & ~kKnownFlags)) {
+      return pti_result::PTI_ERROR_BAD_ARGUMENT;
+    }
+    std::lock_guard<std::mutex> cb_lock(get_new_buffer_mtx_);
+    if (buffer_pool_) {
+      // Buffers of the pool might still be out
+      return pti_result::PTI_ERROR_BAD_ARGUMENT;
+    }
+    buffer_pool_ = std::make_unique<ViewBufferPool>(buffer_size, buffer_count, flags);
+    pool_.store(buffer_pool_.get(), std::memory_order_release);
+    return pti_result::PTI_SUCCESS;
+  }
+
+  inline pti_result ReturnBuffer(unsigned char* buffer) {
+    auto* ring_file = ring_file_.load(std::memory_order_acquire);
+    if (ring_file && ring_file->Release(buffer)) {
+      return pti_result::PTI_SUCCESS;
+    }
+    auto* pool = pool_.load(std::memory_order_acquire);
+    if (!pool || !pool->Release(buffer)) {
+      return pti_result::PTI_ERROR_BAD_ARGUMENT;
+    }
+    return pti_result::PTI_SUCCESS;
+  }
+
+  inline pti_result SetRingFile(const char* path, std::size_t slice_size,
+                                std::size_t slice_count) {
+    if (!path || slice_size < SizeOfLargestViewRecord() || !slice_count) {
+      return pti_result::PTI_ERROR_BAD_ARGUMENT;
+    }
+    std::lock_guard<std::mutex> cb_lock(get_new_buffer_mtx_);
+    if (ring_file_owner_) {
+      // Slices might still be out
+      return pti_result::PTI_ERROR_BAD_ARGUMENT;
+    }
+    try {
+      ring_file_owner_ = std::make_unique<ViewRingFile>(path, slice_size, slice_count);
+    } catch (const std::runtime_error& e) {
+      SPDLOG_WARN("{}", e.what());
+      return pti_result::PTI_ERROR_BAD_ARGUMENT;
+    }
+    ring_file_.store(ring_file_owner_.get(), std::memory_order_release);
+    return pti_result::PTI_SUCCESS;
+  }
+
+  inline pti_result SetOverflowPolicy(pti_view_overflow_policy policy,
+                                      const char* spill_file_path) {
+    if (policy == pti_view_overflow_policy::PTI_VIEW_OVERFLOW_SPILL) {
+      std::unique_ptr<ViewBufferSpill> spill;
+      try {
+        spill = std::make_unique<ViewBufferSpill>(spill_file_path);
+      } catch (const std::runtime_error& e) {
+        SPDLOG_WARN("{}", e.what());
+        return pti_result::PTI_ERROR_BAD_ARGUMENT;
+      }
+      std::unique_lock<std::mutex> spill_lock(spill_mtx_);
+      // Buffers of the previous file are delivered first
+      while (spill_ && !spill_->Empty() && !stop_consumer_thread_) {
+        spill_lock.unlock();
+        DrainSpill();
+        spill_lock.lock();
+      }
+      spill_ = std::move(spill);
+    }
+    overflow_policy_ = policy;
+    return pti_result::PTI_SUCCESS;
+  }
+
+  // Surplus consumers finish their current delivery before they are joined
+  inline pti_result SetConsumerThreads(uint32_t thread_count, pti_view_delivery_order order) {
+    const bool timestamp_ordered =
+        order == pti_view_delivery_order::PTI_VIEW_DELIVERY_TIMESTAMP_ORDERED;
+    if (!thread_count || thread_count > kMaxConsumerThreads ||
+        (timestamp_ordered && thread_count != 1)) {
+      return pti_result::PTI_ERROR_BAD_ARGUMENT;
+    }
+    std::lock_guard<std::mutex> consumers_lock(buffer_consumers_mtx_);
+    if (timestamp_ordered_ && !timestamp_ordered) {
+      // Merged records go before the buffers delivered as they are
+      timestamp_ordered_ = false;
+      buffer_queue_.WaitUntilEmptyOr(stop_consumer_thread_);
+      FlushMerged();
+    }
+    timestamp_ordered_ = timestamp_ordered;
+    delivery_ordered_ = order != pti_view_delivery_order::PTI_VIEW_DELIVERY_UNORDERED;
+    consumer_count_ = thread_count;
+    buffer_queue_.NotifyAll();
+    while (buffer_consumers_.size() > thread_count) {
+      buffer_consumers_.back().join();
+      buffer_consumers_.pop_back();
+    }
+    while (buffer_consumers_.size() < thread_count) {
+      buffer_consumers_.emplace_back(
+          [this, index = buffer_consumers_.size()]() { return BufferConsumer(index); });
+    }
+    return pti_result::PTI_SUCCESS;
+  }
+
+  inline pti_result GetDeliveryStats(pti_view_delivery_stats* delivery_stats) {
+    if (!delivery_stats) {
+      return pti_result::PTI_ERROR_BAD_ARGUMENT;
+    }
+    const auto stats = buffer_queue_.GetStats();
+    delivery_stats->_buffers_delivered = stats.delivered;
+    delivery_stats->_queue_depth = stats.size;
+    delivery_stats->_max_queue_depth = stats.max_size;
+    delivery_stats->_producer_waits = stats.producer_waits;
+    delivery_stats->_producer_wait_ns = stats.producer_wait_time;
+    delivery_stats->_total_delivery_latency_ns = stats.total_delivery_latency;
+    delivery_stats->_max_delivery_latency_ns = stats.max_delivery_latency;
+    return pti_result::PTI_SUCCESS;
+  }
+
+  // Buffers queued before producers wait (or the overflow policy applies)
+  inline void SetBufferQueueDepth(std::size_t depth) { buffer_queue_.SetBufferDepth(depth); }
+
+  inline bool IsTimestampOrdered() const {
+    return timestamp_ordered_.load(std::memory_order_relaxed);
+  }
+
+  // Records delivered by timestamp ordered delivery after younger ones
+  inline uint64_t GetLateRecords() {
+    std::lock_guard<std::mutex> merge_lock(merge_mtx_);
+    return merger_.LateRecords();
+  }
+
+  inline void RequestNewBuffer(ViewBuffer& buffer) {
+    if (auto* ring_file = ring_file_.load(std::memory_order_acquire)) {
+      if (auto* slice = ring_file->Acquire()) {
+        buffer.Refresh(slice, ring_file->SliceSize());
+        return;
+      }
+      // All the slices are out, fall back to the pool and the user buffers
+    }
+    if (auto* pool = pool_.load(std::memory_order_acquire)) {
+      // Thread free list of the pool, no global lock on the fast path
+      if (auto* pool_buffer = pool->Acquire()) {
+        buffer.Refresh(pool_buffer, pool->BufferSize());
+        return;
+      }
+      // All the pool buffers are out, fall back to the user ones
+    }
+    unsigned char* raw_buffer = nullptr;
+    std::size_t buffer_size = 0;
+    {
+      std::lock_guard<std::mutex> cb_lock(get_new_buffer_mtx_);
+      get_new_buffer_(&raw_buffer, &buffer_size);
+    }
+    buffer.Refresh(raw_buffer, buffer_size);
+  }
+
+  inline void DeliverBuffer(ViewBuffer&& buffer) {
+    auto buffer_to_deliver = std::move(buffer);
+    {
+      // Consumers deliver in parallel, only callback changes are exclusive
+      std::shared_lock<std::shared_mutex> cb_lock(deliver_buffer_mtx_);
+      if (!callbacks_set_ && ReturnBuffer(buffer_to_deliver.GetBuffer()) == PTI_SUCCESS) {
+        // Default callbacks can't release library buffers
+        return;
+      }
+      if (buffer_to_deliver.GetBuffer()) {
+        deliver_buffer_(buffer_to_deliver.GetBuffer(), buffer_to_deliver.GetBufferSize(),
+                        buffer_to_deliver.GetValidBytes());
+      }
+    }
+  }
+
+  // Records of the buffer are kept in the ring file (if it is from there)
+  inline void CommitBuffer(const ViewBuffer& buffer) {
+    if (auto* ring_file = ring_file_.load(std::memory_order_acquire)) {
+      ring_file->Commit(buffer.GetBuffer(), buffer.GetValidBytes());
+    }
+  }
+
+  inline void InvalidateBuffer(const ViewBuffer& buffer) {
+    if (auto* ring_file = ring_file_.load(std::memory_order_acquire)) {
+      ring_file->Invalidate(buffer.GetBuffer());
+    }
+  }
+
+  // Queues the buffer, waiting for room whatever the overflow policy
+  inline void Push(ViewBuffer&& buffer, const void* producer) {
+    CommitBuffer(buffer);
+    buffer_queue_.Push(std::move(buffer), producer);
+  }
+
+  // Hands a completed buffer of producer over to the consumers. If the
+  // buffer is dropped or spilled, buffer keeps its memory for reuse.
+  inline void HandOverBuffer(ViewBuffer& buffer, const void* producer) {
+    CommitBuffer(buffer);
+    const auto policy = overflow_policy_.load(std::memory_order_relaxed);
+    if (spilled_buffers_ || policy == pti_view_overflow_policy::PTI_VIEW_OVERFLOW_SPILL) {
+      // Spilled buffers of the thread must be delivered first
+      std::lock_guard<std::mutex> spill_lock(spill_mtx_);
+      ReplaySpilledBuffers();
+      if (spill_ && (!spill_->Empty() || !buffer_queue_.TryPush(std::move(buffer), producer))) {
+        if (spill_->Write(buffer.GetBuffer(), buffer.GetValidBytes(), producer)) {
+          ++spilled_buffers_;
+        } else {
+          CountLostRecords(buffer.GetBuffer(), buffer.GetValidBytes());
+        }
+        buffer.Refresh(buffer.GetBuffer(), buffer.GetBufferSize());
+        return;
+      }
+      if (buffer.IsNull()) {
+        return;
+      }
+    }
+    if (policy == pti_view_overflow_policy::PTI_VIEW_OVERFLOW_DROP_NEWEST) {
+      if (!buffer_queue_.TryPush(std::move(buffer), producer)) {
+        CountLostRecords(buffer.GetBuffer(), buffer.GetValidBytes());
+        buffer.Refresh(buffer.GetBuffer(), buffer.GetBufferSize());
+      }
+    } else if (policy == pti_view_overflow_policy::PTI_VIEW_OVERFLOW_DROP_OLDEST) {
+      if (auto dropped = buffer_queue_.PushDropOldest(std::move(buffer), producer)) {
+        CountLostRecords(dropped->GetBuffer(), dropped->GetValidBytes());
+        buffer.Refresh(dropped->GetBuffer(), dropped->GetBufferSize());
+      }
+    } else {
+      buffer_queue_.Push(std::move(buffer), producer);
+    }
+  }
+
+  // Memory kept after a drop or a spill, given back empty. The queue might
+  // stay full for long, so the producer doesn't wait for it.
+  inline void ReturnSpareBuffer(ViewBuffer&& buffer, const void* producer) {
+    buffer.Refresh(buffer.GetBuffer(), buffer.GetBufferSize());
+    if (!buffer_queue_.TryPush(std::move(buffer), producer)) {
+      std::lock_guard<std::mutex> spill_lock(spill_mtx_);
+      spare_buffers_.push_back(std::move(buffer));
+    }
+  }
+
+  // Queues the spilled buffers, so they go before the current ones of the
+  // same threads, and gives the spare memory back
+  inline void FlushSpill() {
+    DrainSpill();
+    std::vector<ViewBuffer> spare_buffers;
+    {
+      std::lock_guard<std::mutex> spill_lock(spill_mtx_);
+      spare_buffers.swap(spare_buffers_);
+    }
+    for (auto& spare_buffer : spare_buffers) {
+      // Nothing to deliver, memory goes back to the user
+      if (!spare_buffer.IsNull()) {
+        buffer_queue_.Push(std::move(spare_buffer));
+      }
+    }
+  }
+
+  // Waits until the queued buffers and the merged records are delivered
+  inline void WaitUntilDelivered() {
+    buffer_queue_.WaitUntilEmptyOr(stop_consumer_thread_);
+    if (timestamp_ordered_) {
+      FlushMerged();
+    }
+  }
+
+  inline bool RecordsLostPending() const { return records_lost_pending_; }
+
+  // Takes the counts of the dropped buffers, false if nothing was counted
+  // since the last call
+  inline bool TakeRecordsLost(pti_view_record_records_lost& record) {
+    if (!records_lost_pending_.exchange(false)) {
+      return false;
+    }
+    record._buffers_lost = lost_buffers_.exchange(0);
+    uint64_t records_lost = 0;
+    for (std::size_t i = 0; i < lost_records_.size(); ++i) {
+      record._records_lost[i] = lost_records_[i].exchange(0);
+      records_lost += record._records_lost[i];
+    }
+    // Counted after an earlier record took the pending flag
+    return record._buffers_lost || records_lost;
+  }
+
+ private:
+  // Consumers deliver what is queued before they stop
+  void BufferConsumer(std::size_t index) {
+    auto stop = [this, index] { return stop_consumer_thread_ || index >= consumer_count_; };
+    while (auto entry = buffer_queue_.PopForDelivery(delivery_ordered_, stop)) {
+      if (timestamp_ordered_) {
+        MergeBuffers(std::move(*entry));
+      } else {
+        if (!entry->buffer.IsNull()) {
+          DeliverBuffer(std::move(entry->buffer));
+        }
+        buffer_queue_.DeliveryDone(*entry);
+      }
+      if (spilled_buffers_) {
+        // Room for a spilled buffer has just been made
+        std::lock_guard<std::mutex> spill_lock(spill_mtx_);
+        ReplaySpilledBuffers();
+      }
+    }
+  }
+
+  // Moves spilled buffers to the queue while it has room, spill_mtx_ must be held
+  inline void ReplaySpilledBuffers() {
+    while (spill_ && !spill_->Empty() && !buffer_queue_.Full()) {
+      ViewBufferSpill::EntryHeader header;
+      if (!spill_->Front(header)) {
+        // Unreadable, records of the buffer are unknown
+        ++lost_buffers_;
+        records_lost_pending_ = true;
+        PopSpilledBuffer(header);
+        continue;
+      }
+      if (spare_buffers_.empty()) {
+        spare_buffers_.emplace_back();
+        RequestNewBuffer(spare_buffers_.back());
+      }
+      auto& spare_buffer = spare_buffers_.back();
+      if (spare_buffer.GetBufferSize() < header.valid_bytes) {
+        // No memory to replay into
+        std::vector<unsigned char> records(header.valid_bytes);
+        if (spill_->ReadFront(header, records.data())) {
+          CountLostRecords(records.data(), records.size());
+        } else {
+          ++lost_buffers_;
+          records_lost_pending_ = true;
+        }
+        PopSpilledBuffer(header);
+        continue;
+      }
+      if (!spill_->ReadFront(header, spare_buffer.GetBuffer())) {
+        ++lost_buffers_;
+        records_lost_pending_ = true;
+        PopSpilledBuffer(header);
+        continue;
+      }
+      spare_buffer.Advance(header.valid_bytes);
+      CommitBuffer(spare_buffer);
+      if (!buffer_queue_.TryPush(std::move(spare_buffer),
+                                 reinterpret_cast<const void*>(header.producer))) {
+        // Filled up meanwhile, the entry stays in the file
+        InvalidateBuffer(spare_buffer);
+        spare_buffer.Refresh(spare_buffer.GetBuffer(), spare_buffer.GetBufferSize());
+        return;
+      }
+      spare_buffers_.pop_back();
+      PopSpilledBuffer(header);
+    }
+  }
+
+  inline void PopSpilledBuffer(const ViewBufferSpill::EntryHeader& header) {
+    spill_->PopFront(header);
+    --spilled_buffers_;
+  }
+
+  // Waits until all the spilled buffers are queued
+  inline void DrainSpill() {
+    std::unique_lock<std::mutex> spill_lock(spill_mtx_);
+    while (spill_ && !spill_->Empty() && !stop_consumer_thread_) {
+      const auto spilled = spill_->Size();
+      ReplaySpilledBuffers();
+      const bool queue_full = spill_->Size() == spilled;
+      spill_lock.unlock();
+      if (queue_full) {
+        buffer_queue_.WaitUntilNotFullOr(stop_consumer_thread_);
+      }
+      spill_lock.lock();
+    }
+  }
+
+  // Accounts records of a dropped buffer, reported by the next records lost record
+  inline void CountLostRecords(unsigned char* records, std::size_t valid_bytes) {
+    pti_view_record_base* record = nullptr;
+    while (GetNextRecord(records, valid_bytes, &record) == pti_result::PTI_SUCCESS) {
+      const auto kind = record->_view_kind;
+      if (kind == pti_view_kind::PTI_VIEW_RECORDS_LOST) {
+        // Not lost themselves, their counts are reported again
+        const auto* lost = reinterpret_cast<const pti_view_record_records_lost*>(record);
+        lost_buffers_ += lost->_buffers_lost;
+        for (std::size_t i = 0; i < lost_records_.size(); ++i) {
+          lost_records_[i] += lost->_records_lost[i];
+        }
+      } else if (static_cast<std::size_t>(kind) < lost_records_.size()) {
+        ++lost_records_[kind];
+      }
+    }
+    ++lost_buffers_;
+    records_lost_pending_ = true;
+  }
+
+  // Timestamp ordered delivery: the watermark is taken before the queued
+  // buffers, so all the records starting before it are merged afterwards
+  inline void MergeBuffers(ViewBufferQueue::Entry&& entry) {
+    std::lock_guard<std::mutex> merge_lock(merge_mtx_);
+    const auto watermark = merge_watermark_();
+    std::optional<ViewBufferQueue::Entry> queued = std::move(entry);
+    do {
+      AddMergedBuffer(queued->buffer, queued->producer);
+      buffer_queue_.DeliveryDone(*queued);
+    } while ((queued = buffer_queue_.PopForDelivery(true, [] { return true; })));
+    WriteMerged(watermark);
+  }
+
+  // Records are copied to the merger, buffer memory takes merged records
+  inline void AddMergedBuffer(ViewBuffer& buffer, const void* producer) {
+    if (buffer.IsNull()) {
+      return;
+    }
+    pti_view_record_base* record = nullptr;
+    while (GetNextRecord(buffer.GetBuffer(), buffer.GetValidBytes(), &record) ==
+           pti_result::PTI_SUCCESS) {
+      merger_.Add(producer, record, GetViewSize(record->_view_kind));
+    }
+    merger_.Commit(producer);
+    InvalidateBuffer(buffer);
+    buffer.Refresh(buffer.GetBuffer(), buffer.GetBufferSize());
+    merge_buffers_.push_back(std::move(buffer));
+  }
+
+  // Full buffers of merged records are delivered right away, merge_mtx_ must
+  // be held
+  inline void WriteMerged(uint64_t watermark) {
+    merger_.Drain(watermark, [this](const unsigned char* record, std::size_t size) {
+      if (merge_output_.FreeBytes() < size) {
+        if (!merge_output_.IsNull()) {
+          CommitBuffer(merge_output_);
+          DeliverBuffer(std::move(merge_output_));
+        }
+        if (!merge_buffers_.empty()) {
+          merge_output_ = std::move(merge_buffers_.back());
+          merge_buffers_.pop_back();
+        } else {
+          RequestNewBuffer(merge_output_);
+        }
+        if (merge_output_.FreeBytes() < size) {
+          return false;
+        }
+      }
+      std::memcpy(merge_output_.GetRecordsEnd(), record, size);
+      merge_output_.Advance(size);
+      return true;
+    });
+  }
+
+  // All the merged records are delivered, unused memory goes back to the user
+  inline void FlushMerged() {
+    std::lock_guard<std::mutex> merge_lock(merge_mtx_);
+    WriteMerged(UINT64_MAX);
+    if (!merge_output_.IsNull()) {
+      CommitBuffer(merge_output_);
+      DeliverBuffer(std::move(merge_output_));
+    }
+    for (auto& buffer : merge_buffers_) {
+      DeliverBuffer(std::move(buffer));
+    }
+    merge_buffers_.clear();
+  }
+
+  std::atomic<bool> stop_consumer_thread_ = false;
+  std::atomic<bool> callbacks_set_ = false;
+  ViewBufferQueue buffer_queue_ = ViewBufferQueue{kDefaultBufferQueueDepth};
+  AskForBufferEvent get_new_buffer_;
+  ReturnBufferEvent deliver_buffer_;
+  mutable std::mutex get_new_buffer_mtx_;
+  mutable std::shared_mutex deliver_buffer_mtx_;
+  std::unique_ptr<ViewBufferPool> buffer_pool_;
+  std::atomic<ViewBufferPool*> pool_ = nullptr;
+  std::unique_ptr<ViewRingFile> ring_file_owner_;
+  std::atomic<ViewRingFile*> ring_file_ = nullptr;
+  std::atomic<bool> delivery_ordered_ = true;
+  std::atomic<bool> timestamp_ordered_ = false;
+  // Timestamp ordered delivery state, consumer and flushes take it in turns
+  std::mutex merge_mtx_;
+  MergeWatermark merge_watermark_;
+  ViewRecordMerger merger_;
+  ViewBuffer merge_output_;
+  std::vector<ViewBuffer> merge_buffers_;
+  std::atomic<std::size_t> consumer_count_ = 0;
+  std::mutex buffer_consumers_mtx_;
+  std::vector<std::thread> buffer_consumers_;
+  std::atomic<pti_view_overflow_policy> overflow_policy_ =
+      pti_view_overflow_policy::PTI_VIEW_OVERFLOW_BLOCK;
+  std::array<std::atomic<uint64_t>, kSizeOfViewRecordTable> lost_records_ = {};
+  std::atomic<uint64_t> lost_buffers_ = 0;
+  std::atomic<bool> records_lost_pending_ = false;
+  std::mutex spill_mtx_;
+  std::unique_ptr<ViewBufferSpill> spill_;
+  std::atomic<std::size_t> spilled_buffers_ = 0;
+  // Buffers to replay spilled ones into, guarded by spill_mtx_
+  std::vector<ViewBuffer> spare_buffers_;
+};
+
+}  // namespace utilities
+}  // namespace view
+}  // namespace pti
+
+#endif  // SRC_VIEW_BUFFER_DELIVERY_H_
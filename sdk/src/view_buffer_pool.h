@@ -0,0 +1,211 @@
+//==============================================================
+// Copyright (C) Intel Corporation
+//
+// SPDX-License-Identifier: MIT
+// =============================================================
+
+#ifndef SRC_VIEW_BUFFER_POOL_H_
+#define SRC_VIEW_BUFFER_POOL_H_
+
+#include <sys/mman.h>
+#include <unistd.h>
+
+#include <algorithm>
+#include <atomic>
+#include <cstddef>
+#include <cstdint>
+#include <memory>
+#include <mutex>
+#include <new>
+#include <vector>
+
+#include "pti_view.h"
+
+namespace pti {
+namespace view {
+namespace utilities {
+
+constexpr std::size_t kHugePageSize = 2UL << 20;
+// Buffers a thread keeps for itself before giving them back to the pool
+constexpr std::size_t kThreadFreeListSize = 8;
+// Buffers moved between a thread free list and the pool at once
+constexpr std::size_t kFreeListBatchSize = kThreadFreeListSize / 2;
+
+inline std::size_t RoundUp(std::size_t value, std::size_t alignment) {
+  return (value + alignment - 1) / alignment * alignment;
+}
+
+// Fixed set of equally sized buffers carved out of a single mapping.
+// Buffers are acquired by the threads filling them and released by the
+// threads consuming them, both go through per-thread free lists, so the pool
+// lock is taken once per kFreeListBatchSize buffers.
+class ViewBufferPool {
+ public:
+  ViewBufferPool(std::size_t buffer_size, std::size_t buffer_count, uint32_t flags)
+      : state_(std::make_shared<State>()) {
+    const auto page_size = static_cast<std::size_t>(sysconf(_SC_PAGESIZE));
+    state_->buffer_size = buffer_size;
+    state_->buffer_count = buffer_count;
+    // Page aligned buffers never share a page, so releasing one doesn't
+    // touch memory another thread is filling
+    state_->stride = RoundUp(buffer_size, page_size);
+    state_->region_size = state_->stride * buffer_count;
+
+    if (flags & PTI_VIEW_BUFFER_POOL_HUGE_PAGES) {
+      state_->region_size = RoundUp(state_->region_size, kHugePageSize);
+      state_->region = Map(state_->region_size, MAP_HUGETLB);
+      state_->huge_pages = state_->region != nullptr;
+      if (!state_->huge_pages) {
+        // No huge pages reserved, ask for transparent ones instead
+        state_->region = Map(state_->region_size, 0);
+        if (state_->region) {
+          madvise(state_->region, state_->region_size, MADV_HUGEPAGE);
+        }
+      }
+    } else {
+      state_->region = Map(state_->region_size, 0);
+    }
+    if (!state_->region) {
+      throw std::bad_alloc();
+    }
+
+    if (flags & PTI_VIEW_BUFFER_POOL_PRE_TOUCH) {
+      // Take the page faults now rather than while tracing
+      for (std::size_t offset = 0; offset < state_->region_size; offset += page_size) {
+        static_cast<volatile unsigned char*>(state_->region)[offset] = 0;
+      }
+    }
+
+    state_->in_use = std::make_unique<std::atomic<bool>[]>(buffer_count);
+    state_->free_buffers.reserve(buffer_count);
+    // Reversed, so the buffers are handed out in address order
+    for (std::size_t i = buffer_count; i > 0; --i) {
+      state_->free_buffers.push_back(state_->region + (i - 1) * state_->stride);
+    }
+  }
+
+  ViewBufferPool(const ViewBufferPool&) = delete;
+  ViewBufferPool& operator=(const ViewBufferPool&) = delete;
+  ViewBufferPool(ViewBufferPool&&) = delete;
+  ViewBufferPool& operator=(ViewBufferPool&&) = delete;
+
+  // The mapping lives until the last thread free list referring to it is gone
+  virtual ~ViewBufferPool() = default;
+
+  // Returns nullptr if all the buffers are taken
+  inline unsigned char* Acquire() {
+    auto& free_list = GetThreadFreeList();
+    if (free_list.buffers.empty()) {
+      std::lock_guard<std::mutex> free_lock(state_->free_mtx);
+      auto& free_buffers = state_->free_buffers;
+      const auto batch_size = std::min(kFreeListBatchSize, free_buffers.size());
+      free_list.buffers.insert(free_list.buffers.end(), free_buffers.end() - batch_size,
+                               free_buffers.end());
+      free_buffers.resize(free_buffers.size() - batch_size);
+    }
+    if (free_list.buffers.empty()) {
+      return nullptr;
+    }
+    auto* buffer = free_list.buffers.back();
+    free_list.buffers.pop_back();
+    state_->in_use[Index(buffer)].store(true, std::memory_order_relaxed);
+    return buffer;
+  }
+
+  // Returns false for buffers not acquired from this pool (or released twice)
+  inline bool Release(unsigned char* buffer) {
+    if (!Owns(buffer) ||
+        !state_->in_use[Index(buffer)].exchange(false, std::memory_order_relaxed)) {
+      return false;
+    }
+    auto& free_list = GetThreadFreeList();
+    free_list.buffers.push_back(buffer);
+    if (free_list.buffers.size() > kThreadFreeListSize) {
+      std::lock_guard<std::mutex> free_lock(state_->free_mtx);
+      auto first = free_list.buffers.begin();
+      state_->free_buffers.insert(state_->free_buffers.end(), first, first + kFreeListBatchSize);
+      free_list.buffers.erase(first, first + kFreeListBatchSize);
+    }
+    return true;
+  }
+
+  inline bool Owns(const unsigned char* buffer) const {
+    return buffer >= state_->region && buffer < state_->region + state_->stride * BufferCount() &&
+           (buffer - state_->region) % state_->stride == 0;
+  }
+
+  inline std::size_t BufferSize() const { return state_->buffer_size; }
+
+  inline std::size_t BufferCount() const { return state_->buffer_count; }
+
+  // True if the buffers are backed by reserved (not transparent) huge pages
+  inline bool UsesHugePages() const { return state_->huge_pages; }
+
+ private:
+  struct State {
+    State() = default;
+    State(const State&) = delete;
+    State& operator=(const State&) = delete;
+    State(State&&) = delete;
+    State& operator=(State&&) = delete;
+    virtual ~State() {
+      if (region) {
+        munmap(region, region_size);
+      }
+    }
+
+    unsigned char* region = nullptr;
+    std::size_t region_size = 0;
+    std::size_t stride = 0;
+    std::size_t buffer_size = 0;
+    std::size_t buffer_count = 0;
+    bool huge_pages = false;
+    std::unique_ptr<std::atomic<bool>[]> in_use;
+    std::mutex free_mtx;
+    std::vector<unsigned char*> free_buffers;
+  };
+
+  struct ThreadFreeList {
+    std::shared_ptr<State> state;
+    std::vector<unsigned char*> buffers;
+
+    // Buffers of exiting threads (or of a previous pool) go back to the pool
+    inline void Flush() {
+      if (state && !buffers.empty()) {
+        std::lock_guard<std::mutex> free_lock(state->free_mtx);
+        state->free_buffers.insert(state->free_buffers.end(), buffers.begin(), buffers.end());
+      }
+      buffers.clear();
+    }
+
+    ~ThreadFreeList() { Flush(); }
+  };
+
+  static inline unsigned char* Map(std::size_t size, int flags) {
+    void* region =
+        mmap(nullptr, size, PROT_READ | PROT_WRITE, MAP_PRIVATE | MAP_ANONYMOUS | flags, -1, 0);
+    return region == MAP_FAILED ? nullptr : static_cast<unsigned char*>(region);
+  }
+
+  inline std::size_t Index(const unsigned char* buffer) const {
+    return static_cast<std::size_t>(buffer - state_->region) / state_->stride;
+  }
+
+  inline ThreadFreeList& GetThreadFreeList() {
+    thread_local ThreadFreeList free_list;
+    if (free_list.state != state_) {
+      free_list.Flush();
+      free_list.state = state_;
+      free_list.buffers.reserve(kThreadFreeListSize + 1);
+    }
+    return free_list;
+  }
+
+  std::shared_ptr<State> state_;
+};
+
+}  // namespace utilities
+}  // namespace view
+}  // namespace pti
+
+#endif  // SRC_VIEW_BUFFER_POOL_H_
@@ -0,0 +1,101 @@
+//==============================================================
+// Copyright (C) Intel Corporation
+//
+// SPDX-License-Identifier: MIT
+// =============================================================
+
+#ifndef SRC_VIEW_BUFFER_SPILL_H_
+#define SRC_VIEW_BUFFER_SPILL_H_
+
+#include <sys/types.h>
+#include <unistd.h>
+
+#include <atomic>
+#include <cstdint>
+#include <cstdio>
+#include <stdexcept>
+#include <string>
+
+namespace pti {
+namespace view {
+namespace utilities {
+
+// FIFO of buffer contents kept in a file while the buffer queue is full.
+// Not thread safe, except Empty(): callers serialize the access.
+class ViewBufferSpill {
+ public:
+  // Header of every spilled buffer, followed by valid_bytes of records
+  struct EntryHeader {
+    uint64_t valid_bytes = 0;
+    uint64_t producer = 0;
+  };
+
+  // Unnamed temporary file (removed on close) if path is nullptr
+  explicit ViewBufferSpill(const char* path) : file_(path ? fopen(path, "w+b") : tmpfile()) {
+    if (!file_) {
+      throw std::runtime_error("Unable to open spill file " +
+                               std::string(path ? path : "(temporary)"));
+    }
+  }
+
+  ViewBufferSpill(const ViewBufferSpill&) = delete;
+  ViewBufferSpill& operator=(const ViewBufferSpill&) = delete;
+  ViewBufferSpill(ViewBufferSpill&&) = delete;
+  ViewBufferSpill& operator=(ViewBufferSpill&&) = delete;
+
+  virtual ~ViewBufferSpill() { fclose(file_); }
+
+  // Returns false if the file can't take the buffer (e.g. no space left)
+  inline bool Write(const unsigned char* records, std::size_t valid_bytes, const void* producer) {
+    const EntryHeader header{valid_bytes, reinterpret_cast<uintptr_t>(producer)};
+    if (fseeko(file_, static_cast<off_t>(write_offset_), SEEK_SET) != 0 ||
+        fwrite(&header, sizeof(header), 1, file_) != 1 ||
+        (valid_bytes && fwrite(records, valid_bytes, 1, file_) != 1) || fflush(file_) != 0) {
+      return false;
+    }
+    write_offset_ += sizeof(header) + valid_bytes;
+    ++entries_;
+    return true;
+  }
+
+  // Header of the oldest buffer, false if there is none or it can't be read
+  inline bool Front(EntryHeader& header) {
+    return !Empty() && fseeko(file_, static_cast<off_t>(read_offset_), SEEK_SET) == 0 &&
+           fread(&header, sizeof(header), 1, file_) == 1;
+  }
+
+  // Copies records of the oldest buffer, records must hold header.valid_bytes
+  inline bool ReadFront(const EntryHeader& header, unsigned char* records) {
+    return !header.valid_bytes ||
+           (fseeko(file_, static_cast<off_t>(read_offset_ + sizeof(header)), SEEK_SET) == 0 &&
+            fread(records, header.valid_bytes, 1, file_) == 1);
+  }
+
+  inline void PopFront(const EntryHeader& header) {
+    read_offset_ += sizeof(header) + header.valid_bytes;
+    if (--entries_ == 0) {
+      // Everything replayed, give the disk space back
+      read_offset_ = 0;
+      write_offset_ = 0;
+      if (ftruncate(fileno(file_), 0) != 0) {
+        // Keeps growing, still correct
+      }
+    }
+  }
+
+  inline bool Empty() const { return entries_.load(std::memory_order_acquire) == 0; }
+
+  inline std::size_t Size() const { return entries_.load(std::memory_order_acquire); }
+
+ private:
+  FILE* file_ = nullptr;
+  std::size_t read_offset_ = 0;
+  std::size_t write_offset_ = 0;
+  std::atomic<std::size_t> entries_ = 0;
+};
+
+}  // namespace utilities
+}  // namespace view
+}  // namespace pti
+
+#endif  // SRC_VIEW_BUFFER_SPILL_H_
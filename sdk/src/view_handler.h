@@ -6,13 +6,15 @@
 #ifndef SRC_API_VIEW_HANDLER_H_
 #define SRC_API_VIEW_HANDLER_H_
 
+#include <algorithm>
 #include <array>
 #include <atomic>
-#include <condition_variable>
 #include <cstddef>
 #include <cstdio>
+#include <cstring>
 #include <functional>
 #include <iostream>
+#include <iterator>
 #include <map>
 #include <memory>
 #include <mutex>
@@ -20,6 +22,7 @@
 #include <string>
 #include <thread>
 #include <unordered_map>
+#include <vector>
 
 #include "common.h"
 #include "default_buffer_callbacks.h"
@@ -30,15 +33,22 @@
 #include "sycl_collector.h"
 #endif
 
+#include "clock_conversion.h"
+#include "compact_encoding.h"
+#include "external_correlation.h"
 #include "overhead_kinds.h"
+#include "string_table.h"
 #include "unikernel.h"
 #include "view_buffer.h"
+#include "view_buffer_delivery.h"
+#include "view_record_filter.h"
 #include "view_record_info.h"
 #include "ze_collector.h"
 
-using AskForBufferEvent = std::function<void(unsigned char**, size_t*)>;
-using ReturnBufferEvent = std::function<void(unsigned char*, size_t, size_t)>;
-using ViewInsert = std::function<void(void*, const ZeKernelCommandExecutionRecord&)>;
+using AskForBufferEvent = pti::view::utilities::AskForBufferEvent;
+using ReturnBufferEvent = pti::view::utilities::ReturnBufferEvent;
+using ViewInsert = void (*)(void*, const ZeKernelCommandExecutionRecord&);
+using CompletionWatermark = std::function<uint64_t()>;
 
 inline void MemCopyEvent(void* data, const ZeKernelCommandExecutionRecord& rec);
 
@@ -46,6 +56,8 @@ inline void MemFillEvent(void* data, const ZeKernelCommandExecutionRecord& rec);
 
 inline void KernelEvent(void* data, const ZeKernelCommandExecutionRecord& rec);
 
+inline void KernelStatsEvent(void* data, const ZeKernelCommandExecutionRecord& rec);
+
 inline void SyclRuntimeEvent(void* data, const ZeKernelCommandExecutionRecord& rec);
 
 inline void OverheadCollectionEvent(void* data, const ZeKernelCommandExecutionRecord& rec);
@@ -56,40 +68,31 @@ inline void ZeChromeKernelStagesCallback(void* data,
 inline void SyclRuntimeViewCallback(void* data, ZeKernelCommandExecutionRecord& rec);
 inline void OverheadCollectionCallback(void* data, ZeKernelCommandExecutionRecord& rec);
 
+inline void FillKernelRecord(pti_view_record_kernel& record,
+                             const ZeKernelCommandExecutionRecord& rec);
+inline void FillMemCopyRecord(pti_view_record_memory_copy& record,
+                              const ZeKernelCommandExecutionRecord& rec);
+inline void FillMemFillRecord(pti_view_record_memory_fill& record,
+                              const ZeKernelCommandExecutionRecord& rec);
+
+inline pti_result GetNextRecord(uint8_t* buffer, size_t valid_bytes,
+                                pti_view_record_base** record);
+
 struct ViewData {
   const char* fn_name = "";
   ViewInsert callback;
 };
 
-inline const std::vector<ViewData>& GetViewNameAndCallback(pti_view_kind view) {
+inline const ViewData& GetViewNameAndCallback(pti_view_kind view) {
   // clang-format off
-  static const std::map<pti_view_kind, std::vector<ViewData>> view_data_map =
+  static const std::map<pti_view_kind, ViewData> view_data_map =
       {
-        {PTI_VIEW_DEVICE_GPU_KERNEL,
-          {
-            ViewData{"KernelEvent", KernelEvent}
-          }
-        },
-        {PTI_VIEW_SYCL_RUNTIME_CALLS,
-          {
-            ViewData{"SyclRuntimeEvent", SyclRuntimeEvent}
-          }
-        },
-        {PTI_VIEW_COLLECTION_OVERHEAD,
-          {
-            ViewData{"OverheadCollectionEvent", OverheadCollectionEvent}
-          }
-        },
-        {PTI_VIEW_DEVICE_GPU_MEM_COPY,
-          {
-            ViewData{"zeCommandListAppendMemoryCopy", MemCopyEvent},
-          }
-        },
-        {PTI_VIEW_DEVICE_GPU_MEM_FILL,
-          {
-            ViewData{"zeCommandListAppendMemoryFill", MemFillEvent}
-          }
-        },
+        {PTI_VIEW_DEVICE_GPU_KERNEL, ViewData{"KernelEvent", KernelEvent}},
+        {PTI_VIEW_SYCL_RUNTIME_CALLS, ViewData{"SyclRuntimeEvent", SyclRuntimeEvent}},
+        {PTI_VIEW_COLLECTION_OVERHEAD, ViewData{"OverheadCollectionEvent", OverheadCollectionEvent}},
+        {PTI_VIEW_DEVICE_GPU_MEM_COPY, ViewData{"MemCopyEvent", MemCopyEvent}},
+        {PTI_VIEW_DEVICE_GPU_MEM_FILL, ViewData{"MemFillEvent", MemFillEvent}},
+        {PTI_VIEW_DEVICE_GPU_KERNEL_STATS, ViewData{"KernelStatsEvent", KernelStatsEvent}},
       };
   // clang-format on
   const auto result = view_data_map.find(view);
@@ -99,29 +102,31 @@ inline const std::vector<ViewData>& GetViewNameAndCallback(pti_view_kind view) {
   return result->second;
 }
 
-constexpr auto kDefaultBufferQueueDepth = 50UL;
+// External correlation IDs pushed by the thread
+inline thread_local pti::view::utilities::ExternalCorrelationStacks external_correlation_stacks;
+
+using pti::view::utilities::kDefaultBufferQueueDepth;
+using pti::view::utilities::kMaxConsumerThreads;
+constexpr auto kDefaultRingFileSlices = 64UL;
 static std::atomic<bool> external_collection_enabled = false;
 
 struct PtiViewRecordHandler {
  public:
   using ViewBuffer = pti::view::utilities::ViewBuffer;
-  using ViewBufferQueue = pti::view::utilities::ViewBufferQueue;
+  using ThreadViewBuffer = pti::view::utilities::ThreadViewBuffer;
+  using ClockConverter = pti::view::utilities::ClockConverter;
   using ViewBufferTable = pti::view::utilities::ViewBufferTable<std::thread::id>;
-  using ViewEventTable = pti::view::utilities::ThreadSafeHashTable<std::string, ViewInsert>;
-  using KernelNameStorageQueue =
-      pti::view::utilities::ViewRecordBufferQueue<std::unique_ptr<std::string>>;
-
-  PtiViewRecordHandler()
-      : get_new_buffer_(pti::view::defaults::DefaultBufferAllocation),
-        deliver_buffer_(pti::view::defaults::DefaultRecordParser),
-        buffer_consumer_([this]() { return BufferConsumer(); }) {
-    // Set queue depth based on number of hardware threads supported.
-    constexpr auto kBufQueueDepthMult = 2UL;
-    const auto threads_supported = std::thread::hardware_concurrency();
-    if (threads_supported) {
-      buffer_queue_.SetBufferDepth(kBufQueueDepthMult * threads_supported);
-    }
-
+  // Indexed by pti_view_kind, nullptr for disabled views
+  using ViewEventTable = std::array<std::atomic<ViewInsert>, kSizeOfViewRecordTable>;
+  using NameTable = pti::view::utilities::StringTable<>;
+  using ViewBufferDelivery = pti::view::utilities::ViewBufferDelivery;
+  using ExternalCorrelationStacks = pti::view::utilities::ExternalCorrelationStacks;
+  using RecordFilter = pti::view::utilities::RecordFilter;
+  using FilterReason = pti::view::utilities::FilterReason;
+  using KernelStatsTable = pti::view::utilities::KernelStatsTable;
+  using KernelStatsKey = pti::view::utilities::KernelStatsKey;
+
+  PtiViewRecordHandler() : delivery_([this] { return GetMergeWatermark(); }) {
     if (!collector_) {
       CollectorOptions collector_options;
       collector_options.kernel_tracing = true;
@@ -129,6 +134,14 @@ struct PtiViewRecordHandler {
                                        nullptr, nullptr);
       overhead::SetOverheadCallback(OverheadCollectionCallback);
     }
+
+    SetConsumerThreads(1, pti_view_delivery_order::PTI_VIEW_DELIVERY_ORDERED);
+
+    const auto ring_file_path = utils::GetEnv("PTI_VIEW_RING_FILE");
+    if (!ring_file_path.empty()) {
+      SetRingFile(ring_file_path.c_str(), pti::view::defaults::kDefaultSizeOfBuffer,
+                  kDefaultRingFileSlices);
+    }
   }
 
   PtiViewRecordHandler(const PtiViewRecordHandler&) = delete;
@@ -137,106 +150,230 @@ struct PtiViewRecordHandler {
   PtiViewRecordHandler& operator=(PtiViewRecordHandler&&) = delete;
 
   virtual ~PtiViewRecordHandler() {
+    // Threads exiting later must not return their buffers to this handler
+    view_buffers_.ForEach(
+        [](const auto&, auto& thread_buffer) { thread_buffer->attached = false; });
     overhead::overhead_collection_enabled = false;
     DisableTracing();
-    collector_->DisableTracing();
-    delete collector_;
-    stop_consumer_thread_ = true;
-    buffer_queue_.ResetBufferDepth();
-    buffer_queue_.Push(ViewBuffer{});  // Stop consumer
-    if (buffer_consumer_.joinable()) {
-      buffer_consumer_.join();
+    if (collector_) {
+      collector_->DisableTracing();
+      delete collector_;
     }
+    delivery_.Stop();
   }
 
-  void BufferConsumer() {
-    while (!stop_consumer_thread_) {
-      auto consume_buffer = buffer_queue_.Pop();
-      if (!consume_buffer.IsNull()) {
-        DeliverBuffer(std::move(consume_buffer));
+  inline pti_result FlushBuffers() {
+    // Spilled buffers go before the current ones of the same threads
+    delivery_.FlushSpill();
+    KernelStatsTable kernel_stats;
+    {
+      std::lock_guard<std::mutex> kernel_stats_lock(kernel_stats_mtx_);
+      kernel_stats.swap(retired_kernel_stats_);
+    }
+    // Pushing may wait for the consumers, which need the table lock to get
+    // the merge watermark, so the buffers are pushed outside of it
+    std::vector<std::shared_ptr<ThreadViewBuffer>> thread_buffers;
+    view_buffers_.ForEach([&thread_buffers](const auto&, auto& thread_buffer) {
+      thread_buffers.push_back(thread_buffer);
+    });
+    for (auto& thread_buffer : thread_buffers) {
+      ViewBuffer buffer;
+      {
+        std::lock_guard<std::mutex> buffer_lock(thread_buffer->buffer_mtx);
+        ReportFiltered(*thread_buffer);
+        pti::view::utilities::MergeKernelStats(kernel_stats, thread_buffer->kernel_stats);
+        thread_buffer->kernel_stats.clear();
+        buffer = std::move(thread_buffer->buffer);
+        // Records on the way to the queue hold the merge watermark back
+        ++buffers_in_transit_;
+        thread_buffer->oldest_timestamp.store(UINT64_MAX, std::memory_order_release);
       }
+      if (!buffer.IsNull()) {
+        delivery_.Push(std::move(buffer), thread_buffer.get());
+      }
+      --buffers_in_transit_;
     }
-  }
 
-  inline pti_result FlushBuffers() {
-    view_buffers_.ForEach(
-        [this](const auto&, auto&& buffer) { buffer_queue_.Push(std::move(buffer)); });
+    if (!kernel_stats.empty()) {
+      ReportKernelStats(kernel_stats);
+    }
+
+    if (delivery_.RecordsLostPending()) {
+      // Report the drops now rather than with the next buffer
+      ThreadViewBuffer report;
+      delivery_.RequestNewBuffer(report.buffer);
+      if (!report.buffer.IsNull()) {
+        StartBuffer(report);
+        delivery_.Push(std::move(report.buffer), &report);
+      }
+    }
 
-    buffer_queue_.WaitUntilEmptyOr(stop_consumer_thread_);
+    delivery_.WaitUntilDelivered();
 
     return PTI_SUCCESS;
   }
 
   template <typename T>
   inline void InsertRecord(const T& view_record) {
-    static_assert(std::is_trivially_copyable<T>::value,
-                  "One can only insert trivially copyable types into the "
-                  "ViewBuffer (view records)");
-    auto& buffer = view_buffers_[std::this_thread::get_id()];
+    auto& thread_buffer = GetThreadBuffer();
+    std::lock_guard<std::mutex> buffer_lock(thread_buffer.buffer_mtx);
+    std::size_t reserved_bytes = 0;
+    InsertRecord(thread_buffer, view_record, reserved_bytes);
+  }
 
-    if (buffer.IsNull()) {
-      RequestNewBuffer(buffer);
-    }
+  // Views of device commands, looked up once for a batch of commands
+  struct CommandViews {
+    bool kernels = false;
+    bool mem_copies = false;
+    bool mem_fills = false;
+    bool external_correlation = false;
+    bool kernel_stats = false;
+  };
+
+  inline CommandViews GetCommandViews() const {
+    CommandViews views;
+    views.kernels = view_event_map_[PTI_VIEW_DEVICE_GPU_KERNEL].load(std::memory_order_acquire);
+    views.mem_copies =
+        view_event_map_[PTI_VIEW_DEVICE_GPU_MEM_COPY].load(std::memory_order_acquire);
+    views.mem_fills = view_event_map_[PTI_VIEW_DEVICE_GPU_MEM_FILL].load(std::memory_order_acquire);
+    views.external_correlation = external_collection_enabled;
+    views.kernel_stats =
+        view_event_map_[PTI_VIEW_DEVICE_GPU_KERNEL_STATS].load(std::memory_order_acquire);
+    return views;
+  }
 
-    buffer.Insert(view_record);
-    static_assert(SizeOfLargestViewRecord() != 0, "Largest record not avaiable on compile time");
-    if (buffer.FreeBytes() >= SizeOfLargestViewRecord()) {
-      // There's space to insert more records. No need for swap.
+  // Records of the commands completed together: the thread buffer is looked
+  // up and locked once, and the free space is checked once for as many
+  // records as the buffer can take
+  inline void InsertRecords(const std::vector<ZeKernelCommandExecutionRecord>& recs,
+                            const CommandViews& views) {
+    if (recs.empty() ||
+        (!views.kernels && !views.mem_copies && !views.mem_fills && !views.kernel_stats)) {
       return;
     }
 
-    buffer_queue_.Push(std::move(buffer));
+    auto& thread_buffer = GetThreadBuffer();
+    std::lock_guard<std::mutex> buffer_lock(thread_buffer.buffer_mtx);
+    std::size_t reserved_bytes = 0;
+    for (const auto& rec : recs) {
+      switch (rec.kind_) {
+        case ZeCommandKind::kMemoryCopy:
+          if (views.mem_copies) {
+            InsertCommandRecord(thread_buffer, PTI_VIEW_DEVICE_GPU_MEM_COPY, rec, false,
+                                reserved_bytes);
+          }
+          break;
+        case ZeCommandKind::kMemoryFill:
+          if (views.mem_fills) {
+            InsertCommandRecord(thread_buffer, PTI_VIEW_DEVICE_GPU_MEM_FILL, rec, false,
+                                reserved_bytes);
+          }
+          break;
+        case ZeCommandKind::kBarrier:
+          // no-op for now
+          break;
+        default:
+          if (views.kernel_stats) {
+            AddKernelStats(thread_buffer, rec);
+          }
+          if (views.kernels) {
+            InsertCommandRecord(thread_buffer, PTI_VIEW_DEVICE_GPU_KERNEL, rec,
+                                views.external_correlation, reserved_bytes);
+          }
+          break;
+      }
+    }
+  }
+
+  // Record of one device command of the view (kernel, memory copy or fill)
+  inline void InsertCommandRecord(pti_view_kind kind, const ZeKernelCommandExecutionRecord& rec) {
+    auto& thread_buffer = GetThreadBuffer();
+    std::lock_guard<std::mutex> buffer_lock(thread_buffer.buffer_mtx);
+    std::size_t reserved_bytes = 0;
+    InsertCommandRecord(thread_buffer, kind, rec, external_collection_enabled, reserved_bytes);
+  }
+
+  // Launch of a kernel counted in the statistics of the thread
+  inline void AddKernelStats(const ZeKernelCommandExecutionRecord& rec) {
+    auto& thread_buffer = GetThreadBuffer();
+    std::lock_guard<std::mutex> buffer_lock(thread_buffer.buffer_mtx);
+    AddKernelStats(thread_buffer, rec);
+  }
+
+  // Filters set before stay alive, threads might be checking them
+  inline pti_result SetRecordFilter(const pti_view_record_filter* filter) {
+    if (!filter) {
+      record_filter_.store(nullptr, std::memory_order_release);
+      return pti_result::PTI_SUCCESS;
+    }
+    std::unique_ptr<RecordFilter> record_filter;
+    try {
+      record_filter = std::make_unique<RecordFilter>(*filter);
+    } catch (const std::invalid_argument& e) {
+      SPDLOG_WARN("{}", e.what());
+      return pti_result::PTI_ERROR_BAD_ARGUMENT;
+    }
+    std::lock_guard<std::mutex> record_filters_lock(record_filters_mtx_);
+    record_filter_.store(record_filter.get(), std::memory_order_release);
+    record_filters_.push_back(std::move(record_filter));
+    return pti_result::PTI_SUCCESS;
   }
 
   inline pti_result RegisterBufferCallbacks(AskForBufferEvent&& get_new_buf,
                                             ReturnBufferEvent&& return_new_buf) {
-    pti_result result = pti_result::PTI_ERROR_BAD_ARGUMENT;
-    auto get_new_buffer = std::move(get_new_buf);
-    auto deliver_buffer = std::move(return_new_buf);
-    if (!get_new_buffer || !deliver_buffer) {
+    if (!get_new_buf || !return_new_buf) {
       // Keep using default callbacks
-      return result;
+      return pti_result::PTI_ERROR_BAD_ARGUMENT;
     }
 
-    unsigned char* raw_buffer = nullptr;
-    std::size_t raw_buffer_size = 0;
-    get_new_buffer(&raw_buffer, &raw_buffer_size);
-    if (raw_buffer_size < SizeOfLargestViewRecord() || !raw_buffer) {
-      // Keep using default callbacks
-      result = pti_result::PTI_ERROR_BAD_ARGUMENT;
-      deliver_buffer(raw_buffer, raw_buffer_size, 0);
-    } else {
-      // User callback is fine, keep memory they gave us
-      result = pti_result::PTI_SUCCESS;
+    ViewBuffer new_buffer;
+    const auto result =
+        delivery_.SetBufferCallbacks(std::move(get_new_buf), std::move(return_new_buf), new_buffer);
+    auto& thread_buffer = GetThreadBuffer();
+    ViewBuffer buffer_to_replace;
+    {
+      std::lock_guard<std::mutex> buffer_lock(thread_buffer.buffer_mtx);
+      buffer_to_replace = std::move(thread_buffer.buffer);
+      thread_buffer.buffer.Refresh(new_buffer.GetBuffer(), new_buffer.GetBufferSize());
     }
+    delivery_.DeliverBuffer(std::move(buffer_to_replace));
+    delivery_.SetCallbacksInUse();
 
-    if (result == pti_result::PTI_SUCCESS) {
-      // Use user-defined callbacks
-      {
-        std::lock_guard<std::mutex> cb_lock(get_new_buffer_mtx_);
-        get_new_buffer_ = std::move(get_new_buffer);
-      }
-      {
-        std::lock_guard<std::mutex> cb_lock(deliver_buffer_mtx_);
-        deliver_buffer_ = std::move(deliver_buffer);
-      }
-    } else {
-      get_new_buffer_(&raw_buffer, &raw_buffer_size);
-    }
-    auto* buffer_to_replace = view_buffers_.TryFindElement(std::this_thread::get_id());
+    return result;
+  }
 
-    if (buffer_to_replace) {
-      DeliverBuffer(std::move(*buffer_to_replace));
-    }
+  inline pti_result SetRecordEncoding(pti_view_record_encoding encoding) {
+    record_encoding_ = encoding;
+    return pti_result::PTI_SUCCESS;
+  }
+
+  inline pti_result SetBufferPool(std::size_t buffer_size, std::size_t buffer_count,
+                                  uint32_t flags) {
+    return delivery_.SetBufferPool(buffer_size, buffer_count, flags);
+  }
 
-    view_buffers_[std::this_thread::get_id()].Refresh(raw_buffer, raw_buffer_size);
-    callbacks_set_ = true;
+  inline pti_result ReturnBuffer(unsigned char* buffer) { return delivery_.ReturnBuffer(buffer); }
 
-    return result;
+  inline pti_result SetRingFile(const char* path, std::size_t slice_size,
+                                std::size_t slice_count) {
+    return delivery_.SetRingFile(path, slice_size, slice_count);
+  }
+
+  inline pti_result SetOverflowPolicy(pti_view_overflow_policy policy,
+                                      const char* spill_file_path) {
+    return delivery_.SetOverflowPolicy(policy, spill_file_path);
+  }
+
+  inline pti_result SetConsumerThreads(uint32_t thread_count, pti_view_delivery_order order) {
+    return delivery_.SetConsumerThreads(thread_count, order);
+  }
+
+  inline pti_result GetDeliveryStats(pti_view_delivery_stats* delivery_stats) {
+    return delivery_.GetDeliveryStats(delivery_stats);
   }
 
   inline pti_result Enable(pti_view_kind type) {
-    if (!callbacks_set_) return pti_result::PTI_ERROR_NO_CALLBACKS_SET;
+    if (!delivery_.CallbacksInUse()) return pti_result::PTI_ERROR_NO_CALLBACKS_SET;
     auto result = pti_result::PTI_SUCCESS;
     bool collection_enabled = collection_enabled_;
 
@@ -257,11 +394,25 @@ struct PtiViewRecordHandler {
       external_collection_enabled = true;
     }
 
+    if (type == pti_view_kind::PTI_VIEW_CLOCK_CONVERSION) {
+      // Records are emitted by buffers themselves, no tracing required
+      clock_conversion_enabled_ = true;
+      return result;
+    }
+
+    if (type == pti_view_kind::PTI_VIEW_RECORDS_LOST ||
+        type == pti_view_kind::PTI_VIEW_RECORDS_FILTERED) {
+      // Always emitted after drops or filtering
+      return result;
+    }
+
     if (type == pti_view_kind::PTI_VIEW_SYCL_RUNTIME_CALLS) {
 #if defined(PTI_TRACE_SYCL)
-      if (!view_event_map_.TryFindElement("SyclRuntimeEvent")) {
+      if (!view_event_map_[type].load(std::memory_order_acquire)) {
         SyclCollector::Instance().SetCallback(SyclRuntimeViewCallback);
-        SyclCollector::Instance().EnableTracing();
+        if (IsTracingRunning()) {
+          SyclCollector::Instance().EnableTracing();
+        }
         collection_enabled = true;
       }
 #else
@@ -285,9 +436,8 @@ struct PtiViewRecordHandler {
 
     try {
       if (type != pti_view_kind::PTI_VIEW_EXTERNAL_CORRELATION) {
-        for (const auto& view_types : GetViewNameAndCallback(type)) {
-          view_event_map_[view_types.fn_name] = view_types.callback;
-        }
+        const auto& view_data = GetViewNameAndCallback(type);
+        view_event_map_[type].store(view_data.callback, std::memory_order_release);
       }
     } catch (const std::out_of_range&) {
       result = pti_result::PTI_ERROR_BAD_ARGUMENT;
@@ -303,6 +453,14 @@ struct PtiViewRecordHandler {
     if (type == pti_view_kind::PTI_VIEW_EXTERNAL_CORRELATION) {
       external_collection_enabled = false;
     }
+    if (type == pti_view_kind::PTI_VIEW_CLOCK_CONVERSION) {
+      clock_conversion_enabled_ = false;
+      return result;
+    }
+    if (type == pti_view_kind::PTI_VIEW_RECORDS_LOST ||
+        type == pti_view_kind::PTI_VIEW_RECORDS_FILTERED) {
+      return result;
+    }
     if (type == pti_view_kind::PTI_VIEW_SYCL_RUNTIME_CALLS) {
 #if defined(PTI_TRACE_SYCL)
       SyclCollector::Instance().DisableTracing();
@@ -312,86 +470,438 @@ struct PtiViewRecordHandler {
       return pti_result::PTI_ERROR_BAD_ARGUMENT;
     }
     try {
-      for (const auto& view_types : GetViewNameAndCallback(type)) {
-        view_event_map_.Erase(view_types.fn_name);
-      }
+      GetViewNameAndCallback(type);
+      view_event_map_[type].store(nullptr, std::memory_order_release);
     } catch (const std::out_of_range&) {
       result = pti_result::PTI_ERROR_BAD_ARGUMENT;
     }
-    if (view_event_map_.Empty()) {
+    if (AllViewsDisabled()) {
       DisableTracing();
     }
     return result;
   }
 
-  inline pti_result PushExternalKindId(pti_view_external_kind external_kind, uint64_t external_id) {
-    pti_result result = pti_result::PTI_SUCCESS;
+  // Tracing windows: stopped collection traces lifetimes of command lists,
+  // events and kernels, submissions and synchronizations only. Commands
+  // appended in a window are reported when they complete, also if they are
+  // submitted or complete after the window.
+  inline pti_result StartTracing() { return SetTracingRunning(true); }
 
-    pti_view_record_external_correlation ext_corr_rec = pti_view_record_external_correlation();
-    ext_corr_rec._external_id = external_id;
-    ext_corr_rec._external_kind = external_kind;
-    auto it = map_ext_corrid_vectors.find({external_kind});
-    if (it != map_ext_corrid_vectors.cend()) {
-      it->second.push(ext_corr_rec);
-    } else {
-      map_ext_corrid_vectors[{external_kind}].push(ext_corr_rec);
-    }
+  inline pti_result StopTracing() { return SetTracingRunning(false); }
 
-    return result;
+  inline bool IsTracingRunning() const { return tracing_running_.load(std::memory_order_acquire); }
+
+  // Stacks are per thread, so pushes and pops take no locks
+  inline pti_result PushExternalKindId(pti_view_external_kind external_kind, uint64_t external_id) {
+    if (!ExternalCorrelationStacks::IsValidKind(external_kind) ||
+        !external_correlation_stacks.Push(external_kind, external_id)) {
+      return pti_result::PTI_ERROR_BAD_ARGUMENT;
+    }
+    return pti_result::PTI_SUCCESS;
   }
 
   inline pti_result PopExternalKindId(pti_view_external_kind external_kind,
                                       uint64_t* p_external_id) {
-    pti_result result = pti_result::PTI_SUCCESS;
-    auto it = map_ext_corrid_vectors.find({external_kind});
-    if (it != map_ext_corrid_vectors.cend()) {
-      pti_view_record_external_correlation ext_record = it->second.top();
-      if (p_external_id != nullptr) *p_external_id = ext_record._external_id;
-      it->second.pop();
-      if (!it->second.size()) {
-        map_ext_corrid_vectors.erase(it);
-      }
-    } else {
-      result = pti_result::PTI_ERROR_EXTERNAL_ID_QUEUE_EMPTY;
+    if (!ExternalCorrelationStacks::IsValidKind(external_kind)) {
+      return pti_result::PTI_ERROR_BAD_ARGUMENT;
     }
-    return result;
+    if (!external_correlation_stacks.Pop(external_kind, p_external_id)) {
+      return pti_result::PTI_ERROR_EXTERNAL_ID_QUEUE_EMPTY;
+    }
+    return pti_result::PTI_SUCCESS;
   }
 
-  inline void operator()(const std::string& key, void* data,
+  inline void operator()(pti_view_kind kind, void* data,
                          const ZeKernelCommandExecutionRecord& rec) {
-    auto* view_event_callback = view_event_map_.TryFindElement(key);
+    auto view_event_callback = view_event_map_[kind].load(std::memory_order_acquire);
     if (view_event_callback) {
-      (*view_event_callback)(data, rec);
+      view_event_callback(data, rec);
     }
   }
 
-  inline const char* InsertKernel(const std::string& name) {
-    auto kernel_name = std::make_unique<std::string>(name);
-    const auto* kernel_name_str = kernel_name->c_str();
-    kernel_name_storage_.Push(std::move(kernel_name));
-    return kernel_name_str;
+  // Returned pointer stays valid for the handler lifetime
+  inline const char* InternName(const std::string& name) { return name_table_.Intern(name); }
+
+  // Source of the host timestamp no command completing later starts before,
+  // the Level Zero collector unless set
+  inline void SetCompletionWatermark(CompletionWatermark&& completion_watermark) {
+    std::lock_guard<std::mutex> completion_watermark_lock(completion_watermark_mtx_);
+    completion_watermark_ = std::move(completion_watermark);
   }
 
+  // Buffers queued before producers wait (or the overflow policy applies)
+  inline void SetBufferQueueDepth(std::size_t depth) { delivery_.SetBufferQueueDepth(depth); }
+
+  // Records delivered by timestamp ordered delivery after younger ones
+  inline uint64_t GetLateRecords() { return delivery_.GetLateRecords(); }
+
  private:
-  inline void RequestNewBuffer(pti::view::utilities::ViewBuffer& buffer) {
-    unsigned char* raw_buffer = nullptr;
-    std::size_t buffer_size = 0;
+  // Keeps the calling thread's buffer registered in view_buffers_ (so flushes
+  // can reach it) for the thread lifetime and returns it at thread exit
+  struct ThreadBufferHolder {
+    PtiViewRecordHandler* handler = nullptr;
+    std::shared_ptr<ThreadViewBuffer> thread_buffer;
+
+    ~ThreadBufferHolder() {
+      if (handler && thread_buffer->attached) {
+        handler->ReleaseThreadBuffer(*thread_buffer);
+      }
+    }
+  };
+
+  inline ThreadViewBuffer& GetThreadBuffer() {
+    // Fast path: no table lookup (and no global lock) after the first record
+    thread_local ThreadBufferHolder holder;
+    if (holder.handler == this) {
+      return *holder.thread_buffer;
+    }
+
+    auto& thread_buffer = view_buffers_[std::this_thread::get_id()];
+    if (!thread_buffer) {
+      thread_buffer = std::make_shared<ThreadViewBuffer>();
+    }
+    if (!holder.handler) {
+      holder.handler = this;
+      holder.thread_buffer = thread_buffer;
+    }
+    return *thread_buffer;
+  }
+
+  inline void ReleaseThreadBuffer(ThreadViewBuffer& thread_buffer) {
+    ++buffers_in_transit_;
+    view_buffers_.Erase(std::this_thread::get_id());
+    ViewBuffer buffer;
     {
-      std::lock_guard<std::mutex> cb_lock(get_new_buffer_mtx_);
-      get_new_buffer_(&raw_buffer, &buffer_size);
+      std::lock_guard<std::mutex> buffer_lock(thread_buffer.buffer_mtx);
+      ReportFiltered(thread_buffer);
+      if (!thread_buffer.kernel_stats.empty()) {
+        // Reported with the next flush
+        std::lock_guard<std::mutex> kernel_stats_lock(kernel_stats_mtx_);
+        pti::view::utilities::MergeKernelStats(retired_kernel_stats_, thread_buffer.kernel_stats);
+        thread_buffer.kernel_stats.clear();
+      }
+      if (!thread_buffer.buffer.IsNull()) {
+        PushBuffer(thread_buffer);
+      }
+      buffer = std::move(thread_buffer.buffer);
+    }
+    if (!buffer.IsNull()) {
+      // Memory kept after a drop or a spill
+      delivery_.ReturnSpareBuffer(std::move(buffer), &thread_buffer);
+    }
+    --buffers_in_transit_;
+  }
+
+  // Hands a completed buffer of a traced thread over to the consumers. If the
+  // buffer is dropped or spilled, the thread keeps buffer memory for reuse.
+  inline void PushBuffer(ThreadViewBuffer& thread_buffer) {
+    delivery_.HandOverBuffer(thread_buffer.buffer, &thread_buffer);
+    // Queued, spilled or dropped, none of the records are the thread's anymore
+    thread_buffer.oldest_timestamp.store(UINT64_MAX, std::memory_order_release);
+  }
+
+  // All the records of a buffer share one clock conversion model, so the
+  // model is updated only when the buffer is (re)started
+  inline void StartBuffer(ThreadViewBuffer& thread_buffer) {
+    auto& buffer = thread_buffer.buffer;
+    thread_buffer.clock = clock_converter_.GetModel();
+    // Memory of a committed buffer might be reused after a drop or a spill
+    delivery_.InvalidateBuffer(buffer);
+
+    // Buffers too small for compact records stay fixed
+    thread_buffer.compact =
+        record_encoding_ == pti_view_record_encoding::PTI_VIEW_RECORD_ENCODING_COMPACT &&
+        buffer.FreeBytes() >= pti::view::utilities::kCompactBufferHeaderSize +
+                                  pti::view::utilities::kMaxCompactRecordSize;
+    if (thread_buffer.compact) {
+      thread_buffer.encoder.Reset();
+      buffer.Advance(pti::view::utilities::WriteCompactBufferHeader(buffer.GetRecordsEnd()));
+    }
+
+    if (delivery_.RecordsLostPending()) {
+      WriteRecordsLost(thread_buffer);
+    }
+
+    if (thread_buffer.filtered.total) {
+      WriteRecordsFiltered(thread_buffer, MaxRecordSize(thread_buffer));
+    }
+
+    if (!clock_conversion_enabled_) {
+      return;
+    }
+
+    const auto clock_record_size = thread_buffer.compact
+                                       ? pti::view::utilities::kMaxCompactRecordSize
+                                       : sizeof(pti_view_record_clock_conversion);
+    if (buffer.FreeBytes() < clock_record_size + MaxRecordSize(thread_buffer)) {
+      return;
+    }
+
+    pti_view_record_clock_conversion record = pti_view_record_clock_conversion();
+    record._view_kind._view_kind = pti_view_kind::PTI_VIEW_CLOCK_CONVERSION;
+    record._raw_base_timestamp = thread_buffer.clock.raw_base;
+    record._real_base_timestamp = thread_buffer.clock.real_base;
+    record._raw_to_real_rate = thread_buffer.clock.rate;
+    record._uncertainty_ns = thread_buffer.clock.uncertainty;
+    WriteRecord(thread_buffer, record);
+  }
+
+  inline void WriteRecordsLost(ThreadViewBuffer& thread_buffer) {
+    const auto record_size = thread_buffer.compact ? pti::view::utilities::kMaxCompactRecordSize
+                                                   : sizeof(pti_view_record_records_lost);
+    if (thread_buffer.buffer.FreeBytes() < record_size + MaxRecordSize(thread_buffer)) {
+      return;
+    }
+    pti_view_record_records_lost record = pti_view_record_records_lost();
+    if (!delivery_.TakeRecordsLost(record)) {
+      return;
+    }
+    record._view_kind._view_kind = pti_view_kind::PTI_VIEW_RECORDS_LOST;
+    record._timestamp = thread_buffer.clock.Convert(utils::GetTime(CLOCK_MONOTONIC_RAW));
+    WriteRecord(thread_buffer, record);
+  }
+
+  // Writes the filter counts of the thread if the buffer keeps free_bytes
+  // left afterwards
+  inline void WriteRecordsFiltered(ThreadViewBuffer& thread_buffer, std::size_t free_bytes) {
+    const auto record_size = thread_buffer.compact ? pti::view::utilities::kMaxCompactRecordSize
+                                                   : sizeof(pti_view_record_records_filtered);
+    if (thread_buffer.buffer.FreeBytes() < record_size + free_bytes) {
+      return;
+    }
+    auto& counts = thread_buffer.filtered;
+    pti_view_record_records_filtered record = pti_view_record_records_filtered();
+    record._view_kind._view_kind = pti_view_kind::PTI_VIEW_RECORDS_FILTERED;
+    record._timestamp = thread_buffer.clock.Convert(utils::GetTime(CLOCK_MONOTONIC_RAW));
+    for (std::size_t i = 0; i < counts.kinds.size(); ++i) {
+      record._records_filtered[i] = counts.kinds[i];
+    }
+    record._by_name = counts.reasons[static_cast<std::size_t>(FilterReason::kName)];
+    record._by_duration = counts.reasons[static_cast<std::size_t>(FilterReason::kDuration)];
+    record._by_device = counts.reasons[static_cast<std::size_t>(FilterReason::kDevice)];
+    record._by_rate_limit = counts.reasons[static_cast<std::size_t>(FilterReason::kRateLimit)];
+    WriteRecord(thread_buffer, record);
+    counts = pti::view::utilities::RecordFilterCounts();
+  }
+
+  // Filter counts go with the buffer of the locked thread buffer before it is
+  // handed over. A thread with all its records filtered out gets a buffer
+  // for them.
+  inline void ReportFiltered(ThreadViewBuffer& thread_buffer) {
+    if (!thread_buffer.filtered.total) {
+      return;
+    }
+    if (!thread_buffer.buffer.IsNull() && thread_buffer.buffer.GetValidBytes()) {
+      WriteRecordsFiltered(thread_buffer, 0);
+    } else {
+      // Written when the buffer is started
+      ReserveRecords(thread_buffer);
+    }
+  }
+
+  // Statistics are kept for all the launches, the record filter doesn't apply
+  inline void AddKernelStats(ThreadViewBuffer& thread_buffer,
+                             const ZeKernelCommandExecutionRecord& rec) {
+    KernelStatsKey key;
+    key.name = InternName(rec.name_);
+    key.device = rec.device_;
+    std::copy(std::begin(rec.group_size_), std::end(rec.group_size_), key.group_size.begin());
+    thread_buffer.kernel_stats[key].Add(rec.start_time_, rec.end_time_);
+  }
+
+  // One record per kernel of the merged statistics, in buffers of their own
+  inline void ReportKernelStats(const KernelStatsTable& kernel_stats) {
+    ThreadViewBuffer report;
+    std::size_t reserved_bytes = 0;
+    for (const auto& [key, stats] : kernel_stats) {
+      pti_view_record_kernel_stats record = pti_view_record_kernel_stats();
+      pti::view::utilities::FillKernelStatsRecord(record, key, stats);
+      InsertRecord(report, record, reserved_bytes);
+    }
+    if (!report.buffer.IsNull()) {
+      delivery_.Push(std::move(report.buffer), &report);
     }
-    buffer.Refresh(raw_buffer, buffer_size);
   }
 
-  inline void DeliverBuffer(pti::view::utilities::ViewBuffer&& buffer) {
-    auto buffer_to_deliver = std::move(buffer);
+  // Filtered out records are counted, not built
+  inline void InsertCommandRecord(ThreadViewBuffer& thread_buffer, pti_view_kind kind,
+                                  const ZeKernelCommandExecutionRecord& rec,
+                                  bool external_correlation, std::size_t& reserved_bytes) {
+    if (auto* filter = record_filter_.load(std::memory_order_acquire)) {
+      const auto reason =
+          filter->Check(rec.name_, rec.start_time_, rec.end_time_, rec.device_, rec.queue_);
+      if (reason != FilterReason::kPassed) {
+        thread_buffer.filtered.Count(kind, reason);
+        return;
+      }
+    }
+    switch (kind) {
+      case PTI_VIEW_DEVICE_GPU_MEM_COPY: {
+        pti_view_record_memory_copy record;
+        FillMemCopyRecord(record, rec);
+        InsertRecord(thread_buffer, record, reserved_bytes);
+        break;
+      }
+      case PTI_VIEW_DEVICE_GPU_MEM_FILL: {
+        pti_view_record_memory_fill record;
+        FillMemFillRecord(record, rec);
+        InsertRecord(thread_buffer, record, reserved_bytes);
+        break;
+      }
+      default: {
+        if (external_correlation) {
+          external_correlation_stacks.ForEach(rec.cid_, [&](const auto& ext_record) {
+            InsertRecord(thread_buffer, ext_record, reserved_bytes);
+          });
+        }
+        pti_view_record_kernel record;
+        FillKernelRecord(record, rec);
+        InsertRecord(thread_buffer, record, reserved_bytes);
+        break;
+      }
+    }
+  }
+
+  // Makes sure the thread buffer is started and returns how many bytes of
+  // records it takes before it must be checked for a push
+  inline std::size_t ReserveRecords(ThreadViewBuffer& thread_buffer) {
+    auto& buffer = thread_buffer.buffer;
+    if (buffer.IsNull()) {
+      delivery_.RequestNewBuffer(buffer);
+    }
+
+    if (!buffer.GetValidBytes()) {
+      StartBuffer(thread_buffer);
+    }
+
+    const auto max_record_size = MaxRecordSize(thread_buffer);
+    return buffer.FreeBytes() > max_record_size ? buffer.FreeBytes() - max_record_size : 0;
+  }
+
+  // Inserts into the locked thread buffer. Within reserved_bytes there's no
+  // free space check, otherwise the space is reserved again.
+  template <typename T>
+  inline void InsertRecord(ThreadViewBuffer& thread_buffer, const T& view_record,
+                           std::size_t& reserved_bytes) {
+    static_assert(std::is_trivially_copyable<T>::value,
+                  "One can only insert trivially copyable types into the "
+                  "ViewBuffer (view records)");
+    auto& buffer = thread_buffer.buffer;
+    const auto record_size =
+        thread_buffer.compact ? pti::view::utilities::kMaxCompactRecordSize : sizeof(T);
+    if (reserved_bytes < record_size) {
+      reserved_bytes = ReserveRecords(thread_buffer);
+    }
+
+    const auto valid_bytes = buffer.GetValidBytes();
+    if constexpr (RecordTimestamps<T>::kFields.size() > 0) {
+      // Timestamps are converted with the model of the buffer
+      T record = view_record;
+      for (auto timestamp : RecordTimestamps<T>::kFields) {
+        record.*timestamp = thread_buffer.clock.Convert(record.*timestamp);
+      }
+      WriteRecord(thread_buffer, record);
+    } else {
+      WriteRecord(thread_buffer, view_record);
+    }
+    const auto written_bytes = buffer.GetValidBytes() - valid_bytes;
+    if (written_bytes <= reserved_bytes) {
+      reserved_bytes -= written_bytes;
+      return;
+    }
+
+    reserved_bytes = 0;
+    static_assert(SizeOfLargestViewRecord() != 0, "Largest record not avaiable on compile time");
+    if (buffer.FreeBytes() >= MaxRecordSize(thread_buffer)) {
+      // There's space to insert more records. No need for swap.
+      return;
+    }
+
+    PushBuffer(thread_buffer);
+  }
+
+  template <typename T>
+  inline void WriteRecord(ThreadViewBuffer& thread_buffer, const T& record) {
+    auto& buffer = thread_buffer.buffer;
+    if (thread_buffer.compact) {
+      buffer.Advance(thread_buffer.encoder.Encode(record, buffer.GetRecordsEnd()));
+    } else {
+      buffer.Insert(record);
+    }
+    if constexpr (RecordStartTimestamp<T>::kField != nullptr) {
+      const uint64_t timestamp = record.*RecordStartTimestamp<T>::kField;
+      if (delivery_.IsTimestampOrdered() &&
+          timestamp < thread_buffer.oldest_timestamp.load(std::memory_order_relaxed)) {
+        thread_buffer.oldest_timestamp.store(timestamp, std::memory_order_release);
+      }
+    }
+  }
+
+  // Records starting before the watermark are either queued or merged: the
+  // collector has no older commands pending, the traced threads have no
+  // older records in their buffers. 0 while that is not known.
+  inline uint64_t GetMergeWatermark() {
+    uint64_t watermark = 0;
     {
-      std::lock_guard<std::mutex> cb_lock(deliver_buffer_mtx_);
-      if (buffer_to_deliver.GetBuffer()) {
-        deliver_buffer_(buffer_to_deliver.GetBuffer(), buffer_to_deliver.GetBufferSize(),
-                        buffer_to_deliver.GetValidBytes());
+      std::lock_guard<std::mutex> completion_watermark_lock(completion_watermark_mtx_);
+      if (completion_watermark_) {
+        watermark = completion_watermark_();
+      } else if (collector_) {
+        watermark = collector_->GetCompletionWatermark();
+      } else {
+        watermark = utils::GetTime(CLOCK_MONOTONIC_RAW);
       }
     }
+    if (!watermark) {
+      return 0;
+    }
+    watermark = clock_converter_.GetModel().Convert(watermark);
+    view_buffers_.ForEach([&watermark](const auto&, auto& thread_buffer) {
+      watermark =
+          std::min(watermark, thread_buffer->oldest_timestamp.load(std::memory_order_acquire));
+    });
+    return buffers_in_transit_ ? 0 : watermark;
+  }
+
+  // Space a buffer must have left to take one more record
+  static inline std::size_t MaxRecordSize(const ThreadViewBuffer& thread_buffer) {
+    return thread_buffer.compact ? pti::view::utilities::kMaxCompactRecordSize
+                                 : SizeOfLargestViewRecord();
+  }
+
+  inline bool AllViewsDisabled() const {
+    for (const auto& view_event_callback : view_event_map_) {
+      if (view_event_callback.load(std::memory_order_acquire)) {
+        return false;
+      }
+    }
+    return true;
+  }
+
+  inline pti_result SetTracingRunning(bool running) {
+    std::lock_guard<std::mutex> tracing_window_lock(tracing_window_mtx_);
+    if (IsTracingRunning() == running) {
+      return pti_result::PTI_SUCCESS;
+    }
+    if (collector_) {
+      if (running) {
+        collector_->StartTracing();
+      } else {
+        collector_->StopTracing();
+      }
+    }
+#if defined(PTI_TRACE_SYCL)
+    if (view_event_map_[pti_view_kind::PTI_VIEW_SYCL_RUNTIME_CALLS].load(
+            std::memory_order_acquire)) {
+      if (running) {
+        SyclCollector::Instance().EnableTracing();
+      } else {
+        SyclCollector::Instance().DisableTracing();
+      }
+    }
+#endif
+    tracing_running_.store(running, std::memory_order_release);
+    return pti_result::PTI_SUCCESS;
   }
 
   inline void DisableTracing() {
@@ -405,18 +915,27 @@ struct PtiViewRecordHandler {
   }
   ZeCollector* collector_ = nullptr;
   std::atomic<bool> flush_operation_ = false;
-  std::atomic<bool> stop_consumer_thread_ = false;
   std::atomic<bool> collection_enabled_ = false;
-  std::atomic<bool> callbacks_set_ = false;
-  ViewBufferQueue buffer_queue_ = ViewBufferQueue{kDefaultBufferQueueDepth};
-  AskForBufferEvent get_new_buffer_;
-  ReturnBufferEvent deliver_buffer_;
-  mutable std::mutex get_new_buffer_mtx_;
-  mutable std::mutex deliver_buffer_mtx_;
-  ViewEventTable view_event_map_;
-  KernelNameStorageQueue kernel_name_storage_;
+  std::atomic<bool> tracing_running_ = true;
+  std::mutex tracing_window_mtx_;
+  std::atomic<bool> clock_conversion_enabled_ = false;
+  std::atomic<pti_view_record_encoding> record_encoding_ =
+      pti_view_record_encoding::PTI_VIEW_RECORD_ENCODING_FIXED;
+  ViewEventTable view_event_map_ = {};
+  NameTable name_table_;
+  ClockConverter clock_converter_;
   ViewBufferTable view_buffers_;
-  std::thread buffer_consumer_;
+  // Threads' records neither in their buffers nor queued
+  std::atomic<std::size_t> buffers_in_transit_ = 0;
+  std::mutex completion_watermark_mtx_;
+  CompletionWatermark completion_watermark_;
+  std::atomic<RecordFilter*> record_filter_ = nullptr;
+  std::mutex record_filters_mtx_;
+  std::vector<std::unique_ptr<RecordFilter>> record_filters_;
+  // Kernel statistics of exited threads, reported with the next flush
+  std::mutex kernel_stats_mtx_;
+  KernelStatsTable retired_kernel_stats_;
+  ViewBufferDelivery delivery_;
 };
 
 // Required to access buffer from ze_collector callbacks
@@ -431,6 +950,11 @@ inline pti_result GetNextRecord(uint8_t* buffer, size_t valid_bytes,
     return pti_result::PTI_ERROR_BAD_ARGUMENT;
   }
 
+  if (pti::view::utilities::IsCompactBuffer(buffer, valid_bytes)) {
+    thread_local pti::view::utilities::CompactDecoder decoder;
+    return decoder.GetNextRecord(buffer, valid_bytes, record);
+  }
+
   pti::view::utilities::ViewBuffer view_buffer(buffer, valid_bytes, valid_bytes);
 
   if (view_buffer.IsNull() || !view_buffer.GetValidBytes()) {
@@ -463,136 +987,29 @@ inline pti_result GetNextRecord(uint8_t* buffer, size_t valid_bytes,
   return pti_result::PTI_SUCCESS;
 }
 
-//
-// TODO -- can we save on the string compare cost by optimizing at the source in
-// L0 collector?
-//
+static_assert(static_cast<uint32_t>(ZeMemoryType::kShared) + 1 == kZeMemoryTypeCount);
+static_assert(static_cast<pti_view_memory_type>(ZeMemoryType::kHost) ==
+              pti_view_memory_type::PTI_VIEW_MEMORY_TYPE_HOST);
+static_assert(static_cast<pti_view_memory_type>(ZeMemoryType::kShared) ==
+              pti_view_memory_type::PTI_VIEW_MEMORY_TYPE_SHARED);
+static_assert(pti_view_memcpy_type::PTI_VIEW_MEMCPY_TYPE_D2H ==
+              static_cast<uint32_t>(ZeMemoryType::kDevice) * kZeMemoryTypeCount +
+                  static_cast<uint32_t>(ZeMemoryType::kHost));
+static_assert(pti_view_memcpy_type::PTI_VIEW_MEMCPY_TYPE_S2S ==
+              kZeMemoryTypeCount * kZeMemoryTypeCount - 1);
+
 inline void SetMemFillType(pti_view_record_memory_fill& mem_record,
                            const ZeKernelCommandExecutionRecord& rec) {
-  std::size_t found_pos = rec.name_.find_last_of("(");
-  std::string tmp_str = rec.name_.substr(found_pos);
-  if (tmp_str == "(M)") {
-    mem_record._mem_type = pti_view_memory_type::PTI_VIEW_MEMORY_TYPE_MEMORY;
-    return;
-  }
-  if (tmp_str == "(H)") {
-    mem_record._mem_type = pti_view_memory_type::PTI_VIEW_MEMORY_TYPE_HOST;
-    return;
-  }
-  if (tmp_str == "(D)") {
-    mem_record._mem_type = pti_view_memory_type::PTI_VIEW_MEMORY_TYPE_DEVICE;
-    return;
-  }
-  if (tmp_str == "(S)") {
-    mem_record._mem_type = pti_view_memory_type::PTI_VIEW_MEMORY_TYPE_SHARED;
-    return;
-  }
+  mem_record._mem_type = static_cast<pti_view_memory_type>(rec.src_mem_type_);
 }
 
-//
-// TODO -- can we save on the string compare cost by optimizing at the source in
-// L0 collector?
-//
 inline void SetMemCopyType(pti_view_record_memory_copy& mem_record,
                            const ZeKernelCommandExecutionRecord& rec) {
-  std::size_t found_pos = rec.name_.find_last_of("(");
-  std::string tmp_str = rec.name_.substr(found_pos);
-  if (tmp_str == "(M2M)") {
-    mem_record._memcpy_type = pti_view_memcpy_type::PTI_VIEW_MEMCPY_TYPE_M2M;
-    mem_record._mem_src = pti_view_memory_type::PTI_VIEW_MEMORY_TYPE_MEMORY;
-    mem_record._mem_dst = pti_view_memory_type::PTI_VIEW_MEMORY_TYPE_MEMORY;
-    return;
-  }
-  if (tmp_str == "(M2H)") {
-    mem_record._memcpy_type = pti_view_memcpy_type::PTI_VIEW_MEMCPY_TYPE_M2H;
-    mem_record._mem_src = pti_view_memory_type::PTI_VIEW_MEMORY_TYPE_MEMORY;
-    mem_record._mem_dst = pti_view_memory_type::PTI_VIEW_MEMORY_TYPE_HOST;
-    return;
-  }
-  if (tmp_str == "(M2D)") {
-    mem_record._memcpy_type = pti_view_memcpy_type::PTI_VIEW_MEMCPY_TYPE_M2D;
-    mem_record._mem_src = pti_view_memory_type::PTI_VIEW_MEMORY_TYPE_MEMORY;
-    mem_record._mem_dst = pti_view_memory_type::PTI_VIEW_MEMORY_TYPE_DEVICE;
-    return;
-  }
-  if (tmp_str == "(M2S)") {
-    mem_record._memcpy_type = pti_view_memcpy_type::PTI_VIEW_MEMCPY_TYPE_M2S;
-    mem_record._mem_src = pti_view_memory_type::PTI_VIEW_MEMORY_TYPE_MEMORY;
-    mem_record._mem_dst = pti_view_memory_type::PTI_VIEW_MEMORY_TYPE_SHARED;
-    return;
-  }
-  if (tmp_str == "(H2M)") {
-    mem_record._memcpy_type = pti_view_memcpy_type::PTI_VIEW_MEMCPY_TYPE_H2M;
-    mem_record._mem_src = pti_view_memory_type::PTI_VIEW_MEMORY_TYPE_HOST;
-    mem_record._mem_dst = pti_view_memory_type::PTI_VIEW_MEMORY_TYPE_MEMORY;
-    return;
-  }
-  if (tmp_str == "(H2H)") {
-    mem_record._memcpy_type = pti_view_memcpy_type::PTI_VIEW_MEMCPY_TYPE_H2H;
-    mem_record._mem_src = pti_view_memory_type::PTI_VIEW_MEMORY_TYPE_HOST;
-    mem_record._mem_dst = pti_view_memory_type::PTI_VIEW_MEMORY_TYPE_HOST;
-    return;
-  }
-  if (tmp_str == "(H2D)") {
-    mem_record._memcpy_type = pti_view_memcpy_type::PTI_VIEW_MEMCPY_TYPE_H2D;
-    mem_record._mem_src = pti_view_memory_type::PTI_VIEW_MEMORY_TYPE_HOST;
-    mem_record._mem_dst = pti_view_memory_type::PTI_VIEW_MEMORY_TYPE_DEVICE;
-    return;
-  }
-  if (tmp_str == "(H2S)") {
-    mem_record._memcpy_type = pti_view_memcpy_type::PTI_VIEW_MEMCPY_TYPE_H2S;
-    mem_record._mem_src = pti_view_memory_type::PTI_VIEW_MEMORY_TYPE_HOST;
-    mem_record._mem_dst = pti_view_memory_type::PTI_VIEW_MEMORY_TYPE_SHARED;
-    return;
-  }
-  if (tmp_str == "(D2M)") {
-    mem_record._memcpy_type = pti_view_memcpy_type::PTI_VIEW_MEMCPY_TYPE_D2M;
-    mem_record._mem_src = pti_view_memory_type::PTI_VIEW_MEMORY_TYPE_DEVICE;
-    mem_record._mem_dst = pti_view_memory_type::PTI_VIEW_MEMORY_TYPE_MEMORY;
-    return;
-  }
-  if (tmp_str == "(D2H)") {
-    mem_record._memcpy_type = pti_view_memcpy_type::PTI_VIEW_MEMCPY_TYPE_D2H;
-    mem_record._mem_src = pti_view_memory_type::PTI_VIEW_MEMORY_TYPE_DEVICE;
-    mem_record._mem_dst = pti_view_memory_type::PTI_VIEW_MEMORY_TYPE_HOST;
-    return;
-  }
-  if (tmp_str == "(D2D)") {
-    mem_record._memcpy_type = pti_view_memcpy_type::PTI_VIEW_MEMCPY_TYPE_D2D;
-    mem_record._mem_src = pti_view_memory_type::PTI_VIEW_MEMORY_TYPE_DEVICE;
-    mem_record._mem_dst = pti_view_memory_type::PTI_VIEW_MEMORY_TYPE_DEVICE;
-    return;
-  }
-  if (tmp_str == "(D2S)") {
-    mem_record._memcpy_type = pti_view_memcpy_type::PTI_VIEW_MEMCPY_TYPE_D2S;
-    mem_record._mem_src = pti_view_memory_type::PTI_VIEW_MEMORY_TYPE_DEVICE;
-    mem_record._mem_dst = pti_view_memory_type::PTI_VIEW_MEMORY_TYPE_SHARED;
-    return;
-  }
-  if (tmp_str == "(S2M)") {
-    mem_record._memcpy_type = pti_view_memcpy_type::PTI_VIEW_MEMCPY_TYPE_S2M;
-    mem_record._mem_src = pti_view_memory_type::PTI_VIEW_MEMORY_TYPE_SHARED;
-    mem_record._mem_dst = pti_view_memory_type::PTI_VIEW_MEMORY_TYPE_MEMORY;
-    return;
-  }
-  if (tmp_str == "(S2H)") {
-    mem_record._memcpy_type = pti_view_memcpy_type::PTI_VIEW_MEMCPY_TYPE_S2H;
-    mem_record._mem_src = pti_view_memory_type::PTI_VIEW_MEMORY_TYPE_SHARED;
-    mem_record._mem_dst = pti_view_memory_type::PTI_VIEW_MEMORY_TYPE_HOST;
-    return;
-  }
-  if (tmp_str == "(S2D)") {
-    mem_record._memcpy_type = pti_view_memcpy_type::PTI_VIEW_MEMCPY_TYPE_S2D;
-    mem_record._mem_src = pti_view_memory_type::PTI_VIEW_MEMORY_TYPE_SHARED;
-    mem_record._mem_dst = pti_view_memory_type::PTI_VIEW_MEMORY_TYPE_DEVICE;
-    return;
-  }
-  if (tmp_str == "(S2S)") {
-    mem_record._memcpy_type = pti_view_memcpy_type::PTI_VIEW_MEMCPY_TYPE_S2S;
-    mem_record._mem_src = pti_view_memory_type::PTI_VIEW_MEMORY_TYPE_SHARED;
-    mem_record._mem_dst = pti_view_memory_type::PTI_VIEW_MEMORY_TYPE_SHARED;
-    return;
-  }
+  const auto src = static_cast<uint32_t>(rec.src_mem_type_);
+  const auto dst = static_cast<uint32_t>(rec.dst_mem_type_);
+  mem_record._memcpy_type = static_cast<pti_view_memcpy_type>(src * kZeMemoryTypeCount + dst);
+  mem_record._mem_src = static_cast<pti_view_memory_type>(src);
+  mem_record._mem_dst = static_cast<pti_view_memory_type>(dst);
 }
 
 inline void GetDeviceId(char* buf, const ZeKernelCommandExecutionRecord& rec) {
@@ -604,14 +1021,8 @@ inline void GetDeviceId(char* buf, const ZeKernelCommandExecutionRecord& rec) {
 }
 
 inline void GenerateExternalCorrelationRecords(const ZeKernelCommandExecutionRecord& rec) {
-  for (auto it = map_ext_corrid_vectors.cbegin(); it != map_ext_corrid_vectors.cend(); it++) {
-    // for ( pti_view_record_external_correlation ext_record : it->second ) {
-    pti_view_record_external_correlation ext_record = it->second.top();
-    ext_record._correlation_id = rec.cid_;
-    ext_record._view_kind._view_kind = pti_view_kind::PTI_VIEW_EXTERNAL_CORRELATION;
-    Instance().InsertRecord(ext_record);
-    //}
-  }
+  external_correlation_stacks.ForEach(
+      rec.cid_, [](const auto& ext_record) { Instance().InsertRecord(ext_record); });
 }
 
 inline uint64_t ApplyTimeShift(uint64_t timestamp, int64_t time_shift) {
@@ -626,16 +1037,15 @@ inline uint64_t ApplyTimeShift(uint64_t timestamp, int64_t time_shift) {
   return out_ts;
 }
 
-inline void MemCopyEvent(void* /*data*/, const ZeKernelCommandExecutionRecord& rec) {
-  pti_view_record_memory_copy record;
+inline void FillMemCopyRecord(pti_view_record_memory_copy& record,
+                              const ZeKernelCommandExecutionRecord& rec) {
   record._view_kind._view_kind = pti_view_kind::PTI_VIEW_DEVICE_GPU_MEM_COPY;
 
-  int64_t ts_shift = utils::ConvertionFactorMonotonicRawToReal();
 
-  record._append_timestamp = ApplyTimeShift(rec.append_time_, ts_shift);
-  record._start_timestamp = ApplyTimeShift(rec.start_time_, ts_shift);
-  record._end_timestamp = ApplyTimeShift(rec.end_time_, ts_shift);
-  record._submit_timestamp = ApplyTimeShift(rec.submit_time_, ts_shift);
+  record._append_timestamp = rec.append_time_;
+  record._start_timestamp = rec.start_time_;
+  record._end_timestamp = rec.end_time_;
+  record._submit_timestamp = rec.submit_time_;
   record._queue_handle = rec.queue_;
   record._device_handle = rec.device_;
   record._context_handle = rec.context_;
@@ -643,24 +1053,26 @@ inline void MemCopyEvent(void* /*data*/, const ZeKernelCommandExecutionRecord& r
   GetDeviceId(record._pci_address, rec);
   SetMemCopyType(record, rec);
 
-  // We're storing it in a kernel map so this shouldn't go out of scope
-  record._name = Instance().InsertKernel(rec.name_);
+  // Names are interned, so they don't go out of scope
+  record._name = Instance().InternName(rec.name_);
   record._thread_id = rec.tid_;
   record._mem_op_id = rec.cid_;
   record._correlation_id = rec.cid_;
-  Instance().InsertRecord(record);
 }
 
-inline void MemFillEvent(void* /*data*/, const ZeKernelCommandExecutionRecord& rec) {
-  pti_view_record_memory_fill record;
+inline void MemCopyEvent(void* /*data*/, const ZeKernelCommandExecutionRecord& rec) {
+  Instance().InsertCommandRecord(PTI_VIEW_DEVICE_GPU_MEM_COPY, rec);
+}
+
+inline void FillMemFillRecord(pti_view_record_memory_fill& record,
+                              const ZeKernelCommandExecutionRecord& rec) {
   record._view_kind._view_kind = pti_view_kind::PTI_VIEW_DEVICE_GPU_MEM_FILL;
 
-  int64_t ts_shift = utils::ConvertionFactorMonotonicRawToReal();
 
-  record._append_timestamp = ApplyTimeShift(rec.append_time_, ts_shift);
-  record._start_timestamp = ApplyTimeShift(rec.start_time_, ts_shift);
-  record._end_timestamp = ApplyTimeShift(rec.end_time_, ts_shift);
-  record._submit_timestamp = ApplyTimeShift(rec.submit_time_, ts_shift);
+  record._append_timestamp = rec.append_time_;
+  record._start_timestamp = rec.start_time_;
+  record._end_timestamp = rec.end_time_;
+  record._submit_timestamp = rec.submit_time_;
   record._queue_handle = rec.queue_;
   record._device_handle = rec.device_;
   record._context_handle = rec.context_;
@@ -670,22 +1082,21 @@ inline void MemFillEvent(void* /*data*/, const ZeKernelCommandExecutionRecord& r
   GetDeviceId(record._pci_address, rec);
   SetMemFillType(record, rec);
 
-  // We're storing it in a kernel map so this shouldn't go out of scope
-  record._name = Instance().InsertKernel(rec.name_);
+  // Names are interned, so they don't go out of scope
+  record._name = Instance().InternName(rec.name_);
   record._thread_id = rec.tid_;
   record._mem_op_id = rec.cid_;
   record._correlation_id = rec.cid_;
-  Instance().InsertRecord(record);
+}
+
+inline void MemFillEvent(void* /*data*/, const ZeKernelCommandExecutionRecord& rec) {
+  Instance().InsertCommandRecord(PTI_VIEW_DEVICE_GPU_MEM_FILL, rec);
 }
 
 inline void OverheadCollectionEvent(void* data, const ZeKernelCommandExecutionRecord& /*rec*/) {
-  int64_t ts_shift = utils::ConvertionFactorMonotonicRawToReal();
   pti_view_record_overhead* ohRec = reinterpret_cast<pti_view_record_overhead*>(data);
-  ohRec->_overhead_start_timestamp_ns =
-      ApplyTimeShift(ohRec->_overhead_start_timestamp_ns, ts_shift);
-  ohRec->_overhead_end_timestamp_ns = ApplyTimeShift(ohRec->_overhead_end_timestamp_ns, ts_shift);
   // ohRec->_overhead_api_name =
-  // Instance().InsertKernel(ohRec->_overhead_api_name);
+  // Instance().InternName(ohRec->_overhead_api_name);
   Instance().InsertRecord(*ohRec);
 }
 
@@ -693,14 +1104,13 @@ inline void SyclRuntimeEvent(void* /*data*/, const ZeKernelCommandExecutionRecor
   pti_view_record_sycl_runtime record;
   record._view_kind._view_kind = pti_view_kind::PTI_VIEW_SYCL_RUNTIME_CALLS;
 
-  int64_t ts_shift = utils::ConvertionFactorMonotonicRawToReal();
 
   if (external_collection_enabled) {
     GenerateExternalCorrelationRecords(rec);
   }
 
-  record._start_timestamp = ApplyTimeShift(rec.start_time_, ts_shift);
-  record._end_timestamp = ApplyTimeShift(rec.end_time_, ts_shift);
+  record._start_timestamp = rec.start_time_;
+  record._end_timestamp = rec.end_time_;
   record._thread_id = rec.tid_;
   record._process_id = rec.pid_;
   record._correlation_id = rec.cid_;
@@ -708,63 +1118,53 @@ inline void SyclRuntimeEvent(void* /*data*/, const ZeKernelCommandExecutionRecor
   Instance().InsertRecord(record);
 }
 
-inline void KernelEvent(void* /*data*/, const ZeKernelCommandExecutionRecord& rec) {
-  pti_view_record_kernel record;
+inline void FillKernelRecord(pti_view_record_kernel& record,
+                             const ZeKernelCommandExecutionRecord& rec) {
   record._view_kind._view_kind = pti_view_kind::PTI_VIEW_DEVICE_GPU_KERNEL;
 
-  int64_t ts_shift = utils::ConvertionFactorMonotonicRawToReal();
-
-  if (external_collection_enabled) {
-    GenerateExternalCorrelationRecords(rec);
-  }
-
-  record._append_timestamp = ApplyTimeShift(rec.append_time_, ts_shift);
-  record._start_timestamp = ApplyTimeShift(rec.start_time_, ts_shift);
-  record._end_timestamp = ApplyTimeShift(rec.end_time_, ts_shift);
-  record._submit_timestamp = ApplyTimeShift(rec.submit_time_, ts_shift);
+  record._append_timestamp = rec.append_time_;
+  record._start_timestamp = rec.start_time_;
+  record._end_timestamp = rec.end_time_;
+  record._submit_timestamp = rec.submit_time_;
   record._queue_handle = rec.queue_;
   record._device_handle = rec.device_;
   record._context_handle = rec.context_;
 
   GetDeviceId(record._pci_address, rec);
 
-  // We're storing it in a kernel map so this shouldn't go out of scope
-  record._name = Instance().InsertKernel(rec.name_);
+  // Names are interned, so they don't go out of scope
+  record._name = Instance().InternName(rec.name_);
   record._thread_id = rec.tid_;
   record._kernel_id = rec.kid_;
   record._correlation_id = rec.cid_;
-  record._source_file_name = Instance().InsertKernel(rec.source_file_name_);
+  record._source_file_name = Instance().InternName(rec.source_file_name_);
   record._source_line_number =
       rec.source_line_number_ != UINT32_MAX ? rec.source_line_number_ : 0ULL;
   record._sycl_node_id = rec.sycl_node_id_;
   record._sycl_invocation_id = rec.sycl_invocation_id_;
-  record._sycl_enqk_begin_timestamp = ApplyTimeShift(rec.sycl_enqk_begin_time_, ts_shift);
-  record._sycl_task_begin_timestamp = ApplyTimeShift(rec.sycl_task_begin_time_, ts_shift);
+  record._sycl_enqk_begin_timestamp = rec.sycl_enqk_begin_time_;
+  record._sycl_task_begin_timestamp = rec.sycl_task_begin_time_;
+}
 
-  Instance().InsertRecord(record);
+inline void KernelEvent(void* /*data*/, const ZeKernelCommandExecutionRecord& rec) {
+  Instance().InsertCommandRecord(PTI_VIEW_DEVICE_GPU_KERNEL, rec);
+}
+
+inline void KernelStatsEvent(void* /*data*/, const ZeKernelCommandExecutionRecord& rec) {
+  Instance().AddKernelStats(rec);
 }
 
 inline void SyclRuntimeViewCallback(void* data, ZeKernelCommandExecutionRecord& rec) {
-  Instance()("SyclRuntimeEvent", data, rec);
+  Instance()(PTI_VIEW_SYCL_RUNTIME_CALLS, data, rec);
 }
 
 inline void OverheadCollectionCallback(void* data, ZeKernelCommandExecutionRecord& rec) {
-  Instance()("OverheadCollectionEvent", data, rec);
+  Instance()(PTI_VIEW_COLLECTION_OVERHEAD, data, rec);
 }
 
-inline void ZeChromeKernelStagesCallback(void* data,
+inline void ZeChromeKernelStagesCallback(void* /*data*/,
                                          std::vector<ZeKernelCommandExecutionRecord>& kcexecrec) {
-  for (const auto& rec : kcexecrec) {
-    if (rec.name_.find("zeCommandListAppendMemoryCopy") != std::string::npos) {
-      Instance()("zeCommandListAppendMemoryCopy", data, rec);
-    } else if (rec.name_.find("zeCommandListAppendMemoryFill") != std::string::npos) {
-      Instance()("zeCommandListAppendMemoryFill", data, rec);
-    } else if (rec.name_.find("zeCommandListAppendBarrier") != std::string::npos) {
-      // no-op for now
-    } else {
-      Instance()("KernelEvent", data, rec);
-    }
-  }
+  Instance().InsertRecords(kcexecrec, Instance().GetCommandViews());
 }
 
 #endif  // SRC_API_VIEW_HANDLER_H_
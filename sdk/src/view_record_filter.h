@@ -0,0 +1,218 @@
+//==============================================================
+// Copyright (C) Intel Corporation
+//
+// SPDX-License-Identifier: MIT
+// =============================================================
+
+#ifndef SRC_VIEW_RECORD_FILTER_H_
+#define SRC_VIEW_RECORD_FILTER_H_
+
+#include <algorithm>
+#include <array>
+#include <cstddef>
+#include <cstdint>
+#include <mutex>
+#include <stdexcept>
+#include <string>
+#include <string_view>
+#include <unordered_map>
+#include <vector>
+
+#include "pti_view.h"
+
+namespace pti {
+namespace view {
+namespace utilities {
+
+// Rate limit period if none is given
+inline constexpr uint64_t kDefaultRateLimitPeriodNs = 1000000000ULL;
+
+// Kernel name pattern: '*' matches any sequence of characters, '?' any one
+// character. Split at '*' once, so a match is a scan for each segment.
+class NamePattern {
+ public:
+  explicit NamePattern(std::string_view pattern) {
+    std::size_t begin = 0;
+    while (true) {
+      const auto end = pattern.find('*', begin);
+      segments_.emplace_back(pattern.substr(begin, end - begin));
+      if (end == std::string_view::npos) {
+        break;
+      }
+      begin = end + 1;
+    }
+  }
+
+  inline bool Matches(std::string_view name) const {
+    const auto& first = segments_.front();
+    if (segments_.size() == 1) {
+      return name.size() == first.size() && SegmentAt(name, 0, first);
+    }
+    const auto& last = segments_.back();
+    if (name.size() < first.size() + last.size() || !SegmentAt(name, 0, first) ||
+        !SegmentAt(name, name.size() - last.size(), last)) {
+      return false;
+    }
+    // Leftmost match of every segment in between leaves the most room for the rest
+    std::size_t position = first.size();
+    const auto end = name.size() - last.size();
+    for (std::size_t i = 1; i + 1 < segments_.size(); ++i) {
+      const auto& segment = segments_[i];
+      while (position + segment.size() <= end && !SegmentAt(name, position, segment)) {
+        ++position;
+      }
+      if (position + segment.size() > end) {
+        return false;
+      }
+      position += segment.size();
+    }
+    return true;
+  }
+
+ private:
+  static inline bool SegmentAt(std::string_view name, std::size_t position,
+                               const std::string& segment) {
+    for (std::size_t i = 0; i < segment.size(); ++i) {
+      if (segment[i] != '?' && segment[i] != name[position + i]) {
+        return false;
+      }
+    }
+    return true;
+  }
+
+  std::vector<std::string> segments_;
+};
+
+// Why records were filtered out, indexes of RecordFilterCounts::reasons
+enum class FilterReason : std::size_t {
+  kPassed = 0,
+  kName,
+  kDuration,
+  kDevice,
+  kRateLimit,
+};
+
+// Records filtered out since the last records filtered record
+struct RecordFilterCounts {
+  std::array<uint64_t, PTI_VIEW_RECORDS_LOST_KINDS> kinds = {};
+  std::array<uint64_t, static_cast<std::size_t>(FilterReason::kRateLimit) + 1> reasons = {};
+  uint64_t total = 0;
+
+  inline void Count(pti_view_kind kind, FilterReason reason) {
+    ++kinds[kind];
+    ++reasons[static_cast<std::size_t>(reason)];
+    ++total;
+  }
+};
+
+/**
+ * @brief Selects records of device commands before they are built.
+ *
+ * Checks go from the cheapest to the most expensive: device and queue,
+ * duration, name patterns and the rate limit, which is shared by all the
+ * threads. Patterns are compiled once, when the filter is set.
+ */
+class RecordFilter {
+ public:
+  explicit RecordFilter(const pti_view_record_filter& filter) {
+    if ((filter._include_name_count && !filter._include_names) ||
+        (filter._exclude_name_count && !filter._exclude_names) ||
+        (filter._device_handle_count && !filter._device_handles) ||
+        (filter._queue_handle_count && !filter._queue_handles)) {
+      throw std::invalid_argument("Filter list without elements");
+    }
+    include_names_ = CompilePatterns(filter._include_names, filter._include_name_count);
+    exclude_names_ = CompilePatterns(filter._exclude_names, filter._exclude_name_count);
+    devices_.assign(filter._device_handles, filter._device_handles + filter._device_handle_count);
+    queues_.assign(filter._queue_handles, filter._queue_handles + filter._queue_handle_count);
+    min_duration_ = filter._min_duration_ns;
+    max_records_per_name_ = filter._max_records_per_name;
+    rate_limit_period_ =
+        filter._rate_limit_period_ns ? filter._rate_limit_period_ns : kDefaultRateLimitPeriodNs;
+  }
+
+  RecordFilter(const RecordFilter&) = delete;
+  RecordFilter& operator=(const RecordFilter&) = delete;
+  RecordFilter(RecordFilter&&) = delete;
+  RecordFilter& operator=(RecordFilter&&) = delete;
+
+  virtual ~RecordFilter() = default;
+
+  // Rate limit periods are counted in the record (end) timestamps
+  inline FilterReason Check(const std::string& name, uint64_t start_time, uint64_t end_time,
+                            ze_device_handle_t device, ze_command_queue_handle_t queue) {
+    if (!Selected(devices_, device) || !Selected(queues_, queue)) {
+      return FilterReason::kDevice;
+    }
+    if (min_duration_ && (end_time < start_time || end_time - start_time < min_duration_)) {
+      return FilterReason::kDuration;
+    }
+    if (!MatchesName(name)) {
+      return FilterReason::kName;
+    }
+    if (max_records_per_name_ && !WithinRateLimit(name, end_time)) {
+      return FilterReason::kRateLimit;
+    }
+    return FilterReason::kPassed;
+  }
+
+ private:
+  struct RateLimitWindow {
+    uint64_t period = 0;
+    uint64_t records = 0;
+  };
+
+  static inline std::vector<NamePattern> CompilePatterns(const char* const* patterns,
+                                                         uint32_t count) {
+    std::vector<NamePattern> compiled;
+    for (uint32_t i = 0; i < count; ++i) {
+      if (!patterns[i]) {
+        throw std::invalid_argument("Null name pattern");
+      }
+      compiled.emplace_back(patterns[i]);
+    }
+    return compiled;
+  }
+
+  template <typename T>
+  static inline bool Selected(const std::vector<T>& selection, T handle) {
+    return selection.empty() || std::find(selection.begin(), selection.end(), handle) !=
+                                    selection.end();
+  }
+
+  inline bool MatchesName(std::string_view name) const {
+    const auto matches = [name](const NamePattern& pattern) { return pattern.Matches(name); };
+    if (!include_names_.empty() &&
+        std::none_of(include_names_.begin(), include_names_.end(), matches)) {
+      return false;
+    }
+    return std::none_of(exclude_names_.begin(), exclude_names_.end(), matches);
+  }
+
+  inline bool WithinRateLimit(const std::string& name, uint64_t timestamp) {
+    const auto period = timestamp / rate_limit_period_;
+    std::lock_guard<std::mutex> rate_limit_lock(rate_limit_mtx_);
+    auto& window = rate_limit_windows_[name];
+    if (window.period != period) {
+      window.period = period;
+      window.records = 0;
+    }
+    return window.records++ < max_records_per_name_;
+  }
+
+  std::vector<NamePattern> include_names_;
+  std::vector<NamePattern> exclude_names_;
+  std::vector<ze_device_handle_t> devices_;
+  std::vector<ze_command_queue_handle_t> queues_;
+  uint64_t min_duration_ = 0;
+  uint64_t max_records_per_name_ = 0;
+  uint64_t rate_limit_period_ = kDefaultRateLimitPeriodNs;
+  std::mutex rate_limit_mtx_;
+  std::unordered_map<std::string, RateLimitWindow> rate_limit_windows_;
+};
+
+}  // namespace utilities
+}  // namespace view
+}  // namespace pti
+
+#endif  // SRC_VIEW_RECORD_FILTER_H_
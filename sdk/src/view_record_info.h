@@ -8,12 +8,15 @@
 
 #include <array>
 #include <cstddef>
+#include <cstdint>
 
 #include "pti_view.h"
 
 inline constexpr auto kReserved = 0;
-inline constexpr auto kLastViewRecordEnumValue = PTI_VIEW_DEVICE_GPU_MEM_FILL;
+inline constexpr auto kLastViewRecordEnumValue = PTI_VIEW_DEVICE_GPU_KERNEL_STATS;
 inline constexpr auto kSizeOfViewRecordTable = kLastViewRecordEnumValue + 1;
+static_assert(kSizeOfViewRecordTable <= PTI_VIEW_RECORDS_LOST_KINDS,
+              "Records lost record can't count records of all view kinds");
 
 // kViewSizeLookUpTable
 //
@@ -33,9 +36,125 @@ inline constexpr std::array<std::size_t, kSizeOfViewRecordTable> kViewSizeLookup
     sizeof(pti_view_record_external_correlation), // PTI_VIEW_EXTERNAL_CORRELATION
     sizeof(pti_view_record_memory_copy),                // PTI_VIEW_DEVICE_GPU_MEM_COPY
     sizeof(pti_view_record_memory_fill),                // PTI_VIEW_DEVICE_GPU_MEM_FILL
+    sizeof(pti_view_record_clock_conversion),           // PTI_VIEW_CLOCK_CONVERSION
+    sizeof(pti_view_record_records_lost),               // PTI_VIEW_RECORDS_LOST
+    sizeof(pti_view_record_records_filtered),           // PTI_VIEW_RECORDS_FILTERED
+    sizeof(pti_view_record_kernel_stats),               // PTI_VIEW_DEVICE_GPU_KERNEL_STATS
 };
 // clang-format on
 
+// RecordTimestamps<T>::kFields
+//
+// Members of view record type T holding CLOCK_MONOTONIC_RAW timestamps,
+// converted to CLOCK_REALTIME on insertion into a buffer.
+//
+template <typename T>
+struct RecordTimestamps {
+  static constexpr std::array<uint64_t T::*, 0> kFields = {};
+};
+
+template <>
+struct RecordTimestamps<pti_view_record_kernel> {
+  static constexpr std::array<uint64_t pti_view_record_kernel::*, 6> kFields = {
+      &pti_view_record_kernel::_append_timestamp,
+      &pti_view_record_kernel::_start_timestamp,
+      &pti_view_record_kernel::_end_timestamp,
+      &pti_view_record_kernel::_submit_timestamp,
+      &pti_view_record_kernel::_sycl_task_begin_timestamp,
+      &pti_view_record_kernel::_sycl_enqk_begin_timestamp};
+};
+
+template <>
+struct RecordTimestamps<pti_view_record_memory_copy> {
+  static constexpr std::array<uint64_t pti_view_record_memory_copy::*, 4> kFields = {
+      &pti_view_record_memory_copy::_append_timestamp,
+      &pti_view_record_memory_copy::_start_timestamp,
+      &pti_view_record_memory_copy::_end_timestamp,
+      &pti_view_record_memory_copy::_submit_timestamp};
+};
+
+template <>
+struct RecordTimestamps<pti_view_record_memory_fill> {
+  static constexpr std::array<uint64_t pti_view_record_memory_fill::*, 4> kFields = {
+      &pti_view_record_memory_fill::_append_timestamp,
+      &pti_view_record_memory_fill::_start_timestamp,
+      &pti_view_record_memory_fill::_end_timestamp,
+      &pti_view_record_memory_fill::_submit_timestamp};
+};
+
+template <>
+struct RecordTimestamps<pti_view_record_sycl_runtime> {
+  static constexpr std::array<uint64_t pti_view_record_sycl_runtime::*, 2> kFields = {
+      &pti_view_record_sycl_runtime::_start_timestamp,
+      &pti_view_record_sycl_runtime::_end_timestamp};
+};
+
+template <>
+struct RecordTimestamps<pti_view_record_records_lost> {
+  static constexpr std::array<uint64_t pti_view_record_records_lost::*, 1> kFields = {
+      &pti_view_record_records_lost::_timestamp};
+};
+
+template <>
+struct RecordTimestamps<pti_view_record_records_filtered> {
+  static constexpr std::array<uint64_t pti_view_record_records_filtered::*, 1> kFields = {
+      &pti_view_record_records_filtered::_timestamp};
+};
+
+template <>
+struct RecordTimestamps<pti_view_record_kernel_stats> {
+  static constexpr std::array<uint64_t pti_view_record_kernel_stats::*, 2> kFields = {
+      &pti_view_record_kernel_stats::_start_timestamp,
+      &pti_view_record_kernel_stats::_end_timestamp};
+};
+
+template <>
+struct RecordTimestamps<pti_view_record_overhead> {
+  static constexpr std::array<uint64_t pti_view_record_overhead::*, 2> kFields = {
+      &pti_view_record_overhead::_overhead_start_timestamp_ns,
+      &pti_view_record_overhead::_overhead_end_timestamp_ns};
+};
+
+// RecordStartTimestamp<T>::kField
+//
+// Member of view record type T holding the start of the operation the record
+// is about, nullptr for records of events, counters and summaries.
+//
+template <typename T>
+struct RecordStartTimestamp {
+  static constexpr uint64_t T::*kField = nullptr;
+};
+
+template <>
+struct RecordStartTimestamp<pti_view_record_kernel> {
+  static constexpr uint64_t pti_view_record_kernel::*kField =
+      &pti_view_record_kernel::_start_timestamp;
+};
+
+template <>
+struct RecordStartTimestamp<pti_view_record_memory_copy> {
+  static constexpr uint64_t pti_view_record_memory_copy::*kField =
+      &pti_view_record_memory_copy::_start_timestamp;
+};
+
+template <>
+struct RecordStartTimestamp<pti_view_record_memory_fill> {
+  static constexpr uint64_t pti_view_record_memory_fill::*kField =
+      &pti_view_record_memory_fill::_start_timestamp;
+};
+
+template <>
+struct RecordStartTimestamp<pti_view_record_sycl_runtime> {
+  static constexpr uint64_t pti_view_record_sycl_runtime::*kField =
+      &pti_view_record_sycl_runtime::_start_timestamp;
+};
+
+template <>
+struct RecordStartTimestamp<pti_view_record_overhead> {
+  static constexpr uint64_t pti_view_record_overhead::*kField =
+      &pti_view_record_overhead::_overhead_start_timestamp_ns;
+};
+
 // SizeOfLargestViewRecord()
 //
 // Calculated at compile time (since we know all the records and their sizes)
@@ -71,4 +190,34 @@ inline auto GetViewSize(pti_view_kind view_type) {
   return view_size;
 }
 
+// GetRecordStartTimestamp()
+//
+// Start of the operation the record is about, see RecordStartTimestamp.
+//
+// @param record view record
+// @param timestamp start timestamp, if the record has one
+// @return whether the record has a start timestamp
+inline bool GetRecordStartTimestamp(const pti_view_record_base* record, uint64_t& timestamp) {
+  switch (record->_view_kind) {
+    case PTI_VIEW_DEVICE_GPU_KERNEL:
+      timestamp = reinterpret_cast<const pti_view_record_kernel*>(record)->_start_timestamp;
+      return true;
+    case PTI_VIEW_DEVICE_GPU_MEM_COPY:
+      timestamp = reinterpret_cast<const pti_view_record_memory_copy*>(record)->_start_timestamp;
+      return true;
+    case PTI_VIEW_DEVICE_GPU_MEM_FILL:
+      timestamp = reinterpret_cast<const pti_view_record_memory_fill*>(record)->_start_timestamp;
+      return true;
+    case PTI_VIEW_SYCL_RUNTIME_CALLS:
+      timestamp = reinterpret_cast<const pti_view_record_sycl_runtime*>(record)->_start_timestamp;
+      return true;
+    case PTI_VIEW_COLLECTION_OVERHEAD:
+      timestamp =
+          reinterpret_cast<const pti_view_record_overhead*>(record)->_overhead_start_timestamp_ns;
+      return true;
+    default:
+      return false;
+  }
+}
+
 #endif  // SRC_VIEW_RECORD_INFO_
@@ -0,0 +1,225 @@
+//==============================================================
+// Copyright (C) Intel Corporation
+//
+// SPDX-License-Identifier: MIT
+// =============================================================
+
+#ifndef SRC_VIEW_RECORD_MERGE_H_
+#define SRC_VIEW_RECORD_MERGE_H_
+
+#include <algorithm>
+#include <cstddef>
+#include <cstdint>
+#include <cstring>
+#include <functional>
+#include <queue>
+#include <unordered_map>
+#include <utility>
+#include <vector>
+
+#include "pti_view.h"
+#include "view_record_info.h"
+
+namespace pti {
+namespace view {
+namespace utilities {
+
+/**
+ * @brief Merges view records of producer threads by start timestamp.
+ *
+ * Records of every producer are kept sorted: a buffer of the producer is
+ * sorted when it is committed and merged into the records left from the
+ * earlier ones, which are almost always older. The producers are then
+ * k-way merged over a heap of their oldest records, up to a watermark below
+ * which no more records are expected.
+ *
+ * Records without a start timestamp (external correlation, clock conversion,
+ * summaries) go with the next record of the buffer that has one, or with the
+ * previous one if none follows.
+ */
+class ViewRecordMerger {
+ public:
+  ViewRecordMerger() = default;
+  ViewRecordMerger(const ViewRecordMerger&) = delete;
+  ViewRecordMerger& operator=(const ViewRecordMerger&) = delete;
+  ViewRecordMerger(ViewRecordMerger&&) = delete;
+  ViewRecordMerger& operator=(ViewRecordMerger&&) = delete;
+
+  virtual ~ViewRecordMerger() = default;
+
+  // Copies the record, it is merged once the producer's records are committed
+  inline void Add(const void* producer, const pti_view_record_base* record, std::size_t size) {
+    auto& stream = streams_[producer];
+    Entry entry;
+    entry.timed = GetRecordStartTimestamp(record, entry.timestamp);
+    entry.sequence = next_sequence_++;
+    entry.offset = stream.storage.size();
+    entry.size = size;
+    const auto* data = reinterpret_cast<const unsigned char*>(record);
+    stream.storage.insert(stream.storage.end(), data, data + size);
+    stream.entries.push_back(entry);
+  }
+
+  // Records added since the last commit of the producer are one buffer
+  inline void Commit(const void* producer) {
+    auto& stream = streams_[producer];
+    const auto begin = stream.entries.begin() + stream.committed;
+    const auto end = stream.entries.end();
+    if (begin == end) {
+      return;
+    }
+    AssignTimestamps(stream, begin, end);
+    std::stable_sort(begin, end, EarlierEntry);
+    if (begin != stream.entries.begin() + stream.head && EarlierEntry(*begin, *(begin - 1))) {
+      std::inplace_merge(stream.entries.begin() + stream.head, begin, end, EarlierEntry);
+    }
+    pending_ += stream.entries.size() - stream.committed;
+    stream.committed = stream.entries.size();
+  }
+
+  // Passes committed records up to the watermark to write(data, size) in
+  // start timestamp order, until write returns false. Returns the number of
+  // records written.
+  template <typename Write>
+  inline std::size_t Drain(uint64_t watermark, Write&& write) {
+    std::priority_queue<Head, std::vector<Head>, std::greater<Head>> heads;
+    for (auto& [producer, stream] : streams_) {
+      if (stream.head < stream.committed) {
+        heads.push(MakeHead(stream));
+      }
+    }
+    std::size_t written = 0;
+    while (!heads.empty()) {
+      const auto head = heads.top();
+      if (head.timestamp > watermark) {
+        break;
+      }
+      auto& stream = *head.stream;
+      const auto& entry = stream.entries[stream.head];
+      if (!write(stream.storage.data() + entry.offset, entry.size)) {
+        break;
+      }
+      if (entry.timestamp < last_timestamp_) {
+        ++late_records_;
+      }
+      last_timestamp_ = std::max(last_timestamp_, entry.timestamp);
+      heads.pop();
+      ++stream.head;
+      ++written;
+      if (stream.head < stream.committed) {
+        heads.push(MakeHead(stream));
+      }
+    }
+    pending_ -= written;
+    Compact();
+    return written;
+  }
+
+  // Committed records not written yet
+  inline std::size_t Size() const { return pending_; }
+
+  // Records written after a younger one: they were committed after the
+  // watermark had passed them
+  inline uint64_t LateRecords() const { return late_records_; }
+
+ private:
+  struct Entry {
+    uint64_t timestamp = 0;
+    uint64_t sequence = 0;
+    std::size_t offset = 0;
+    std::size_t size = 0;
+    bool timed = false;
+  };
+
+  // Records of a producer, sorted up to committed
+  struct Stream {
+    std::vector<unsigned char> storage;
+    std::vector<Entry> entries;
+    std::size_t head = 0;
+    std::size_t committed = 0;
+  };
+
+  struct Head {
+    uint64_t timestamp = 0;
+    uint64_t sequence = 0;
+    Stream* stream = nullptr;
+
+    inline bool operator>(const Head& other) const {
+      return timestamp != other.timestamp ? timestamp > other.timestamp
+                                          : sequence > other.sequence;
+    }
+  };
+
+  using EntryIterator = std::vector<Entry>::iterator;
+
+  static inline bool EarlierEntry(const Entry& left, const Entry& right) {
+    return left.timestamp < right.timestamp;
+  }
+
+  static inline Head MakeHead(Stream& stream) {
+    const auto& entry = stream.entries[stream.head];
+    return Head{entry.timestamp, entry.sequence, &stream};
+  }
+
+  inline void AssignTimestamps(const Stream& stream, EntryIterator begin, EntryIterator end) {
+    const Entry* next = nullptr;
+    for (auto it = end; it != begin;) {
+      --it;
+      if (it->timed) {
+        next = &*it;
+      } else if (next) {
+        it->timestamp = next->timestamp;
+        it->timed = true;
+      }
+    }
+    // Trailing records go with the previous one
+    uint64_t previous = stream.committed > stream.head
+                            ? stream.entries[stream.committed - 1].timestamp
+                            : last_timestamp_;
+    for (auto it = begin; it != end; ++it) {
+      if (!it->timed) {
+        it->timestamp = previous;
+      }
+      previous = it->timestamp;
+    }
+  }
+
+  // Drops written records, storage is moved once most of it is written
+  inline void Compact() {
+    for (auto it = streams_.begin(); it != streams_.end();) {
+      auto& stream = it->second;
+      if (stream.head == stream.entries.size()) {
+        // Producer keys are addresses, they might be reused
+        it = streams_.erase(it);
+        continue;
+      }
+      if (stream.head * 2 > stream.entries.size()) {
+        std::vector<unsigned char> storage;
+        std::vector<Entry> entries(stream.entries.begin() + stream.head, stream.entries.end());
+        for (auto& entry : entries) {
+          const auto offset = storage.size();
+          storage.insert(storage.end(), stream.storage.begin() + entry.offset,
+                         stream.storage.begin() + entry.offset + entry.size);
+          entry.offset = offset;
+        }
+        stream.committed -= stream.head;
+        stream.head = 0;
+        stream.storage.swap(storage);
+        stream.entries.swap(entries);
+      }
+      ++it;
+    }
+  }
+
+  std::unordered_map<const void*, Stream> streams_;
+  uint64_t next_sequence_ = 0;
+  uint64_t last_timestamp_ = 0;
+  uint64_t late_records_ = 0;
+  std::size_t pending_ = 0;
+};
+
+}  // namespace utilities
+}  // namespace view
+}  // namespace pti
+
+#endif  // SRC_VIEW_RECORD_MERGE_H_
@@ -0,0 +1,279 @@
+//==============================================================
+// Copyright (C) Intel Corporation
+//
+// SPDX-License-Identifier: MIT
+// =============================================================
+
+#ifndef SRC_VIEW_RING_FILE_H_
+#define SRC_VIEW_RING_FILE_H_
+
+#include <fcntl.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <unistd.h>
+
+#include <algorithm>
+#include <atomic>
+#include <cstddef>
+#include <cstdint>
+#include <deque>
+#include <mutex>
+#include <stdexcept>
+#include <string>
+#include <vector>
+
+#include "pti_view.h"
+#include "view_buffer_pool.h"
+
+namespace pti {
+namespace view {
+namespace utilities {
+
+// Ring file layout, also read by pti_view_ring_file.py:
+//   RingFileHeader
+//   RingFileSlice[slice_count]
+//   padding up to header_size (page aligned)
+//   slice_count slices of slice_size bytes, every one page aligned
+// A slice holds records once its sequence is non-zero, sequences grow in
+// the commit order. The file is written through a shared mapping only, so
+// committed slices are left in the page cache even if the process dies.
+inline constexpr uint64_t kRingFileMagic = 0x31474e4952495450;  // "PTIRING1"
+inline constexpr uint32_t kRingFileVersion = 1;
+
+struct RingFileHeader {
+  uint64_t magic;
+  uint32_t version;
+  uint32_t reserved;
+  uint64_t header_size;
+  uint64_t slice_size;
+  uint64_t slice_stride;
+  uint64_t slice_count;
+};
+
+struct RingFileSlice {
+  std::atomic<uint64_t> sequence;
+  std::atomic<uint64_t> valid_bytes;
+};
+
+static_assert(sizeof(RingFileSlice) == 2 * sizeof(uint64_t) &&
+                  std::atomic<uint64_t>::is_always_lock_free,
+              "Ring file slices must be plain 64-bit words");
+
+// Buffers carved out of a memory-mapped file. A buffer is committed when it
+// is complete and invalidated when it is taken again, so the file keeps the
+// most recently completed buffers.
+class ViewRingFile {
+ public:
+  ViewRingFile(const char* path, std::size_t slice_size, std::size_t slice_count) {
+    const auto page_size = static_cast<std::size_t>(sysconf(_SC_PAGESIZE));
+    slice_stride_ = RoundUp(slice_size, page_size);
+    header_size_ =
+        RoundUp(sizeof(RingFileHeader) + slice_count * sizeof(RingFileSlice), page_size);
+    region_size_ = header_size_ + slice_stride_ * slice_count;
+    slice_size_ = slice_size;
+    slice_count_ = slice_count;
+
+    const int fd = open(path, O_RDWR | O_CREAT | O_TRUNC | O_CLOEXEC, 0644);
+    if (fd < 0) {
+      throw std::runtime_error("Unable to open ring file " + std::string(path));
+    }
+    void* region = MAP_FAILED;
+    if (ftruncate(fd, static_cast<off_t>(region_size_)) == 0) {
+      region = mmap(nullptr, region_size_, PROT_READ | PROT_WRITE, MAP_SHARED, fd, 0);
+    }
+    close(fd);
+    if (region == MAP_FAILED) {
+      throw std::runtime_error("Unable to map ring file " + std::string(path));
+    }
+    region_ = static_cast<unsigned char*>(region);
+
+    auto* header = reinterpret_cast<RingFileHeader*>(region_);
+    header->version = kRingFileVersion;
+    header->header_size = header_size_;
+    header->slice_size = slice_size_;
+    header->slice_stride = slice_stride_;
+    header->slice_count = slice_count_;
+    slices_ = reinterpret_cast<RingFileSlice*>(region_ + sizeof(RingFileHeader));
+    // The file is recognized only once it is fully set up
+    header->magic = kRingFileMagic;
+
+    in_use_.resize(slice_count_, false);
+    for (std::size_t i = 0; i < slice_count_; ++i) {
+      free_slices_.push_back(i);
+    }
+  }
+
+  ViewRingFile(const ViewRingFile&) = delete;
+  ViewRingFile& operator=(const ViewRingFile&) = delete;
+  ViewRingFile(ViewRingFile&&) = delete;
+  ViewRingFile& operator=(ViewRingFile&&) = delete;
+
+  virtual ~ViewRingFile() { munmap(region_, region_size_); }
+
+  // Takes the slice committed the longest time ago, nullptr if all are taken
+  inline unsigned char* Acquire() {
+    std::lock_guard<std::mutex> slices_lock(slices_mtx_);
+    if (free_slices_.empty()) {
+      return nullptr;
+    }
+    const auto index = free_slices_.front();
+    free_slices_.pop_front();
+    in_use_[index] = true;
+    slices_[index].sequence.store(0, std::memory_order_release);
+    return SliceBuffer(index);
+  }
+
+  // Returns false for buffers not acquired from this file (or released twice)
+  inline bool Release(unsigned char* buffer) {
+    if (!Owns(buffer)) {
+      return false;
+    }
+    std::lock_guard<std::mutex> slices_lock(slices_mtx_);
+    const auto index = Index(buffer);
+    if (!in_use_[index]) {
+      return false;
+    }
+    in_use_[index] = false;
+    free_slices_.push_back(index);
+    return true;
+  }
+
+  // Buffer is complete: the records stay in the file until it is reused
+  inline void Commit(const unsigned char* buffer, std::size_t valid_bytes) {
+    if (!Owns(buffer)) {
+      return;
+    }
+    auto& slice = slices_[Index(buffer)];
+    slice.valid_bytes.store(valid_bytes, std::memory_order_relaxed);
+    slice.sequence.store(next_sequence_.fetch_add(1, std::memory_order_relaxed),
+                         std::memory_order_release);
+  }
+
+  // Buffer memory is written again
+  inline void Invalidate(const unsigned char* buffer) {
+    if (Owns(buffer)) {
+      slices_[Index(buffer)].sequence.store(0, std::memory_order_release);
+    }
+  }
+
+  inline bool Owns(const unsigned char* buffer) const {
+    const auto* slices_begin = region_ + header_size_;
+    return buffer >= slices_begin && buffer < slices_begin + slice_stride_ * slice_count_ &&
+           (buffer - slices_begin) % slice_stride_ == 0;
+  }
+
+  inline std::size_t SliceSize() const { return slice_size_; }
+
+  inline std::size_t SliceCount() const { return slice_count_; }
+
+ private:
+  inline unsigned char* SliceBuffer(std::size_t index) const {
+    return region_ + header_size_ + index * slice_stride_;
+  }
+
+  inline std::size_t Index(const unsigned char* buffer) const {
+    return static_cast<std::size_t>(buffer - region_ - header_size_) / slice_stride_;
+  }
+
+  unsigned char* region_ = nullptr;
+  std::size_t region_size_ = 0;
+  std::size_t header_size_ = 0;
+  std::size_t slice_size_ = 0;
+  std::size_t slice_stride_ = 0;
+  std::size_t slice_count_ = 0;
+  RingFileSlice* slices_ = nullptr;
+  std::atomic<uint64_t> next_sequence_ = 1;
+  std::mutex slices_mtx_;
+  std::vector<bool> in_use_;
+  // In the release order, so slices are reused in the order they were filled
+  std::deque<std::size_t> free_slices_;
+};
+
+// Reads committed slices of a ring file, e.g. one left by a crashed process
+class ViewRingFileReader {
+ public:
+  explicit ViewRingFileReader(const char* path) {
+    const int fd = open(path, O_RDONLY | O_CLOEXEC);
+    if (fd < 0) {
+      throw std::invalid_argument("Unable to open ring file " + std::string(path));
+    }
+    struct stat file_stat = {};
+    void* region = MAP_FAILED;
+    if (fstat(fd, &file_stat) == 0 &&
+        static_cast<std::size_t>(file_stat.st_size) >= sizeof(RingFileHeader)) {
+      region_size_ = static_cast<std::size_t>(file_stat.st_size);
+      region = mmap(nullptr, region_size_, PROT_READ, MAP_PRIVATE, fd, 0);
+    }
+    close(fd);
+    if (region == MAP_FAILED) {
+      throw std::invalid_argument("Unable to map ring file " + std::string(path));
+    }
+    region_ = static_cast<unsigned char*>(region);
+
+    const auto* header = reinterpret_cast<const RingFileHeader*>(region_);
+    const auto slices_size = header->slice_stride * header->slice_count;
+    if (header->magic != kRingFileMagic || header->version != kRingFileVersion ||
+        header->slice_size > header->slice_stride || header->header_size > region_size_ ||
+        sizeof(RingFileHeader) + header->slice_count * sizeof(RingFileSlice) >
+            header->header_size ||
+        slices_size > region_size_ - header->header_size) {
+      munmap(region_, region_size_);
+      throw std::invalid_argument("Not a ring file " + std::string(path));
+    }
+
+    const auto* slices =
+        reinterpret_cast<const RingFileSlice*>(region_ + sizeof(RingFileHeader));
+    for (std::size_t i = 0; i < header->slice_count; ++i) {
+      const auto sequence = slices[i].sequence.load(std::memory_order_acquire);
+      const auto valid_bytes = slices[i].valid_bytes.load(std::memory_order_relaxed);
+      if (sequence && valid_bytes <= header->slice_size) {
+        committed_.push_back(
+            Slice{sequence, region_ + header->header_size + i * header->slice_stride,
+                  valid_bytes});
+      }
+    }
+    std::sort(committed_.begin(), committed_.end(),
+              [](const Slice& lhs, const Slice& rhs) { return lhs.sequence < rhs.sequence; });
+  }
+
+  ViewRingFileReader(const ViewRingFileReader&) = delete;
+  ViewRingFileReader& operator=(const ViewRingFileReader&) = delete;
+  ViewRingFileReader(ViewRingFileReader&&) = delete;
+  ViewRingFileReader& operator=(ViewRingFileReader&&) = delete;
+
+  virtual ~ViewRingFileReader() { munmap(region_, region_size_); }
+
+  // Committed slices in the commit order, PTI_STATUS_END_OF_BUFFER after the last one
+  inline pti_result GetNextSlice(uint8_t** buffer, std::size_t* valid_bytes) {
+    if (!buffer || !valid_bytes) {
+      return pti_result::PTI_ERROR_BAD_ARGUMENT;
+    }
+    if (next_slice_ == committed_.size()) {
+      return pti_result::PTI_STATUS_END_OF_BUFFER;
+    }
+    const auto& slice = committed_[next_slice_++];
+    *buffer = const_cast<uint8_t*>(slice.buffer);
+    *valid_bytes = slice.valid_bytes;
+    return pti_result::PTI_SUCCESS;
+  }
+
+  inline std::size_t SliceCount() const { return committed_.size(); }
+
+ private:
+  struct Slice {
+    uint64_t sequence;
+    const unsigned char* buffer;
+    std::size_t valid_bytes;
+  };
+
+  unsigned char* region_ = nullptr;
+  std::size_t region_size_ = 0;
+  std::vector<Slice> committed_;
+  std::size_t next_slice_ = 0;
+};
+
+}  // namespace utilities
+}  // namespace view
+}  // namespace pti
+
+#endif  // SRC_VIEW_RING_FILE_H_
@@ -0,0 +1,394 @@
+#==============================================================
+# Copyright (C) Intel Corporation
+#
+# SPDX-License-Identifier: MIT
+# =============================================================
+
+# Single-pass Level Zero header parser shared by tracing generators.
+# Headers are scanned once to index every typedef'ed struct and enum body,
+# after that functions, parameters and callback groups are resolved by
+# lookups into the index. Parsed representation is stored into a cache file
+# keyed by content hash of the headers, so unchanged headers are parsed once.
+# Copy of build_utils/ze_api_parser.py, so the SDK tree generates its
+# headers on its own. Both copies are kept identical.
+
+import collections
+import hashlib
+import json
+import os
+import re
+import tempfile
+
+PARSER_VERSION = 1
+CACHE_FILE_NAME = "ze_api_ir.json"
+CACHE_DIR_ENV = "PTI_GEN_CACHE_DIR"
+
+STATE_NORMAL = 0
+STATE_CONDITION = 1
+STATE_SKIP = 2
+
+# Field of callback table structure, cond is the name of #if condition
+# the field is guarded by (empty if none)
+ZeCallback = collections.namedtuple("ZeCallback", ["field", "cond"])
+
+# Parameter of API function, type has one pointer level less than the
+# corresponding field of the params structure
+ZeParam = collections.namedtuple("ZeParam", ["name", "type"])
+
+class ZeApi:
+  def __init__(self, func_list, group_map, param_map, enum_map, struct_set):
+    # API functions in header order, e.g. "zeInit"
+    self.func_list = func_list
+    # Function name -> (group ZeCallback, function ZeCallback)
+    self.group_map = group_map
+    # Function name -> list of ZeParam
+    self.param_map = param_map
+    # Enum name -> {field name -> value string}
+    self.enum_map = enum_map
+    # Names of structure types (handles are not included)
+    self.struct_set = struct_set
+
+  def to_dict(self):
+    return {
+      "func_list": self.func_list,
+      "group_map": {func: [list(group), list(callback)]
+                    for func, (group, callback) in self.group_map.items()},
+      "param_map": {func: [list(param) for param in params]
+                    for func, params in self.param_map.items()},
+      "enum_map": self.enum_map,
+      "struct_list": sorted(self.struct_set)}
+
+  @staticmethod
+  def from_dict(data):
+    group_map = collections.OrderedDict()
+    for func, (group, callback) in data["group_map"].items():
+      group_map[func] = (ZeCallback(*group), ZeCallback(*callback))
+    param_map = collections.OrderedDict()
+    for func, params in data["param_map"].items():
+      param_map[func] = [ZeParam(*param) for param in params]
+    return ZeApi(list(data["func_list"]), group_map, param_map,
+                 collections.OrderedDict(data["enum_map"]),
+                 set(data["struct_list"]))
+
+# Helpers #####################################################################
+
+def get_comma_count(line):
+  count = 0
+  level = 0
+  for symbol in line:
+    if symbol == "(":
+      level += 1
+    elif symbol == ")":
+      assert level > 0
+      level -= 1
+    elif symbol == "," and level == 0:
+      count += 1
+  return count
+
+def remove_comments(line):
+  pos = line.find("//")
+  if pos != -1:
+    line = line[0:pos]
+  return line
+
+def get_func_name(callback_struct_name):
+  assert callback_struct_name.strip().find("ze_pfn") == 0
+  assert callback_struct_name.strip().find("Cb_t") + len("Cb_t") == len(callback_struct_name.strip())
+  body = callback_struct_name.strip()
+  body = body.split("ze_pfn")[1]
+  body = body.split("Cb_t")[0]
+  return "ze" + body
+
+def get_param_struct_name(func_name):
+  assert func_name[0] == 'z'
+  func_name = 'Z' + func_name[1:]
+  func_name = func_name.replace("CL", "Cl")
+  func_name = func_name.replace("IPC", "Ipc")
+  items = re.findall('[A-Z][^A-Z]*', func_name)
+  assert len(items) > 1
+  struct_name = ""
+  for item in items:
+    struct_name += item.lower() + "_"
+  struct_name += "params_t"
+  return struct_name
+
+# Header Index ################################################################
+
+class HeaderIndex:
+  def __init__(self, lines):
+    self.lines = lines
+    # Type name -> (first body line, line with closing brace)
+    self.struct_map = {}
+    self.enum_map = {}
+    # Structures declared with "typedef struct _x_t x_t;"
+    self.struct_decl_set = set()
+    # Names of ze_pfn*Cb_t callback types in header order
+    self.func_list = []
+
+    i = 0
+    while i < len(lines):
+      line = lines[i]
+      if line.find("ZE_APICALL") != -1 and line.find("ze_pfn") != -1:
+        items = line.split("ze_pfn")
+        assert len(items) == 2
+        assert items[1].find("Cb_t") != -1
+        items = items[1].split("Cb_t")
+        assert len(items) == 2
+        self.func_list.append("ze" + items[0].strip())
+        i += 1
+        continue
+
+      text = remove_comments(line).strip()
+      is_struct = text.find("typedef struct") == 0
+      is_enum = text.find("typedef enum") == 0
+      if not (is_struct or is_enum):
+        i += 1
+        continue
+
+      items = text.rstrip("{").split()
+      if len(items) < 3 or items[2].find("_") != 0:
+        i += 1
+        continue
+      name = items[2].strip().lstrip("_")
+
+      if text.find(";") != -1:
+        # Forward declaration or handle type, no body
+        if is_struct and text.find("*") == -1:
+          self.struct_decl_set.add(name)
+        i += 1
+        continue
+
+      start = i
+      while lines[start].find("{") == -1:
+        start += 1
+      start += 1
+      assert start < len(lines)
+
+      end = start
+      while lines[end].find("}") == -1:
+        end += 1
+      assert end < len(lines)
+
+      if is_struct:
+        if not name in self.struct_map:
+          self.struct_map[name] = (start, end)
+      else:
+        assert len(items) == 3
+        assert not name in self.enum_map
+        self.enum_map[name] = (start, end)
+      i = end + 1
+
+  def get_struct_body(self, struct_name):
+    assert struct_name in self.struct_map
+    start, end = self.struct_map[struct_name]
+    return self.lines[start:end]
+
+  def get_enum_body(self, enum_name):
+    assert enum_name in self.enum_map
+    start, end = self.enum_map[enum_name]
+    return self.lines[start:end]
+
+# Parse Level Zero Headers ####################################################
+
+def get_callback_struct_map(index, struct_name):
+  struct_map = collections.OrderedDict()
+  cond = ""
+  state = STATE_NORMAL
+  for line in index.get_struct_body(struct_name):
+    if line.find("#if") >= 0:
+      items = line.strip().split()
+      assert len(items) == 2
+      state = STATE_CONDITION
+      cond = items[1].strip()
+      continue
+    elif line.find("#else") >= 0:
+      assert state == STATE_CONDITION
+      state = STATE_SKIP
+      continue
+    elif line.find("#endif") >= 0:
+      assert state != STATE_NORMAL
+      state = STATE_NORMAL
+      cond = ""
+      continue
+
+    if state == STATE_SKIP:
+      continue
+
+    items = line.strip().split()
+    assert len(items) == 2
+    type_name = items[0].strip()
+    field_name = items[1].strip().strip(";")
+    assert not (type_name in struct_map)
+    struct_map[type_name] = ZeCallback(field_name, cond)
+
+  return struct_map
+
+def get_callback_group_map(index):
+  group_map = collections.OrderedDict()
+
+  base_map = get_callback_struct_map(index, "ze_callbacks_t")
+  assert len(base_map) > 0
+
+  for key, value in base_map.items():
+    func_map = get_callback_struct_map(index, key)
+    for fkey, fvalue in func_map.items():
+      func_name = get_func_name(fkey)
+      assert not (func_name in group_map)
+      group_map[func_name] = (value, fvalue)
+
+  return group_map
+
+def get_params(index, func_name):
+  params = []
+
+  for line in index.get_struct_body(get_param_struct_name(func_name)):
+    items = line.strip().split()
+    assert len(items) >= 2
+
+    type = ""
+    for j in range(len(items) - 1):
+      type += items[j] + " "
+    type = type.strip()
+    assert type[len(type) - 1] == "*"
+    type = type[0:len(type) - 1]
+
+    name = items[len(items) - 1].rstrip(";")
+    assert name[0] == "p"
+    name = name[1:len(name)]
+
+    assert not ((name, type) in params)
+    params.append(ZeParam(name, type))
+
+  return params
+
+def get_param_map(index):
+  param_map = collections.OrderedDict()
+  for func in index.func_list:
+    assert not (func in param_map)
+    param_map[func] = get_params(index, func)
+  return param_map
+
+def find_enums(index, enum_map):
+  for enum_name in index.enum_map:
+    params = collections.OrderedDict()
+    default_value = 0
+    has_unresolved_values = False
+    for line in index.get_enum_body(enum_name):
+      line = remove_comments(line).strip()
+      if not line:
+        continue
+      comma_count = get_comma_count(line)
+      assert comma_count == 0 or comma_count == 1
+      if line.find("=") == -1:
+        assert not has_unresolved_values
+        field_name = line.rstrip(",")
+        field_value = str(default_value)
+        default_value += 1
+      else:
+        items = line.split("=")
+        assert len(items) == 2
+        field_name = items[0].strip()
+        field_value = items[1].strip().rstrip(",")
+        if field_value.find("0x") == 0:
+          field_value = str(int(field_value, 16))
+        if all(symbol.isdigit() for symbol in field_value):
+          default_value = int(field_value)
+          default_value += 1
+        else:
+          has_unresolved_values = True
+      assert not (field_name in params)
+      params[field_name] = field_value
+    assert len(params) > 0
+    assert not (enum_name in enum_map)
+    enum_map[enum_name] = params
+
+def get_header_list(include_path):
+  header_list = []
+  for file_name in sorted(os.listdir(include_path)):
+    if file_name.endswith(".h") or file_name.endswith(".hpp"):
+      header_list.append(file_name)
+  assert "ze_api.h" in header_list
+  return header_list
+
+def read_headers(include_path):
+  content_map = collections.OrderedDict()
+  for file_name in get_header_list(include_path):
+    file = open(os.path.join(include_path, file_name), "rt")
+    content_map[file_name] = file.read()
+    file.close()
+  return content_map
+
+def get_content_hash(content_map):
+  content_hash = hashlib.sha256()
+  content_hash.update(("ze_api_parser:" + str(PARSER_VERSION)).encode("utf-8"))
+  for file_name, content in content_map.items():
+    content_hash.update(file_name.encode("utf-8"))
+    content_hash.update(b"\0")
+    content_hash.update(content.encode("utf-8"))
+    content_hash.update(b"\0")
+  return content_hash.hexdigest()
+
+def parse(content_map):
+  enum_map = collections.OrderedDict()
+  ze_api = None
+  for file_name, content in content_map.items():
+    index = HeaderIndex(content.splitlines())
+    find_enums(index, enum_map)
+    if file_name == "ze_api.h":
+      ze_api = index
+  assert ze_api is not None
+
+  struct_set = set(ze_api.struct_decl_set)
+  struct_set.update(ze_api.struct_map.keys())
+  return ZeApi(ze_api.func_list, get_callback_group_map(ze_api),
+               get_param_map(ze_api), enum_map, struct_set)
+
+# Cache #######################################################################
+
+def get_cache_path(cache_path):
+  if os.environ.get(CACHE_DIR_ENV):
+    cache_path = os.environ.get(CACHE_DIR_ENV)
+  if not cache_path:
+    return None
+  return os.path.join(cache_path, CACHE_FILE_NAME)
+
+def read_cache(cache_file_path, content_hash):
+  if cache_file_path is None or not os.path.isfile(cache_file_path):
+    return None
+  try:
+    file = open(cache_file_path, "rt")
+    data = json.load(file)
+    file.close()
+  except (OSError, ValueError):
+    return None
+  if data.get("version") != PARSER_VERSION or data.get("hash") != content_hash:
+    return None
+  return ZeApi.from_dict(data["ir"])
+
+def write_cache(cache_file_path, content_hash, ze_api):
+  if cache_file_path is None:
+    return
+  cache_dir = os.path.dirname(cache_file_path)
+  if not os.path.exists(cache_dir):
+    os.makedirs(cache_dir)
+
+  # Generators may run in parallel, so replace cache file atomically
+  fd, temp_path = tempfile.mkstemp(dir=cache_dir, prefix=CACHE_FILE_NAME)
+  with os.fdopen(fd, "wt") as file:
+    json.dump({"version": PARSER_VERSION, "hash": content_hash,
+               "ir": ze_api.to_dict()}, file)
+  os.replace(temp_path, cache_file_path)
+
+def load(include_path, cache_path=None):
+  """Returns ZeApi for Level Zero headers from include_path (directory
+  containing ze_api.h). If cache_path is given (or PTI_GEN_CACHE_DIR is set),
+  parsed representation is reused while the headers are unchanged."""
+  content_map = read_headers(include_path)
+  content_hash = get_content_hash(content_map)
+  cache_file_path = get_cache_path(cache_path)
+
+  ze_api = read_cache(cache_file_path, content_hash)
+  if ze_api is None:
+    ze_api = parse(content_map)
+    write_cache(cache_file_path, content_hash, ze_api)
+  return ze_api
@@ -0,0 +1,141 @@
+#include "clock_conversion.h"
+
+#include <gtest/gtest.h>
+
+#include <array>
+#include <chrono>
+#include <cstdlib>
+#include <mutex>
+#include <thread>
+#include <vector>
+
+#include "pti_view.h"
+#include "utils/test_helpers.h"
+#include "view_handler.h"
+
+namespace {
+
+constexpr std::size_t kBufferSize = 1UL << 16;
+constexpr uint64_t kAllowedError = NSEC_IN_MSEC;
+
+std::mutex delivered_mtx;
+std::vector<std::vector<unsigned char>> delivered_buffers;
+
+void BufferRequested(unsigned char** buf, std::size_t* buf_size) {
+  *buf = static_cast<unsigned char*>(std::malloc(kBufferSize));
+  *buf_size = *buf ? kBufferSize : 0;
+}
+
+void BufferCompleted(unsigned char* buf, std::size_t /*buf_size*/, std::size_t valid_buf_size) {
+  if (valid_buf_size) {
+    std::lock_guard<std::mutex> lock(delivered_mtx);
+    delivered_buffers.emplace_back(buf, buf + valid_buf_size);
+  }
+  std::free(buf);
+}
+
+uint64_t Difference(uint64_t left, uint64_t right) {
+  return left > right ? left - right : right - left;
+}
+
+}  // namespace
+
+TEST(ClockConversionTest, ModelConvert) {
+  pti::view::utilities::ClockModel model;
+  model.raw_base = 1000;
+  model.real_base = 5000;
+  EXPECT_EQ(model.Convert(1000), 5000);
+  EXPECT_EQ(model.Convert(1500), 5500);
+  EXPECT_EQ(model.Convert(900), 4900);
+
+  model.rate = 1.5;
+  EXPECT_EQ(model.Convert(3000), 8000);
+}
+
+TEST(ClockConversionTest, BulkConvert) {
+  pti::view::utilities::ClockModel model;
+  model.raw_base = 123456789;
+  model.real_base = 987654321000;
+  model.rate = 1.000001;
+  std::array<uint64_t, 5> timestamps = {0, 123456789, 200000000, 300000000, 1000000000000};
+  auto converted = timestamps;
+  model.Convert(converted.data(), converted.size());
+  for (std::size_t i = 0; i < timestamps.size(); ++i) {
+    EXPECT_EQ(converted[i], model.Convert(timestamps[i]));
+  }
+}
+
+TEST(ClockConversionTest, SampleIsBracketed) {
+  const auto before = utils::GetTime(CLOCK_MONOTONIC_RAW);
+  const auto sample = pti::view::utilities::ClockConverter::TakeSample(8);
+  const auto after = utils::GetTime(CLOCK_MONOTONIC_RAW);
+  EXPECT_GE(sample.raw, before);
+  EXPECT_LE(sample.raw, after);
+  EXPECT_LE(sample.uncertainty, after - before);
+}
+
+TEST(ClockConversionTest, ModelMatchesRealTime) {
+  // Calibrate every time the model is requested
+  pti::view::utilities::ClockConverter converter(0);
+  for (int i = 0; i < 3; ++i) {
+    std::this_thread::sleep_for(std::chrono::milliseconds(10));
+    const auto model = converter.GetModel();
+    const auto sample = pti::view::utilities::ClockConverter::TakeSample(8);
+    EXPECT_LE(Difference(model.Convert(sample.raw), sample.real), kAllowedError);
+    EXPECT_GT(model.rate, 0.99);
+    EXPECT_LT(model.rate, 1.01);
+  }
+}
+
+TEST(ClockConversionTest, BufferStartsWithModel) {
+  using pti::test::utils::CreateRecord;
+  ASSERT_EQ(Instance().RegisterBufferCallbacks(BufferRequested, BufferCompleted),
+            pti_result::PTI_SUCCESS);
+  ASSERT_EQ(Instance().Enable(PTI_VIEW_CLOCK_CONVERSION), pti_result::PTI_SUCCESS);
+  Instance().FlushBuffers();
+
+  const auto raw = utils::GetTime(CLOCK_MONOTONIC_RAW);
+  auto kernel = CreateRecord<pti_view_record_kernel>();
+  kernel._start_timestamp = raw;
+  kernel._end_timestamp = raw + 1000;
+
+  // Fresh thread, so the record starts a new buffer
+  std::thread producer([&kernel] { Instance().InsertRecord(kernel); });
+  producer.join();
+  Instance().FlushBuffers();
+  EXPECT_EQ(Instance().Disable(PTI_VIEW_CLOCK_CONVERSION), pti_result::PTI_SUCCESS);
+
+  const auto deadline = std::chrono::steady_clock::now() + std::chrono::seconds(10);
+  while (std::chrono::steady_clock::now() < deadline) {
+    {
+      std::lock_guard<std::mutex> lock(delivered_mtx);
+      if (!delivered_buffers.empty()) {
+        break;
+      }
+    }
+    std::this_thread::sleep_for(std::chrono::milliseconds(1));
+  }
+
+  std::lock_guard<std::mutex> lock(delivered_mtx);
+  ASSERT_EQ(delivered_buffers.size(), 1);
+  auto& buffer = delivered_buffers.front();
+  pti_view_record_base* record = nullptr;
+  ASSERT_EQ(GetNextRecord(buffer.data(), buffer.size(), &record), pti_result::PTI_SUCCESS);
+  ASSERT_EQ(record->_view_kind, PTI_VIEW_CLOCK_CONVERSION);
+  auto* clock = reinterpret_cast<pti_view_record_clock_conversion*>(record);
+  pti::view::utilities::ClockModel model;
+  model.raw_base = clock->_raw_base_timestamp;
+  model.real_base = clock->_real_base_timestamp;
+  model.rate = clock->_raw_to_real_rate;
+
+  ASSERT_EQ(GetNextRecord(buffer.data(), buffer.size(), &record), pti_result::PTI_SUCCESS);
+  ASSERT_EQ(record->_view_kind, PTI_VIEW_DEVICE_GPU_KERNEL);
+  auto* converted = reinterpret_cast<pti_view_record_kernel*>(record);
+  EXPECT_EQ(converted->_start_timestamp, model.Convert(raw));
+  EXPECT_EQ(converted->_end_timestamp, model.Convert(raw + 1000));
+  EXPECT_LE(Difference(converted->_start_timestamp, utils::GetTime(CLOCK_REALTIME)),
+            10ULL * NSEC_IN_SEC);
+
+  EXPECT_EQ(GetNextRecord(buffer.data(), buffer.size(), &record),
+            pti_result::PTI_STATUS_END_OF_BUFFER);
+}
@@ -0,0 +1,298 @@
+#include "compact_encoding.h"
+
+#include <gtest/gtest.h>
+
+#include <chrono>
+#include <cstdlib>
+#include <cstring>
+#include <iostream>
+#include <mutex>
+#include <thread>
+#include <vector>
+
+#include "pti_view.h"
+#include "utils/test_helpers.h"
+#include "view_handler.h"
+
+namespace {
+
+constexpr std::size_t kBufferSize = 1UL << 16;
+constexpr std::size_t kRecordCount = 10000;
+// CLOCK_MONOTONIC_RAW timestamps, as they come from the collectors
+constexpr uint64_t kBaseTimestamp = 5000000000000ULL;
+
+const char* const kKernelNames[] = {"gemm", "ReallyComplicated_KernelName_SomeOp",
+                                    "zeCommandListAppendMemoryCopy(M2D)"};
+
+std::mutex delivered_mtx;
+std::vector<std::vector<unsigned char>> delivered_buffers;
+
+void BufferRequested(unsigned char** buf, std::size_t* buf_size) {
+  *buf = static_cast<unsigned char*>(std::malloc(kBufferSize));
+  *buf_size = *buf ? kBufferSize : 0;
+}
+
+void BufferCompleted(unsigned char* buf, std::size_t /*buf_size*/, std::size_t valid_buf_size) {
+  if (valid_buf_size) {
+    std::lock_guard<std::mutex> lock(delivered_mtx);
+    delivered_buffers.emplace_back(buf, buf + valid_buf_size);
+  }
+  std::free(buf);
+}
+
+// Stream of kernels and copies, as a single threaded application would do
+pti_view_record_kernel CreateKernel(std::size_t i) {
+  auto record = pti::test::utils::CreateRecord<pti_view_record_kernel>();
+  record._queue_handle = reinterpret_cast<ze_command_queue_handle_t>(0x7f0000001000 + (i % 2));
+  record._device_handle = reinterpret_cast<ze_device_handle_t>(0x7f0000002000);
+  record._context_handle = reinterpret_cast<ze_context_handle_t>(0x7f0000003000);
+  record._name = kKernelNames[i % 2];
+  record._source_file_name = "gemm.cpp";
+  record._source_line_number = 42;
+  record._kernel_id = 1000 + i;
+  record._correlation_id = static_cast<uint32_t>(2000 + 2 * i);
+  record._thread_id = 31337;
+  std::strcpy(record._pci_address, "0:3a:0.0");
+  record._append_timestamp = kBaseTimestamp + i * 20000;
+  record._submit_timestamp = record._append_timestamp + 3000;
+  record._start_timestamp = record._submit_timestamp + 4000;
+  record._end_timestamp = record._start_timestamp + 9000;
+  record._sycl_task_begin_timestamp = record._append_timestamp - 1500;
+  record._sycl_enqk_begin_timestamp = record._append_timestamp - 700;
+  record._sycl_node_id = 0;
+  record._sycl_invocation_id = 0;
+  return record;
+}
+
+pti_view_record_memory_copy CreateCopy(std::size_t i) {
+  auto record = pti::test::utils::CreateRecord<pti_view_record_memory_copy>();
+  record._memcpy_type = PTI_VIEW_MEMCPY_TYPE_M2D;
+  record._mem_src = PTI_VIEW_MEMORY_TYPE_MEMORY;
+  record._mem_dst = PTI_VIEW_MEMORY_TYPE_DEVICE;
+  record._queue_handle = reinterpret_cast<ze_command_queue_handle_t>(0x7f0000001000);
+  record._device_handle = reinterpret_cast<ze_device_handle_t>(0x7f0000002000);
+  record._context_handle = reinterpret_cast<ze_context_handle_t>(0x7f0000003000);
+  record._name = kKernelNames[2];
+  std::strcpy(record._pci_address, "0:3a:0.0");
+  record._mem_op_id = 1000 + i;
+  record._correlation_id = static_cast<uint32_t>(2001 + 2 * i);
+  record._thread_id = 31337;
+  record._append_timestamp = kBaseTimestamp + i * 20000 + 10000;
+  record._submit_timestamp = record._append_timestamp + 2000;
+  record._start_timestamp = record._submit_timestamp + 3000;
+  record._end_timestamp = record._start_timestamp + 1000;
+  return record;
+}
+
+template <typename T>
+void ExpectSameRecord(const pti_view_record_base* decoded, const T& expected) {
+  ASSERT_EQ(decoded->_view_kind, expected._view_kind._view_kind);
+  EXPECT_EQ(std::memcmp(decoded, &expected, sizeof(T)), 0);
+}
+
+}  // namespace
+
+TEST(CompactEncodingTest, VarintRoundTrip) {
+  using namespace pti::view::utilities;
+  for (uint64_t value : std::vector<uint64_t>{0, 1, 127, 128, 300, 1ULL << 35, UINT64_MAX}) {
+    uint8_t data[kMaxVarintSize] = {};
+    const auto size = WriteVarint(value, data);
+    uint64_t read = 0;
+    EXPECT_EQ(ReadVarint(data, size, &read), size);
+    EXPECT_EQ(read, value);
+    EXPECT_EQ(ReadVarint(data, size - 1, &read), 0);
+  }
+  for (int64_t delta : std::vector<int64_t>{0, -1, 1, -1000000, INT64_MAX, INT64_MIN}) {
+    EXPECT_EQ(ZigzagDecode(ZigzagEncode(static_cast<uint64_t>(delta))),
+              static_cast<uint64_t>(delta));
+  }
+  EXPECT_EQ(ZigzagEncode(static_cast<uint64_t>(-1LL)), 1);
+  EXPECT_EQ(ZigzagEncode(1), 2);
+}
+
+TEST(CompactEncodingTest, EncodeDecodeRoundTrip) {
+  using namespace pti::view::utilities;
+  std::vector<uint8_t> buffer(kBufferSize);
+  std::size_t size = WriteCompactBufferHeader(buffer.data());
+  CompactEncoder encoder;
+
+  auto overhead = pti::test::utils::CreateRecord<pti_view_record_overhead>();
+  overhead._overhead_start_timestamp_ns = kBaseTimestamp;
+  overhead._overhead_end_timestamp_ns = kBaseTimestamp + 100;
+  overhead._overhead_thread_id = 31337;
+  overhead._overhead_count = 3;
+  overhead._overhead_duration_ns = 60;
+  overhead._overhead_kind = PTI_VIEW_OVERHEAD_KIND_TIME;
+  auto external = pti::test::utils::CreateRecord<pti_view_record_external_correlation>();
+  external._view_kind._view_kind = PTI_VIEW_EXTERNAL_CORRELATION;
+  external._correlation_id = 2000;
+  external._external_id = 0xFFFFFFFFFFULL;
+  external._external_kind = PTI_VIEW_EXTERNAL_KIND_CUSTOM_3;
+  auto fill = pti::test::utils::CreateRecord<pti_view_record_memory_fill>();
+  fill._mem_type = PTI_VIEW_MEMORY_TYPE_SHARED;
+  fill._name = "zeCommandListAppendMemoryFill(S)";
+  fill._start_timestamp = kBaseTimestamp - 5;
+  fill._bytes = 4096;
+  fill._value_for_set = 1;
+  auto clock = pti::test::utils::CreateRecord<pti_view_record_clock_conversion>();
+  clock._view_kind._view_kind = PTI_VIEW_CLOCK_CONVERSION;
+  clock._raw_base_timestamp = 123456789;
+  clock._real_base_timestamp = kBaseTimestamp;
+  clock._raw_to_real_rate = 1.0000012;
+  clock._uncertainty_ns = 20;
+  const auto kernel = CreateKernel(0);
+  const auto copy = CreateCopy(0);
+  const auto later_kernel = CreateKernel(1);
+
+  size += encoder.Encode(clock, buffer.data() + size);
+  size += encoder.Encode(kernel, buffer.data() + size);
+  size += encoder.Encode(copy, buffer.data() + size);
+  size += encoder.Encode(overhead, buffer.data() + size);
+  size += encoder.Encode(external, buffer.data() + size);
+  size += encoder.Encode(fill, buffer.data() + size);
+  size += encoder.Encode(later_kernel, buffer.data() + size);
+
+  pti_view_record_base* record = nullptr;
+  ASSERT_EQ(GetNextRecord(buffer.data(), size, &record), pti_result::PTI_SUCCESS);
+  ExpectSameRecord(record, clock);
+  ASSERT_EQ(GetNextRecord(buffer.data(), size, &record), pti_result::PTI_SUCCESS);
+  ExpectSameRecord(record, kernel);
+  ASSERT_EQ(GetNextRecord(buffer.data(), size, &record), pti_result::PTI_SUCCESS);
+  ExpectSameRecord(record, copy);
+  ASSERT_EQ(GetNextRecord(buffer.data(), size, &record), pti_result::PTI_SUCCESS);
+  ExpectSameRecord(record, overhead);
+  ASSERT_EQ(GetNextRecord(buffer.data(), size, &record), pti_result::PTI_SUCCESS);
+  ExpectSameRecord(record, external);
+  ASSERT_EQ(GetNextRecord(buffer.data(), size, &record), pti_result::PTI_SUCCESS);
+  ExpectSameRecord(record, fill);
+  ASSERT_EQ(GetNextRecord(buffer.data(), size, &record), pti_result::PTI_SUCCESS);
+  ExpectSameRecord(record, later_kernel);
+  EXPECT_EQ(GetNextRecord(buffer.data(), size, &record), pti_result::PTI_STATUS_END_OF_BUFFER);
+
+  // Foreign record pointer does not continue the iteration
+  auto foreign = kernel;
+  record = &foreign._view_kind;
+  EXPECT_EQ(GetNextRecord(buffer.data(), size, &record), pti_result::PTI_ERROR_BAD_ARGUMENT);
+}
+
+TEST(CompactEncodingTest, RawEntries) {
+  using namespace pti::view::utilities;
+  std::vector<uint8_t> buffer(kBufferSize);
+  std::size_t size = WriteCompactBufferHeader(buffer.data());
+  CompactEncoder encoder;
+  for (std::size_t i = 0; i < 4; ++i) {
+    size += encoder.Encode(CreateKernel(i), buffer.data() + size);
+  }
+
+  std::size_t offset = 0;
+  std::size_t records = 0;
+  std::size_t dictionary_entries = 0;
+  pti_view_compact_entry entry = {};
+  pti_result result = pti_result::PTI_SUCCESS;
+  while ((result = ReadCompactEntry(buffer.data(), size, &offset, &entry)) ==
+         pti_result::PTI_SUCCESS) {
+    if (entry._entry_kind == PTI_VIEW_COMPACT_ENTRY_DICTIONARY) {
+      EXPECT_EQ(entry._dictionary_id, dictionary_entries);
+      ++dictionary_entries;
+    } else {
+      EXPECT_EQ(entry._view_kind, PTI_VIEW_DEVICE_GPU_KERNEL);
+      EXPECT_LT(entry._size, sizeof(pti_view_record_kernel) / 3);
+      ++records;
+    }
+  }
+  EXPECT_EQ(result, pti_result::PTI_STATUS_END_OF_BUFFER);
+  EXPECT_EQ(offset, size);
+  EXPECT_EQ(records, 4);
+  // 2 queues, device, context, 2 names, source file, PCI address
+  EXPECT_EQ(dictionary_entries, 8);
+
+  // Truncated buffer
+  offset = 0;
+  while (ReadCompactEntry(buffer.data(), size - 1, &offset, &entry) == pti_result::PTI_SUCCESS) {
+  }
+  EXPECT_EQ(ReadCompactEntry(buffer.data(), size - 1, &offset, &entry),
+            pti_result::PTI_ERROR_BAD_ARGUMENT);
+
+  // Fixed buffer
+  const auto kernel = CreateKernel(0);
+  offset = 0;
+  EXPECT_EQ(ReadCompactEntry(reinterpret_cast<const uint8_t*>(&kernel), sizeof(kernel), &offset,
+                             &entry),
+            pti_result::PTI_ERROR_BAD_ARGUMENT);
+}
+
+TEST(CompactEncodingTest, BufferBytesReduction) {
+  ASSERT_EQ(Instance().RegisterBufferCallbacks(BufferRequested, BufferCompleted),
+            pti_result::PTI_SUCCESS);
+
+  std::size_t buffer_bytes[2] = {};
+  std::size_t buffer_counts[2] = {};
+  for (auto encoding : {PTI_VIEW_RECORD_ENCODING_FIXED, PTI_VIEW_RECORD_ENCODING_COMPACT}) {
+    Instance().FlushBuffers();
+    {
+      std::lock_guard<std::mutex> lock(delivered_mtx);
+      delivered_buffers.clear();
+    }
+    ASSERT_EQ(Instance().SetRecordEncoding(encoding), pti_result::PTI_SUCCESS);
+
+    // Fresh thread, so its buffers are started with the encoding set
+    std::thread producer([] {
+      for (std::size_t i = 0; i < kRecordCount; ++i) {
+        Instance().InsertRecord(CreateKernel(i));
+        Instance().InsertRecord(CreateCopy(i));
+      }
+    });
+    producer.join();
+    Instance().FlushBuffers();
+
+    const auto deadline = std::chrono::steady_clock::now() + std::chrono::seconds(10);
+    std::size_t kernels = 0;
+    std::size_t copies = 0;
+    while (std::chrono::steady_clock::now() < deadline) {
+      std::lock_guard<std::mutex> lock(delivered_mtx);
+      kernels = 0;
+      copies = 0;
+      buffer_bytes[encoding] = 0;
+      for (auto& buffer : delivered_buffers) {
+        buffer_bytes[encoding] += buffer.size();
+        pti_view_record_base* record = nullptr;
+        while (GetNextRecord(buffer.data(), buffer.size(), &record) == pti_result::PTI_SUCCESS) {
+          if (record->_view_kind == PTI_VIEW_DEVICE_GPU_KERNEL) {
+            auto* kernel = reinterpret_cast<pti_view_record_kernel*>(record);
+            EXPECT_EQ(kernel->_kernel_id, 1000 + kernels);
+            EXPECT_EQ(kernel->_name, kKernelNames[kernels % 2]);
+            EXPECT_STREQ(kernel->_pci_address, "0:3a:0.0");
+            // Timestamps went through the clock model, rate is not exactly 1
+            EXPECT_LE(kernel->_end_timestamp - kernel->_start_timestamp, 9001);
+            EXPECT_GE(kernel->_end_timestamp - kernel->_start_timestamp, 8999);
+            ++kernels;
+          } else if (record->_view_kind == PTI_VIEW_DEVICE_GPU_MEM_COPY) {
+            auto* copy = reinterpret_cast<pti_view_record_memory_copy*>(record);
+            EXPECT_EQ(copy->_correlation_id, 2001 + 2 * copies);
+            EXPECT_EQ(copy->_mem_dst, PTI_VIEW_MEMORY_TYPE_DEVICE);
+            ++copies;
+          }
+        }
+      }
+      buffer_counts[encoding] = delivered_buffers.size();
+      if (kernels == kRecordCount && copies == kRecordCount) {
+        break;
+      }
+      std::this_thread::sleep_for(std::chrono::milliseconds(1));
+    }
+    EXPECT_EQ(kernels, kRecordCount);
+    EXPECT_EQ(copies, kRecordCount);
+  }
+  EXPECT_EQ(Instance().SetRecordEncoding(PTI_VIEW_RECORD_ENCODING_FIXED), pti_result::PTI_SUCCESS);
+
+  const double ratio = static_cast<double>(buffer_bytes[PTI_VIEW_RECORD_ENCODING_FIXED]) /
+                       buffer_bytes[PTI_VIEW_RECORD_ENCODING_COMPACT];
+  std::cout << "Fixed: " << buffer_bytes[PTI_VIEW_RECORD_ENCODING_FIXED] << " bytes in "
+            << buffer_counts[PTI_VIEW_RECORD_ENCODING_FIXED]
+            << " buffers, compact: " << buffer_bytes[PTI_VIEW_RECORD_ENCODING_COMPACT]
+            << " bytes in " << buffer_counts[PTI_VIEW_RECORD_ENCODING_COMPACT] << " buffers ("
+            << ratio << "x)" << std::endl;
+  EXPECT_GE(ratio, 3.0);
+  EXPECT_LT(buffer_counts[PTI_VIEW_RECORD_ENCODING_COMPACT] * 3,
+            buffer_counts[PTI_VIEW_RECORD_ENCODING_FIXED]);
+}
@@ -0,0 +1,213 @@
+#include "external_correlation.h"
+
+#include <gtest/gtest.h>
+
+#include <algorithm>
+#include <atomic>
+#include <chrono>
+#include <cstdlib>
+#include <iostream>
+#include <mutex>
+#include <string>
+#include <thread>
+#include <vector>
+
+#include "pti_view.h"
+#include "view_handler.h"
+
+using pti::view::utilities::ExternalCorrelationStacks;
+using pti::view::utilities::kMaxExternalIdDepth;
+
+namespace {
+
+constexpr std::size_t kBufferSize = 1UL << 20;
+constexpr std::size_t kThreadCount = 8;
+constexpr std::size_t kOpsPerThread = 1UL << 14;
+constexpr std::size_t kKernelsPerOp = 4;
+
+// External IDs and kernel IDs are (thread index << 32 | op)
+constexpr uint64_t OpId(std::size_t thread, std::size_t op) {
+  return (static_cast<uint64_t>(thread) << 32) | op;
+}
+
+// Correlation IDs of the kernels are unique over all the threads
+constexpr uint32_t KernelCorrelationId(std::size_t thread, std::size_t kernel) {
+  return static_cast<uint32_t>(thread * kOpsPerThread * kKernelsPerOp + kernel + 1);
+}
+
+constexpr std::size_t kCorrelationIdCount = kThreadCount * kOpsPerThread * kKernelsPerOp + 1;
+
+std::mutex delivered_mtx;
+std::size_t kernel_records = 0;
+std::size_t correlation_records = 0;
+// External ID of the op and kernel ID, by correlation ID of the kernel
+std::vector<uint64_t> correlated_external_ids(kCorrelationIdCount, UINT64_MAX);
+std::vector<uint64_t> kernel_ids(kCorrelationIdCount, UINT64_MAX);
+
+void BufferRequested(unsigned char** buf, std::size_t* buf_size) {
+  *buf = static_cast<unsigned char*>(std::malloc(kBufferSize));
+  *buf_size = *buf ? kBufferSize : 0;
+}
+
+// Kernels are matched to the correlation records of their op by correlation
+// ID, whatever order the records are delivered in
+void BufferCompleted(unsigned char* buf, std::size_t /*buf_size*/, std::size_t valid_buf_size) {
+  std::lock_guard<std::mutex> lock(delivered_mtx);
+  pti_view_record_base* record = nullptr;
+  while (GetNextRecord(buf, valid_buf_size, &record) == pti_result::PTI_SUCCESS) {
+    if (record->_view_kind == PTI_VIEW_EXTERNAL_CORRELATION) {
+      const auto* ext_record = reinterpret_cast<pti_view_record_external_correlation*>(record);
+      if (ext_record->_external_kind == PTI_VIEW_EXTERNAL_KIND_CUSTOM_0) {
+        correlated_external_ids[ext_record->_correlation_id] = ext_record->_external_id;
+      }
+      ++correlation_records;
+    } else if (record->_view_kind == PTI_VIEW_DEVICE_GPU_KERNEL) {
+      const auto* kernel = reinterpret_cast<pti_view_record_kernel*>(record);
+      kernel_ids[kernel->_correlation_id] = kernel->_kernel_id;
+      ++kernel_records;
+    }
+  }
+  std::free(buf);
+}
+
+std::vector<pti_view_record_external_correlation> TakeRecords(
+    const ExternalCorrelationStacks& stacks, uint32_t correlation_id) {
+  std::vector<pti_view_record_external_correlation> records;
+  stacks.ForEach(correlation_id,
+                 [&records](const auto& ext_record) { records.push_back(ext_record); });
+  return records;
+}
+
+}  // namespace
+
+TEST(ExternalCorrelationTest, PushPopInStackOrder) {
+  ExternalCorrelationStacks stacks;
+  uint64_t external_id = 0;
+  EXPECT_FALSE(stacks.Pop(PTI_VIEW_EXTERNAL_KIND_CUSTOM_0, &external_id));
+  for (uint64_t i = 0; i < kMaxExternalIdDepth; ++i) {
+    EXPECT_TRUE(stacks.Push(PTI_VIEW_EXTERNAL_KIND_CUSTOM_0, i));
+  }
+  // Fixed size, other kinds have their own stacks
+  EXPECT_FALSE(stacks.Push(PTI_VIEW_EXTERNAL_KIND_CUSTOM_0, kMaxExternalIdDepth));
+  EXPECT_TRUE(stacks.Push(PTI_VIEW_EXTERNAL_KIND_CUSTOM_1, 1000));
+  for (uint64_t i = kMaxExternalIdDepth; i > 0; --i) {
+    EXPECT_TRUE(stacks.Pop(PTI_VIEW_EXTERNAL_KIND_CUSTOM_0, &external_id));
+    EXPECT_EQ(external_id, i - 1);
+  }
+  EXPECT_FALSE(stacks.Pop(PTI_VIEW_EXTERNAL_KIND_CUSTOM_0, nullptr));
+  EXPECT_TRUE(stacks.Pop(PTI_VIEW_EXTERNAL_KIND_CUSTOM_1, nullptr));
+
+  EXPECT_FALSE(ExternalCorrelationStacks::IsValidKind(static_cast<pti_view_external_kind>(-1)));
+  EXPECT_FALSE(ExternalCorrelationStacks::IsValidKind(
+      static_cast<pti_view_external_kind>(pti::view::utilities::kExternalKindCount)));
+  EXPECT_EQ(Instance().PushExternalKindId(static_cast<pti_view_external_kind>(100), 1),
+            pti_result::PTI_ERROR_BAD_ARGUMENT);
+}
+
+TEST(ExternalCorrelationTest, EmittedForEveryCommand) {
+  ExternalCorrelationStacks stacks;
+  EXPECT_TRUE(TakeRecords(stacks, 1).empty());
+
+  stacks.Push(PTI_VIEW_EXTERNAL_KIND_CUSTOM_0, 10);
+  stacks.Push(PTI_VIEW_EXTERNAL_KIND_CUSTOM_2, 20);
+  auto records = TakeRecords(stacks, 2);
+  ASSERT_EQ(records.size(), 2UL);
+  EXPECT_EQ(records[0]._external_kind, PTI_VIEW_EXTERNAL_KIND_CUSTOM_0);
+  EXPECT_EQ(records[0]._external_id, 10UL);
+  EXPECT_EQ(records[0]._correlation_id, 2U);
+  EXPECT_EQ(records[0]._view_kind._view_kind, PTI_VIEW_EXTERNAL_CORRELATION);
+  EXPECT_EQ(records[1]._external_kind, PTI_VIEW_EXTERNAL_KIND_CUSTOM_2);
+  EXPECT_EQ(records[1]._external_id, 20UL);
+
+  // Same IDs again, the next command gets its own records
+  records = TakeRecords(stacks, 3);
+  ASSERT_EQ(records.size(), 2UL);
+  EXPECT_EQ(records[0]._correlation_id, 3U);
+  EXPECT_EQ(records[1]._correlation_id, 3U);
+
+  // Nested ID and back: the innermost ID is emitted
+  stacks.Push(PTI_VIEW_EXTERNAL_KIND_CUSTOM_0, 11);
+  records = TakeRecords(stacks, 4);
+  ASSERT_EQ(records.size(), 2UL);
+  EXPECT_EQ(records[0]._external_id, 11UL);
+  stacks.Pop(PTI_VIEW_EXTERNAL_KIND_CUSTOM_0, nullptr);
+  records = TakeRecords(stacks, 5);
+  ASSERT_EQ(records.size(), 2UL);
+  EXPECT_EQ(records[0]._external_id, 10UL);
+
+  // Kinds with an empty stack are not emitted
+  stacks.Pop(PTI_VIEW_EXTERNAL_KIND_CUSTOM_0, nullptr);
+  records = TakeRecords(stacks, 6);
+  ASSERT_EQ(records.size(), 1UL);
+  EXPECT_EQ(records[0]._external_kind, PTI_VIEW_EXTERNAL_KIND_CUSTOM_2);
+  stacks.Pop(PTI_VIEW_EXTERNAL_KIND_CUSTOM_2, nullptr);
+  EXPECT_TRUE(TakeRecords(stacks, 7).empty());
+}
+
+TEST(ExternalCorrelationTest, MultiThreadedCorrelation) {
+  ASSERT_EQ(Instance().RegisterBufferCallbacks(BufferRequested, BufferCompleted),
+            pti_result::PTI_SUCCESS);
+  Instance().FlushBuffers();
+  {
+    std::lock_guard<std::mutex> lock(delivered_mtx);
+    kernel_records = correlation_records = 0;
+    std::fill(correlated_external_ids.begin(), correlated_external_ids.end(), UINT64_MAX);
+    std::fill(kernel_ids.begin(), kernel_ids.end(), UINT64_MAX);
+  }
+  external_collection_enabled = true;
+
+  std::atomic<bool> start = false;
+  std::vector<std::thread> producers;
+  for (std::size_t i = 0; i < kThreadCount; ++i) {
+    producers.emplace_back([&start, i] {
+      ZeKernelCommandExecutionRecord rec;
+      rec.name_ = "ExternalCorrelationTestKernel";
+      rec.tid_ = static_cast<uint32_t>(i);
+      // An outer ID of another kind stays the same for all the ops
+      ASSERT_EQ(Instance().PushExternalKindId(PTI_VIEW_EXTERNAL_KIND_CUSTOM_1, OpId(i, 0)),
+                pti_result::PTI_SUCCESS);
+      while (!start) {
+        std::this_thread::yield();
+      }
+      for (std::size_t op = 0; op < kOpsPerThread; ++op) {
+        ASSERT_EQ(Instance().PushExternalKindId(PTI_VIEW_EXTERNAL_KIND_CUSTOM_0, OpId(i, op)),
+                  pti_result::PTI_SUCCESS);
+        for (std::size_t kernel = 0; kernel < kKernelsPerOp; ++kernel) {
+          rec.kid_ = OpId(i, op);
+          rec.cid_ = KernelCorrelationId(i, op * kKernelsPerOp + kernel);
+          KernelEvent(nullptr, rec);
+        }
+        uint64_t external_id = 0;
+        ASSERT_EQ(Instance().PopExternalKindId(PTI_VIEW_EXTERNAL_KIND_CUSTOM_0, &external_id),
+                  pti_result::PTI_SUCCESS);
+        ASSERT_EQ(external_id, OpId(i, op));
+      }
+      Instance().PopExternalKindId(PTI_VIEW_EXTERNAL_KIND_CUSTOM_1, nullptr);
+    });
+  }
+
+  auto begin = std::chrono::steady_clock::now();
+  start = true;
+  for (auto& producer : producers) {
+    producer.join();
+  }
+  auto end = std::chrono::steady_clock::now();
+  Instance().FlushBuffers();
+  external_collection_enabled = false;
+
+  std::lock_guard<std::mutex> lock(delivered_mtx);
+  EXPECT_EQ(kernel_records, kThreadCount * kOpsPerThread * kKernelsPerOp);
+  // One record per kernel for each of the two kinds
+  EXPECT_EQ(correlation_records, 2 * kernel_records);
+  std::size_t uncorrelated_kernels = 0;
+  for (std::size_t cid = 1; cid < kCorrelationIdCount; ++cid) {
+    uncorrelated_kernels += kernel_ids[cid] != correlated_external_ids[cid];
+  }
+  EXPECT_EQ(uncorrelated_kernels, 0UL);
+
+  const std::chrono::duration<double> time = end - begin;
+  const double rate = kThreadCount * kOpsPerThread / time.count();
+  std::cout << "Threads: " << kThreadCount << ", ops/sec (push, " << kKernelsPerOp
+            << " kernels, pop): " << static_cast<uint64_t>(rate) << std::endl;
+  RecordProperty("ops_per_sec", std::to_string(static_cast<uint64_t>(rate)));
+}
@@ -35,6 +35,7 @@ bool memory_view_record_created = false;
 bool kernel_view_record_created = false;
 uint64_t memory_view_record_count = 0;
 uint64_t kernel_view_record_count = 0;
+std::vector<pti_view_record_memory_copy> memory_copy_records;
 bool buffer_size_atleast_largest_record = false;
 bool ze_initialization_succeeded = false;
 bool ze_tracing_enabled_env = true;
@@ -272,6 +273,7 @@ class MainZeFixtureTest : public ::testing::Test {
     kernel_view_record_created = false;
     memory_view_record_count = 0;
     kernel_view_record_count = 0;
+    memory_copy_records.clear();
   }
 
   void TearDown() override {
@@ -312,6 +314,7 @@ class MainZeFixtureTest : public ::testing::Test {
         case pti_view_kind::PTI_VIEW_DEVICE_GPU_MEM_COPY: {
           memory_view_record_created = true;
           memory_view_record_count += 1;
+          memory_copy_records.push_back(*reinterpret_cast<pti_view_record_memory_copy*>(ptr));
           break;
         }
         case pti_view_kind::PTI_VIEW_DEVICE_GPU_MEM_FILL: {
@@ -406,6 +409,82 @@ class MainZeFixtureTest : public ::testing::Test {
     auto flush_results = ptiFlushAllViews();
     return flush_results;
   }
+
+  // Memory copy is appended while tracing is running. It is either submitted
+  // in the window and synchronized after ptiViewStop(), or submitted after
+  // ptiViewStop() and then once more in the next window. Views are flushed
+  // before the command list is destroyed.
+  void RunCopyAcrossWindows(bool submit_in_window) {
+    ze_result_t status = zeInit(ZE_INIT_FLAG_GPU_ONLY);
+    ze_initialization_succeeded = (status == ZE_RESULT_SUCCESS);
+
+    ze_device_handle_t device = utils::ze::GetGpuDevice(kPtiDeviceId);
+    ze_driver_handle_t driver = utils::ze::GetGpuDriver(kPtiDeviceId);
+    if (device == nullptr || driver == nullptr) {
+      std::cout << "Unable to find GPU device" << std::endl;
+      return;
+    }
+    ze_context_handle_t context = utils::ze::GetContext(driver);
+    PTI_ASSERT(context != nullptr);
+
+    ptiViewEnable(PTI_VIEW_DEVICE_GPU_MEM_COPY);
+    ASSERT_EQ(ptiViewStart(), pti_result::PTI_SUCCESS);
+
+    std::vector<float> a(size, A_VALUE);
+    void* dev_a = nullptr;
+    ze_device_mem_alloc_desc_t alloc_desc = {ZE_STRUCTURE_TYPE_DEVICE_MEM_ALLOC_DESC, nullptr, 0,
+                                             0};
+    status = zeMemAllocDevice(context, &alloc_desc, size * sizeof(float), ALIGN, device, &dev_a);
+    PTI_ASSERT(status == ZE_RESULT_SUCCESS);
+
+    ze_command_list_desc_t cmd_list_desc = {ZE_STRUCTURE_TYPE_COMMAND_LIST_DESC, nullptr, 0, 0};
+    ze_command_list_handle_t cmd_list = nullptr;
+    status = zeCommandListCreate(context, device, &cmd_list_desc, &cmd_list);
+    PTI_ASSERT(status == ZE_RESULT_SUCCESS);
+    status = zeCommandListAppendMemoryCopy(cmd_list, dev_a, a.data(), size * sizeof(float),
+                                           nullptr, 0, nullptr);
+    PTI_ASSERT(status == ZE_RESULT_SUCCESS);
+    status = zeCommandListClose(cmd_list);
+    PTI_ASSERT(status == ZE_RESULT_SUCCESS);
+
+    ze_command_queue_desc_t cmd_queue_desc = {
+        ZE_STRUCTURE_TYPE_COMMAND_QUEUE_DESC, nullptr, 0, 0, 0, ZE_COMMAND_QUEUE_MODE_ASYNCHRONOUS,
+        ZE_COMMAND_QUEUE_PRIORITY_NORMAL};
+    ze_command_queue_handle_t cmd_queue = nullptr;
+    status = zeCommandQueueCreate(context, device, &cmd_queue_desc, &cmd_queue);
+    PTI_ASSERT(status == ZE_RESULT_SUCCESS && cmd_queue != nullptr);
+
+    if (submit_in_window) {
+      status = zeCommandQueueExecuteCommandLists(cmd_queue, 1, &cmd_list, nullptr);
+      PTI_ASSERT(status == ZE_RESULT_SUCCESS);
+      EXPECT_EQ(ptiViewStop(), pti_result::PTI_SUCCESS);
+      status = zeCommandQueueSynchronize(cmd_queue, UINT32_MAX);
+      PTI_ASSERT(status == ZE_RESULT_SUCCESS);
+    } else {
+      EXPECT_EQ(ptiViewStop(), pti_result::PTI_SUCCESS);
+      status = zeCommandQueueExecuteCommandLists(cmd_queue, 1, &cmd_list, nullptr);
+      PTI_ASSERT(status == ZE_RESULT_SUCCESS);
+      status = zeCommandQueueSynchronize(cmd_queue, UINT32_MAX);
+      PTI_ASSERT(status == ZE_RESULT_SUCCESS);
+      EXPECT_EQ(ptiViewStart(), pti_result::PTI_SUCCESS);
+      status = zeCommandQueueExecuteCommandLists(cmd_queue, 1, &cmd_list, nullptr);
+      PTI_ASSERT(status == ZE_RESULT_SUCCESS);
+      status = zeCommandQueueSynchronize(cmd_queue, UINT32_MAX);
+      PTI_ASSERT(status == ZE_RESULT_SUCCESS);
+    }
+    EXPECT_EQ(ptiFlushAllViews(), pti_result::PTI_SUCCESS);
+
+    EXPECT_EQ(ptiViewStart(), pti_result::PTI_SUCCESS);
+    status = zeCommandQueueDestroy(cmd_queue);
+    PTI_ASSERT(status == ZE_RESULT_SUCCESS);
+    status = zeCommandListDestroy(cmd_list);
+    PTI_ASSERT(status == ZE_RESULT_SUCCESS);
+    status = zeMemFree(context, dev_a);
+    PTI_ASSERT(status == ZE_RESULT_SUCCESS);
+    status = zeContextDestroy(context);
+    PTI_ASSERT(status == ZE_RESULT_SUCCESS);
+    ptiViewDisable(PTI_VIEW_DEVICE_GPU_MEM_COPY);
+  }
 };
 
 TEST_F(MainZeFixtureTest, ZeEnableTracingLayer) {
@@ -477,6 +556,25 @@ TEST_F(MainZeFixtureTest, NumberOfExpectedKernelRecords) {
   EXPECT_EQ(kernel_view_record_count, 1 * repeat_count);
 }
 
+TEST_F(MainZeFixtureTest, CopySubmittedInWindowReportedOnCompletion) {
+  EXPECT_EQ(ptiViewSetCallbacks(BufferRequested, BufferCompleted), pti_result::PTI_SUCCESS);
+  RunCopyAcrossWindows(true);
+  ASSERT_EQ(memory_copy_records.size(), 1UL);
+  EXPECT_LE(memory_copy_records[0]._submit_timestamp, memory_copy_records[0]._start_timestamp);
+}
+
+TEST_F(MainZeFixtureTest, CopySubmittedAfterWindowReportedPerSubmission) {
+  EXPECT_EQ(ptiViewSetCallbacks(BufferRequested, BufferCompleted), pti_result::PTI_SUCCESS);
+  RunCopyAcrossWindows(false);
+  ASSERT_EQ(memory_copy_records.size(), 2UL);
+  for (const auto& record : memory_copy_records) {
+    EXPECT_LE(record._append_timestamp, record._submit_timestamp);
+    EXPECT_LE(record._submit_timestamp, record._start_timestamp);
+  }
+  // Second run is submitted after the first one completed
+  EXPECT_GE(memory_copy_records[1]._submit_timestamp, memory_copy_records[0]._end_timestamp);
+}
+
 TEST_F(MainZeFixtureTest, RequestedAndCompletedBuffers) {
   EXPECT_EQ(ptiViewSetCallbacks(BufferRequested, BufferCompleted), pti_result::PTI_SUCCESS);
   RunGemm();
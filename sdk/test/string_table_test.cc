@@ -0,0 +1,137 @@
+#include "string_table.h"
+
+#include <gtest/gtest.h>
+
+#include <atomic>
+#include <chrono>
+#include <cstring>
+#include <iostream>
+#include <string>
+#include <thread>
+#include <vector>
+
+namespace {
+
+constexpr std::size_t kDistinctNames = 50;
+constexpr std::size_t kLookupsPerThread = 1UL << 20;
+
+std::vector<std::string> CreateNames(std::size_t count) {
+  std::vector<std::string> names;
+  for (std::size_t i = 0; i < count; ++i) {
+    names.push_back("ReallyComplicated_KernelName_SomeOp_" + std::to_string(i));
+  }
+  return names;
+}
+
+}  // namespace
+
+TEST(StringTableTest, SameStringSamePointer) {
+  pti::view::utilities::StringTable<> table;
+  std::string name = "gemm";
+  const auto* first = table.Intern(name);
+  const auto* second = table.Intern(std::string("gemm"));
+  EXPECT_EQ(first, second);
+  EXPECT_NE(first, name.c_str());
+  EXPECT_STREQ(first, "gemm");
+  EXPECT_EQ(table.Size(), 1);
+}
+
+TEST(StringTableTest, DistinctStrings) {
+  pti::view::utilities::StringTable<> table;
+  const auto* gemm = table.Intern("gemm");
+  const auto* empty = table.Intern("");
+  const auto* memcpy = table.Intern("zeCommandListAppendMemoryCopy(M2D)");
+  EXPECT_NE(gemm, empty);
+  EXPECT_NE(gemm, memcpy);
+  EXPECT_STREQ(empty, "");
+  EXPECT_STREQ(memcpy, "zeCommandListAppendMemoryCopy(M2D)");
+  EXPECT_EQ(table.Size(), 3);
+}
+
+TEST(StringTableTest, PointersStayValid) {
+  // Single bucket, so every string goes to the same list
+  pti::view::utilities::StringTable<1> table;
+  const auto names = CreateNames(1000);
+  std::vector<const char*> pointers;
+  for (const auto& name : names) {
+    pointers.push_back(table.Intern(name));
+  }
+  for (std::size_t i = 0; i < names.size(); ++i) {
+    EXPECT_STREQ(pointers[i], names[i].c_str());
+    EXPECT_EQ(table.Intern(names[i]), pointers[i]);
+  }
+  EXPECT_EQ(table.Size(), names.size());
+}
+
+TEST(StringTableTest, ConcurrentIntern) {
+  constexpr std::size_t kThreadCount = 16;
+  pti::view::utilities::StringTable<4> table;
+  const auto names = CreateNames(kDistinctNames);
+  std::vector<std::vector<const char*>> pointers(kThreadCount);
+  std::atomic<bool> start = false;
+
+  std::vector<std::thread> threads;
+  for (std::size_t i = 0; i < kThreadCount; ++i) {
+    threads.emplace_back([&, i] {
+      while (!start) {
+        std::this_thread::yield();
+      }
+      // Every thread goes through the names in its own order
+      for (std::size_t j = 0; j < names.size(); ++j) {
+        pointers[i].push_back(table.Intern(names[(i + j) % names.size()]));
+      }
+    });
+  }
+  start = true;
+  for (auto& thread : threads) {
+    thread.join();
+  }
+
+  EXPECT_EQ(table.Size(), names.size());
+  for (std::size_t i = 0; i < kThreadCount; ++i) {
+    for (std::size_t j = 0; j < names.size(); ++j) {
+      const auto* pointer = pointers[i][j];
+      EXPECT_EQ(pointer, table.Intern(names[(i + j) % names.size()]));
+      EXPECT_STREQ(pointer, names[(i + j) % names.size()].c_str());
+    }
+  }
+}
+
+TEST(StringTableTest, ThroughputAndMemory) {
+  const auto names = CreateNames(kDistinctNames);
+  for (std::size_t thread_count : {1, 4, 16}) {
+    pti::view::utilities::StringTable<> table;
+    std::atomic<bool> start = false;
+    std::vector<std::thread> threads;
+    for (std::size_t i = 0; i < thread_count; ++i) {
+      threads.emplace_back([&] {
+        while (!start) {
+          std::this_thread::yield();
+        }
+        for (std::size_t j = 0; j < kLookupsPerThread; ++j) {
+          const auto* name = table.Intern(names[j % names.size()]);
+          ASSERT_NE(name, nullptr);
+        }
+      });
+    }
+
+    auto begin = std::chrono::steady_clock::now();
+    start = true;
+    for (auto& thread : threads) {
+      thread.join();
+    }
+    auto end = std::chrono::steady_clock::now();
+
+    EXPECT_EQ(table.Size(), names.size());
+
+    // Storing a copy per record (as it was done before) would take
+    const auto lookups = thread_count * kLookupsPerThread;
+    const auto copy_bytes = lookups * (sizeof(std::string) + names[0].size() + 1);
+    const std::chrono::duration<double> time = end - begin;
+    std::cout << "Threads: " << thread_count << ", lookups/sec: "
+              << static_cast<uint64_t>(lookups / time.count())
+              << ", table bytes: " << table.Bytes() << " (vs " << copy_bytes
+              << " bytes for per-record copies)" << std::endl;
+    EXPECT_LT(table.Bytes(), copy_bytes);
+  }
+}
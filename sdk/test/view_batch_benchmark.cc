@@ -0,0 +1,208 @@
+#include <gtest/gtest.h>
+
+#include <chrono>
+#include <cstdlib>
+#include <iostream>
+#include <mutex>
+#include <string>
+#include <utility>
+#include <vector>
+
+#include "pti_view.h"
+#include "view_handler.h"
+
+namespace {
+
+constexpr std::size_t kCommandsPerRun = 1UL << 16;
+constexpr std::size_t kBufferSize = 1UL << 20;
+
+std::mutex delivered_mtx;
+std::vector<unsigned char> delivered;
+
+void BufferRequested(unsigned char** buf, std::size_t* buf_size) {
+  *buf = static_cast<unsigned char*>(std::malloc(kBufferSize));
+  *buf_size = *buf ? kBufferSize : 0;
+}
+
+void BufferCompleted(unsigned char* buf, std::size_t /*buf_size*/, std::size_t valid_buf_size) {
+  {
+    std::lock_guard<std::mutex> lock(delivered_mtx);
+    delivered.insert(delivered.end(), buf, buf + valid_buf_size);
+  }
+  std::free(buf);
+}
+
+// Records of all the views of device commands
+PtiViewRecordHandler::CommandViews AllViews() {
+  PtiViewRecordHandler::CommandViews views;
+  views.kernels = true;
+  views.mem_copies = true;
+  views.mem_fills = true;
+  views.external_correlation = true;
+  return views;
+}
+
+// Command completions as ZeCollector reports them: kernels, copies, fills
+// and barriers
+std::vector<ZeKernelCommandExecutionRecord> CreateCommands(std::size_t count) {
+  std::vector<ZeKernelCommandExecutionRecord> commands(count);
+  for (std::size_t i = 0; i < commands.size(); ++i) {
+    auto& rec = commands[i];
+    rec.cid_ = static_cast<uint32_t>(i);
+    rec.kid_ = i;
+    rec.start_time_ = 5000000000000ULL + i * 1000;
+    rec.end_time_ = rec.start_time_ + 500;
+    switch (i % 8) {
+      case 0:
+        rec.kind_ = ZeCommandKind::kMemoryCopy;
+        rec.name_ = "zeCommandListAppendMemoryCopy(D2H)";
+        break;
+      case 1:
+        rec.kind_ = ZeCommandKind::kMemoryFill;
+        rec.name_ = "zeCommandListAppendMemoryFill(D)";
+        break;
+      case 2:
+        rec.kind_ = ZeCommandKind::kBarrier;
+        rec.name_ = "zeCommandListAppendBarrier";
+        break;
+      default:
+        rec.kind_ = ZeCommandKind::kKernel;
+        rec.name_ = "ReallyComplicated_KernelName_SomeOp_" + std::to_string(i % 50);
+        break;
+    }
+  }
+  return commands;
+}
+
+// Completions handed over one by one through the view table, as before
+// batched insertion
+void InsertOneByOne(PtiViewRecordHandler::ViewEventTable& table,
+                    const std::vector<ZeKernelCommandExecutionRecord>& commands) {
+  auto insert = [&table](pti_view_kind kind, const ZeKernelCommandExecutionRecord& rec) {
+    auto view_event_callback = table[kind].load(std::memory_order_acquire);
+    if (view_event_callback) {
+      view_event_callback(nullptr, rec);
+    }
+  };
+  for (const auto& rec : commands) {
+    switch (rec.kind_) {
+      case ZeCommandKind::kMemoryCopy:
+        insert(PTI_VIEW_DEVICE_GPU_MEM_COPY, rec);
+        break;
+      case ZeCommandKind::kMemoryFill:
+        insert(PTI_VIEW_DEVICE_GPU_MEM_FILL, rec);
+        break;
+      case ZeCommandKind::kBarrier:
+        break;
+      default:
+        insert(PTI_VIEW_DEVICE_GPU_KERNEL, rec);
+        break;
+    }
+  }
+}
+
+// Kinds and IDs of the delivered records
+std::vector<std::pair<pti_view_kind, uint64_t>> TakeDelivered() {
+  Instance().FlushBuffers();
+  std::vector<unsigned char> records;
+  {
+    std::lock_guard<std::mutex> lock(delivered_mtx);
+    records.swap(delivered);
+  }
+  std::vector<std::pair<pti_view_kind, uint64_t>> ids;
+  pti_view_record_base* record = nullptr;
+  while (GetNextRecord(records.data(), records.size(), &record) == pti_result::PTI_SUCCESS) {
+    uint64_t id = 0;
+    switch (record->_view_kind) {
+      case PTI_VIEW_DEVICE_GPU_KERNEL:
+        id = reinterpret_cast<pti_view_record_kernel*>(record)->_kernel_id;
+        break;
+      case PTI_VIEW_DEVICE_GPU_MEM_COPY:
+        id = reinterpret_cast<pti_view_record_memory_copy*>(record)->_mem_op_id;
+        break;
+      case PTI_VIEW_DEVICE_GPU_MEM_FILL:
+        id = reinterpret_cast<pti_view_record_memory_fill*>(record)->_mem_op_id;
+        break;
+      case PTI_VIEW_EXTERNAL_CORRELATION:
+        id = reinterpret_cast<pti_view_record_external_correlation*>(record)->_correlation_id;
+        break;
+      default:
+        break;
+    }
+    ids.emplace_back(record->_view_kind, id);
+  }
+  return ids;
+}
+
+}  // namespace
+
+class ViewBatchBenchmark : public ::testing::TestWithParam<std::size_t> {
+ protected:
+  void SetUp() override {
+    ASSERT_EQ(Instance().RegisterBufferCallbacks(BufferRequested, BufferCompleted),
+              pti_result::PTI_SUCCESS);
+    TakeDelivered();
+    table_[PTI_VIEW_DEVICE_GPU_KERNEL] = KernelEvent;
+    table_[PTI_VIEW_DEVICE_GPU_MEM_COPY] = MemCopyEvent;
+    table_[PTI_VIEW_DEVICE_GPU_MEM_FILL] = MemFillEvent;
+    external_collection_enabled = true;
+  }
+
+  void TearDown() override { external_collection_enabled = false; }
+
+  // A new external ID, correlated to the first kernel inserted next
+  void PushExternalId(uint64_t external_id) {
+    Instance().PopExternalKindId(PTI_VIEW_EXTERNAL_KIND_CUSTOM_0, nullptr);
+    ASSERT_EQ(Instance().PushExternalKindId(PTI_VIEW_EXTERNAL_KIND_CUSTOM_0, external_id),
+              pti_result::PTI_SUCCESS);
+  }
+
+  PtiViewRecordHandler::ViewEventTable table_ = {};
+};
+
+TEST_P(ViewBatchBenchmark, InsertRecordsPerBatch) {
+  const auto batch_size = GetParam();
+  const auto commands = CreateCommands(batch_size);
+  const auto batches = kCommandsPerRun / batch_size;
+  const auto views = AllViews();
+
+  PushExternalId(1);
+  auto begin = std::chrono::steady_clock::now();
+  for (std::size_t i = 0; i < batches; ++i) {
+    InsertOneByOne(table_, commands);
+  }
+  auto end = std::chrono::steady_clock::now();
+  const std::chrono::duration<double, std::nano> one_by_one_time = end - begin;
+  const auto one_by_one = TakeDelivered();
+
+  PushExternalId(2);
+  begin = std::chrono::steady_clock::now();
+  for (std::size_t i = 0; i < batches; ++i) {
+    Instance().InsertRecords(commands, views);
+  }
+  end = std::chrono::steady_clock::now();
+  const std::chrono::duration<double, std::nano> batched_time = end - begin;
+  const auto batched = TakeDelivered();
+
+  // Barriers have no records, the first kernel comes with an external
+  // correlation record
+  std::size_t records_per_batch = 0;
+  for (const auto& rec : commands) {
+    records_per_batch += rec.kind_ != ZeCommandKind::kBarrier;
+  }
+  const bool with_kernels = batch_size > 3;
+  EXPECT_EQ(one_by_one.size(), batches * records_per_batch + with_kernels);
+  // Same records, in the same order
+  EXPECT_EQ(batched, one_by_one);
+
+  const auto commands_inserted = static_cast<double>(batches * batch_size);
+  const auto one_by_one_ns = one_by_one_time.count() / commands_inserted;
+  const auto batched_ns = batched_time.count() / commands_inserted;
+  std::cout << "Batch: " << batch_size << " commands, per command one by one: " << one_by_one_ns
+            << " ns, batched: " << batched_ns << " ns (" << one_by_one_ns / batched_ns << "x)"
+            << std::endl;
+  RecordProperty("one_by_one_ns_per_command", std::to_string(one_by_one_ns));
+  RecordProperty("batched_ns_per_command", std::to_string(batched_ns));
+}
+
+INSTANTIATE_TEST_SUITE_P(BatchSizes, ViewBatchBenchmark, ::testing::Values(1, 64, 4096));
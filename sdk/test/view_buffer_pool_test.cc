@@ -0,0 +1,255 @@
+#include "view_buffer_pool.h"
+
+#include <gtest/gtest.h>
+
+#include <chrono>
+#include <condition_variable>
+#include <cstdlib>
+#include <cstring>
+#include <iostream>
+#include <mutex>
+#include <queue>
+#include <set>
+#include <thread>
+#include <vector>
+
+#include "pti_view.h"
+#include "utils/test_helpers.h"
+#include "view_handler.h"
+
+using pti::view::utilities::ViewBufferPool;
+
+namespace {
+
+constexpr std::size_t kPoolBufferSize = 1UL << 16;
+constexpr std::size_t kPoolBufferCount = 16;
+constexpr std::size_t kRecordCount = 20000;
+constexpr uint64_t kBaseTimestamp = 5000000000000ULL;
+
+std::mutex delivered_mtx;
+std::size_t pool_buffers = 0;
+std::size_t user_buffers = 0;
+std::size_t delivered_records = 0;
+
+void BufferRequested(unsigned char** buf, std::size_t* buf_size) {
+  *buf = static_cast<unsigned char*>(std::malloc(kPoolBufferSize));
+  *buf_size = *buf ? kPoolBufferSize : 0;
+}
+
+void BufferCompleted(unsigned char* buf, std::size_t /*buf_size*/, std::size_t valid_buf_size) {
+  std::size_t records = 0;
+  pti_view_record_base* record = nullptr;
+  while (GetNextRecord(buf, valid_buf_size, &record) == pti_result::PTI_SUCCESS) {
+    ++records;
+  }
+  const bool from_pool = Instance().ReturnBuffer(buf) == pti_result::PTI_SUCCESS;
+  if (!from_pool) {
+    std::free(buf);
+  }
+  std::lock_guard<std::mutex> lock(delivered_mtx);
+  delivered_records += records;
+  ++(from_pool ? pool_buffers : user_buffers);
+}
+
+}  // namespace
+
+TEST(ViewBufferPoolTest, AcquireAllBuffers) {
+  ViewBufferPool pool(kPoolBufferSize, kPoolBufferCount, PTI_VIEW_BUFFER_POOL_DEFAULT);
+  EXPECT_EQ(pool.BufferSize(), kPoolBufferSize);
+  EXPECT_EQ(pool.BufferCount(), kPoolBufferCount);
+
+  std::set<unsigned char*> buffers;
+  for (std::size_t i = 0; i < kPoolBufferCount; ++i) {
+    auto* buffer = pool.Acquire();
+    ASSERT_NE(buffer, nullptr);
+    EXPECT_TRUE(pool.Owns(buffer));
+    EXPECT_EQ(reinterpret_cast<uintptr_t>(buffer) % sysconf(_SC_PAGESIZE), 0UL);
+    std::memset(buffer, 0xab, kPoolBufferSize);
+    buffers.insert(buffer);
+  }
+  EXPECT_EQ(buffers.size(), kPoolBufferCount);
+  EXPECT_EQ(pool.Acquire(), nullptr);
+
+  for (auto* buffer : buffers) {
+    EXPECT_TRUE(pool.Release(buffer));
+  }
+  // Same buffers are reused
+  for (std::size_t i = 0; i < kPoolBufferCount; ++i) {
+    EXPECT_EQ(buffers.count(pool.Acquire()), 1UL);
+  }
+  EXPECT_EQ(pool.Acquire(), nullptr);
+}
+
+TEST(ViewBufferPoolTest, RejectsForeignBuffers) {
+  ViewBufferPool pool(kPoolBufferSize, kPoolBufferCount, PTI_VIEW_BUFFER_POOL_DEFAULT);
+  auto* buffer = pool.Acquire();
+  ASSERT_NE(buffer, nullptr);
+
+  std::vector<unsigned char> foreign(kPoolBufferSize);
+  EXPECT_FALSE(pool.Release(foreign.data()));
+  EXPECT_FALSE(pool.Release(nullptr));
+  EXPECT_FALSE(pool.Release(buffer + 1));
+
+  EXPECT_TRUE(pool.Release(buffer));
+  // Already released
+  EXPECT_FALSE(pool.Release(buffer));
+}
+
+TEST(ViewBufferPoolTest, HugePagesPreTouched) {
+  ViewBufferPool pool(kPoolBufferSize, kPoolBufferCount,
+                      PTI_VIEW_BUFFER_POOL_HUGE_PAGES | PTI_VIEW_BUFFER_POOL_PRE_TOUCH);
+  std::cout << "Reserved huge pages: " << std::boolalpha << pool.UsesHugePages() << std::endl;
+  std::vector<unsigned char*> buffers;
+  while (auto* buffer = pool.Acquire()) {
+    // Pre-touched memory reads as zeroes, just like fresh memory
+    EXPECT_EQ(buffer[0], 0);
+    EXPECT_EQ(buffer[kPoolBufferSize - 1], 0);
+    std::memset(buffer, 0xcd, kPoolBufferSize);
+    buffers.push_back(buffer);
+  }
+  EXPECT_EQ(buffers.size(), kPoolBufferCount);
+  for (auto* buffer : buffers) {
+    EXPECT_TRUE(pool.Release(buffer));
+  }
+}
+
+TEST(ViewBufferPoolTest, ProducersAndConsumer) {
+  constexpr std::size_t kProducers = 4;
+  constexpr std::size_t kBuffersPerProducer = 5000;
+  ViewBufferPool pool(kPoolBufferSize, kPoolBufferCount, PTI_VIEW_BUFFER_POOL_DEFAULT);
+
+  std::mutex queue_mtx;
+  std::condition_variable queue_cv;
+  std::queue<unsigned char*> filled;
+  std::size_t done = 0;
+
+  std::vector<std::thread> producers;
+  for (std::size_t p = 0; p < kProducers; ++p) {
+    producers.emplace_back([&, p] {
+      for (std::size_t i = 0; i < kBuffersPerProducer;) {
+        auto* buffer = pool.Acquire();
+        if (!buffer) {
+          std::this_thread::yield();
+          continue;
+        }
+        // Buffer must not be handed out to anybody else meanwhile
+        std::memset(buffer, static_cast<int>(p), 64);
+        {
+          std::lock_guard<std::mutex> lock(queue_mtx);
+          filled.push(buffer);
+        }
+        queue_cv.notify_one();
+        ++i;
+      }
+    });
+  }
+
+  std::size_t corrupted = 0;
+  std::thread consumer([&] {
+    while (done < kProducers * kBuffersPerProducer) {
+      std::unique_lock<std::mutex> lock(queue_mtx);
+      queue_cv.wait(lock, [&] { return !filled.empty(); });
+      auto* buffer = filled.front();
+      filled.pop();
+      lock.unlock();
+      for (std::size_t i = 1; i < 64; ++i) {
+        corrupted += buffer[i] != buffer[0];
+      }
+      EXPECT_TRUE(pool.Release(buffer));
+      ++done;
+    }
+  });
+
+  for (auto& producer : producers) {
+    producer.join();
+  }
+  consumer.join();
+  EXPECT_EQ(corrupted, 0UL);
+  EXPECT_EQ(done, kProducers * kBuffersPerProducer);
+}
+
+TEST(ViewBufferPoolTest, BufferTurnaroundCost) {
+  constexpr std::size_t kBufferSize = 1UL << 20;
+  constexpr std::size_t kIterations = 2000;
+  const auto page_size = static_cast<std::size_t>(sysconf(_SC_PAGESIZE));
+  auto fill = [page_size](unsigned char* buffer) {
+    for (std::size_t offset = 0; offset < kBufferSize; offset += page_size) {
+      buffer[offset] = 1;
+    }
+  };
+
+  auto begin = std::chrono::steady_clock::now();
+  for (std::size_t i = 0; i < kIterations; ++i) {
+    auto* buffer = static_cast<unsigned char*>(::operator new(kBufferSize));
+    fill(buffer);
+    ::operator delete(buffer);
+  }
+  const std::chrono::duration<double, std::nano> allocation_time =
+      std::chrono::steady_clock::now() - begin;
+
+  ViewBufferPool pool(kBufferSize, 4, PTI_VIEW_BUFFER_POOL_PRE_TOUCH);
+  begin = std::chrono::steady_clock::now();
+  for (std::size_t i = 0; i < kIterations; ++i) {
+    auto* buffer = pool.Acquire();
+    ASSERT_NE(buffer, nullptr);
+    fill(buffer);
+    ASSERT_TRUE(pool.Release(buffer));
+  }
+  const std::chrono::duration<double, std::nano> pool_time =
+      std::chrono::steady_clock::now() - begin;
+
+  const auto allocation_ns = allocation_time.count() / kIterations;
+  const auto pool_ns = pool_time.count() / kIterations;
+  std::cout << "Per 1MB buffer, allocated: " << allocation_ns << " ns, pooled: " << pool_ns
+            << " ns" << std::endl;
+  RecordProperty("allocation_ns_per_buffer", std::to_string(allocation_ns));
+  RecordProperty("pool_ns_per_buffer", std::to_string(pool_ns));
+}
+
+TEST(ViewBufferPoolTest, HandlerUsesPool) {
+  ASSERT_EQ(Instance().RegisterBufferCallbacks(BufferRequested, BufferCompleted),
+            pti_result::PTI_SUCCESS);
+  EXPECT_EQ(Instance().SetBufferPool(8, kPoolBufferCount, PTI_VIEW_BUFFER_POOL_DEFAULT),
+            pti_result::PTI_ERROR_BAD_ARGUMENT);
+  EXPECT_EQ(Instance().SetBufferPool(kPoolBufferSize, 0, PTI_VIEW_BUFFER_POOL_DEFAULT),
+            pti_result::PTI_ERROR_BAD_ARGUMENT);
+  EXPECT_EQ(Instance().SetBufferPool(kPoolBufferSize, kPoolBufferCount, 0x80),
+            pti_result::PTI_ERROR_BAD_ARGUMENT);
+  ASSERT_EQ(Instance().SetBufferPool(kPoolBufferSize, kPoolBufferCount,
+                                     PTI_VIEW_BUFFER_POOL_PRE_TOUCH),
+            pti_result::PTI_SUCCESS);
+  // Set once
+  EXPECT_EQ(Instance().SetBufferPool(kPoolBufferSize, kPoolBufferCount,
+                                     PTI_VIEW_BUFFER_POOL_DEFAULT),
+            pti_result::PTI_ERROR_BAD_ARGUMENT);
+
+  std::thread producer([] {
+    for (std::size_t i = 0; i < kRecordCount; ++i) {
+      auto record = pti::test::utils::CreateRecord<pti_view_record_kernel>();
+      record._kernel_id = i;
+      record._start_timestamp = kBaseTimestamp + i * 1000;
+      record._end_timestamp = record._start_timestamp + 500;
+      Instance().InsertRecord(record);
+    }
+  });
+  producer.join();
+  Instance().FlushBuffers();
+
+  const auto deadline = std::chrono::steady_clock::now() + std::chrono::seconds(10);
+  while (std::chrono::steady_clock::now() < deadline) {
+    {
+      std::lock_guard<std::mutex> lock(delivered_mtx);
+      if (delivered_records == kRecordCount) {
+        break;
+      }
+    }
+    std::this_thread::sleep_for(std::chrono::milliseconds(1));
+  }
+
+  std::lock_guard<std::mutex> lock(delivered_mtx);
+  EXPECT_EQ(delivered_records, kRecordCount);
+  // More buffers than the pool holds, so they were recycled
+  EXPECT_GT(pool_buffers, kPoolBufferCount);
+  std::cout << "Pool buffers: " << pool_buffers << ", user buffers: " << user_buffers
+            << std::endl;
+}
@@ -0,0 +1,273 @@
+#include <gtest/gtest.h>
+
+#include <algorithm>
+#include <array>
+#include <atomic>
+#include <chrono>
+#include <cstdlib>
+#include <iostream>
+#include <map>
+#include <mutex>
+#include <thread>
+#include <vector>
+
+#include "pti_view.h"
+#include "utils/test_helpers.h"
+#include "view_buffer.h"
+#include "view_handler.h"
+
+namespace {
+
+using pti::view::utilities::ViewBuffer;
+using pti::view::utilities::ViewBufferQueue;
+
+constexpr std::size_t kProducers = 3;
+constexpr std::size_t kBuffersPerProducer = 100;
+constexpr std::size_t kConsumers = 4;
+constexpr std::size_t kBufferSize = 1UL << 14;
+constexpr std::size_t kRecordsPerThread = 4000;
+constexpr auto kSlowCallback = std::chrono::milliseconds(2);
+constexpr uint64_t kBaseTimestamp = 5000000000000ULL;
+
+std::array<unsigned char, kProducers * kBuffersPerProducer> backing = {};
+
+// Buffer position tells the sequence number inside the producer
+ViewBuffer CreateBuffer(std::size_t producer, std::size_t sequence) {
+  return ViewBuffer(backing.data() + producer * kBuffersPerProducer, kBuffersPerProducer,
+                    sequence);
+}
+
+std::size_t GetProducer(const ViewBuffer& buffer) {
+  return (buffer.GetBuffer() - backing.data()) / kBuffersPerProducer;
+}
+
+// Pushes kBuffersPerProducer buffers from every producer and delivers them
+// with kConsumers threads, returns max number of parallel deliveries
+std::size_t DeliverAll(ViewBufferQueue& queue, bool ordered,
+                       std::array<std::vector<std::size_t>, kProducers>& delivered) {
+  std::atomic<bool> stop = false;
+  std::mutex delivered_mtx;
+  std::array<std::atomic<int>, kProducers> in_delivery = {};
+  std::atomic<std::size_t> parallel = 0;
+  std::atomic<std::size_t> max_parallel = 0;
+  std::atomic<std::size_t> producer_overlaps = 0;
+
+  std::vector<std::thread> consumers;
+  for (std::size_t i = 0; i < kConsumers; ++i) {
+    consumers.emplace_back([&] {
+      while (auto entry = queue.PopForDelivery(ordered, [&stop] { return stop.load(); })) {
+        const auto producer = GetProducer(entry->buffer);
+        producer_overlaps += in_delivery[producer]++ != 0;
+        const auto now_parallel = ++parallel;
+        auto observed = max_parallel.load();
+        while (now_parallel > observed &&
+               !max_parallel.compare_exchange_weak(observed, now_parallel)) {
+        }
+        {
+          std::lock_guard<std::mutex> lock(delivered_mtx);
+          delivered[producer].push_back(entry->buffer.GetValidBytes());
+        }
+        std::this_thread::sleep_for(std::chrono::microseconds(200));
+        --parallel;
+        --in_delivery[producer];
+        queue.DeliveryDone(*entry);
+      }
+    });
+  }
+
+  std::vector<std::thread> producers;
+  for (std::size_t p = 0; p < kProducers; ++p) {
+    producers.emplace_back([&queue, p] {
+      for (std::size_t i = 0; i < kBuffersPerProducer; ++i) {
+        queue.Push(CreateBuffer(p, i), &backing[p * kBuffersPerProducer]);
+      }
+    });
+  }
+  for (auto& producer : producers) {
+    producer.join();
+  }
+  queue.WaitUntilEmptyOr(false);
+  stop = true;
+  queue.NotifyAll();
+  for (auto& consumer : consumers) {
+    consumer.join();
+  }
+  if (ordered) {
+    EXPECT_EQ(producer_overlaps, 0UL);
+  }
+  return max_parallel;
+}
+
+std::mutex callback_mtx;
+std::size_t delivered_records = 0;
+// First kernel ID of every delivered buffer per thread, in the order
+// the callbacks started
+std::map<uint32_t, std::vector<uint64_t>> first_kernel_ids;
+
+void BufferRequested(unsigned char** buf, std::size_t* buf_size) {
+  *buf = static_cast<unsigned char*>(std::malloc(kBufferSize));
+  *buf_size = *buf ? kBufferSize : 0;
+}
+
+// Deliberately slow consumer
+void BufferCompleted(unsigned char* buf, std::size_t /*buf_size*/, std::size_t valid_buf_size) {
+  std::size_t records = 0;
+  pti_view_record_base* record = nullptr;
+  while (GetNextRecord(buf, valid_buf_size, &record) == pti_result::PTI_SUCCESS) {
+    if (record->_view_kind == PTI_VIEW_DEVICE_GPU_KERNEL) {
+      auto* kernel = reinterpret_cast<pti_view_record_kernel*>(record);
+      if (!records) {
+        std::lock_guard<std::mutex> lock(callback_mtx);
+        first_kernel_ids[kernel->_thread_id].push_back(kernel->_kernel_id);
+      }
+      ++records;
+    }
+  }
+  std::this_thread::sleep_for(kSlowCallback);
+  std::free(buf);
+  std::lock_guard<std::mutex> lock(callback_mtx);
+  delivered_records += records;
+}
+
+// Time two threads take to produce their records
+double ProduceRecords() {
+  const auto begin = std::chrono::steady_clock::now();
+  std::vector<std::thread> producers;
+  for (uint32_t t = 0; t < 2; ++t) {
+    producers.emplace_back([t] {
+      for (std::size_t i = 0; i < kRecordsPerThread; ++i) {
+        auto record = pti::test::utils::CreateRecord<pti_view_record_kernel>();
+        record._thread_id = t;
+        record._kernel_id = i;
+        record._start_timestamp = kBaseTimestamp + i * 1000;
+        record._end_timestamp = record._start_timestamp + 500;
+        Instance().InsertRecord(record);
+      }
+    });
+  }
+  for (auto& producer : producers) {
+    producer.join();
+  }
+  const std::chrono::duration<double, std::milli> time = std::chrono::steady_clock::now() - begin;
+  Instance().FlushBuffers();
+  return time.count();
+}
+
+}  // namespace
+
+TEST(ViewDeliveryTest, OrderedPerProducer) {
+  ViewBufferQueue queue(8);
+  std::array<std::vector<std::size_t>, kProducers> delivered;
+  DeliverAll(queue, true, delivered);
+  for (const auto& sequence : delivered) {
+    ASSERT_EQ(sequence.size(), kBuffersPerProducer);
+    EXPECT_TRUE(std::is_sorted(sequence.begin(), sequence.end()));
+  }
+}
+
+TEST(ViewDeliveryTest, UnorderedInParallel) {
+  ViewBufferQueue queue(8);
+  std::array<std::vector<std::size_t>, kProducers> delivered;
+  const auto max_parallel = DeliverAll(queue, false, delivered);
+  for (auto& sequence : delivered) {
+    ASSERT_EQ(sequence.size(), kBuffersPerProducer);
+    std::sort(sequence.begin(), sequence.end());
+    EXPECT_EQ(std::adjacent_find(sequence.begin(), sequence.end()), sequence.end());
+  }
+  EXPECT_GT(max_parallel, 1UL);
+}
+
+TEST(ViewDeliveryTest, WaitsForDeliveries) {
+  ViewBufferQueue queue;
+  std::atomic<bool> delivered = false;
+  queue.Push(CreateBuffer(0, 1));
+  std::thread consumer([&] {
+    auto entry = queue.PopForDelivery(true, [] { return false; });
+    std::this_thread::sleep_for(std::chrono::milliseconds(50));
+    delivered = true;
+    queue.DeliveryDone(*entry);
+  });
+  queue.WaitUntilEmptyOr(false);
+  EXPECT_TRUE(delivered);
+  consumer.join();
+}
+
+TEST(ViewDeliveryTest, QueueStats) {
+  ViewBufferQueue queue(1);
+  queue.Push(CreateBuffer(0, 1));
+  std::thread producer([&queue] { queue.Push(CreateBuffer(0, 2)); });
+  std::this_thread::sleep_for(std::chrono::milliseconds(20));
+  for (int i = 0; i < 2; ++i) {
+    auto entry = queue.PopForDelivery(true, [] { return false; });
+    ASSERT_TRUE(entry.has_value());
+    queue.DeliveryDone(*entry);
+  }
+  producer.join();
+
+  const auto stats = queue.GetStats();
+  EXPECT_EQ(stats.delivered, 2UL);
+  EXPECT_EQ(stats.size, 0UL);
+  EXPECT_EQ(stats.max_size, 1UL);
+  EXPECT_EQ(stats.producer_waits, 1UL);
+  EXPECT_GE(stats.producer_wait_time, 10'000'000UL);
+  EXPECT_GE(stats.max_delivery_latency, 10'000'000UL);
+  EXPECT_GE(stats.total_delivery_latency, stats.max_delivery_latency);
+}
+
+TEST(ViewDeliveryTest, SlowCallbackThroughput) {
+  ASSERT_EQ(Instance().RegisterBufferCallbacks(BufferRequested, BufferCompleted),
+            pti_result::PTI_SUCCESS);
+  EXPECT_EQ(Instance().SetConsumerThreads(0, PTI_VIEW_DELIVERY_ORDERED),
+            pti_result::PTI_ERROR_BAD_ARGUMENT);
+  EXPECT_EQ(Instance().SetConsumerThreads(kMaxConsumerThreads + 1, PTI_VIEW_DELIVERY_ORDERED),
+            pti_result::PTI_ERROR_BAD_ARGUMENT);
+  EXPECT_EQ(Instance().GetDeliveryStats(nullptr), pti_result::PTI_ERROR_BAD_ARGUMENT);
+  // Buffers still to be delivered by the thread registering the callbacks
+  Instance().FlushBuffers();
+  {
+    std::lock_guard<std::mutex> lock(callback_mtx);
+    delivered_records = 0;
+  }
+
+  // Ordered delivery runs at most one callback per producer thread at a time
+  constexpr int kConfigs = 3;
+  const uint32_t consumer_counts[kConfigs] = {1, kConsumers, kConsumers};
+  const pti_view_delivery_order orders[kConfigs] = {
+      PTI_VIEW_DELIVERY_ORDERED, PTI_VIEW_DELIVERY_ORDERED, PTI_VIEW_DELIVERY_UNORDERED};
+  double times[kConfigs] = {};
+  pti_view_delivery_stats stats[kConfigs] = {};
+  for (int i = 0; i < kConfigs; ++i) {
+    ASSERT_EQ(Instance().SetConsumerThreads(consumer_counts[i], orders[i]),
+              pti_result::PTI_SUCCESS);
+    {
+      std::lock_guard<std::mutex> lock(callback_mtx);
+      first_kernel_ids.clear();
+    }
+    times[i] = ProduceRecords();
+    ASSERT_EQ(Instance().GetDeliveryStats(&stats[i]), pti_result::PTI_SUCCESS);
+
+    std::lock_guard<std::mutex> lock(callback_mtx);
+    EXPECT_EQ(delivered_records, 2 * kRecordsPerThread * (i + 1));
+    if (orders[i] == PTI_VIEW_DELIVERY_ORDERED) {
+      for (const auto& [thread_id, kernel_ids] : first_kernel_ids) {
+        EXPECT_TRUE(std::is_sorted(kernel_ids.begin(), kernel_ids.end()));
+      }
+    }
+  }
+  EXPECT_EQ(Instance().SetConsumerThreads(1, PTI_VIEW_DELIVERY_ORDERED), pti_result::PTI_SUCCESS);
+
+  EXPECT_GT(stats[1]._buffers_delivered, stats[0]._buffers_delivered);
+  EXPECT_GE(stats[1]._producer_waits, stats[0]._producer_waits);
+  EXPECT_EQ(stats[2]._queue_depth, 0UL);
+  EXPECT_GE(stats[0]._max_delivery_latency_ns,
+            static_cast<uint64_t>(std::chrono::nanoseconds(kSlowCallback).count()));
+  std::cout << "Producing with a slow callback, 1 consumer: " << times[0] << " ms, "
+            << kConsumers << " consumers ordered: " << times[1] << " ms (" << times[0] / times[1]
+            << "x), unordered: " << times[2] << " ms (" << times[0] / times[2] << "x)"
+            << std::endl;
+  std::cout << "Producer waits: " << stats[0]._producer_waits << " / "
+            << stats[1]._producer_waits - stats[0]._producer_waits << " / "
+            << stats[2]._producer_waits - stats[1]._producer_waits << std::endl;
+  EXPECT_LT(times[1], times[0]);
+  EXPECT_LT(times[2], times[0]);
+}
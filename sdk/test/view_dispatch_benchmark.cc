@@ -0,0 +1,209 @@
+#include <gtest/gtest.h>
+
+#include <chrono>
+#include <functional>
+#include <iostream>
+#include <string>
+#include <vector>
+
+#include "pti_view.h"
+#include "view_handler.h"
+
+namespace {
+
+constexpr std::size_t kRecordCount = 1UL << 12;
+constexpr std::size_t kIterations = 256;
+
+constexpr const char* kDirections[] = {"M", "H", "D", "S"};
+
+std::size_t dispatched = 0;
+pti_view_record_memory_copy last_copy = {};
+pti_view_record_memory_fill last_fill = {};
+
+// Name based classification and lookup as they were before command kinds
+using LegacyViewEventTable = pti::view::utilities::ThreadSafeHashTable<
+    std::string, std::function<void(void*, const ZeKernelCommandExecutionRecord&)>>;
+
+void LegacySetMemCopyType(pti_view_record_memory_copy& mem_record,
+                          const ZeKernelCommandExecutionRecord& rec) {
+  std::size_t found_pos = rec.name_.find_last_of("(");
+  std::string tmp_str = rec.name_.substr(found_pos);
+  // Same sequence of comparisons as the removed if chain
+  static const char* const kSuffixes[] = {"(M2M)", "(M2H)", "(M2D)", "(M2S)", "(H2M)", "(H2H)",
+                                          "(H2D)", "(H2S)", "(D2M)", "(D2H)", "(D2D)", "(D2S)",
+                                          "(S2M)", "(S2H)", "(S2D)", "(S2S)"};
+  for (uint32_t type = 0; type < kZeMemoryTypeCount * kZeMemoryTypeCount; ++type) {
+    if (tmp_str == kSuffixes[type]) {
+      mem_record._memcpy_type = static_cast<pti_view_memcpy_type>(type);
+      mem_record._mem_src = static_cast<pti_view_memory_type>(type / kZeMemoryTypeCount);
+      mem_record._mem_dst = static_cast<pti_view_memory_type>(type % kZeMemoryTypeCount);
+      return;
+    }
+  }
+}
+
+void LegacySetMemFillType(pti_view_record_memory_fill& mem_record,
+                          const ZeKernelCommandExecutionRecord& rec) {
+  std::size_t found_pos = rec.name_.find_last_of("(");
+  std::string tmp_str = rec.name_.substr(found_pos);
+  static const char* const kSuffixes[] = {"(M)", "(H)", "(D)", "(S)"};
+  for (uint32_t type = 0; type < kZeMemoryTypeCount; ++type) {
+    if (tmp_str == kSuffixes[type]) {
+      mem_record._mem_type = static_cast<pti_view_memory_type>(type);
+      return;
+    }
+  }
+}
+
+void LegacyDispatch(LegacyViewEventTable& table,
+                    const std::vector<ZeKernelCommandExecutionRecord>& records) {
+  auto dispatch = [&table](const std::string& key, const ZeKernelCommandExecutionRecord& rec) {
+    auto* view_event_callback = table.TryFindElement(key);
+    if (view_event_callback) {
+      (*view_event_callback)(nullptr, rec);
+    }
+  };
+  for (const auto& rec : records) {
+    if (rec.name_.find("zeCommandListAppendMemoryCopy") != std::string::npos) {
+      dispatch("zeCommandListAppendMemoryCopy", rec);
+    } else if (rec.name_.find("zeCommandListAppendMemoryFill") != std::string::npos) {
+      dispatch("zeCommandListAppendMemoryFill", rec);
+    } else if (rec.name_.find("zeCommandListAppendBarrier") != std::string::npos) {
+    } else {
+      dispatch("KernelEvent", rec);
+    }
+  }
+}
+
+void Dispatch(PtiViewRecordHandler::ViewEventTable& table,
+              const std::vector<ZeKernelCommandExecutionRecord>& records) {
+  auto dispatch = [&table](pti_view_kind kind, const ZeKernelCommandExecutionRecord& rec) {
+    auto view_event_callback = table[kind].load(std::memory_order_acquire);
+    if (view_event_callback) {
+      view_event_callback(nullptr, rec);
+    }
+  };
+  for (const auto& rec : records) {
+    switch (rec.kind_) {
+      case ZeCommandKind::kMemoryCopy:
+        dispatch(PTI_VIEW_DEVICE_GPU_MEM_COPY, rec);
+        break;
+      case ZeCommandKind::kMemoryFill:
+        dispatch(PTI_VIEW_DEVICE_GPU_MEM_FILL, rec);
+        break;
+      case ZeCommandKind::kBarrier:
+        break;
+      default:
+        dispatch(PTI_VIEW_DEVICE_GPU_KERNEL, rec);
+        break;
+    }
+  }
+}
+
+// Mix of kernels, copies in all directions, fills and barriers
+std::vector<ZeKernelCommandExecutionRecord> CreateRecords() {
+  std::vector<ZeKernelCommandExecutionRecord> records(kRecordCount);
+  for (std::size_t i = 0; i < records.size(); ++i) {
+    auto& rec = records[i];
+    const auto src = static_cast<uint32_t>(i % kZeMemoryTypeCount);
+    const auto dst = static_cast<uint32_t>((i / kZeMemoryTypeCount) % kZeMemoryTypeCount);
+    rec.src_mem_type_ = static_cast<ZeMemoryType>(src);
+    rec.dst_mem_type_ = static_cast<ZeMemoryType>(dst);
+    switch (i % 8) {
+      case 0:
+      case 1:
+        rec.kind_ = ZeCommandKind::kMemoryCopy;
+        rec.name_ = std::string("zeCommandListAppendMemoryCopy(") + kDirections[src] + "2" +
+                    kDirections[dst] + ")";
+        break;
+      case 2:
+        rec.kind_ = ZeCommandKind::kMemoryFill;
+        rec.name_ = std::string("zeCommandListAppendMemoryFill(") + kDirections[src] + ")";
+        break;
+      case 3:
+        rec.kind_ = ZeCommandKind::kBarrier;
+        rec.name_ = "zeCommandListAppendBarrier";
+        break;
+      default:
+        rec.kind_ = ZeCommandKind::kKernel;
+        rec.name_ = "ReallyComplicated_KernelName_SomeOp_" + std::to_string(i % 50);
+        break;
+    }
+  }
+  return records;
+}
+
+template <typename F>
+double MeasureNsPerRecord(F&& dispatch) {
+  dispatched = 0;
+  auto begin = std::chrono::steady_clock::now();
+  for (std::size_t i = 0; i < kIterations; ++i) {
+    dispatch();
+  }
+  auto end = std::chrono::steady_clock::now();
+  const std::chrono::duration<double, std::nano> time = end - begin;
+  return time.count() / (kIterations * kRecordCount);
+}
+
+}  // namespace
+
+TEST(ViewDispatchBenchmark, PerRecordCost) {
+  const auto records = CreateRecords();
+
+  LegacyViewEventTable legacy_table;
+  legacy_table["KernelEvent"] = [](void*, const ZeKernelCommandExecutionRecord&) { ++dispatched; };
+  legacy_table["zeCommandListAppendMemoryCopy"] = [](void*,
+                                                     const ZeKernelCommandExecutionRecord& rec) {
+    LegacySetMemCopyType(last_copy, rec);
+    ++dispatched;
+  };
+  legacy_table["zeCommandListAppendMemoryFill"] = [](void*,
+                                                     const ZeKernelCommandExecutionRecord& rec) {
+    LegacySetMemFillType(last_fill, rec);
+    ++dispatched;
+  };
+
+  PtiViewRecordHandler::ViewEventTable table = {};
+  table[PTI_VIEW_DEVICE_GPU_KERNEL] = [](void*, const ZeKernelCommandExecutionRecord&) {
+    ++dispatched;
+  };
+  table[PTI_VIEW_DEVICE_GPU_MEM_COPY] = [](void*, const ZeKernelCommandExecutionRecord& rec) {
+    SetMemCopyType(last_copy, rec);
+    ++dispatched;
+  };
+  table[PTI_VIEW_DEVICE_GPU_MEM_FILL] = [](void*, const ZeKernelCommandExecutionRecord& rec) {
+    SetMemFillType(last_fill, rec);
+    ++dispatched;
+  };
+
+  const auto legacy_ns = MeasureNsPerRecord([&] { LegacyDispatch(legacy_table, records); });
+  const auto legacy_dispatched = dispatched;
+  const auto ns = MeasureNsPerRecord([&] { Dispatch(table, records); });
+  EXPECT_EQ(dispatched, legacy_dispatched);
+  EXPECT_EQ(dispatched, kIterations * kRecordCount * 7 / 8);
+
+  std::cout << "Per record dispatch, name based: " << legacy_ns << " ns, kind based: " << ns
+            << " ns (" << legacy_ns / ns << "x)" << std::endl;
+  RecordProperty("legacy_ns_per_record", std::to_string(legacy_ns));
+  RecordProperty("ns_per_record", std::to_string(ns));
+}
+
+TEST(ViewDispatchBenchmark, SameMemoryTypes) {
+  for (const auto& rec : CreateRecords()) {
+    if (rec.kind_ == ZeCommandKind::kMemoryCopy) {
+      pti_view_record_memory_copy legacy = {};
+      pti_view_record_memory_copy copy = {};
+      LegacySetMemCopyType(legacy, rec);
+      SetMemCopyType(copy, rec);
+      EXPECT_EQ(copy._memcpy_type, legacy._memcpy_type);
+      EXPECT_EQ(copy._mem_src, legacy._mem_src);
+      EXPECT_EQ(copy._mem_dst, legacy._mem_dst);
+    } else if (rec.kind_ == ZeCommandKind::kMemoryFill) {
+      pti_view_record_memory_fill legacy = {};
+      pti_view_record_memory_fill fill = {};
+      LegacySetMemFillType(legacy, rec);
+      SetMemFillType(fill, rec);
+      EXPECT_EQ(fill._mem_type, legacy._mem_type);
+    }
+  }
+}
@@ -0,0 +1,97 @@
+#include <gtest/gtest.h>
+
+#include <atomic>
+#include <chrono>
+#include <cstdlib>
+#include <iostream>
+#include <thread>
+#include <vector>
+
+#include "pti_view.h"
+#include "utils/test_helpers.h"
+#include "view_handler.h"
+
+namespace {
+
+constexpr std::size_t kRecordsPerThread = 1UL << 16;
+constexpr std::size_t kBufferSize = 1UL << 20;
+constexpr auto kDeliveryTimeout = std::chrono::seconds(60);
+
+std::atomic<std::size_t> delivered_bytes = 0;
+
+// Records per second reached with one thread, the base for scaling
+double single_thread_rate = 0.0;
+
+void BufferRequested(unsigned char** buf, std::size_t* buf_size) {
+  *buf = static_cast<unsigned char*>(std::malloc(kBufferSize));
+  *buf_size = *buf ? kBufferSize : 0;
+}
+
+void BufferCompleted(unsigned char* buf, std::size_t /*buf_size*/, std::size_t valid_buf_size) {
+  delivered_bytes += valid_buf_size;
+  std::free(buf);
+}
+
+}  // namespace
+
+class ViewHandlerInsertBenchmark : public ::testing::TestWithParam<std::size_t> {
+ protected:
+  void SetUp() override {
+    ASSERT_EQ(Instance().RegisterBufferCallbacks(BufferRequested, BufferCompleted),
+              pti_result::PTI_SUCCESS);
+    Instance().FlushBuffers();
+    delivered_bytes = 0;
+  }
+};
+
+TEST_P(ViewHandlerInsertBenchmark, InsertRecordScaling) {
+  using pti::test::utils::CreateRecord;
+  const auto thread_count = GetParam();
+
+  std::atomic<bool> start = false;
+  std::vector<std::thread> producers;
+  for (std::size_t i = 0; i < thread_count; ++i) {
+    producers.emplace_back([&start, i] {
+      auto record = CreateRecord<pti_view_record_external_correlation>();
+      record._external_id = i;
+      while (!start) {
+        std::this_thread::yield();
+      }
+      for (std::size_t j = 0; j < kRecordsPerThread; ++j) {
+        record._correlation_id = static_cast<uint32_t>(j);
+        Instance().InsertRecord(record);
+      }
+    });
+  }
+
+  auto begin = std::chrono::steady_clock::now();
+  start = true;
+  for (auto& producer : producers) {
+    producer.join();
+  }
+  auto end = std::chrono::steady_clock::now();
+
+  // Exited producers return their buffers, flush catches the rest
+  Instance().FlushBuffers();
+  const auto expected_bytes =
+      thread_count * kRecordsPerThread * sizeof(pti_view_record_external_correlation);
+  const auto deadline = std::chrono::steady_clock::now() + kDeliveryTimeout;
+  while (delivered_bytes < expected_bytes && std::chrono::steady_clock::now() < deadline) {
+    std::this_thread::sleep_for(std::chrono::milliseconds(1));
+  }
+  EXPECT_EQ(delivered_bytes, expected_bytes);
+
+  const std::chrono::duration<double> time = end - begin;
+  const double rate = thread_count * kRecordsPerThread / time.count();
+  if (thread_count == 1) {
+    single_thread_rate = rate;
+  }
+  const double scaling = single_thread_rate > 0.0 ? rate / single_thread_rate : 0.0;
+  std::cout << "Threads: " << thread_count << ", records/sec: " << static_cast<uint64_t>(rate)
+            << ", scaling: " << scaling << "x (" << std::thread::hardware_concurrency()
+            << " hardware threads)" << std::endl;
+  RecordProperty("records_per_sec", std::to_string(static_cast<uint64_t>(rate)));
+}
+
+INSTANTIATE_TEST_SUITE_P(Threads, ViewHandlerInsertBenchmark,
+                         ::testing::Values(1, 2, 4, 8, 16, 32, 64, 128));
@@ -0,0 +1,212 @@
+#include "kernel_stats.h"
+
+#include <gtest/gtest.h>
+
+#include <cstdlib>
+#include <map>
+#include <mutex>
+#include <string>
+#include <thread>
+#include <tuple>
+#include <vector>
+
+#include "pti_view.h"
+#include "view_handler.h"
+
+using pti::view::utilities::DurationBucket;
+using pti::view::utilities::KernelStats;
+using pti::view::utilities::kKernelStatsBuckets;
+
+namespace {
+
+constexpr std::size_t kBufferSize = 1UL << 20;
+constexpr uint64_t kBaseTime = 5000000000000ULL;
+constexpr std::size_t kKernelNames = 7;
+constexpr std::size_t kDevices = 2;
+constexpr std::size_t kGroupSizes = 3;
+
+std::mutex delivered_mtx;
+std::vector<unsigned char> delivered;
+
+void BufferRequested(unsigned char** buf, std::size_t* buf_size) {
+  *buf = static_cast<unsigned char*>(std::malloc(kBufferSize));
+  *buf_size = *buf ? kBufferSize : 0;
+}
+
+void BufferCompleted(unsigned char* buf, std::size_t /*buf_size*/, std::size_t valid_buf_size) {
+  {
+    std::lock_guard<std::mutex> lock(delivered_mtx);
+    delivered.insert(delivered.end(), buf, buf + valid_buf_size);
+  }
+  std::free(buf);
+}
+
+using StatsKey = std::tuple<std::string, ze_device_handle_t, uint32_t>;
+
+struct Delivered {
+  std::size_t bytes = 0;
+  std::size_t kernels = 0;
+  std::size_t stats_records = 0;
+  std::map<StatsKey, pti_view_record_kernel_stats> stats;
+};
+
+Delivered TakeDelivered() {
+  Instance().FlushBuffers();
+  std::vector<unsigned char> records;
+  {
+    std::lock_guard<std::mutex> lock(delivered_mtx);
+    records.swap(delivered);
+  }
+  Delivered result;
+  result.bytes = records.size();
+  pti_view_record_base* record = nullptr;
+  while (GetNextRecord(records.data(), records.size(), &record) == pti_result::PTI_SUCCESS) {
+    if (record->_view_kind == PTI_VIEW_DEVICE_GPU_KERNEL) {
+      ++result.kernels;
+    } else if (record->_view_kind == PTI_VIEW_DEVICE_GPU_KERNEL_STATS) {
+      const auto* stats = reinterpret_cast<pti_view_record_kernel_stats*>(record);
+      ++result.stats_records;
+      result.stats[{stats->_name, stats->_device_handle, stats->_group_size[0]}] = *stats;
+    }
+  }
+  return result;
+}
+
+PtiViewRecordHandler::CommandViews StatsViews(bool kernels) {
+  PtiViewRecordHandler::CommandViews views;
+  views.kernels = kernels;
+  views.kernel_stats = true;
+  return views;
+}
+
+// Launches of kKernelNames * kDevices * kGroupSizes distinct kernels, the
+// duration of launch i is i % 4096 ns
+std::vector<ZeKernelCommandExecutionRecord> CreateLaunches(std::size_t count) {
+  std::vector<ZeKernelCommandExecutionRecord> launches(count);
+  for (std::size_t i = 0; i < launches.size(); ++i) {
+    auto& rec = launches[i];
+    rec.kind_ = ZeCommandKind::kKernel;
+    rec.cid_ = static_cast<uint32_t>(i);
+    rec.kid_ = i;
+    rec.name_ = "Kernel_" + std::to_string(i % kKernelNames);
+    rec.device_ = reinterpret_cast<ze_device_handle_t>(0x10 * (1 + i % kDevices));
+    rec.group_size_[0] = 32U << (i % kGroupSizes);
+    rec.group_size_[1] = 1;
+    rec.group_size_[2] = 1;
+    rec.start_time_ = kBaseTime + i * 10000;
+    rec.end_time_ = rec.start_time_ + i % 4096;
+  }
+  return launches;
+}
+
+}  // namespace
+
+class ViewKernelStatsTest : public ::testing::Test {
+ protected:
+  void SetUp() override {
+    ASSERT_EQ(Instance().RegisterBufferCallbacks(BufferRequested, BufferCompleted),
+              pti_result::PTI_SUCCESS);
+    TakeDelivered();
+  }
+
+  void TearDown() override {
+    Instance().SetRecordEncoding(pti_view_record_encoding::PTI_VIEW_RECORD_ENCODING_FIXED);
+    TakeDelivered();
+  }
+};
+
+TEST(KernelStatsTest, DurationBuckets) {
+  EXPECT_EQ(DurationBucket(0), 0UL);
+  EXPECT_EQ(DurationBucket(1), 0UL);
+  EXPECT_EQ(DurationBucket(2), 1UL);
+  EXPECT_EQ(DurationBucket(3), 1UL);
+  EXPECT_EQ(DurationBucket(1024), 10UL);
+  EXPECT_EQ(DurationBucket(2047), 10UL);
+  EXPECT_EQ(DurationBucket(1ULL << (kKernelStatsBuckets - 1)), kKernelStatsBuckets - 1);
+  EXPECT_EQ(DurationBucket(UINT64_MAX), kKernelStatsBuckets - 1);
+}
+
+TEST(KernelStatsTest, MergeKeepsExtremes) {
+  KernelStats first;
+  first.Add(100, 150);
+  first.Add(200, 1200);
+  KernelStats second;
+  second.Add(50, 60);
+  // End before start counts as no time
+  second.Add(300, 250);
+
+  first.Merge(second);
+  EXPECT_EQ(first.count, 4UL);
+  EXPECT_EQ(first.start, 50UL);
+  EXPECT_EQ(first.end, 1200UL);
+  EXPECT_EQ(first.total_duration, 50UL + 1000UL + 10UL);
+  EXPECT_EQ(first.min_duration, 0UL);
+  EXPECT_EQ(first.max_duration, 1000UL);
+  EXPECT_EQ(first.histogram[DurationBucket(0)], 1UL);
+  EXPECT_EQ(first.histogram[DurationBucket(10)], 1UL);
+  EXPECT_EQ(first.histogram[DurationBucket(50)], 1UL);
+  EXPECT_EQ(first.histogram[DurationBucket(1000)], 1UL);
+}
+
+TEST_F(ViewKernelStatsTest, OneRecordPerKernel) {
+  constexpr std::size_t kLaunches = 8192;
+  constexpr std::size_t kThreads = 4;
+  const auto launches = CreateLaunches(kLaunches);
+
+  for (const auto encoding : {pti_view_record_encoding::PTI_VIEW_RECORD_ENCODING_FIXED,
+                              pti_view_record_encoding::PTI_VIEW_RECORD_ENCODING_COMPACT}) {
+    Instance().SetRecordEncoding(encoding);
+    // Threads exit before the flush, their statistics are still reported
+    std::vector<std::thread> threads;
+    for (std::size_t i = 0; i < kThreads; ++i) {
+      threads.emplace_back([&launches] { Instance().InsertRecords(launches, StatsViews(false)); });
+    }
+    for (auto& thread : threads) {
+      thread.join();
+    }
+    Instance().InsertRecords(launches, StatsViews(false));
+    const auto result = TakeDelivered();
+
+    EXPECT_EQ(result.kernels, 0UL);
+    ASSERT_EQ(result.stats_records, kKernelNames * kDevices * kGroupSizes);
+    ASSERT_EQ(result.stats.size(), result.stats_records);
+    uint64_t launch_count = 0;
+    for (const auto& [key, stats] : result.stats) {
+      uint64_t histogram_count = 0;
+      for (auto count : stats._duration_histogram) {
+        histogram_count += count;
+      }
+      EXPECT_EQ(histogram_count, stats._count);
+      EXPECT_LE(stats._min_duration_ns, stats._max_duration_ns);
+      EXPECT_LE(stats._min_duration_ns * stats._count, stats._total_duration_ns);
+      EXPECT_LE(stats._start_timestamp, stats._end_timestamp);
+      EXPECT_EQ(stats._group_size[1], 1U);
+      launch_count += stats._count;
+    }
+    EXPECT_EQ(launch_count, (kThreads + 1) * kLaunches);
+
+    // Statistics start over after a flush
+    EXPECT_EQ(TakeDelivered().stats_records, 0UL);
+  }
+}
+
+TEST_F(ViewKernelStatsTest, OutputVolumeOfDistinctKernels) {
+  const auto launches = CreateLaunches(4096);
+
+  Instance().InsertRecords(launches, StatsViews(true));
+  const auto both = TakeDelivered();
+  EXPECT_EQ(both.kernels, launches.size());
+  ASSERT_EQ(both.stats_records, kKernelNames * kDevices * kGroupSizes);
+
+  // Twice the launches, the same output
+  Instance().InsertRecords(launches, StatsViews(false));
+  Instance().InsertRecords(launches, StatsViews(false));
+  const auto stats_only = TakeDelivered();
+  EXPECT_EQ(stats_only.stats_records, both.stats_records);
+  EXPECT_EQ(stats_only.bytes, both.stats_records * sizeof(pti_view_record_kernel_stats));
+  EXPECT_LT(stats_only.bytes * 10, both.bytes);
+  for (const auto& [key, stats] : stats_only.stats) {
+    EXPECT_EQ(stats._count, 2 * both.stats.at(key)._count);
+    EXPECT_EQ(stats._max_duration_ns, both.stats.at(key)._max_duration_ns);
+  }
+}
@@ -0,0 +1,131 @@
+#include <gtest/gtest.h>
+
+#include <algorithm>
+#include <chrono>
+#include <cstring>
+#include <iostream>
+#include <string>
+#include <vector>
+
+#include "pti_view.h"
+#include "utils/test_helpers.h"
+#include "view_record_merge.h"
+
+using pti::view::utilities::ViewRecordMerger;
+
+namespace {
+
+constexpr std::size_t kRecordsPerRun = 1UL << 17;
+constexpr std::size_t kRecordsPerBuffer = 64;
+constexpr uint64_t kBaseTime = 5000000000000ULL;
+constexpr uint64_t kStep = 1000;
+
+// Buffers of the producers in the order they are pushed: round robin, the
+// records of a buffer in completion order, every fourth pair swapped
+std::vector<std::vector<pti_view_record_kernel>> CreateBuffers(std::size_t producers) {
+  const auto records_per_producer = kRecordsPerRun / producers;
+  const auto buffers_per_producer = records_per_producer / kRecordsPerBuffer;
+  std::vector<std::vector<pti_view_record_kernel>> buffers;
+  for (std::size_t b = 0; b < buffers_per_producer; ++b) {
+    for (std::size_t p = 0; p < producers; ++p) {
+      std::vector<pti_view_record_kernel> buffer;
+      for (std::size_t j = 0; j < kRecordsPerBuffer; ++j) {
+        auto record = pti::test::utils::CreateRecord<pti_view_record_kernel>();
+        record._kernel_id = (b * kRecordsPerBuffer + j) * producers + p;
+        record._thread_id = static_cast<uint32_t>(p);
+        record._start_timestamp = kBaseTime + record._kernel_id * kStep;
+        record._end_timestamp = record._start_timestamp + kStep / 2;
+        buffer.push_back(record);
+      }
+      for (std::size_t j = 0; j + 1 < buffer.size(); j += 8) {
+        std::swap(buffer[j], buffer[j + 1]);
+      }
+      buffers.push_back(std::move(buffer));
+    }
+  }
+  return buffers;
+}
+
+// Merged by the consumer thread: every buffer is merged as it comes, records
+// older than all the producers' next buffers are written out
+std::vector<uint64_t> Merge(const std::vector<std::vector<pti_view_record_kernel>>& buffers,
+                            std::size_t producers, std::vector<unsigned char>& output) {
+  ViewRecordMerger merger;
+  std::size_t written = 0;
+  const auto write = [&output, &written](const unsigned char* record, std::size_t size) {
+    std::memcpy(output.data() + written, record, size);
+    written += size;
+    return true;
+  };
+  for (std::size_t i = 0; i < buffers.size(); ++i) {
+    const auto* producer = &buffers[i % producers];
+    for (const auto& record : buffers[i]) {
+      merger.Add(producer, &record._view_kind, sizeof(record));
+    }
+    merger.Commit(producer);
+    if (i + 1 >= producers) {
+      merger.Drain(buffers[i + 1 - producers].back()._start_timestamp, write);
+    }
+  }
+  merger.Drain(UINT64_MAX, write);
+
+  std::vector<uint64_t> ids;
+  for (std::size_t offset = 0; offset < written; offset += sizeof(pti_view_record_kernel)) {
+    ids.push_back(reinterpret_cast<pti_view_record_kernel*>(output.data() + offset)->_kernel_id);
+  }
+  return ids;
+}
+
+// Sorted by the user: all the delivered records at once
+std::vector<uint64_t> Sort(const std::vector<std::vector<pti_view_record_kernel>>& buffers) {
+  std::vector<pti_view_record_kernel> records;
+  for (const auto& buffer : buffers) {
+    records.insert(records.end(), buffer.begin(), buffer.end());
+  }
+  std::stable_sort(records.begin(), records.end(), [](const auto& left, const auto& right) {
+    return left._start_timestamp < right._start_timestamp;
+  });
+
+  std::vector<uint64_t> ids;
+  for (const auto& record : records) {
+    ids.push_back(record._kernel_id);
+  }
+  return ids;
+}
+
+}  // namespace
+
+class ViewMergeBenchmark : public ::testing::TestWithParam<std::size_t> {};
+
+TEST_P(ViewMergeBenchmark, MergeAgainstSort) {
+  const auto producers = GetParam();
+  const auto buffers = CreateBuffers(producers);
+  const auto record_count = buffers.size() * kRecordsPerBuffer;
+  std::vector<unsigned char> output(record_count * sizeof(pti_view_record_kernel));
+
+  auto begin = std::chrono::steady_clock::now();
+  const auto merged = Merge(buffers, producers, output);
+  auto end = std::chrono::steady_clock::now();
+  const std::chrono::duration<double, std::nano> merge_time = end - begin;
+
+  begin = std::chrono::steady_clock::now();
+  const auto sorted = Sort(buffers);
+  end = std::chrono::steady_clock::now();
+  const std::chrono::duration<double, std::nano> sort_time = end - begin;
+
+  ASSERT_EQ(merged.size(), record_count);
+  EXPECT_EQ(merged, sorted);
+  for (std::size_t i = 0; i < merged.size(); ++i) {
+    ASSERT_EQ(merged[i], i);
+  }
+
+  const auto merge_ns = merge_time.count() / static_cast<double>(record_count);
+  const auto sort_ns = sort_time.count() / static_cast<double>(record_count);
+  std::cout << "Producers: " << producers << ", per record merged: " << merge_ns
+            << " ns, sorted by consumer: " << sort_ns << " ns (" << sort_ns / merge_ns << "x)"
+            << std::endl;
+  RecordProperty("merge_ns_per_record", std::to_string(merge_ns));
+  RecordProperty("sort_ns_per_record", std::to_string(sort_ns));
+}
+
+INSTANTIATE_TEST_SUITE_P(ProducerCounts, ViewMergeBenchmark, ::testing::Values(2, 8, 32));
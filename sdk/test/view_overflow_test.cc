@@ -0,0 +1,278 @@
+#include <gtest/gtest.h>
+
+#include <algorithm>
+#include <array>
+#include <chrono>
+#include <condition_variable>
+#include <cstdlib>
+#include <filesystem>
+#include <iostream>
+#include <map>
+#include <mutex>
+#include <thread>
+#include <vector>
+
+#include "pti_view.h"
+#include "utils/test_helpers.h"
+#include "view_buffer.h"
+#include "view_buffer_spill.h"
+#include "view_handler.h"
+
+namespace {
+
+using pti::view::utilities::ViewBuffer;
+using pti::view::utilities::ViewBufferQueue;
+using pti::view::utilities::ViewBufferSpill;
+
+constexpr std::size_t kBufferSize = 4096;
+constexpr uint32_t kProducers = 2;
+constexpr auto kSlowCallback = std::chrono::milliseconds(1);
+constexpr uint64_t kBaseTimestamp = 5000000000000ULL;
+
+std::mutex callback_mtx;
+std::condition_variable gate_cv;
+// Consumers are stuck in the callback until the gate opens
+bool gate_open = true;
+std::size_t delivered_records = 0;
+uint64_t lost_records = 0;
+uint64_t lost_buffers = 0;
+std::map<uint32_t, std::vector<uint64_t>> kernel_ids;
+
+void BufferRequested(unsigned char** buf, std::size_t* buf_size) {
+  *buf = static_cast<unsigned char*>(std::malloc(kBufferSize));
+  *buf_size = *buf ? kBufferSize : 0;
+}
+
+void BufferCompleted(unsigned char* buf, std::size_t /*buf_size*/, std::size_t valid_buf_size) {
+  std::unique_lock<std::mutex> lock(callback_mtx);
+  gate_cv.wait(lock, [] { return gate_open; });
+  pti_view_record_base* record = nullptr;
+  while (GetNextRecord(buf, valid_buf_size, &record) == pti_result::PTI_SUCCESS) {
+    if (record->_view_kind == PTI_VIEW_DEVICE_GPU_KERNEL) {
+      auto* kernel = reinterpret_cast<pti_view_record_kernel*>(record);
+      kernel_ids[kernel->_thread_id].push_back(kernel->_kernel_id);
+      ++delivered_records;
+    } else if (record->_view_kind == PTI_VIEW_RECORDS_LOST) {
+      auto* lost = reinterpret_cast<pti_view_record_records_lost*>(record);
+      lost_records += lost->_records_lost[PTI_VIEW_DEVICE_GPU_KERNEL];
+      lost_buffers += lost->_buffers_lost;
+    }
+  }
+  lock.unlock();
+  std::this_thread::sleep_for(kSlowCallback);
+  std::free(buf);
+}
+
+void SetGate(bool open) {
+  {
+    std::lock_guard<std::mutex> lock(callback_mtx);
+    gate_open = open;
+  }
+  gate_cv.notify_all();
+}
+
+// Enough records to fill the handler queue several times over
+std::size_t RecordsPerProducer() {
+  const std::size_t queue_depth =
+      2 * std::max(1U, std::thread::hardware_concurrency()) + kDefaultBufferQueueDepth;
+  return 4 * queue_depth * (kBufferSize / sizeof(pti_view_record_kernel)) / kProducers;
+}
+
+void ProduceRecords(std::size_t records_per_producer) {
+  std::vector<std::thread> producers;
+  for (uint32_t t = 0; t < kProducers; ++t) {
+    producers.emplace_back([t, records_per_producer] {
+      for (std::size_t i = 0; i < records_per_producer; ++i) {
+        auto record = pti::test::utils::CreateRecord<pti_view_record_kernel>();
+        record._thread_id = t;
+        record._kernel_id = i;
+        record._start_timestamp = kBaseTimestamp + i * 1000;
+        record._end_timestamp = record._start_timestamp + 500;
+        Instance().InsertRecord(record);
+      }
+    });
+  }
+  for (auto& producer : producers) {
+    producer.join();
+  }
+}
+
+class ViewOverflowTest : public ::testing::Test {
+ protected:
+  void SetUp() override {
+    ASSERT_EQ(Instance().RegisterBufferCallbacks(BufferRequested, BufferCompleted),
+              pti_result::PTI_SUCCESS);
+    Instance().FlushBuffers();
+    std::lock_guard<std::mutex> lock(callback_mtx);
+    delivered_records = 0;
+    lost_records = 0;
+    lost_buffers = 0;
+    kernel_ids.clear();
+  }
+
+  void TearDown() override {
+    SetGate(true);
+    EXPECT_EQ(Instance().SetOverflowPolicy(PTI_VIEW_OVERFLOW_BLOCK, nullptr),
+              pti_result::PTI_SUCCESS);
+    Instance().FlushBuffers();
+  }
+
+  // Records of every producer are delivered in order, some might be missing
+  static void ExpectOrdered() {
+    for (const auto& [thread_id, ids] : kernel_ids) {
+      EXPECT_TRUE(std::is_sorted(ids.begin(), ids.end()));
+      EXPECT_EQ(std::adjacent_find(ids.begin(), ids.end()), ids.end());
+    }
+  }
+};
+
+}  // namespace
+
+TEST(ViewOverflowQueueTest, TryPushKeepsBuffer) {
+  std::array<unsigned char, 8> backing = {};
+  ViewBufferQueue queue(1);
+  EXPECT_TRUE(queue.TryPush(ViewBuffer(backing.data(), backing.size(), 1)));
+  EXPECT_TRUE(queue.Full());
+
+  ViewBuffer buffer(backing.data() + 4, 4, 2);
+  EXPECT_FALSE(queue.TryPush(std::move(buffer)));
+  EXPECT_EQ(buffer.GetBuffer(), backing.data() + 4);
+  EXPECT_EQ(buffer.GetValidBytes(), 2UL);
+  EXPECT_EQ(queue.Size(), 1UL);
+}
+
+TEST(ViewOverflowQueueTest, PushDropOldest) {
+  std::array<unsigned char, 8> backing = {};
+  ViewBufferQueue queue(2);
+  for (std::size_t i = 0; i < 2; ++i) {
+    EXPECT_FALSE(queue.PushDropOldest(ViewBuffer(backing.data() + i, 1, 1)).has_value());
+  }
+  auto dropped = queue.PushDropOldest(ViewBuffer(backing.data() + 2, 1, 1));
+  ASSERT_TRUE(dropped.has_value());
+  EXPECT_EQ(dropped->GetBuffer(), backing.data());
+  EXPECT_EQ(queue.Pop().GetBuffer(), backing.data() + 1);
+  EXPECT_EQ(queue.Pop().GetBuffer(), backing.data() + 2);
+}
+
+TEST(ViewOverflowQueueTest, SpillFileFifo) {
+  ViewBufferSpill spill(nullptr);
+  EXPECT_TRUE(spill.Empty());
+  const unsigned char first[] = {1, 2, 3};
+  const unsigned char second[] = {4, 5};
+  const int producer = 0;
+  ASSERT_TRUE(spill.Write(first, sizeof(first), &producer));
+  ASSERT_TRUE(spill.Write(second, sizeof(second), nullptr));
+  EXPECT_EQ(spill.Size(), 2UL);
+
+  ViewBufferSpill::EntryHeader header;
+  unsigned char records[4] = {};
+  ASSERT_TRUE(spill.Front(header));
+  EXPECT_EQ(header.valid_bytes, sizeof(first));
+  EXPECT_EQ(header.producer, reinterpret_cast<uintptr_t>(&producer));
+  ASSERT_TRUE(spill.ReadFront(header, records));
+  EXPECT_EQ(records[2], 3);
+  spill.PopFront(header);
+
+  ASSERT_TRUE(spill.Front(header));
+  EXPECT_EQ(header.valid_bytes, sizeof(second));
+  ASSERT_TRUE(spill.ReadFront(header, records));
+  EXPECT_EQ(records[1], 5);
+  spill.PopFront(header);
+  EXPECT_TRUE(spill.Empty());
+  EXPECT_FALSE(spill.Front(header));
+}
+
+TEST_F(ViewOverflowTest, BlockDeliversAll) {
+  pti_view_delivery_stats before = {};
+  pti_view_delivery_stats after = {};
+  ASSERT_EQ(Instance().GetDeliveryStats(&before), pti_result::PTI_SUCCESS);
+  const auto records = RecordsPerProducer() / 4;
+  ProduceRecords(records);
+  Instance().FlushBuffers();
+  ASSERT_EQ(Instance().GetDeliveryStats(&after), pti_result::PTI_SUCCESS);
+
+  std::lock_guard<std::mutex> lock(callback_mtx);
+  EXPECT_EQ(delivered_records, kProducers * records);
+  EXPECT_EQ(lost_records, 0UL);
+  EXPECT_GT(after._producer_waits, before._producer_waits);
+  ExpectOrdered();
+}
+
+TEST_F(ViewOverflowTest, DropNewestCountsLostRecords) {
+  ASSERT_EQ(Instance().SetOverflowPolicy(PTI_VIEW_OVERFLOW_DROP_NEWEST, nullptr),
+            pti_result::PTI_SUCCESS);
+  SetGate(false);
+  const auto begin = std::chrono::steady_clock::now();
+  ProduceRecords(RecordsPerProducer());
+  const std::chrono::duration<double, std::milli> time = std::chrono::steady_clock::now() - begin;
+  SetGate(true);
+  Instance().FlushBuffers();
+
+  std::lock_guard<std::mutex> lock(callback_mtx);
+  std::cout << "Drop newest, producing: " << time.count() << " ms, delivered: "
+            << delivered_records << ", lost: " << lost_records << " in " << lost_buffers
+            << " buffers" << std::endl;
+  EXPECT_GT(lost_records, 0UL);
+  EXPECT_EQ(delivered_records + lost_records, kProducers * RecordsPerProducer());
+  ExpectOrdered();
+  // The oldest buffers are kept
+  for (const auto& [thread_id, ids] : kernel_ids) {
+    ASSERT_FALSE(ids.empty());
+    EXPECT_EQ(ids.front(), 0UL);
+  }
+}
+
+TEST_F(ViewOverflowTest, DropOldestCountsLostRecords) {
+  ASSERT_EQ(Instance().SetOverflowPolicy(PTI_VIEW_OVERFLOW_DROP_OLDEST, nullptr),
+            pti_result::PTI_SUCCESS);
+  SetGate(false);
+  ProduceRecords(RecordsPerProducer());
+  SetGate(true);
+  Instance().FlushBuffers();
+
+  std::lock_guard<std::mutex> lock(callback_mtx);
+  std::cout << "Drop oldest, delivered: " << delivered_records << ", lost: " << lost_records
+            << " in " << lost_buffers << " buffers" << std::endl;
+  EXPECT_GT(lost_records, 0UL);
+  EXPECT_EQ(delivered_records + lost_records, kProducers * RecordsPerProducer());
+  ExpectOrdered();
+  // The newest records are kept, at least those of the producer finishing last
+  EXPECT_TRUE(std::any_of(kernel_ids.begin(), kernel_ids.end(), [](const auto& thread_ids) {
+    return !thread_ids.second.empty() && thread_ids.second.back() == RecordsPerProducer() - 1;
+  }));
+}
+
+TEST_F(ViewOverflowTest, SpillReplaysAllInOrder) {
+  const auto spill_path = std::filesystem::temp_directory_path() / "pti_view_overflow_test.spill";
+  ASSERT_EQ(Instance().SetOverflowPolicy(PTI_VIEW_OVERFLOW_SPILL, spill_path.c_str()),
+            pti_result::PTI_SUCCESS);
+  SetGate(false);
+  ProduceRecords(RecordsPerProducer());
+  EXPECT_GT(std::filesystem::file_size(spill_path), 0UL);
+  SetGate(true);
+  Instance().FlushBuffers();
+
+  {
+    std::lock_guard<std::mutex> lock(callback_mtx);
+    EXPECT_EQ(delivered_records, kProducers * RecordsPerProducer());
+    EXPECT_EQ(lost_records, 0UL);
+    ExpectOrdered();
+  }
+  // Replayed buffers are not kept on disk
+  EXPECT_EQ(std::filesystem::file_size(spill_path), 0UL);
+  EXPECT_EQ(Instance().SetOverflowPolicy(PTI_VIEW_OVERFLOW_SPILL, "/nonexistent/dir/spill"),
+            pti_result::PTI_ERROR_BAD_ARGUMENT);
+  std::filesystem::remove(spill_path);
+}
+
+TEST_F(ViewOverflowTest, SpillWhileConsuming) {
+  ASSERT_EQ(Instance().SetOverflowPolicy(PTI_VIEW_OVERFLOW_SPILL, nullptr),
+            pti_result::PTI_SUCCESS);
+  // Slow consumer replays spilled buffers while producers keep going
+  ProduceRecords(RecordsPerProducer());
+  Instance().FlushBuffers();
+
+  std::lock_guard<std::mutex> lock(callback_mtx);
+  EXPECT_EQ(delivered_records, kProducers * RecordsPerProducer());
+  ExpectOrdered();
+}
@@ -0,0 +1,287 @@
+#include "view_record_filter.h"
+
+#include <gtest/gtest.h>
+
+#include <chrono>
+#include <cstdlib>
+#include <iostream>
+#include <mutex>
+#include <string>
+#include <vector>
+
+#include "pti_view.h"
+#include "view_handler.h"
+
+using pti::view::utilities::FilterReason;
+using pti::view::utilities::NamePattern;
+using pti::view::utilities::RecordFilter;
+
+namespace {
+
+constexpr std::size_t kBufferSize = 1UL << 20;
+constexpr uint64_t kBaseTime = 5000000000000ULL;
+
+std::mutex delivered_mtx;
+std::vector<unsigned char> delivered;
+
+void BufferRequested(unsigned char** buf, std::size_t* buf_size) {
+  *buf = static_cast<unsigned char*>(std::malloc(kBufferSize));
+  *buf_size = *buf ? kBufferSize : 0;
+}
+
+void BufferCompleted(unsigned char* buf, std::size_t /*buf_size*/, std::size_t valid_buf_size) {
+  {
+    std::lock_guard<std::mutex> lock(delivered_mtx);
+    delivered.insert(delivered.end(), buf, buf + valid_buf_size);
+  }
+  std::free(buf);
+}
+
+struct Delivered {
+  std::size_t kernels = 0;
+  std::size_t mem_copies = 0;
+  std::size_t mem_fills = 0;
+  std::vector<uint64_t> external_correlation_ids;  // correlation IDs
+  std::vector<uint64_t> kernel_correlation_ids;
+  pti_view_record_records_filtered filtered = pti_view_record_records_filtered();
+};
+
+Delivered TakeDelivered() {
+  Instance().FlushBuffers();
+  std::vector<unsigned char> records;
+  {
+    std::lock_guard<std::mutex> lock(delivered_mtx);
+    records.swap(delivered);
+  }
+  Delivered result;
+  pti_view_record_base* record = nullptr;
+  while (GetNextRecord(records.data(), records.size(), &record) == pti_result::PTI_SUCCESS) {
+    switch (record->_view_kind) {
+      case PTI_VIEW_DEVICE_GPU_KERNEL:
+        ++result.kernels;
+        result.kernel_correlation_ids.push_back(
+            reinterpret_cast<pti_view_record_kernel*>(record)->_correlation_id);
+        break;
+      case PTI_VIEW_DEVICE_GPU_MEM_COPY:
+        ++result.mem_copies;
+        break;
+      case PTI_VIEW_DEVICE_GPU_MEM_FILL:
+        ++result.mem_fills;
+        break;
+      case PTI_VIEW_EXTERNAL_CORRELATION:
+        result.external_correlation_ids.push_back(
+            reinterpret_cast<pti_view_record_external_correlation*>(record)->_correlation_id);
+        break;
+      case PTI_VIEW_RECORDS_FILTERED: {
+        const auto* filtered = reinterpret_cast<pti_view_record_records_filtered*>(record);
+        for (std::size_t i = 0; i < PTI_VIEW_RECORDS_LOST_KINDS; ++i) {
+          result.filtered._records_filtered[i] += filtered->_records_filtered[i];
+        }
+        result.filtered._by_name += filtered->_by_name;
+        result.filtered._by_duration += filtered->_by_duration;
+        result.filtered._by_device += filtered->_by_device;
+        result.filtered._by_rate_limit += filtered->_by_rate_limit;
+        break;
+      }
+      default:
+        break;
+    }
+  }
+  return result;
+}
+
+PtiViewRecordHandler::CommandViews AllViews() {
+  PtiViewRecordHandler::CommandViews views;
+  views.kernels = true;
+  views.mem_copies = true;
+  views.mem_fills = true;
+  views.external_correlation = true;
+  return views;
+}
+
+// Every 20th command is a long compute kernel, the others are tiny fill
+// kernels or short copies, as in the workloads the filter is made for
+std::vector<ZeKernelCommandExecutionRecord> CreateCommands(std::size_t count) {
+  std::vector<ZeKernelCommandExecutionRecord> commands(count);
+  for (std::size_t i = 0; i < commands.size(); ++i) {
+    auto& rec = commands[i];
+    rec.cid_ = static_cast<uint32_t>(i);
+    rec.kid_ = i;
+    rec.device_ = nullptr;
+    rec.queue_ = nullptr;
+    rec.start_time_ = kBaseTime + i * 10000;
+    if (i % 20 == 0) {
+      rec.kind_ = ZeCommandKind::kKernel;
+      rec.name_ = "Gemm_KernelName_" + std::to_string(i % 7);
+      rec.end_time_ = rec.start_time_ + 50000;
+    } else if (i % 2) {
+      rec.kind_ = ZeCommandKind::kKernel;
+      rec.name_ = "fill_buffer_kernel_" + std::to_string(i % 5);
+      rec.end_time_ = rec.start_time_ + 800;
+    } else {
+      rec.kind_ = ZeCommandKind::kMemoryCopy;
+      rec.name_ = "zeCommandListAppendMemoryCopy(D2D)";
+      rec.end_time_ = rec.start_time_ + 1500;
+    }
+  }
+  return commands;
+}
+
+}  // namespace
+
+class ViewRecordFilterTest : public ::testing::Test {
+ protected:
+  void SetUp() override {
+    ASSERT_EQ(Instance().RegisterBufferCallbacks(BufferRequested, BufferCompleted),
+              pti_result::PTI_SUCCESS);
+    TakeDelivered();
+  }
+
+  void TearDown() override {
+    Instance().SetRecordFilter(nullptr);
+    TakeDelivered();
+  }
+};
+
+TEST(NamePatternTest, MatchesWholeName) {
+  EXPECT_TRUE(NamePattern("Gemm").Matches("Gemm"));
+  EXPECT_FALSE(NamePattern("Gemm").Matches("Gemm2"));
+  EXPECT_FALSE(NamePattern("Gemm").Matches("Gem"));
+  EXPECT_TRUE(NamePattern("G?mm").Matches("Gemm"));
+  EXPECT_TRUE(NamePattern("*").Matches(""));
+  EXPECT_TRUE(NamePattern("fill_*").Matches("fill_buffer"));
+  EXPECT_FALSE(NamePattern("fill_*").Matches("my_fill_buffer"));
+  EXPECT_TRUE(NamePattern("*Copy(*)").Matches("zeCommandListAppendMemoryCopy(D2H)"));
+  EXPECT_TRUE(NamePattern("a*b*c").Matches("abc"));
+  EXPECT_TRUE(NamePattern("a*b*c").Matches("axxbxxbxc"));
+  EXPECT_FALSE(NamePattern("a*b*c").Matches("axxcxxb"));
+  // Prefix and suffix must not overlap
+  EXPECT_FALSE(NamePattern("ab*ba").Matches("aba"));
+  EXPECT_TRUE(NamePattern("*_?_*").Matches("x_1_y"));
+  EXPECT_FALSE(NamePattern("*_?_*").Matches("x__y"));
+}
+
+TEST(RecordFilterTest, ChecksInOrder) {
+  const char* include_names[] = {"Gemm*", "fill_*"};
+  const char* exclude_names[] = {"*_slow"};
+  const auto device = reinterpret_cast<ze_device_handle_t>(0x10);
+  const auto other_device = reinterpret_cast<ze_device_handle_t>(0x20);
+  pti_view_record_filter options = pti_view_record_filter();
+  options._include_names = include_names;
+  options._include_name_count = 2;
+  options._exclude_names = exclude_names;
+  options._exclude_name_count = 1;
+  options._min_duration_ns = 1000;
+  options._device_handles = &device;
+  options._device_handle_count = 1;
+  options._max_records_per_name = 2;
+  options._rate_limit_period_ns = 1000000;
+  RecordFilter filter(options);
+
+  EXPECT_EQ(filter.Check("Gemm", 0, 5000, other_device, nullptr), FilterReason::kDevice);
+  EXPECT_EQ(filter.Check("Gemm", 0, 500, device, nullptr), FilterReason::kDuration);
+  EXPECT_EQ(filter.Check("Conv", 0, 5000, device, nullptr), FilterReason::kName);
+  EXPECT_EQ(filter.Check("Gemm_slow", 0, 5000, device, nullptr), FilterReason::kName);
+
+  // Two records per name and millisecond
+  EXPECT_EQ(filter.Check("Gemm", 0, 5000, device, nullptr), FilterReason::kPassed);
+  EXPECT_EQ(filter.Check("Gemm", 0, 6000, device, nullptr), FilterReason::kPassed);
+  EXPECT_EQ(filter.Check("Gemm", 0, 7000, device, nullptr), FilterReason::kRateLimit);
+  EXPECT_EQ(filter.Check("fill_x", 0, 7000, device, nullptr), FilterReason::kPassed);
+  EXPECT_EQ(filter.Check("Gemm", 1000000, 1005000, device, nullptr), FilterReason::kPassed);
+}
+
+TEST_F(ViewRecordFilterTest, RejectsInvalidFilter) {
+  pti_view_record_filter options = pti_view_record_filter();
+  options._include_name_count = 1;
+  EXPECT_EQ(Instance().SetRecordFilter(&options), pti_result::PTI_ERROR_BAD_ARGUMENT);
+  const char* include_names[] = {nullptr};
+  options._include_names = include_names;
+  EXPECT_EQ(Instance().SetRecordFilter(&options), pti_result::PTI_ERROR_BAD_ARGUMENT);
+  EXPECT_EQ(Instance().SetRecordFilter(nullptr), pti_result::PTI_SUCCESS);
+}
+
+TEST_F(ViewRecordFilterTest, FilteredRecordsAreCounted) {
+  const auto commands = CreateCommands(1000);
+  const char* exclude_names[] = {"fill_*"};
+  pti_view_record_filter options = pti_view_record_filter();
+  options._exclude_names = exclude_names;
+  options._exclude_name_count = 1;
+  options._min_duration_ns = 2000;
+  ASSERT_EQ(Instance().SetRecordFilter(&options), pti_result::PTI_SUCCESS);
+
+  // Correlated to the first kernel that passes, not to the first processed
+  ASSERT_EQ(Instance().PushExternalKindId(PTI_VIEW_EXTERNAL_KIND_CUSTOM_0, 1),
+            pti_result::PTI_SUCCESS);
+  std::vector<ZeKernelCommandExecutionRecord> first_commands(commands.begin() + 1,
+                                                             commands.begin() + 21);
+  Instance().InsertRecords(first_commands, AllViews());
+  Instance().PopExternalKindId(PTI_VIEW_EXTERNAL_KIND_CUSTOM_0, nullptr);
+  auto result = TakeDelivered();
+  ASSERT_EQ(result.kernels, 1UL);
+  ASSERT_EQ(result.external_correlation_ids.size(), 1UL);
+  EXPECT_EQ(result.external_correlation_ids[0], result.kernel_correlation_ids[0]);
+  EXPECT_EQ(result.filtered._records_filtered[PTI_VIEW_DEVICE_GPU_KERNEL], 10UL);
+  EXPECT_EQ(result.filtered._records_filtered[PTI_VIEW_DEVICE_GPU_MEM_COPY], 9UL);
+
+  // Single records and batches alike
+  for (std::size_t i = 0; i < 100; ++i) {
+    KernelEvent(nullptr, commands[i * 2 + 1]);
+  }
+  Instance().InsertRecords(commands, AllViews());
+  result = TakeDelivered();
+  EXPECT_EQ(result.kernels, 50UL);
+  EXPECT_EQ(result.mem_copies, 0UL);
+  // Short kernels are left out by duration before their names are checked
+  EXPECT_EQ(result.filtered._by_duration, 100UL + 500UL + 450UL);
+  EXPECT_EQ(result.filtered._by_name, 0UL);
+  EXPECT_EQ(result.filtered._records_filtered[PTI_VIEW_DEVICE_GPU_KERNEL], 100UL + 500UL);
+  EXPECT_EQ(result.filtered._records_filtered[PTI_VIEW_DEVICE_GPU_MEM_COPY], 450UL);
+
+  // Nothing is reported once nothing is filtered
+  ASSERT_EQ(Instance().SetRecordFilter(nullptr), pti_result::PTI_SUCCESS);
+  Instance().InsertRecords(commands, AllViews());
+  result = TakeDelivered();
+  EXPECT_EQ(result.kernels + result.mem_copies, commands.size());
+  EXPECT_EQ(result.filtered._by_duration, 0UL);
+}
+
+TEST_F(ViewRecordFilterTest, Throughput) {
+  constexpr std::size_t kBatchSize = 260;
+  constexpr std::size_t kBatches = 1024;
+  const auto commands = CreateCommands(kBatchSize);
+  const auto views = AllViews();
+  const char* exclude_names[] = {"fill_*", "*MemoryCopy*"};
+  pti_view_record_filter options = pti_view_record_filter();
+  options._exclude_names = exclude_names;
+  options._exclude_name_count = 2;
+  options._min_duration_ns = 2000;
+
+  for (const bool filtered : {false, true}) {
+    ASSERT_EQ(Instance().SetRecordFilter(filtered ? &options : nullptr), pti_result::PTI_SUCCESS);
+    const auto begin = std::chrono::steady_clock::now();
+    for (std::size_t i = 0; i < kBatches; ++i) {
+      Instance().InsertRecords(commands, views);
+    }
+    const auto result = TakeDelivered();
+    const auto end = std::chrono::steady_clock::now();
+
+    const auto processed = kBatchSize * kBatches;
+    const auto records = result.kernels + result.mem_copies;
+    uint64_t filtered_records = 0;
+    for (auto count : result.filtered._records_filtered) {
+      filtered_records += count;
+    }
+    EXPECT_EQ(records + filtered_records, processed);
+    EXPECT_EQ(records, filtered ? processed / 20 : processed);
+
+    const std::chrono::duration<double> time = end - begin;
+    const auto processed_rate = static_cast<uint64_t>(processed / time.count());
+    const auto delivered_rate = static_cast<uint64_t>(records / time.count());
+    const std::string name = filtered ? "filtered" : "unfiltered";
+    std::cout << "Records " << name << ", processed/sec: " << processed_rate
+              << ", delivered/sec: " << delivered_rate << std::endl;
+    RecordProperty(name + "_processed_per_sec", std::to_string(processed_rate));
+    RecordProperty(name + "_delivered_per_sec", std::to_string(delivered_rate));
+  }
+}
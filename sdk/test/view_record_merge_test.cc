@@ -0,0 +1,441 @@
+#include "view_record_merge.h"
+
+#include <gtest/gtest.h>
+
+#include <algorithm>
+#include <array>
+#include <atomic>
+#include <condition_variable>
+#include <cstddef>
+#include <cstdlib>
+#include <cstring>
+#include <mutex>
+#include <thread>
+#include <unordered_map>
+#include <vector>
+
+#include "pti_view.h"
+#include "utils.h"
+#include "utils/test_helpers.h"
+#include "view_handler.h"
+
+using pti::view::utilities::ViewRecordMerger;
+
+namespace {
+
+constexpr std::size_t kBufferSize = 1UL << 14;
+constexpr std::size_t kProducers = 4;
+constexpr std::size_t kRecordsPerProducer = 20000;
+// Far above clock conversion differences between buffers
+constexpr uint64_t kStep = 1000;
+
+std::mutex delivered_mtx;
+std::vector<unsigned char> delivered;
+
+void BufferRequested(unsigned char** buf, std::size_t* buf_size) {
+  *buf = static_cast<unsigned char*>(std::malloc(kBufferSize));
+  *buf_size = *buf ? kBufferSize : 0;
+}
+
+void BufferCompleted(unsigned char* buf, std::size_t /*buf_size*/, std::size_t valid_buf_size) {
+  {
+    std::lock_guard<std::mutex> lock(delivered_mtx);
+    delivered.insert(delivered.end(), buf, buf + valid_buf_size);
+  }
+  std::free(buf);
+}
+
+struct Delivered {
+  std::vector<uint64_t> start_timestamps;
+  std::array<std::vector<uint64_t>, kProducers> kernel_ids;
+  std::array<std::vector<uint32_t>, kProducers> correlation_ids;
+  // External IDs of kind PTI_VIEW_EXTERNAL_KIND_CUSTOM_0, by correlation ID
+  std::unordered_map<uint32_t, uint64_t> external_ids;
+};
+
+Delivered TakeDelivered(bool flush) {
+  if (flush) {
+    Instance().FlushBuffers();
+  }
+  std::vector<unsigned char> records;
+  {
+    std::lock_guard<std::mutex> lock(delivered_mtx);
+    records.swap(delivered);
+  }
+  Delivered result;
+  pti_view_record_base* record = nullptr;
+  while (GetNextRecord(records.data(), records.size(), &record) == pti_result::PTI_SUCCESS) {
+    if (record->_view_kind == PTI_VIEW_DEVICE_GPU_KERNEL) {
+      const auto* kernel = reinterpret_cast<pti_view_record_kernel*>(record);
+      result.start_timestamps.push_back(kernel->_start_timestamp);
+      result.kernel_ids.at(kernel->_thread_id).push_back(kernel->_kernel_id);
+      result.correlation_ids.at(kernel->_thread_id).push_back(kernel->_correlation_id);
+    } else if (record->_view_kind == PTI_VIEW_EXTERNAL_CORRELATION) {
+      const auto* ext_record = reinterpret_cast<pti_view_record_external_correlation*>(record);
+      if (ext_record->_external_kind == PTI_VIEW_EXTERNAL_KIND_CUSTOM_0) {
+        result.external_ids[ext_record->_correlation_id] = ext_record->_external_id;
+      }
+    }
+  }
+  return result;
+}
+
+pti_view_record_kernel CreateKernel(uint64_t kernel_id, uint64_t start) {
+  auto record = pti::test::utils::CreateRecord<pti_view_record_kernel>();
+  record._kernel_id = kernel_id;
+  record._start_timestamp = start;
+  record._end_timestamp = start + kStep / 2;
+  return record;
+}
+
+const void* Producer(std::size_t index) {
+  return reinterpret_cast<const void*>(0x10 * (index + 1));
+}
+
+// Merges the records, in the order they are added per producer
+class MergerFixture {
+ public:
+  // Records are read from a buffer, as in the handler
+  void Add(std::size_t producer, const void* record, std::size_t size) {
+    alignas(std::max_align_t) std::array<unsigned char, SizeOfLargestViewRecord()> data = {};
+    std::memcpy(data.data(), record, size);
+    merger_.Add(Producer(producer), reinterpret_cast<const pti_view_record_base*>(data.data()),
+                size);
+  }
+
+  void AddKernel(std::size_t producer, uint64_t kernel_id, uint64_t start) {
+    const auto record = CreateKernel(kernel_id, start);
+    Add(producer, &record, sizeof(record));
+  }
+
+  void Commit(std::size_t producer) { merger_.Commit(Producer(producer)); }
+
+  // Kinds and kernel IDs of the written records, 0 for other kinds
+  std::vector<std::pair<pti_view_kind, uint64_t>> Drain(uint64_t watermark,
+                                                        std::size_t max_records = SIZE_MAX) {
+    std::vector<std::pair<pti_view_kind, uint64_t>> written;
+    merger_.Drain(watermark, [&](const unsigned char* data, std::size_t /*size*/) {
+      if (written.size() == max_records) {
+        return false;
+      }
+      const auto* record = reinterpret_cast<const pti_view_record_base*>(data);
+      uint64_t id = 0;
+      if (record->_view_kind == PTI_VIEW_DEVICE_GPU_KERNEL) {
+        id = reinterpret_cast<const pti_view_record_kernel*>(data)->_kernel_id;
+      }
+      written.emplace_back(record->_view_kind, id);
+      return true;
+    });
+    return written;
+  }
+
+  ViewRecordMerger merger_;
+};
+
+std::vector<uint64_t> KernelIds(const std::vector<std::pair<pti_view_kind, uint64_t>>& written) {
+  std::vector<uint64_t> ids;
+  for (const auto& [kind, id] : written) {
+    ids.push_back(id);
+  }
+  return ids;
+}
+
+}  // namespace
+
+TEST(ViewRecordMergeTest, InterleavedStreams) {
+  constexpr std::size_t kBuffers = 10;
+  constexpr std::size_t kRecordsPerBuffer = 50;
+  MergerFixture merge;
+  // Record i of the producer p starts at i * kProducers + p
+  for (std::size_t buffer = 0; buffer < kBuffers; ++buffer) {
+    for (std::size_t p = 0; p < kProducers; ++p) {
+      for (std::size_t j = 0; j < kRecordsPerBuffer; ++j) {
+        const auto id = (buffer * kRecordsPerBuffer + j) * kProducers + p;
+        merge.AddKernel(p, id, id * kStep);
+      }
+      merge.Commit(p);
+    }
+  }
+  EXPECT_EQ(merge.merger_.Size(), kBuffers * kRecordsPerBuffer * kProducers);
+
+  const auto ids = KernelIds(merge.Drain(UINT64_MAX));
+  ASSERT_EQ(ids.size(), kBuffers * kRecordsPerBuffer * kProducers);
+  for (std::size_t i = 0; i < ids.size(); ++i) {
+    EXPECT_EQ(ids[i], i);
+  }
+  EXPECT_EQ(merge.merger_.Size(), 0UL);
+  EXPECT_EQ(merge.merger_.LateRecords(), 0UL);
+}
+
+TEST(ViewRecordMergeTest, HoldsRecordsAboveWatermark) {
+  MergerFixture merge;
+  for (uint64_t id = 0; id < 10; ++id) {
+    merge.AddKernel(id % 2, id, id * kStep);
+  }
+  merge.Commit(0);
+  merge.Commit(1);
+
+  EXPECT_EQ(KernelIds(merge.Drain(4 * kStep)), (std::vector<uint64_t>{0, 1, 2, 3, 4}));
+  EXPECT_EQ(merge.merger_.Size(), 5UL);
+  EXPECT_TRUE(merge.Drain(4 * kStep).empty());
+
+  // Records of the next buffer go before the held ones
+  merge.AddKernel(1, 10, 5 * kStep - 1);
+  merge.Commit(1);
+  EXPECT_EQ(KernelIds(merge.Drain(UINT64_MAX)), (std::vector<uint64_t>{10, 5, 6, 7, 8, 9}));
+  EXPECT_EQ(merge.merger_.LateRecords(), 0UL);
+}
+
+TEST(ViewRecordMergeTest, SortsBuffersOfProducer) {
+  MergerFixture merge;
+  // Commands complete out of start order
+  for (uint64_t id : {3, 1, 2, 0, 5}) {
+    merge.AddKernel(0, id, id * kStep);
+  }
+  merge.Commit(0);
+  merge.AddKernel(1, 6, 6 * kStep);
+  merge.Commit(1);
+  EXPECT_EQ(KernelIds(merge.Drain(2 * kStep)), (std::vector<uint64_t>{0, 1, 2}));
+
+  // Older than a held record of the previous buffer of the producer
+  merge.AddKernel(0, 4, 4 * kStep);
+  merge.AddKernel(0, 7, 7 * kStep);
+  merge.Commit(0);
+  EXPECT_EQ(KernelIds(merge.Drain(UINT64_MAX)), (std::vector<uint64_t>{3, 4, 5, 6, 7}));
+}
+
+TEST(ViewRecordMergeTest, UntimedRecordsStayWithNextRecord) {
+  MergerFixture merge;
+  auto external = pti::test::utils::CreateRecord<pti_view_record_external_correlation,
+                                                 PTI_VIEW_EXTERNAL_CORRELATION>();
+  auto conversion =
+      pti::test::utils::CreateRecord<pti_view_record_clock_conversion, PTI_VIEW_CLOCK_CONVERSION>();
+
+  merge.AddKernel(0, 1, 1 * kStep);
+  merge.AddKernel(1, 2, 2 * kStep);
+  merge.Add(0, &external, sizeof(external));
+  merge.AddKernel(0, 3, 3 * kStep);
+  merge.Add(0, &conversion, sizeof(conversion));
+  merge.Commit(0);
+  merge.Commit(1);
+
+  const auto written = merge.Drain(UINT64_MAX);
+  const std::vector<std::pair<pti_view_kind, uint64_t>> expected = {
+      {PTI_VIEW_DEVICE_GPU_KERNEL, 1},
+      {PTI_VIEW_DEVICE_GPU_KERNEL, 2},
+      {PTI_VIEW_EXTERNAL_CORRELATION, 0},
+      {PTI_VIEW_DEVICE_GPU_KERNEL, 3},
+      {PTI_VIEW_CLOCK_CONVERSION, 0}};
+  EXPECT_EQ(written, expected);
+}
+
+TEST(ViewRecordMergeTest, CountsLateRecords) {
+  MergerFixture merge;
+  for (uint64_t id = 0; id < 4; ++id) {
+    merge.AddKernel(0, id, id * kStep);
+  }
+  merge.Commit(0);
+  // Output full after two records, the rest is kept
+  EXPECT_EQ(KernelIds(merge.Drain(UINT64_MAX, 2)), (std::vector<uint64_t>{0, 1}));
+  EXPECT_EQ(merge.merger_.Size(), 2UL);
+  EXPECT_EQ(KernelIds(merge.Drain(UINT64_MAX)), (std::vector<uint64_t>{2, 3}));
+
+  // Committed after the watermark had passed it
+  merge.AddKernel(1, 4, kStep / 2);
+  merge.Commit(1);
+  EXPECT_EQ(KernelIds(merge.Drain(UINT64_MAX)), (std::vector<uint64_t>{4}));
+  EXPECT_EQ(merge.merger_.LateRecords(), 1UL);
+}
+
+class ViewRecordMergeDeliveryTest : public ::testing::Test {
+ protected:
+  void SetUp() override {
+    ASSERT_EQ(Instance().RegisterBufferCallbacks(BufferRequested, BufferCompleted),
+              pti_result::PTI_SUCCESS);
+    TakeDelivered(true);
+  }
+
+  void TearDown() override {
+    EXPECT_EQ(Instance().SetConsumerThreads(1, PTI_VIEW_DELIVERY_ORDERED),
+              pti_result::PTI_SUCCESS);
+    Instance().SetCompletionWatermark(nullptr);
+    Instance().SetRecordEncoding(pti_view_record_encoding::PTI_VIEW_RECORD_ENCODING_FIXED);
+    TakeDelivered(true);
+  }
+};
+
+TEST_F(ViewRecordMergeDeliveryTest, OneConsumerThreadOnly) {
+  EXPECT_EQ(Instance().SetConsumerThreads(2, PTI_VIEW_DELIVERY_TIMESTAMP_ORDERED),
+            pti_result::PTI_ERROR_BAD_ARGUMENT);
+  EXPECT_EQ(Instance().SetConsumerThreads(1, PTI_VIEW_DELIVERY_TIMESTAMP_ORDERED),
+            pti_result::PTI_SUCCESS);
+}
+
+TEST_F(ViewRecordMergeDeliveryTest, GloballyOrderedDelivery) {
+  ASSERT_EQ(Instance().SetConsumerThreads(1, PTI_VIEW_DELIVERY_TIMESTAMP_ORDERED),
+            pti_result::PTI_SUCCESS);
+
+  // Start of the next command of every producer stands for its oldest
+  // outstanding command
+  std::array<std::atomic<uint64_t>, kProducers> outstanding = {};
+  Instance().SetCompletionWatermark([&outstanding] {
+    uint64_t watermark = UINT64_MAX;
+    for (const auto& start : outstanding) {
+      watermark = std::min(watermark, start.load());
+    }
+    return watermark;
+  });
+
+  uint64_t base = utils::GetTime(CLOCK_MONOTONIC_RAW);
+  for (const auto encoding : {pti_view_record_encoding::PTI_VIEW_RECORD_ENCODING_FIXED,
+                              pti_view_record_encoding::PTI_VIEW_RECORD_ENCODING_COMPACT}) {
+    Instance().SetRecordEncoding(encoding);
+    for (std::size_t p = 0; p < kProducers; ++p) {
+      outstanding[p] = base + p * kStep;
+    }
+
+    std::vector<std::thread> producers;
+    for (std::size_t p = 0; p < kProducers; ++p) {
+      producers.emplace_back([p, base, &outstanding] {
+        for (std::size_t i = 0; i < kRecordsPerProducer; ++i) {
+          auto record = CreateKernel(i, base + (i * kProducers + p) * kStep);
+          record._thread_id = static_cast<uint32_t>(p);
+          Instance().InsertRecord(record);
+          outstanding[p] = record._start_timestamp + kProducers * kStep;
+          // Producers run at different rates
+          if (p == 0 && i % 1000 == 0) {
+            std::this_thread::yield();
+          }
+        }
+        outstanding[p] = UINT64_MAX;
+      });
+    }
+    for (auto& producer : producers) {
+      producer.join();
+    }
+
+    // Merged records are delivered while the producers run, the rest on flush
+    const auto before_flush = TakeDelivered(false);
+    const auto after_flush = TakeDelivered(true);
+    base += kProducers * kRecordsPerProducer * kStep;
+
+    auto start_timestamps = before_flush.start_timestamps;
+    start_timestamps.insert(start_timestamps.end(), after_flush.start_timestamps.begin(),
+                            after_flush.start_timestamps.end());
+    ASSERT_EQ(start_timestamps.size(), kProducers * kRecordsPerProducer);
+    EXPECT_TRUE(std::is_sorted(start_timestamps.begin(), start_timestamps.end()));
+    for (std::size_t p = 0; p < kProducers; ++p) {
+      auto kernel_ids = before_flush.kernel_ids[p];
+      kernel_ids.insert(kernel_ids.end(), after_flush.kernel_ids[p].begin(),
+                        after_flush.kernel_ids[p].end());
+      ASSERT_EQ(kernel_ids.size(), kRecordsPerProducer);
+      for (std::size_t i = 0; i < kernel_ids.size(); ++i) {
+        EXPECT_EQ(kernel_ids[i], i);
+      }
+    }
+  }
+  EXPECT_EQ(Instance().GetLateRecords(), 0UL);
+}
+
+TEST_F(ViewRecordMergeDeliveryTest, ExternalCorrelationInMergedOrder) {
+  constexpr std::size_t kThreads = 2;
+  constexpr std::size_t kOps = 1000;
+  constexpr std::size_t kKernelsPerOp = 3;
+  ASSERT_EQ(Instance().SetConsumerThreads(1, PTI_VIEW_DELIVERY_TIMESTAMP_ORDERED),
+            pti_result::PTI_SUCCESS);
+  external_collection_enabled = true;
+
+  // Kernels of the threads alternate in the merged order, a kernel is never
+  // next to the correlation records of its thread's previous kernel
+  const uint64_t base = utils::GetTime(CLOCK_MONOTONIC_RAW);
+  std::vector<std::thread> threads;
+  for (std::size_t t = 0; t < kThreads; ++t) {
+    threads.emplace_back([t, base] {
+      ZeKernelCommandExecutionRecord rec = {};
+      rec.tid_ = t;
+      // An outer ID of another kind for all the ops
+      ASSERT_EQ(Instance().PushExternalKindId(PTI_VIEW_EXTERNAL_KIND_CUSTOM_1, t),
+                pti_result::PTI_SUCCESS);
+      for (std::size_t op = 0; op < kOps; ++op) {
+        ASSERT_EQ(Instance().PushExternalKindId(PTI_VIEW_EXTERNAL_KIND_CUSTOM_0, t * kOps + op),
+                  pti_result::PTI_SUCCESS);
+        for (std::size_t kernel = 0; kernel < kKernelsPerOp; ++kernel) {
+          const std::size_t index = op * kKernelsPerOp + kernel;
+          rec.kid_ = t * kOps + op;
+          rec.cid_ = static_cast<uint32_t>(t * kOps * kKernelsPerOp + index + 1);
+          rec.start_time_ = base + (index * kThreads + t) * kStep;
+          rec.end_time_ = rec.start_time_ + kStep / 2;
+          KernelEvent(nullptr, rec);
+        }
+        ASSERT_EQ(Instance().PopExternalKindId(PTI_VIEW_EXTERNAL_KIND_CUSTOM_0, nullptr),
+                  pti_result::PTI_SUCCESS);
+      }
+      Instance().PopExternalKindId(PTI_VIEW_EXTERNAL_KIND_CUSTOM_1, nullptr);
+    });
+  }
+  for (auto& thread : threads) {
+    thread.join();
+  }
+  const auto result = TakeDelivered(true);
+  external_collection_enabled = false;
+
+  ASSERT_EQ(result.start_timestamps.size(), kThreads * kOps * kKernelsPerOp);
+  EXPECT_TRUE(std::is_sorted(result.start_timestamps.begin(), result.start_timestamps.end()));
+  // Every kernel is tied to the ID of its op by its correlation ID
+  EXPECT_EQ(result.external_ids.size(), result.start_timestamps.size());
+  for (std::size_t t = 0; t < kThreads; ++t) {
+    ASSERT_EQ(result.kernel_ids[t].size(), kOps * kKernelsPerOp);
+    for (std::size_t i = 0; i < result.kernel_ids[t].size(); ++i) {
+      const auto external_id = result.external_ids.find(result.correlation_ids[t][i]);
+      ASSERT_NE(external_id, result.external_ids.end());
+      EXPECT_EQ(external_id->second, result.kernel_ids[t][i]);
+    }
+  }
+}
+
+TEST_F(ViewRecordMergeDeliveryTest, FlushWithFullQueue) {
+  ASSERT_EQ(Instance().SetConsumerThreads(1, PTI_VIEW_DELIVERY_TIMESTAMP_ORDERED),
+            pti_result::PTI_SUCCESS);
+  Instance().SetCompletionWatermark([] { return UINT64_MAX; });
+  // Flush fills the queue, the consumer gets the watermark meanwhile
+  Instance().SetBufferQueueDepth(1);
+
+  std::mutex threads_mtx;
+  std::condition_variable threads_cv;
+  std::size_t records_inserted = 0;
+  bool flushed = false;
+  const uint64_t base = utils::GetTime(CLOCK_MONOTONIC_RAW);
+  std::vector<std::thread> producers;
+  for (std::size_t p = 0; p < kProducers; ++p) {
+    producers.emplace_back([&, p] {
+      auto record = CreateKernel(0, base + p * kStep);
+      record._thread_id = static_cast<uint32_t>(p);
+      Instance().InsertRecord(record);
+      // Records stay in the buffer of a live thread until the flush
+      std::unique_lock<std::mutex> lock(threads_mtx);
+      ++records_inserted;
+      threads_cv.notify_all();
+      threads_cv.wait(lock, [&flushed] { return flushed; });
+    });
+  }
+  {
+    std::unique_lock<std::mutex> lock(threads_mtx);
+    threads_cv.wait(lock, [&records_inserted] { return records_inserted == kProducers; });
+  }
+
+  // What ptiFlushAllViews() runs, on the handler of the test
+  EXPECT_EQ(Instance().FlushBuffers(), pti_result::PTI_SUCCESS);
+  {
+    std::lock_guard<std::mutex> lock(threads_mtx);
+    flushed = true;
+  }
+  threads_cv.notify_all();
+  for (auto& producer : producers) {
+    producer.join();
+  }
+  Instance().SetBufferQueueDepth(kDefaultBufferQueueDepth);
+
+  const auto result = TakeDelivered(false);
+  ASSERT_EQ(result.start_timestamps.size(), kProducers);
+  EXPECT_TRUE(std::is_sorted(result.start_timestamps.begin(), result.start_timestamps.end()));
+}
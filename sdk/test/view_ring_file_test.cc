@@ -0,0 +1,214 @@
+#include "view_ring_file.h"
+
+#include <gtest/gtest.h>
+#include <sys/wait.h>
+#include <unistd.h>
+
+#include <cstdlib>
+#include <filesystem>
+#include <fstream>
+#include <mutex>
+#include <string>
+#include <thread>
+#include <vector>
+
+#include "pti_view.h"
+#include "utils/test_helpers.h"
+#include "view_buffer.h"
+#include "view_handler.h"
+
+using pti::view::utilities::ViewBuffer;
+using pti::view::utilities::ViewRingFile;
+
+namespace {
+
+constexpr std::size_t kSliceSize = 1UL << 14;
+constexpr std::size_t kSliceCount = 4;
+constexpr uint64_t kBaseTimestamp = 5000000000000ULL;
+
+std::mutex delivered_mtx;
+std::size_t delivered_records = 0;
+std::size_t ring_file_buffers = 0;
+
+void BufferRequested(unsigned char** buf, std::size_t* buf_size) {
+  *buf = static_cast<unsigned char*>(std::malloc(kSliceSize));
+  *buf_size = *buf ? kSliceSize : 0;
+}
+
+void BufferCompleted(unsigned char* buf, std::size_t /*buf_size*/, std::size_t valid_buf_size) {
+  std::size_t records = 0;
+  pti_view_record_base* record = nullptr;
+  while (GetNextRecord(buf, valid_buf_size, &record) == pti_result::PTI_SUCCESS) {
+    ++records;
+  }
+  const bool from_ring_file = Instance().ReturnBuffer(buf) == pti_result::PTI_SUCCESS;
+  if (!from_ring_file) {
+    std::free(buf);
+  }
+  std::lock_guard<std::mutex> lock(delivered_mtx);
+  delivered_records += records;
+  ring_file_buffers += from_ring_file;
+}
+
+std::string RingFilePath(const char* name) {
+  return (std::filesystem::temp_directory_path() / name).string();
+}
+
+// Fills the buffer with kernel records numbered from first_id
+std::size_t FillBuffer(unsigned char* buffer, uint64_t first_id) {
+  ViewBuffer view_buffer(buffer, kSliceSize, 0);
+  uint64_t id = first_id;
+  while (view_buffer.FreeBytes() >= sizeof(pti_view_record_kernel)) {
+    auto record = pti::test::utils::CreateRecord<pti_view_record_kernel>();
+    record._kernel_id = id++;
+    view_buffer.Insert(record);
+  }
+  return view_buffer.GetValidBytes();
+}
+
+// Kernel IDs of committed slices, in the commit order
+std::vector<std::vector<uint64_t>> ReadKernelIds(const std::string& path) {
+  std::vector<std::vector<uint64_t>> slices;
+  pti_view_ring_file_reader reader = nullptr;
+  EXPECT_EQ(ptiViewRingFileOpen(path.c_str(), &reader), pti_result::PTI_SUCCESS);
+  if (!reader) {
+    return slices;
+  }
+  uint8_t* buffer = nullptr;
+  std::size_t valid_bytes = 0;
+  while (ptiViewRingFileGetNextSlice(reader, &buffer, &valid_bytes) == pti_result::PTI_SUCCESS) {
+    slices.emplace_back();
+    pti_view_record_base* record = nullptr;
+    while (ptiViewGetNextRecord(buffer, valid_bytes, &record) == pti_result::PTI_SUCCESS) {
+      if (record->_view_kind == PTI_VIEW_DEVICE_GPU_KERNEL) {
+        slices.back().push_back(reinterpret_cast<pti_view_record_kernel*>(record)->_kernel_id);
+      }
+    }
+  }
+  EXPECT_EQ(ptiViewRingFileClose(reader), pti_result::PTI_SUCCESS);
+  return slices;
+}
+
+}  // namespace
+
+TEST(ViewRingFileTest, SlicesReusedInCommitOrder) {
+  const auto path = RingFilePath("pti_view_ring_file_test.ring");
+  {
+    ViewRingFile ring_file(path.c_str(), kSliceSize, kSliceCount);
+    std::vector<unsigned char*> slices;
+    for (std::size_t i = 0; i < kSliceCount; ++i) {
+      slices.push_back(ring_file.Acquire());
+      ASSERT_NE(slices.back(), nullptr);
+      EXPECT_TRUE(ring_file.Owns(slices.back()));
+    }
+    EXPECT_EQ(ring_file.Acquire(), nullptr);
+
+    // Completed in reverse order, the last one is still being filled
+    for (std::size_t i = kSliceCount - 1; i > 0; --i) {
+      ring_file.Commit(slices[i], FillBuffer(slices[i], i * 1000));
+      EXPECT_TRUE(ring_file.Release(slices[i]));
+    }
+    EXPECT_FALSE(ring_file.Release(slices[1]));
+    EXPECT_FALSE(ring_file.Release(nullptr));
+
+    auto committed = ReadKernelIds(path);
+    ASSERT_EQ(committed.size(), kSliceCount - 1);
+    for (std::size_t i = 0; i < committed.size(); ++i) {
+      ASSERT_FALSE(committed[i].empty());
+      EXPECT_EQ(committed[i].front(), (kSliceCount - 1 - i) * 1000);
+    }
+
+    // The slice committed first is reused first and no longer readable
+    EXPECT_EQ(ring_file.Acquire(), slices[kSliceCount - 1]);
+    committed = ReadKernelIds(path);
+    ASSERT_EQ(committed.size(), kSliceCount - 2);
+    EXPECT_EQ(committed.front().front(), (kSliceCount - 2) * 1000);
+  }
+  std::filesystem::remove(path);
+}
+
+TEST(ViewRingFileTest, CommittedSlicesSurviveCrash) {
+  const auto path = RingFilePath("pti_view_ring_file_crash_test.ring");
+  const pid_t child = fork();
+  ASSERT_GE(child, 0);
+  if (child == 0) {
+    ViewRingFile ring_file(path.c_str(), kSliceSize, kSliceCount);
+    for (uint64_t i = 0; i < 2; ++i) {
+      auto* slice = ring_file.Acquire();
+      ring_file.Commit(slice, FillBuffer(slice, i * 1000));
+    }
+    // Filled, but not completed
+    FillBuffer(ring_file.Acquire(), 2000);
+    std::abort();
+  }
+  int status = 0;
+  ASSERT_EQ(waitpid(child, &status, 0), child);
+  EXPECT_TRUE(WIFSIGNALED(status));
+
+  const auto committed = ReadKernelIds(path);
+  ASSERT_EQ(committed.size(), 2UL);
+  for (uint64_t i = 0; i < 2; ++i) {
+    ASSERT_EQ(committed[i].size(), kSliceSize / sizeof(pti_view_record_kernel));
+    EXPECT_EQ(committed[i].front(), i * 1000);
+    EXPECT_EQ(committed[i].back(), i * 1000 + committed[i].size() - 1);
+  }
+  std::filesystem::remove(path);
+}
+
+TEST(ViewRingFileTest, RejectsOtherFiles) {
+  const auto path = RingFilePath("pti_view_ring_file_other.ring");
+  std::ofstream(path) << std::string(4096, 'x');
+  pti_view_ring_file_reader reader = nullptr;
+  EXPECT_EQ(ptiViewRingFileOpen(path.c_str(), &reader), pti_result::PTI_ERROR_BAD_ARGUMENT);
+  EXPECT_EQ(ptiViewRingFileOpen("/nonexistent/dir/file", &reader),
+            pti_result::PTI_ERROR_BAD_ARGUMENT);
+  EXPECT_EQ(ptiViewRingFileOpen(path.c_str(), nullptr), pti_result::PTI_ERROR_BAD_ARGUMENT);
+  EXPECT_EQ(ptiViewRingFileGetNextSlice(nullptr, nullptr, nullptr),
+            pti_result::PTI_ERROR_BAD_ARGUMENT);
+  EXPECT_EQ(reader, nullptr);
+  std::filesystem::remove(path);
+}
+
+TEST(ViewRingFileTest, HandlerUsesRingFile) {
+  constexpr std::size_t kRecordCount = 2000;
+  constexpr std::size_t kHandlerSlices = 64;
+  const auto path = RingFilePath("pti_view_ring_file_handler_test.ring");
+  ASSERT_EQ(Instance().RegisterBufferCallbacks(BufferRequested, BufferCompleted),
+            pti_result::PTI_SUCCESS);
+  EXPECT_EQ(Instance().SetRingFile(nullptr, kSliceSize, kHandlerSlices),
+            pti_result::PTI_ERROR_BAD_ARGUMENT);
+  EXPECT_EQ(Instance().SetRingFile(path.c_str(), 8, kHandlerSlices),
+            pti_result::PTI_ERROR_BAD_ARGUMENT);
+  ASSERT_EQ(Instance().SetRingFile(path.c_str(), kSliceSize, kHandlerSlices),
+            pti_result::PTI_SUCCESS);
+  // Set once
+  EXPECT_EQ(Instance().SetRingFile(path.c_str(), kSliceSize, kHandlerSlices),
+            pti_result::PTI_ERROR_BAD_ARGUMENT);
+
+  std::thread producer([] {
+    for (std::size_t i = 0; i < kRecordCount; ++i) {
+      auto record = pti::test::utils::CreateRecord<pti_view_record_kernel>();
+      record._kernel_id = i;
+      record._start_timestamp = kBaseTimestamp + i * 1000;
+      record._end_timestamp = record._start_timestamp + 500;
+      Instance().InsertRecord(record);
+    }
+  });
+  producer.join();
+
+  // Completed buffers are in the file before they are delivered
+  std::vector<uint64_t> kernel_ids;
+  for (const auto& slice : ReadKernelIds(path)) {
+    kernel_ids.insert(kernel_ids.end(), slice.begin(), slice.end());
+  }
+  ASSERT_EQ(kernel_ids.size(), kRecordCount);
+  for (std::size_t i = 0; i < kRecordCount; ++i) {
+    EXPECT_EQ(kernel_ids[i], i);
+  }
+
+  Instance().FlushBuffers();
+  std::lock_guard<std::mutex> lock(delivered_mtx);
+  EXPECT_EQ(delivered_records, kRecordCount);
+  EXPECT_GT(ring_file_buffers, 1UL);
+  std::filesystem::remove(path);
+}
@@ -0,0 +1,183 @@
+#include <gtest/gtest.h>
+
+#include <array>
+#include <atomic>
+#include <chrono>
+#include <cstdint>
+#include <iostream>
+#include <mutex>
+#include <string>
+#include <unordered_map>
+
+#include "pti_view.h"
+#include "view_handler.h"
+
+namespace {
+
+constexpr std::size_t kIterations = 1UL << 16;
+constexpr std::size_t kAppendsPerIteration = 16;
+
+// Calls of the synthetic stream, in the order of one iteration
+enum SyntheticCall : std::size_t {
+  kCommandListCreate = 0,
+  kAppendLaunchKernel,
+  kExecuteCommandLists,
+  kEventHostSynchronize,
+  kCommandListDestroy,
+  kCallCount
+};
+
+constexpr std::size_t kCallsPerIteration = kAppendsPerIteration + 4;
+
+using Callback = void (*)(std::size_t call, uint64_t handle);
+
+struct CallbackTable {
+  std::array<Callback, kCallCount> prologue = {};
+  std::array<Callback, kCallCount> epilogue = {};
+};
+
+// State the callbacks keep, as the collector does for the traced objects
+std::mutex state_mtx;
+std::unordered_map<uint64_t, uint64_t> live_objects;
+std::unordered_map<uint64_t, uint64_t> call_timestamps;
+std::size_t callback_calls = 0;
+
+uint64_t Timestamp() {
+  return static_cast<uint64_t>(std::chrono::steady_clock::now().time_since_epoch().count());
+}
+
+void OnLifetime(std::size_t call, uint64_t handle) {
+  std::lock_guard<std::mutex> lock(state_mtx);
+  if (call == kCommandListDestroy) {
+    live_objects.erase(handle);
+  } else {
+    live_objects[handle] = call;
+  }
+  ++callback_calls;
+}
+
+void OnCall(std::size_t call, uint64_t handle) {
+  const auto timestamp = Timestamp();
+  std::lock_guard<std::mutex> lock(state_mtx);
+  call_timestamps[handle * kCallCount + call] = timestamp;
+  ++callback_calls;
+}
+
+bool IsLifetimeCall(std::size_t call) { return call != kAppendLaunchKernel; }
+
+// Lifetime, submission and synchronization callbacks, installed on the tracer
+// that stays enabled while tracing is stopped
+CallbackTable LifetimeTable() {
+  CallbackTable table;
+  for (std::size_t call = 0; call < kCallCount; ++call) {
+    if (IsLifetimeCall(call)) {
+      table.prologue[call] = OnLifetime;
+      table.epilogue[call] = OnLifetime;
+    }
+  }
+  return table;
+}
+
+// All the other callbacks, installed on the tracer ptiViewStop disables
+CallbackTable WindowTable() {
+  CallbackTable table;
+  for (std::size_t call = 0; call < kCallCount; ++call) {
+    if (!IsLifetimeCall(call)) {
+      table.prologue[call] = OnCall;
+      table.epilogue[call] = OnCall;
+    }
+  }
+  return table;
+}
+
+// Loader side of the tracing: one atomic load per tracer and call, then the
+// callbacks the enabled tracers set for the call
+std::array<std::atomic<const CallbackTable*>, 2> enabled_tables = {};
+std::atomic<uint64_t> driver_work = 0;
+
+inline void TracedCall(std::size_t call, uint64_t handle) {
+  std::array<const CallbackTable*, 2> tables = {};
+  for (std::size_t i = 0; i < tables.size(); ++i) {
+    tables[i] = enabled_tables[i].load(std::memory_order_acquire);
+    if (tables[i] && tables[i]->prologue[call]) {
+      tables[i]->prologue[call](call, handle);
+    }
+  }
+  driver_work.fetch_add(handle, std::memory_order_relaxed);
+  for (const auto* table : tables) {
+    if (table && table->epilogue[call]) {
+      table->epilogue[call](call, handle);
+    }
+  }
+}
+
+// Nanoseconds per call of the stream with the given tracers enabled
+double RunStream(const CallbackTable* lifetime_table, const CallbackTable* window_table) {
+  {
+    std::lock_guard<std::mutex> lock(state_mtx);
+    live_objects.clear();
+    call_timestamps.clear();
+    callback_calls = 0;
+  }
+  enabled_tables[0].store(lifetime_table, std::memory_order_release);
+  enabled_tables[1].store(window_table, std::memory_order_release);
+  const auto begin = std::chrono::steady_clock::now();
+  for (uint64_t i = 0; i < kIterations; ++i) {
+    TracedCall(kCommandListCreate, i);
+    for (std::size_t append = 0; append < kAppendsPerIteration; ++append) {
+      TracedCall(kAppendLaunchKernel, i);
+    }
+    TracedCall(kExecuteCommandLists, i);
+    TracedCall(kEventHostSynchronize, i);
+    TracedCall(kCommandListDestroy, i);
+  }
+  const auto end = std::chrono::steady_clock::now();
+  enabled_tables[0].store(nullptr, std::memory_order_release);
+  enabled_tables[1].store(nullptr, std::memory_order_release);
+  const std::chrono::duration<double, std::nano> time = end - begin;
+  return time.count() / (kIterations * kCallsPerIteration);
+}
+
+std::size_t TakeCallbackCalls() {
+  std::lock_guard<std::mutex> lock(state_mtx);
+  return callback_calls;
+}
+
+}  // namespace
+
+TEST(ViewTracingWindowBenchmark, StartStopWindows) {
+  EXPECT_TRUE(Instance().IsTracingRunning());
+  EXPECT_EQ(Instance().StopTracing(), pti_result::PTI_SUCCESS);
+  EXPECT_FALSE(Instance().IsTracingRunning());
+  // Stopping twice is not an error
+  EXPECT_EQ(Instance().StopTracing(), pti_result::PTI_SUCCESS);
+  EXPECT_EQ(Instance().StartTracing(), pti_result::PTI_SUCCESS);
+  EXPECT_TRUE(Instance().IsTracingRunning());
+}
+
+TEST(ViewTracingWindowBenchmark, StoppedTracingCostsOneLoadPerCall) {
+  const auto lifetime_table = LifetimeTable();
+  const auto window_table = WindowTable();
+
+  const auto no_tracing_ns = RunStream(nullptr, nullptr);
+  EXPECT_EQ(TakeCallbackCalls(), 0UL);
+
+  const auto stopped_ns = RunStream(&lifetime_table, nullptr);
+  // Command lists, submissions and synchronizations are still tracked while
+  // stopped, appends are not
+  EXPECT_EQ(TakeCallbackCalls(), 2 * kIterations * (kCallsPerIteration - kAppendsPerIteration));
+  {
+    std::lock_guard<std::mutex> lock(state_mtx);
+    EXPECT_TRUE(live_objects.empty());
+    EXPECT_TRUE(call_timestamps.empty());
+  }
+
+  const auto running_ns = RunStream(&lifetime_table, &window_table);
+  EXPECT_EQ(TakeCallbackCalls(), 2 * kIterations * kCallsPerIteration);
+
+  std::cout << "Per call, no tracing: " << no_tracing_ns << " ns, stopped: " << stopped_ns
+            << " ns, running: " << running_ns << " ns" << std::endl;
+  RecordProperty("no_tracing_ns_per_call", std::to_string(no_tracing_ns));
+  RecordProperty("stopped_ns_per_call", std::to_string(stopped_ns));
+  RecordProperty("running_ns_per_call", std::to_string(running_ns));
+}
@@ -0,0 +1,479 @@
+import datetime
+import json
+import os
+import platform
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import run
+import utils
+
+HISTORY_FILE_NAME = "bench_history.json"
+
+# Tool modes measured on top of the synthetic workload
+tools = [["onetrace",
+          "-h", "-d", "-c", "-t",
+          "--chrome-call-logging",
+          "--chrome-device-timeline",
+          "--chrome-kernel-timeline",
+          "--chrome-device-stages"],
+         ["ze_tracer",
+          "-h", "-d", "-c", "-t",
+          "--chrome-call-logging",
+          "--chrome-device-timeline",
+          "--chrome-kernel-timeline",
+          "--chrome-device-stages"]]
+
+# PTI SDK view sets (see ZE_FAKE_PTI_VIEWS in tests/ze_fake/README.md)
+views = ["kernel",
+         "kernel,mem_copy,mem_fill",
+         "kernel,overhead",
+         "kernel,external_correlation"]
+
+# Workload shapes as (kernels per submission, share of kernels, immediate).
+# Time overhead is fitted by the linear model
+#   overhead = fixed + api_calls * per_call + kernels * per_kernel
+# over the shapes, so they differ in both calls per kernel and kernel count
+shapes = [[1, 1.0, True],
+          [64, 1.0, False],
+          [64, 0.25, False]]
+
+# Fake driver settings, device time is kept short to expose host overhead
+fake_driver_env = {"ZE_FAKE_KERNEL_TIME": "1000",
+                   "ZE_FAKE_COPY_TIME": "500",
+                   "ZE_FAKE_SUBMIT_LATENCY": "1000"}
+
+# Metric name -> (description, absolute change below which it is noise)
+metrics = {"api_call_overhead_ns": ("per API call, ns", 10.0),
+           "kernel_overhead_ns": ("per kernel, ns", 50.0),
+           "fixed_overhead_ms": ("fixed, ms", 5.0),
+           "peak_rss_kb": ("peak RSS, KB", 1024.0),
+           "bytes_per_event": ("output per event, bytes", 1.0)}
+
+# Build #######################################################################
+
+def get_fake_driver_path():
+  return os.path.join(utils.get_script_path(), "ze_fake")
+
+def get_fake_driver_build_path():
+  path = os.path.join(get_fake_driver_path(), "build")
+  if not os.path.exists(path):
+    os.mkdir(path)
+  return path
+
+def get_sdk_build_path():
+  path = os.path.join(utils.get_root_path(), "sdk", "build")
+  if not os.path.exists(path):
+    os.mkdir(path)
+  return path
+
+def get_sdk_install_path():
+  return os.path.join(get_sdk_build_path(), "install")
+
+def build_sdk():
+  path = get_sdk_build_path()
+  cmake = ["cmake",\
+    "-DCMAKE_BUILD_TYPE=" + utils.get_build_flag(),\
+    "-DPTI_BUILD_TESTING=OFF", "-DPTI_BUILD_SAMPLES=OFF",\
+    "-DCMAKE_INSTALL_PREFIX=" + get_sdk_install_path(), ".."]
+  stdout, stderr = utils.run_process(cmake, path)
+  if stderr and stderr.find("CMake Error") != -1:
+    return stderr
+  stdout, stderr = utils.run_process(["make", "install"], path)
+  if stderr and stderr.lower().find("error") != -1:
+    return stderr
+  return None
+
+def build_fake_driver(with_sdk):
+  path = get_fake_driver_build_path()
+  cmake = ["cmake", "-DCMAKE_BUILD_TYPE=" + utils.get_build_flag()]
+  if with_sdk:
+    cmake.append("-DCMAKE_PREFIX_PATH=" + get_sdk_install_path())
+  cmake.append("..")
+  stdout, stderr = utils.run_process(cmake, path)
+  if stderr and stderr.find("CMake Error") != -1:
+    return stderr
+  stdout, stderr = utils.run_process(["make"], path)
+  if stderr and stderr.lower().find("error") != -1:
+    return stderr
+  return None
+
+# Measurement #################################################################
+
+class Sample:
+  def __init__(self, wall_time, max_rss, output_bytes, stdout, stderr):
+    self.wall_time = wall_time
+    self.max_rss = max_rss
+    self.output_bytes = output_bytes
+    self.stdout = stdout
+    self.stderr = stderr
+
+def get_dir_size(path):
+  size = 0
+  for root, subdirs, files in os.walk(path):
+    for file in files:
+      size += os.path.getsize(os.path.join(root, file))
+  return size
+
+def read_file(file_name):
+  with open(file_name, "rt", errors = "replace") as f:
+    return f.read()
+
+def measure(command, environ):
+  # Every run is done in an empty folder, so all the output files it leaves
+  # (console output included) are counted as output
+  path = tempfile.mkdtemp(prefix = "bench_", dir = get_fake_driver_build_path())
+  stdout_file = os.path.join(path, utils.STDOUT)
+  stderr_file = os.path.join(path, utils.STDERR)
+  try:
+    with open(stdout_file, "wb") as out, open(stderr_file, "wb") as err:
+      start = time.perf_counter()
+      p = subprocess.Popen(command, cwd = path, env = environ,\
+        stdout = out, stderr = err)
+      # Resource usage of the exact child (tools exec the application)
+      pid, status, usage = os.wait4(p.pid, 0)
+      wall_time = time.perf_counter() - start
+      p.returncode = os.waitstatus_to_exitcode(status)
+
+    sample = Sample(wall_time, usage.ru_maxrss, get_dir_size(path),\
+      read_file(stdout_file), read_file(stderr_file))
+    if p.returncode != 0 or sample.stdout.find(" CORRECT") == -1:
+      return None, "Command " + " ".join(command) + " failed with code " +\
+        str(p.returncode) + "\n[stdout]\n" + sample.stdout[-4096:] +\
+        "\n[stderr]\n" + sample.stderr[-4096:]
+    return sample, None
+  finally:
+    shutil.rmtree(path, ignore_errors = True)
+
+def get_shape_args(shape, kernel_count, thread_count):
+  batch, share, immediate = shape
+  args = [str(thread_count), str(max(int(kernel_count * share), batch)),\
+    str(batch)]
+  if immediate:
+    args.append("immediate")
+  return args
+
+def measure_shapes(command, environ, kernel_count, thread_count, repeat):
+  # The fastest of the repeated runs is taken for every shape
+  samples = []
+  for shape in shapes:
+    best = None
+    for i in range(repeat):
+      sample, log = measure(command +\
+        get_shape_args(shape, kernel_count, thread_count), environ)
+      if log:
+        return None, log
+      if best is None or sample.wall_time < best.wall_time:
+        best = sample
+      best.max_rss = max(best.max_rss, sample.max_rss)
+    samples.append(best)
+  return samples, None
+
+def solve(matrix, values):
+  # Gaussian elimination with partial pivoting, None for singular systems
+  size = len(values)
+  rows = [list(matrix[i]) + [values[i]] for i in range(size)]
+  for i in range(size):
+    pivot = max(range(i, size), key = lambda k: abs(rows[k][i]))
+    if abs(rows[pivot][i]) < 1e-12:
+      return None
+    rows[i], rows[pivot] = rows[pivot], rows[i]
+    for k in range(i + 1, size):
+      factor = rows[k][i] / rows[i][i]
+      for j in range(i, size + 1):
+        rows[k][j] -= factor * rows[i][j]
+  result = [0.0] * size
+  for i in reversed(range(size)):
+    value = rows[i][size]
+    for j in range(i + 1, size):
+      value -= rows[i][j] * result[j]
+    result[i] = value / rows[i][i]
+  return result
+
+def get_counts(samples):
+  counts = []
+  for sample in samples:
+    calls = re.search(r"ze_fake API calls: (\d+)", sample.stderr)
+    kernels = re.search(r"ze_fake kernels: (\d+)", sample.stderr)
+    assert calls and kernels
+    counts.append((int(calls.group(1)), int(kernels.group(1))))
+  return counts
+
+def get_pti_bytes(sample):
+  result = re.search(r"PTI bytes: (\d+)", sample.stdout)
+  return int(result.group(1)) if result else 0
+
+def evaluate(samples, baseline, counts):
+  deltas = [samples[i].wall_time - baseline[i].wall_time\
+    for i in range(len(shapes))]
+  matrix = [[1.0, float(calls), float(kernels)] for calls, kernels in counts]
+  fit = solve(matrix, deltas)
+  if fit is None:
+    fit = [0.0, 0.0, 0.0]
+
+  # Output is compared on the shape with the most events
+  calls, kernels = counts[0]
+  output_bytes = samples[0].output_bytes - baseline[0].output_bytes +\
+    get_pti_bytes(samples[0])
+  return {"fixed_overhead_ms": fit[0] * 1e3,
+          "api_call_overhead_ns": fit[1] * 1e9,
+          "kernel_overhead_ns": fit[2] * 1e9,
+          "peak_rss_kb": samples[0].max_rss,
+          "bytes_per_event": float(output_bytes) / (calls + kernels),
+          "wall_time_s": samples[0].wall_time}
+
+# History #####################################################################
+
+def load_history(file_name):
+  if not os.path.exists(file_name):
+    return []
+  with open(file_name, "rt") as f:
+    return json.load(f)
+
+def store_history(file_name, history):
+  # Replaced atomically, so an interrupted run does not lose the history
+  path = os.path.dirname(os.path.abspath(file_name))
+  fd, temp_name = tempfile.mkstemp(dir = path, prefix = HISTORY_FILE_NAME)
+  with os.fdopen(fd, "wt") as f:
+    json.dump(history, f, indent = 2)
+  os.replace(temp_name, file_name)
+
+def get_commit():
+  try:
+    stdout = subprocess.check_output(["git", "rev-parse", "HEAD"],\
+      cwd = utils.get_root_path(), stderr = subprocess.DEVNULL)
+    return stdout.decode().strip()
+  except (OSError, subprocess.CalledProcessError):
+    return None
+
+def print_results(results):
+  names = list(metrics.keys())
+  width = max([len(mode) for mode in results] + [len("Mode")])
+  print("Mode".ljust(width) + "".join(["  " + name.rjust(20) for name in names]))
+  for mode, result in results.items():
+    if "error" in result:
+      print(mode.ljust(width) + "  FAILED")
+      continue
+    print(mode.ljust(width) + "".join(["  " + ("%.2f" % result[name]).rjust(20)\
+      for name in names]))
+
+def compare(history, base_index, new_index, threshold):
+  base = history[base_index]
+  new = history[new_index]
+  print("Comparing run of " + new["date"] + " (" + str(new["commit"]) +\
+    ") against run of " + base["date"] + " (" + str(base["commit"]) +\
+    "), threshold " + str(threshold) + "%")
+
+  regressions = 0
+  for mode, result in new["results"].items():
+    if mode not in base["results"]:
+      continue
+    base_result = base["results"][mode]
+    if "error" in result or "error" in base_result:
+      continue
+    for name, (title, noise) in metrics.items():
+      old_value = base_result[name]
+      new_value = result[name]
+      limit = max(noise, abs(old_value) * threshold / 100.0)
+      if new_value - old_value > limit:
+        print("REGRESSION: " + mode + ": " + title + ": " +\
+          ("%.2f -> %.2f" % (old_value, new_value)))
+        regressions += 1
+
+  print("REGRESSIONS: " + str(regressions))
+  return regressions
+
+# Main ########################################################################
+
+def get_modes(tmpl):
+  modes = []
+  for tool in tools:
+    for option in tool[1:]:
+      name = tool[0] + " " + option
+      if re.search(tmpl, name):
+        modes.append((name, tool[0], option))
+  for view in views:
+    name = "pti " + view
+    if re.search(tmpl, name):
+      modes.append((name, None, view))
+  return modes
+
+def run_benchmarks(modes, kernel_count, thread_count, repeat):
+  with_sdk = len([mode for mode in modes if mode[1] is None]) > 0
+  if with_sdk:
+    log = build_sdk()
+    if log:
+      sys.stdout.write("[WARNING] PTI SDK build failed, SDK views are skipped\n")
+      sys.stderr.write(log + "\n")
+      modes = [mode for mode in modes if mode[1] is not None]
+      with_sdk = False
+
+  log = build_fake_driver(with_sdk)
+  if log:
+    sys.stderr.write(log + "\n")
+    return None
+
+  # Tools are linked and run against the fake loader
+  library_path = get_fake_driver_build_path()
+  if os.environ.get("LD_LIBRARY_PATH"):
+    library_path += os.pathsep + os.environ["LD_LIBRARY_PATH"]
+  os.environ["LD_LIBRARY_PATH"] = library_path
+  environ = os.environ.copy()
+  for name, value in fake_driver_env.items():
+    environ.setdefault(name, value)
+
+  results = {}
+  for tool in sorted(set([mode[1] for mode in modes if mode[1] is not None])):
+    log, info, start, end = run.build_project(tool, True)
+    if log:
+      sys.stderr.write(log + "\n")
+      for mode in modes:
+        if mode[1] == tool:
+          results[mode[0]] = {"error": "Build failed"}
+      modes = [mode for mode in modes if mode[1] != tool]
+
+  workload = os.path.join(get_fake_driver_build_path(), "ze_fake_workload")
+  workload_pti = os.path.join(get_fake_driver_build_path(),\
+    "ze_fake_workload_pti")
+
+  baseline_environ = dict(environ)
+  baseline_environ["ZE_FAKE_STATS"] = "1"
+  baseline, log = measure_shapes([workload], baseline_environ,\
+    kernel_count, thread_count, repeat)
+  if log:
+    sys.stderr.write(log + "\n")
+    return None
+  counts = get_counts(baseline)
+
+  for name, tool, option in modes:
+    sys.stdout.write("Measuring " + name + "...")
+    sys.stdout.flush()
+    if tool is None:
+      mode_environ = dict(environ)
+      mode_environ["ZE_FAKE_PTI_VIEWS"] = option
+      command = [workload_pti]
+    else:
+      mode_environ = environ
+      command = [os.path.join(utils.get_tool_build_path(tool), tool),\
+        option, workload]
+    samples, log = measure_shapes(command, mode_environ,\
+      kernel_count, thread_count, repeat)
+    if log:
+      sys.stdout.write("FAILED\n")
+      sys.stderr.write(log + "\n")
+      results[name] = {"error": log[:1024]}
+    else:
+      sys.stdout.write("DONE\n")
+      results[name] = evaluate(samples, baseline, counts)
+
+  results["baseline"] = {"fixed_overhead_ms": 0.0,
+                         "api_call_overhead_ns": 0.0,
+                         "kernel_overhead_ns": 0.0,
+                         "peak_rss_kb": baseline[0].max_rss,
+                         "bytes_per_event": 0.0,
+                         "wall_time_s": baseline[0].wall_time,
+                         "api_calls": counts[0][0],
+                         "kernels": counts[0][1]}
+  return results
+
+def clean():
+  path = os.path.join(get_fake_driver_path(), "build")
+  if os.path.exists(path):
+    shutil.rmtree(path)
+
+USAGE = """Usage: python bench.py [options]
+Options:
+  -s <regex>                 modes to measure
+  -n <count>                 kernels per thread (20000 by default)
+  --threads <count>          workload threads (1 by default)
+  -r <count>                 repeats of every run (3 by default)
+  --history <file>           history file (tests/bench_history.json by default)
+  --compare [<base> [<new>]] compare two runs from history instead of measuring
+  --threshold <percent>      relative change treated as a regression (10 by default)
+  -c                         remove the fake driver build folder
+  -h, --help                 show this message"""
+
+def main():
+  tmpl = ".+"
+  kernel_count = 20000
+  thread_count = 1
+  repeat = 3
+  threshold = 10.0
+  history_file = os.path.join(utils.get_script_path(), HISTORY_FILE_NAME)
+  indices = None
+  value_options = ["-s", "-n", "-r", "--threads", "--threshold", "--history"]
+  i = 1
+  while i < len(sys.argv):
+    arg = sys.argv[i]
+    if arg in ["-h", "--help"]:
+      print(USAGE)
+      return 0
+    if arg == "-c":
+      clean()
+      return 0
+    if arg == "--compare":
+      # History indices are the positional arguments up to the next option
+      indices = []
+      while i + 1 < len(sys.argv) and len(indices) < 2 and\
+          re.match(r"^-?\d+$", sys.argv[i + 1]):
+        i += 1
+        indices.append(int(sys.argv[i]))
+    elif arg in value_options:
+      if i + 1 == len(sys.argv):
+        print("Value is missing for " + arg + "\n" + USAGE)
+        return 1
+      i += 1
+      value = sys.argv[i]
+      if arg == "-s":
+        tmpl = value
+      if arg == "-n":
+        kernel_count = max(int(value), 1)
+      if arg == "-r":
+        repeat = max(int(value), 1)
+      if arg == "--threads":
+        thread_count = max(int(value), 1)
+      if arg == "--threshold":
+        threshold = float(value)
+      if arg == "--history":
+        history_file = value
+    else:
+      print("Unknown option " + arg + "\n" + USAGE)
+      return 1
+    i += 1
+
+  if indices is not None:
+    history = load_history(history_file)
+    if len(history) < 2:
+      print("At least two runs are required in " + history_file)
+      return 1
+    base_index, new_index = indices + [-2, -1][len(indices):]
+    return 1 if compare(history, base_index, new_index, threshold) else 0
+
+  modes = get_modes(tmpl)
+  results = run_benchmarks(modes, kernel_count, thread_count, repeat)
+  if results is None:
+    print("Benchmark FAILED, see the details above")
+    return 1
+
+  history = load_history(history_file)
+  history.append({"date": datetime.datetime.now().isoformat(),
+                  "commit": get_commit(),
+                  "host": platform.node(),
+                  "config": {"kernels": kernel_count,
+                             "threads": thread_count,
+                             "repeat": repeat,
+                             "build": utils.get_build_flag()},
+                  "results": results})
+  store_history(history_file, history)
+
+  print_results(results)
+  if len(history) > 1:
+    compare(history, -2, -1, threshold)
+  return 0
+
+if __name__ == "__main__":
+  sys.exit(main())
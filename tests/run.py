@@ -1,11 +1,17 @@
+import concurrent.futures
 import importlib
+import inspect
+import json
 import os
 import re
 import shutil
 import sys
+import time
 
 import utils
 
+REPORT_FILE_NAME = "test_report.json"
+
 samples = [["cl_gemm", "gpu", "cpu"],
            ["cl_gemm_inst", None],
            ["cl_gemm_itt", "gpu", "cpu"],
@@ -65,6 +71,13 @@ tools = [["gpuinfo", "-l", "-i", "-m"],
         ["oneprof",
          "-i", "-m", "-k", "-a", "-q", "cl", "ze", "omp"]]
 
+# Tests that collect hardware metrics can't share a device with each other,
+# so they are run one by one (still in parallel with the rest of the tests)
+exclusive = ["cl_gpu_metrics", "cl_gpu_query",
+             "gpu_perfmon_read", "gpu_perfmon_set",
+             "ze_metric_query", "ze_metric_streamer",
+             "oneprof"]
+
 def remove_python_cache(path):
   files = os.listdir(path)
   for file in files:
@@ -86,6 +99,10 @@ def clean():
     if os.path.exists(path):
       shutil.rmtree(path)
 
+  path = os.path.join(utils.get_script_path(), "ze_fake", "build")
+  if os.path.exists(path):
+    shutil.rmtree(path)
+
   remove_python_cache(utils.get_build_utils_path())
   remove_python_cache(utils.get_script_path())
   remove_python_cache(os.path.join(utils.get_script_path(), "samples"))
@@ -93,79 +110,267 @@ def clean():
 
   for root, subdirs, files in os.walk(utils.get_root_path()):
     for file in files:
-      if file.endswith(".log"):
+      if file.endswith(".log") or file == REPORT_FILE_NAME:
         os.remove(os.path.join(root, file))
 
-def test(f, name, option, istool = False):
+class Task:
+  def __init__(self, key, title, func, args, deps = [], after = []):
+    self.key = key
+    self.title = title
+    self.func = func
+    self.args = args
+    # Tasks whose failure fails this one (builds)
+    self.deps = list(deps)
+    # Tasks that only have to complete before this one starts
+    self.after = list(after)
+    self.log = None
+    self.info = {}
+    self.start = None
+    self.end = None
+
+  def get_duration(self):
+    if self.start is None or self.end is None:
+      return 0.0
+    return self.end - self.start
+
+def get_module(name, istool):
   if istool:
-    if option:
-      sys.stdout.write("Running tool test for " + name + " (" + option + ")...")
-    else:
-      sys.stdout.write("Running tool test for " + name + "...")
-  else:
-    if option:
-      sys.stdout.write("Running sample test for " + name + " (" + option + ")...")
-    else:
-      sys.stdout.write("Running sample test for " + name + "...")
-  sys.stdout.flush()
+    return importlib.import_module("tools." + name)
+  return importlib.import_module("samples." + name)
 
+def get_build_path(name, istool):
   if istool:
-    module = importlib.import_module("tools." + name)
-  else:
-    module = importlib.import_module("samples." + name)
-  log = module.main(option)
+    return utils.get_tool_build_path(name)
+  return utils.get_sample_build_path(name)
 
-  if log:
-    sys.stdout.write("FAILED\n")
-    if option:
-      f.write("======= " + name + " (" + option + ") =======\n")
-    else:
-      f.write("======= " + name + " =======\n")
-    f.write(log)
-    f.write("\n")
-    return False
+def get_build_dependencies(name, istool):
+  # Every sample imported by a test module is an application it runs
+  module = get_module(name, istool)
+  dependencies = []
+  for item in vars(module).values():
+    if inspect.ismodule(item) and item.__name__.startswith("samples."):
+      dependencies.append(item.__name__.split(".")[1])
+  return sorted(dependencies)
+
+def build_project(name, istool):
+  start = time.time()
+  utils.default_timeout = None
+  module = get_module(name, istool)
+  path = get_build_path(name, istool)
+  build_hash = utils.get_build_hash(name, istool)
+  cached = utils.is_build_cached(path, build_hash)
+  log = None
+  if not cached:
+    utils.reset_build_hash(path)
+    log = module.config(path)
+    if not log:
+      log = module.build(path)
+    if not log:
+      utils.store_build_hash(path, build_hash)
+  return log, {"hash": build_hash, "cached": cached}, start, time.time()
+
+def run_test(name, option, istool, timeout):
+  start = time.time()
+  # Workers are shared between builds and tests, so set it every time
+  utils.default_timeout = timeout
+  module = get_module(name, istool)
+  path = get_build_path(name, istool)
+  if module.run.__code__.co_argcount > 1:
+    log = module.run(path, option)
   else:
-    sys.stdout.write("PASSED\n")
-    return True
+    log = module.run(path)
+  return log, {}, start, time.time()
+
+def get_test_title(name, option, istool):
+  title = "tool" if istool else "sample"
+  title += " test for " + name
+  if option:
+    title += " (" + option + ")"
+  return title
+
+def create_tasks(tmpl, timeout):
+  builds = {}
+  tests = []
+  exclusive_tests = []
+
+  def add_build(name, istool):
+    key = "build:" + name
+    if key not in builds:
+      builds[key] = Task(key, name, build_project, (name, istool))
+    return key
+
+  for project_list, istool in [(samples, False), (tools, True)]:
+    for project in project_list:
+      name = project[0]
+      if re.search(tmpl, name) == None:
+        continue
+      deps = [add_build(name, istool)]
+      for dependency in get_build_dependencies(name, istool):
+        deps.append(add_build(dependency, False))
+      for option in project[1:]:
+        key = "test:" + name
+        if option:
+          key += ":" + option
+        after = []
+        if name in exclusive and exclusive_tests:
+          after.append(exclusive_tests[-1].key)
+        task = Task(key, get_test_title(name, option, istool),\
+          run_test, (name, option, istool, timeout), deps, after)
+        if name in exclusive:
+          exclusive_tests.append(task)
+        tests.append(task)
+
+  return list(builds.values()), tests
+
+def load_durations(file_name):
+  # Durations of the previous run are used to start the longest chains first
+  durations = {}
+  if not os.path.isfile(file_name):
+    return durations
+  try:
+    f = open(file_name, "rt")
+    report = json.load(f)
+    f.close()
+    for item in report.get("builds", []) + report.get("tests", []):
+      durations[item["key"]] = item["duration"]
+  except (OSError, ValueError, KeyError):
+    return {}
+  return durations
+
+def get_chain_times(tasks, durations):
+  # Longest duration of a chain starting from a task (including it)
+  children = {}
+  for task in tasks:
+    for key in task.deps + task.after:
+      children.setdefault(key, []).append(task)
+  chain_times = {}
+  def get_chain_time(task):
+    if task.key not in chain_times:
+      chain_time = 0.0
+      for child in children.get(task.key, []):
+        chain_time = max(chain_time, get_chain_time(child))
+      chain_times[task.key] = durations.get(task.key, 1.0) + chain_time
+    return chain_times[task.key]
+  for task in tasks:
+    get_chain_time(task)
+  return chain_times
+
+def get_critical_path(tasks):
+  # Chain of dependent tasks that finished last
+  task_map = {task.key: task for task in tasks}
+  path = []
+  task = max(tasks, key = lambda item: item.end or 0.0) if tasks else None
+  while task is not None and task.end is not None:
+    path.append(task)
+    previous = [task_map[key] for key in task.deps + task.after\
+      if task_map[key].end is not None]
+    task = max(previous, key = lambda item: item.end) if previous else None
+  path.reverse()
+  return path
+
+def schedule(tasks, jobs, durations, on_complete):
+  chain_times = get_chain_times(tasks, durations)
+  task_map = {task.key: task for task in tasks}
+  pending = sorted(tasks, key = lambda task: -chain_times[task.key])
+  completed = set()
+  running = {}
+
+  with concurrent.futures.ProcessPoolExecutor(max_workers = jobs) as executor:
+    while pending or running:
+      for task in list(pending):
+        if len(running) >= jobs:
+          break
+        if not all(key in completed for key in task.deps + task.after):
+          continue
+        pending.remove(task)
+        failed = [task_map[key] for key in task.deps if task_map[key].log]
+        if failed:
+          task.log = failed[0].log
+          completed.add(task.key)
+          on_complete(task)
+          continue
+        running[executor.submit(task.func, *task.args)] = task
+
+      if not running:
+        continue
+      done, not_done = concurrent.futures.wait(running,\
+        return_when = concurrent.futures.FIRST_COMPLETED)
+      for future in done:
+        task = running.pop(future)
+        try:
+          task.log, task.info, task.start, task.end = future.result()
+        except Exception as error:
+          task.log = "Test script failed: " + repr(error)
+        completed.add(task.key)
+        on_complete(task)
+
+def write_report(file_name, builds, tests, jobs, start, end):
+  def get_task_info(task, origin):
+    info = {"key": task.key,
+            "status": "FAILED" if task.log else "PASSED",
+            "start": task.start - origin if task.start is not None else None,
+            "duration": task.get_duration()}
+    info.update(task.info)
+    return info
+
+  report = {"jobs": jobs,
+            "wall_time": end - start,
+            "total_time": sum(task.get_duration() for task in builds + tests),
+            "critical_path": [task.key for task in get_critical_path(builds + tests)],
+            "builds": [get_task_info(task, start) for task in builds],
+            "tests": [get_task_info(task, start) for task in tests]}
+  report["critical_path_time"] = sum(task.get_duration()\
+    for task in get_critical_path(builds + tests))
+
+  f = open(file_name, "wt")
+  json.dump(report, f, indent = 2)
+  f.close()
 
 def main():
   tmpl = ".+"
+  jobs = os.cpu_count() or 1
+  timeout = None
   for i in range(1, len(sys.argv) - 1):
     if sys.argv[i] == "-s":
       tmpl = sys.argv[i + 1]
+    if sys.argv[i] == "-j":
+      jobs = max(int(sys.argv[i + 1]), 1)
+    if sys.argv[i] == "-t":
+      timeout = float(sys.argv[i + 1])
 
   for i in range(1, len(sys.argv)):
     if sys.argv[i] == "-c":
       clean()
       return
 
+  builds, tests = create_tasks(tmpl, timeout)
+  durations = load_durations(REPORT_FILE_NAME)
+
   f = open("stderr.log", "wt")
+  results = {"passed": 0, "failed": 0}
 
-  tests_passed = 0
-  tests_failed = 0
-  for sample in samples:
-    name = sample[0]
-    if re.search(tmpl, name) == None:
-      continue
-    for i in range(1, len(sample)):
-      if test(f, name, sample[i]):
-        tests_passed += 1
-      else:
-        tests_failed += 1
+  def on_complete(task):
+    if task in builds:
+      return
+    if task.log:
+      sys.stdout.write("Running " + task.title + "...FAILED\n")
+      f.write("======= " + task.title.split(" test for ")[1] + " =======\n")
+      f.write(task.log)
+      f.write("\n")
+      results["failed"] += 1
+    else:
+      sys.stdout.write("Running " + task.title + "...PASSED\n")
+      results["passed"] += 1
+    sys.stdout.flush()
 
-  for tool in tools:
-    name = tool[0]
-    if re.search(tmpl, name) == None:
-      continue
-    for i in range(1, len(tool)):
-      if test(f, name, tool[i], True):
-        tests_passed += 1
-      else:
-        tests_failed += 1
+  start = time.time()
+  schedule(builds + tests, jobs, durations, on_complete)
+  end = time.time()
 
   f.close()
+  write_report(REPORT_FILE_NAME, builds, tests, jobs, start, end)
 
-  print("PASSED: " + str(tests_passed) + " / FAILED: " + str(tests_failed))
+  print("PASSED: " + str(results["passed"]) + " / FAILED: " + str(results["failed"]))
 
 if __name__ == "__main__":
-  main()
\ No newline at end of file
+  main()
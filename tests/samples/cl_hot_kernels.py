@@ -32,23 +32,6 @@ def build(path):
     return stderr
   return None
 
-def parse(output):
-  lines = output.split("\n")
-  total_time = 0
-  for line in lines:
-    items = line.split(",")
-    if len(items) != 8 or line.find("Time (ns)") != -1:
-      continue
-    kernel_name = items[0].strip()
-    call_count = int(items[1].strip())
-    time = int(items[3].strip())
-    if not kernel_name or call_count <= 0:
-      return False
-    total_time += time
-  if total_time <= 0:
-    return False
-  return True
-
 def run(path, option):
   environ = None
   if option == "dpc":
@@ -69,16 +52,7 @@ def run(path, option):
     app_file = os.path.join(app_folder, "cl_gemm" + file_extention)
     command = [file_name_prefix + "cl_hot_kernels" + file_extention,\
       app_file, option, "1024", "1"]
-  stdout, stderr = utils.run_process(command, path, environ)
-  if not stdout:
-    return "stdout is empty"
-  if not stderr:
-    return "stderr is empty"
-  if stdout.find(" CORRECT") == -1:
-    return stdout
-  if not parse(stderr):
-    return stderr
-  return None
+  return utils.run_test_process(command, path, utils.HotTableParser(8, 3), environ)
 
 def main(option):
   path = utils.get_sample_build_path("cl_hot_kernels")
@@ -57,16 +57,7 @@ def run(path, option):
     else:
       command = [file_name_prefix + "cl_tracer" + file_extention,\
         option, app_file, "cpu", "1024", "1"]
-  stdout, stderr = utils.run_process(command, path, environ)
-  if not stdout:
-    return "stdout is empty"
-  if not stderr:
-    return "stderr is empty"
-  if stdout.find(" CORRECT") == -1:
-    return stdout
-  if stderr.find("WARNING") != -1:
-    return stderr
-  return None
+  return utils.run_test_process(command, path, utils.AppOutputParser("WARNING"), environ)
 
 def main(option):
   path = utils.get_tool_build_path("cl_tracer")
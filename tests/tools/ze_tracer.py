@@ -39,16 +39,7 @@ def run(path, option):
     app_folder = utils.get_sample_executable_path("ze_gemm")
     app_file = os.path.join(app_folder, "ze_gemm")
     command = ["./ze_tracer", option, app_file, "1024", "1"]
-  stdout, stderr = utils.run_process(command, path)
-  if not stdout:
-    return "stdout is empty"
-  if not stderr:
-    return "stderr is empty"
-  if stdout.find(" CORRECT") == -1:
-    return stdout
-  if stderr.find("WARNING") != -1:
-    return stderr
-  return None
+  return utils.run_test_process(command, path, utils.AppOutputParser("WARNING"))
 
 def main(option):
   path = utils.get_tool_build_path("ze_tracer")
@@ -1,6 +1,26 @@
+import collections
+import hashlib
 import os
+import queue
+import re
+import signal
 import sys
 import subprocess
+import threading
+import time
+
+BUILD_HASH_FILE_NAME = ".build_hash"
+
+STDOUT = "stdout"
+STDERR = "stderr"
+
+# Longer lines are passed to parsers in parts
+MAX_LINE_SIZE = 64 * 1024
+# Output retained per stream, the beginning and the end of output are kept
+MAX_LOG_SIZE = int(os.environ.get("PTI_TEST_LOG_LIMIT", 16 * 1024 * 1024))
+
+# Timeout (in seconds) applied to processes started without explicit one
+default_timeout = None
 
 def get_script_path():
   path, script = os.path.split(os.path.realpath(__file__))
@@ -49,6 +69,75 @@ def get_build_flag():
       build_flag = "Debug"
   return build_flag
 
+def get_project_path(name, istool = False):
+  path = os.path.join(get_root_path(), "tools" if istool else "samples")
+  return os.path.join(path, name)
+
+def get_project_inputs(path):
+  # Project sources together with sibling and top-level folders its
+  # CMakeLists.txt refers to (e.g. ../utils, ../../build_utils), transitively
+  inputs = []
+  queue = [os.path.realpath(path)]
+  while queue:
+    current = queue.pop(0)
+    if current in inputs or not os.path.isdir(current):
+      continue
+    inputs.append(current)
+    cmake_file = os.path.join(current, "CMakeLists.txt")
+    if not os.path.isfile(cmake_file):
+      continue
+    f = open(cmake_file, "rt")
+    content = f.read()
+    f.close()
+    for item in re.findall("((?:\\.\\./)+\\w+)", content):
+      queue.append(os.path.realpath(os.path.join(current, item)))
+  return sorted(inputs)
+
+def get_build_hash(name, istool = False, flags = []):
+  # Build is identified by content of all the input files, test script
+  # of the project (it holds configuration options) and build flags
+  build_hash = hashlib.sha256()
+  for flag in [get_build_flag()] + flags:
+    build_hash.update(flag.encode("utf-8"))
+    build_hash.update(b"\0")
+
+  files = [os.path.join(get_script_path(), "tools" if istool else "samples",\
+    name + ".py")]
+  for input_path in get_project_inputs(get_project_path(name, istool)):
+    for root, subdirs, file_names in os.walk(input_path):
+      subdirs[:] = [subdir for subdir in subdirs\
+        if subdir != "build" and subdir != "__pycache__"]
+      for file_name in file_names:
+        files.append(os.path.join(root, file_name))
+
+  for file_name in sorted(files):
+    build_hash.update(os.path.relpath(file_name, get_root_path()).encode("utf-8"))
+    build_hash.update(b"\0")
+    f = open(file_name, "rb")
+    build_hash.update(f.read())
+    f.close()
+    build_hash.update(b"\0")
+  return build_hash.hexdigest()
+
+def is_build_cached(path, build_hash):
+  hash_file = os.path.join(path, BUILD_HASH_FILE_NAME)
+  if not os.path.isfile(hash_file):
+    return False
+  f = open(hash_file, "rt")
+  cached_hash = f.read().strip()
+  f.close()
+  return cached_hash == build_hash
+
+def reset_build_hash(path):
+  hash_file = os.path.join(path, BUILD_HASH_FILE_NAME)
+  if os.path.exists(hash_file):
+    os.remove(hash_file)
+
+def store_build_hash(path, build_hash):
+  f = open(os.path.join(path, BUILD_HASH_FILE_NAME), "wt")
+  f.write(build_hash + "\n")
+  f.close()
+
 def add_env(env, name, val):
   if env:
     custom_env = env
@@ -57,14 +146,252 @@ def add_env(env, name, val):
   custom_env[name] = val
   return custom_env
 
-def run_process(command, path, environ = None):
+class OutputParser:
+  # Incremental check of process output: feed() gets every output line
+  # as soon as it is read and returns error message to stop the process,
+  # finish() is called after the process exited
+  def feed(self, stream, line):
+    return None
+
+  def finish(self):
+    return None
+
+class AppOutputParser(OutputParser):
+  # Application (e.g. running under a tool) reports " CORRECT" into stdout,
+  # tool output goes into stderr and should not contain failure marker
+  def __init__(self, stderr_failure = None):
+    self.stderr_failure = stderr_failure
+    self.has_stdout = False
+    self.has_stderr = False
+    self.is_correct = False
+
+  def feed(self, stream, line):
+    if stream == STDOUT:
+      self.has_stdout = True
+      if line.find(" CORRECT") != -1:
+        self.is_correct = True
+    else:
+      self.has_stderr = True
+      if self.stderr_failure and line.find(self.stderr_failure) != -1:
+        return "stderr contains " + self.stderr_failure + ": " + line
+    return None
+
+  def finish(self):
+    if not self.has_stdout:
+      return "stdout is empty"
+    if not self.has_stderr:
+      return "stderr is empty"
+    if not self.is_correct:
+      return "stdout has no CORRECT result"
+    return None
+
+class HotTableParser(AppOutputParser):
+  # Hot kernels/functions table in stderr: every row has a name and
+  # non-zero call count, total time is positive
+  def __init__(self, column_count, time_column):
+    AppOutputParser.__init__(self)
+    self.column_count = column_count
+    self.time_column = time_column
+    self.total_time = 0
+
+  def feed(self, stream, line):
+    error = AppOutputParser.feed(self, stream, line)
+    if error or stream != STDERR:
+      return error
+    items = line.split(",")
+    if len(items) != self.column_count or line.find("Time (ns)") != -1:
+      return None
+    name = items[0].strip()
+    call_count = int(items[1].strip())
+    if not name or call_count <= 0:
+      return "wrong table row: " + line
+    self.total_time += int(items[self.time_column].strip())
+    return None
+
+  def finish(self):
+    error = AppOutputParser.finish(self)
+    if error:
+      return error
+    if self.total_time <= 0:
+      return "total time is not positive"
+    return None
+
+class RetainedLog:
+  # Keeps at most max_size bytes of output: its beginning and its end
+  def __init__(self, max_size):
+    self.max_size = max_size
+    self.head = []
+    self.head_size = 0
+    self.tail = collections.deque()
+    self.tail_size = 0
+    self.skipped_size = 0
+
+  def append(self, data):
+    if not self.tail and self.head_size < self.max_size // 2:
+      data_head = data[:self.max_size // 2 - self.head_size]
+      self.head.append(data_head)
+      self.head_size += len(data_head)
+      data = data[len(data_head):]
+    if not data:
+      return
+    self.tail.append(data)
+    self.tail_size += len(data)
+    excess = self.head_size + self.tail_size - self.max_size
+    while excess > 0:
+      if len(self.tail[0]) <= excess:
+        data = self.tail.popleft()
+      else:
+        data = self.tail[0][:excess]
+        self.tail[0] = self.tail[0][excess:]
+      self.tail_size -= len(data)
+      self.skipped_size += len(data)
+      excess -= len(data)
+
+  def get_text(self):
+    text = b"".join(self.head)
+    if self.skipped_size > 0:
+      text += ("\n... " + str(self.skipped_size) + " bytes skipped ...\n").encode("utf-8")
+    text += b"".join(self.tail)
+    return str(text, "utf-8", "replace")
+
+class ProcessResult:
+  def __init__(self):
+    self.stdout = ""
+    self.stderr = ""
+    self.returncode = None
+    # Parser error or timeout message, None if the process passed the check
+    self.error = None
+    self.timed_out = False
+
+  def get_log(self):
+    if not self.error:
+      return None
+    log = self.error
+    if self.stdout:
+      log += "\n[stdout]\n" + self.stdout
+    if self.stderr:
+      log += "\n[stderr]\n" + self.stderr
+    return log
+
+def read_pipe(pipe, stream, lines, split_lines):
+  # Output is passed in batches of lines (with line endings), one batch
+  # per read. If nobody parses the output, it's passed as is
+  rest = b""
+  while True:
+    data = pipe.read1(MAX_LINE_SIZE)
+    if not data:
+      break
+    if not split_lines:
+      lines.put((stream, [data]))
+      continue
+    batch = (rest + data).split(b"\n")
+    rest = batch.pop()
+    batch = [line + b"\n" for line in batch]
+    if len(rest) >= MAX_LINE_SIZE:
+      batch.append(rest)
+      rest = b""
+    if batch:
+      lines.put((stream, batch))
+  if rest:
+    lines.put((stream, [rest]))
+  lines.put((stream, None))
+
+def stop_process(p):
+  if p.poll() is not None:
+    return
+  if sys.platform == 'win32':
+    p.kill()
+  else:
+    # Tools start applications as child processes, so kill the whole group
+    try:
+      os.killpg(p.pid, signal.SIGKILL)
+    except OSError:
+      p.kill()
+
+def run_process_streaming(command, path, environ = None, parser = None,\
+                          timeout = None, max_log_size = MAX_LOG_SIZE):
+  if timeout is None:
+    timeout = default_timeout
   shell = True if sys.platform == 'win32' else False
+  new_session = False if sys.platform == 'win32' else True
   p = subprocess.Popen(command, cwd = path, shell = shell,\
-    env = environ, stdout = subprocess.PIPE, stderr = subprocess.PIPE)
-  stdout, stderr = p.communicate()
-  if sys.version_info.major > 2:
-    if stderr:
-      stderr = str(stderr, "utf-8")
-    if stdout:
-      stdout = str(stdout, "utf-8")
-  return stdout, stderr
\ No newline at end of file
+    env = environ, stdout = subprocess.PIPE, stderr = subprocess.PIPE,\
+    start_new_session = new_session)
+
+  # Bounded queue makes readers (and so the process) wait for the parser
+  lines = queue.Queue(64)
+  split_lines = parser is not None
+  readers = [threading.Thread(target = read_pipe,\
+               args = (p.stdout, STDOUT, lines, split_lines)),\
+             threading.Thread(target = read_pipe,\
+               args = (p.stderr, STDERR, lines, split_lines))]
+  for reader in readers:
+    reader.daemon = True
+    reader.start()
+
+  result = ProcessResult()
+  logs = {STDOUT: RetainedLog(max_log_size), STDERR: RetainedLog(max_log_size)}
+  deadline = time.time() + timeout if timeout else None
+  open_streams = 2
+  while open_streams > 0:
+    try:
+      wait_time = max(deadline - time.time(), 0) if deadline else None
+      stream, batch = lines.get(timeout = wait_time)
+    except queue.Empty:
+      result.timed_out = True
+      result.error = "Process was stopped by timeout (" + str(timeout) + " s)"
+      break
+    if batch is None:
+      open_streams -= 1
+      continue
+    logs[stream].append(b"".join(batch))
+    if parser:
+      for line in batch:
+        try:
+          result.error = parser.feed(stream, str(line, "utf-8", "replace").rstrip("\r\n"))
+        except Exception as error:
+          result.error = "Output parser failed: " + repr(error)
+        if result.error:
+          break
+      if result.error:
+        break
+
+  if result.error:
+    stop_process(p)
+    # Output left after the stop is dropped, so that readers can exit
+    while open_streams > 0:
+      try:
+        stream, batch = lines.get(timeout = 1)
+      except queue.Empty:
+        break
+      if batch is None:
+        open_streams -= 1
+  if deadline and not result.error:
+    try:
+      p.wait(max(deadline - time.time(), 0))
+    except subprocess.TimeoutExpired:
+      result.timed_out = True
+      result.error = "Process was stopped by timeout (" + str(timeout) + " s)"
+      stop_process(p)
+  result.returncode = p.wait()
+  for reader in readers:
+    reader.join(1)
+  p.stdout.close()
+  p.stderr.close()
+
+  if parser and not result.error:
+    result.error = parser.finish()
+  result.stdout = logs[STDOUT].get_text()
+  result.stderr = logs[STDERR].get_text()
+  return result
+
+def run_test_process(command, path, parser, environ = None, timeout = None):
+  # Returns None if the process passed the check, error log otherwise
+  return run_process_streaming(command, path, environ, parser, timeout).get_log()
+
+def run_process(command, path, environ = None, timeout = None):
+  result = run_process_streaming(command, path, environ, None, timeout)
+  stderr = result.stderr
+  if result.timed_out:
+    stderr += "\n" + result.error
+  return result.stdout, stderr
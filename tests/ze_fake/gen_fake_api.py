@@ -0,0 +1,130 @@
+#==============================================================
+# Copyright (C) Intel Corporation
+#
+# SPDX-License-Identifier: MIT
+# =============================================================
+
+# Generates exported API entry points of the fake Level Zero loader.
+# Every function of the tracing callback tables calls zelTracer* callbacks
+# around impl:: function of the same name (if it is defined in ze_fake.cc)
+# or returns ZE_RESULT_ERROR_UNSUPPORTED_FEATURE. Implemented functions that
+# are not covered by tracing (zet*, zel*, extensions) are exported as is.
+
+import os
+import re
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             "..", "..", "build_utils"))
+import ze_api_parser
+
+IMPL_FILE_NAME = "ze_fake.cc"
+
+# Parse Implementation ########################################################
+
+def get_impl_map():
+  impl_path = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           IMPL_FILE_NAME)
+  with open(impl_path, "rt") as f:
+    content = f.read()
+
+  start = content.find("namespace impl {")
+  end = content.find("} // namespace impl")
+  assert start != -1 and end != -1
+  content = content[start:end]
+
+  impl_map = {}
+  pattern = r"^ze_result_t\s+((?:ze|zet|zel)\w+)\(([^)]*)\)\s*\{"
+  for match in re.finditer(pattern, content, re.MULTILINE):
+    params = " ".join(match.group(2).split())
+    impl_map[match.group(1)] = params
+  return impl_map
+
+def get_param_names(params):
+  names = []
+  for param in params.split(","):
+    param = param.strip()
+    if param:
+      names.append(re.findall(r"\w+", param)[-1])
+  return names
+
+# Generate Entry Points #######################################################
+
+def gen_traced_func(f, func, group, callback, params, impl_map):
+  if callback.cond:
+    f.write("#if " + callback.cond + "\n")
+
+  f.write("ZE_APIEXPORT ze_result_t ZE_APICALL " + func + "(")
+  f.write(", ".join([param.type + " " + param.name for param in params]))
+  f.write(") {\n")
+
+  if func in impl_map:
+    f.write("  " + ze_api_parser.get_param_struct_name(func) + " params = {")
+    f.write(", ".join(["&" + param.name for param in params]))
+    f.write("};\n")
+    f.write("  return fake::Trace(\n")
+    f.write("      [](const zel_core_callbacks_t& callbacks) {\n")
+    f.write("        return callbacks." + group.field + "." +
+            callback.field + ";\n")
+    f.write("      },\n")
+    f.write("      &params,\n")
+    f.write("      [&]() {\n")
+    # Arguments are taken from params structure as prologues may modify them
+    f.write("        return impl::" + func + "(")
+    f.write(", ".join(["*params.p" + param.name for param in params]))
+    f.write(");\n")
+    f.write("      });\n")
+  else:
+    f.write("  return ZE_RESULT_ERROR_UNSUPPORTED_FEATURE;\n")
+
+  f.write("}\n")
+  if callback.cond:
+    f.write("#endif //" + callback.cond + "\n")
+  f.write("\n")
+
+def gen_plain_func(f, func, params):
+  f.write("ZE_APIEXPORT ze_result_t ZE_APICALL " + func + "(" + params + ") {\n")
+  f.write("  return impl::" + func + "(")
+  f.write(", ".join(get_param_names(params)))
+  f.write(");\n")
+  f.write("}\n")
+  f.write("\n")
+
+def gen_api(f, ze_api, impl_map):
+  f.write("extern \"C\" {\n")
+  f.write("\n")
+  for func in ze_api.func_list:
+    if not func in ze_api.group_map:
+      continue
+    assert func in ze_api.param_map
+    group, callback = ze_api.group_map[func]
+    gen_traced_func(f, func, group, callback,
+                    ze_api.param_map[func], impl_map)
+  for func, params in impl_map.items():
+    if func in ze_api.group_map:
+      continue
+    gen_plain_func(f, func, params)
+  f.write("} // extern \"C\"\n")
+
+def main():
+  if len(sys.argv) < 3:
+    print("Usage: python gen_fake_api.py <output_include_path> <l0_include_path>")
+    return
+
+  dst_path = sys.argv[1]
+  if (not os.path.exists(dst_path)):
+    os.mkdir(dst_path)
+
+  dst_file_path = os.path.join(dst_path, "tracing.gen")
+  if (os.path.isfile(dst_file_path)):
+    os.remove(dst_file_path)
+
+  l0_path = sys.argv[2]
+  ze_api = ze_api_parser.load(l0_path, dst_path)
+  impl_map = get_impl_map()
+
+  with open(dst_file_path, "wt") as dst_file:
+    gen_api(dst_file, ze_api, impl_map)
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,363 @@
+//==============================================================
+// Copyright (C) Intel Corporation
+//
+// SPDX-License-Identifier: MIT
+// =============================================================
+
+// Synthetic Level Zero workload to be run on top of the fake driver:
+// every thread submits kernels (kKernelNameCount distinct names) followed by
+// memory copy in batches to its own queue or immediate command list and
+// waits for completion. If built with ZE_FAKE_PTI_VIEW, PTI SDK views listed
+// in ZE_FAKE_PTI_VIEWS environment variable are collected
+
+#include <stdlib.h>
+#include <sys/resource.h>
+
+#include <atomic>
+#include <chrono>
+#include <iostream>
+#include <string>
+#include <thread>
+#include <vector>
+
+#include "ze_utils.h"
+#include "utils.h"
+
+#ifdef ZE_FAKE_PTI_VIEW
+#include "pti_view.h"
+#endif
+
+struct WorkloadConfig {
+  uint32_t thread_count;
+  uint32_t kernel_count;
+  uint32_t batch_size;
+  bool immediate;
+};
+
+const uint32_t kKernelNameCount = 16;
+const size_t kCopySize = 4096;
+
+#ifdef ZE_FAKE_PTI_VIEW
+
+struct PtiViewInfo {
+  const char* name;
+  pti_view_kind kind;
+};
+
+const PtiViewInfo kPtiViewList[] = {
+  {"kernel", PTI_VIEW_DEVICE_GPU_KERNEL},
+  {"mem_copy", PTI_VIEW_DEVICE_GPU_MEM_COPY},
+  {"mem_fill", PTI_VIEW_DEVICE_GPU_MEM_FILL},
+  {"overhead", PTI_VIEW_COLLECTION_OVERHEAD},
+  {"external_correlation", PTI_VIEW_EXTERNAL_CORRELATION}};
+
+const size_t kPtiBufferSize = 4 * 1024 * 1024;
+
+static std::atomic<uint64_t> pti_record_count{0};
+static std::atomic<uint64_t> pti_byte_count{0};
+static bool pti_external_correlation = false;
+
+static void PtiBufferRequested(unsigned char** buffer, size_t* buffer_size) {
+  *buffer = static_cast<unsigned char*>(aligned_alloc(8, kPtiBufferSize));
+  PTI_ASSERT(*buffer != nullptr);
+  *buffer_size = kPtiBufferSize;
+}
+
+static void PtiBufferCompleted(
+    unsigned char* buffer, size_t buffer_size, size_t used_bytes) {
+  uint64_t count = 0;
+  pti_view_record_base* record = nullptr;
+  while (ptiViewGetNextRecord(buffer, used_bytes, &record) == PTI_SUCCESS) {
+    ++count;
+  }
+  pti_record_count += count;
+  pti_byte_count += used_bytes;
+  free(buffer);
+}
+
+static void EnablePtiViews(const std::string& views) {
+  pti_result result = ptiViewSetCallbacks(PtiBufferRequested, PtiBufferCompleted);
+  PTI_ASSERT(result == PTI_SUCCESS);
+
+  size_t start = 0;
+  while (start < views.size()) {
+    size_t end = views.find(',', start);
+    if (end == std::string::npos) {
+      end = views.size();
+    }
+    std::string name = views.substr(start, end - start);
+    bool found = false;
+    for (auto& view : kPtiViewList) {
+      if (name == view.name) {
+        result = ptiViewEnable(view.kind);
+        PTI_ASSERT(result == PTI_SUCCESS);
+        if (view.kind == PTI_VIEW_EXTERNAL_CORRELATION) {
+          pti_external_correlation = true;
+        }
+        found = true;
+      }
+    }
+    if (!found) {
+      std::cerr << "[WARNING] Unknown PTI view \"" << name << "\"" << std::endl;
+    }
+    start = end + 1;
+  }
+}
+
+static void DisablePtiViews() {
+  for (auto& view : kPtiViewList) {
+    ptiViewDisable(view.kind);
+  }
+  pti_result result = ptiFlushAllViews();
+  PTI_ASSERT(result == PTI_SUCCESS);
+}
+
+#endif // ZE_FAKE_PTI_VIEW
+
+static bool Run(ze_context_handle_t context, ze_device_handle_t device,
+                ze_module_handle_t module, uint32_t thread_id,
+                const WorkloadConfig& config) {
+  ze_result_t status = ZE_RESULT_SUCCESS;
+
+  std::vector<ze_kernel_handle_t> kernel_list;
+  for (uint32_t i = 0; i < kKernelNameCount; ++i) {
+    std::string name = "FakeKernel" + std::to_string(i);
+    ze_kernel_desc_t kernel_desc = {
+        ZE_STRUCTURE_TYPE_KERNEL_DESC, nullptr, 0, name.c_str()};
+    ze_kernel_handle_t kernel = nullptr;
+    status = zeKernelCreate(module, &kernel_desc, &kernel);
+    PTI_ASSERT(status == ZE_RESULT_SUCCESS);
+    status = zeKernelSetGroupSize(kernel, 16, 1, 1);
+    PTI_ASSERT(status == ZE_RESULT_SUCCESS);
+    status = zeKernelSetArgumentValue(
+        kernel, 0, sizeof(thread_id), &thread_id);
+    PTI_ASSERT(status == ZE_RESULT_SUCCESS);
+    kernel_list.push_back(kernel);
+  }
+
+  ze_event_pool_desc_t event_pool_desc = {
+      ZE_STRUCTURE_TYPE_EVENT_POOL_DESC, nullptr,
+      ZE_EVENT_POOL_FLAG_KERNEL_TIMESTAMP | ZE_EVENT_POOL_FLAG_HOST_VISIBLE,
+      config.batch_size + 1};
+  ze_event_pool_handle_t event_pool = nullptr;
+  status = zeEventPoolCreate(context, &event_pool_desc,
+                             1, &device, &event_pool);
+  PTI_ASSERT(status == ZE_RESULT_SUCCESS);
+
+  // One event per kernel in a batch and one more for the copy
+  std::vector<ze_event_handle_t> event_list(config.batch_size + 1, nullptr);
+  for (uint32_t i = 0; i < event_list.size(); ++i) {
+    ze_event_desc_t event_desc = {
+        ZE_STRUCTURE_TYPE_EVENT_DESC, nullptr, i,
+        ZE_EVENT_SCOPE_FLAG_HOST, ZE_EVENT_SCOPE_FLAG_HOST};
+    status = zeEventCreate(event_pool, &event_desc, &event_list[i]);
+    PTI_ASSERT(status == ZE_RESULT_SUCCESS);
+  }
+
+  void* device_buffer = nullptr;
+  ze_device_mem_alloc_desc_t alloc_desc = {
+      ZE_STRUCTURE_TYPE_DEVICE_MEM_ALLOC_DESC, nullptr, 0, 0};
+  status = zeMemAllocDevice(context, &alloc_desc, kCopySize, 64,
+                            device, &device_buffer);
+  PTI_ASSERT(status == ZE_RESULT_SUCCESS);
+  std::vector<uint8_t> host_buffer(kCopySize, 0);
+
+  ze_command_queue_desc_t cmd_queue_desc = {
+      ZE_STRUCTURE_TYPE_COMMAND_QUEUE_DESC, nullptr, 0, 0, 0,
+      ZE_COMMAND_QUEUE_MODE_ASYNCHRONOUS, ZE_COMMAND_QUEUE_PRIORITY_NORMAL};
+  ze_command_queue_handle_t cmd_queue = nullptr;
+  ze_command_list_handle_t cmd_list = nullptr;
+  if (config.immediate) {
+    status = zeCommandListCreateImmediate(
+        context, device, &cmd_queue_desc, &cmd_list);
+    PTI_ASSERT(status == ZE_RESULT_SUCCESS);
+  } else {
+    status = zeCommandQueueCreate(context, device, &cmd_queue_desc, &cmd_queue);
+    PTI_ASSERT(status == ZE_RESULT_SUCCESS);
+    ze_command_list_desc_t cmd_list_desc = {
+        ZE_STRUCTURE_TYPE_COMMAND_LIST_DESC, nullptr, 0, 0};
+    status = zeCommandListCreate(context, device, &cmd_list_desc, &cmd_list);
+    PTI_ASSERT(status == ZE_RESULT_SUCCESS);
+  }
+
+  bool correct = true;
+  ze_group_count_t dim = {1024, 1, 1};
+  uint32_t submitted = 0;
+  while (submitted < config.kernel_count) {
+    uint32_t count = std::min(config.batch_size,
+                              config.kernel_count - submitted);
+#ifdef ZE_FAKE_PTI_VIEW
+    if (pti_external_correlation) {
+      pti_result result = ptiViewPushExternalCorrelationId(
+          PTI_VIEW_EXTERNAL_KIND_CUSTOM_0, submitted);
+      PTI_ASSERT(result == PTI_SUCCESS);
+    }
+#endif
+    for (uint32_t i = 0; i < count; ++i) {
+      ze_kernel_handle_t kernel =
+        kernel_list[(submitted + i) % kernel_list.size()];
+      status = zeCommandListAppendLaunchKernel(
+          cmd_list, kernel, &dim, event_list[i], 0, nullptr);
+      PTI_ASSERT(status == ZE_RESULT_SUCCESS);
+    }
+    status = zeCommandListAppendMemoryCopy(
+        cmd_list, host_buffer.data(), device_buffer, kCopySize,
+        event_list[count], 0, nullptr);
+    PTI_ASSERT(status == ZE_RESULT_SUCCESS);
+
+    if (!config.immediate) {
+      status = zeCommandListClose(cmd_list);
+      PTI_ASSERT(status == ZE_RESULT_SUCCESS);
+      status = zeCommandQueueExecuteCommandLists(
+          cmd_queue, 1, &cmd_list, nullptr);
+      PTI_ASSERT(status == ZE_RESULT_SUCCESS);
+    }
+
+    status = zeEventHostSynchronize(event_list[count], UINT64_MAX);
+    PTI_ASSERT(status == ZE_RESULT_SUCCESS);
+
+    for (uint32_t i = 0; i <= count; ++i) {
+      if (zeEventQueryStatus(event_list[i]) != ZE_RESULT_SUCCESS) {
+        correct = false;
+      }
+      status = zeEventHostReset(event_list[i]);
+      PTI_ASSERT(status == ZE_RESULT_SUCCESS);
+    }
+
+    if (!config.immediate) {
+      status = zeCommandListReset(cmd_list);
+      PTI_ASSERT(status == ZE_RESULT_SUCCESS);
+    }
+#ifdef ZE_FAKE_PTI_VIEW
+    if (pti_external_correlation) {
+      uint64_t id = 0;
+      pti_result result = ptiViewPopExternalCorrelationId(
+          PTI_VIEW_EXTERNAL_KIND_CUSTOM_0, &id);
+      PTI_ASSERT(result == PTI_SUCCESS);
+    }
+#endif
+    submitted += count;
+  }
+
+  status = zeCommandListDestroy(cmd_list);
+  PTI_ASSERT(status == ZE_RESULT_SUCCESS);
+  if (cmd_queue != nullptr) {
+    status = zeCommandQueueDestroy(cmd_queue);
+    PTI_ASSERT(status == ZE_RESULT_SUCCESS);
+  }
+  status = zeMemFree(context, device_buffer);
+  PTI_ASSERT(status == ZE_RESULT_SUCCESS);
+
+  for (auto event : event_list) {
+    status = zeEventDestroy(event);
+    PTI_ASSERT(status == ZE_RESULT_SUCCESS);
+  }
+  status = zeEventPoolDestroy(event_pool);
+  PTI_ASSERT(status == ZE_RESULT_SUCCESS);
+
+  for (auto kernel : kernel_list) {
+    status = zeKernelDestroy(kernel);
+    PTI_ASSERT(status == ZE_RESULT_SUCCESS);
+  }
+
+  return correct;
+}
+
+int main(int argc, char* argv[]) {
+#ifdef ZE_FAKE_PTI_VIEW
+  EnablePtiViews(utils::GetEnv("ZE_FAKE_PTI_VIEWS"));
+#endif
+
+  ze_result_t status = ZE_RESULT_SUCCESS;
+  status = zeInit(ZE_INIT_FLAG_GPU_ONLY);
+  PTI_ASSERT(status == ZE_RESULT_SUCCESS);
+
+  ze_device_handle_t device = utils::ze::GetGpuDevice();
+  ze_driver_handle_t driver = utils::ze::GetGpuDriver();
+  if (device == nullptr || driver == nullptr) {
+    std::cout << "Unable to find GPU device" << std::endl;
+    return 0;
+  }
+
+  WorkloadConfig config = {1, 10000, 16, false};
+  if (argc > 1) {
+    config.thread_count = std::stoul(argv[1]);
+  }
+  if (argc > 2) {
+    config.kernel_count = std::stoul(argv[2]);
+  }
+  if (argc > 3) {
+    config.batch_size = std::stoul(argv[3]);
+  }
+  if (argc > 4) {
+    config.immediate = (std::string(argv[4]) == "immediate");
+  }
+  PTI_ASSERT(config.thread_count > 0 && config.batch_size > 0);
+
+  std::cout << "Level Zero Synthetic Workload (threads: " <<
+    config.thread_count << ", kernels per thread: " << config.kernel_count <<
+    ", kernels per submission: " << config.batch_size <<
+    (config.immediate ? ", immediate" : "") << ")" << std::endl;
+  std::cout << "Target device: " << utils::ze::GetDeviceName(device) <<
+    std::endl;
+
+  ze_context_handle_t context = utils::ze::GetContext(driver);
+  PTI_ASSERT(context != nullptr);
+
+  // Fake driver accepts any module binary
+  std::vector<uint8_t> binary(4, 0);
+  ze_module_desc_t module_desc = {
+      ZE_STRUCTURE_TYPE_MODULE_DESC, nullptr,
+      ZE_MODULE_FORMAT_IL_SPIRV, static_cast<uint32_t>(binary.size()),
+      binary.data(), nullptr, nullptr};
+  ze_module_handle_t module = nullptr;
+  status = zeModuleCreate(context, device, &module_desc, &module, nullptr);
+  PTI_ASSERT(status == ZE_RESULT_SUCCESS && module != nullptr);
+
+  auto start = std::chrono::steady_clock::now();
+  std::vector<std::thread> thread_list;
+  std::vector<int> result_list(config.thread_count, 0);
+  for (uint32_t i = 0; i < config.thread_count; ++i) {
+    thread_list.push_back(std::thread([&, i]() {
+      result_list[i] = Run(context, device, module, i, config) ? 1 : 0;
+    }));
+  }
+  for (auto& thread : thread_list) {
+    thread.join();
+  }
+  auto end = std::chrono::steady_clock::now();
+  std::chrono::duration<double> time = end - start;
+
+  status = zeModuleDestroy(module);
+  PTI_ASSERT(status == ZE_RESULT_SUCCESS);
+  status = zeContextDestroy(context);
+  PTI_ASSERT(status == ZE_RESULT_SUCCESS);
+
+#ifdef ZE_FAKE_PTI_VIEW
+  DisablePtiViews();
+#endif
+
+  bool correct = true;
+  for (int result : result_list) {
+    correct = correct && (result != 0);
+  }
+
+  uint64_t total = static_cast<uint64_t>(config.thread_count) *
+    config.kernel_count;
+  struct rusage usage{};
+  getrusage(RUSAGE_SELF, &usage);
+
+  std::cout << "Kernels submitted: " << total << std::endl;
+  std::cout << "Throughput: " << total / time.count() <<
+    " kernels/sec" << std::endl;
+  std::cout << "Max RSS: " << usage.ru_maxrss << " KB" << std::endl;
+#ifdef ZE_FAKE_PTI_VIEW
+  std::cout << "PTI records: " << pti_record_count << std::endl;
+  std::cout << "PTI bytes: " << pti_byte_count << std::endl;
+#endif
+  std::cout << "Results are " << (correct ? "" : "IN") << "CORRECT" <<
+    std::endl;
+  std::cout << "Total execution time: " << time.count() <<
+    " sec" << std::endl;
+  return 0;
+}
@@ -0,0 +1,1833 @@
+//==============================================================
+// Copyright (C) Intel Corporation
+//
+// SPDX-License-Identifier: MIT
+// =============================================================
+
+// Fake Level Zero loader: driver objects are emulated on the host, commands
+// are "executed" on a virtual device timeline with configurable durations
+// and latencies, and zelTracer* callbacks are called around every API
+// function the same way the tracing layer does. Entry points are generated
+// (see gen_fake_api.py) and forward to impl:: functions below, functions
+// without implementation return ZE_RESULT_ERROR_UNSUPPORTED_FEATURE.
+//
+// Configuration (environment variables, times are in nanoseconds):
+//   ZE_FAKE_DEVICE_COUNT      - number of root devices (1)
+//   ZE_FAKE_SUB_DEVICE_COUNT  - number of sub-devices per root device (0)
+//   ZE_FAKE_TIMER_FREQUENCY   - device timer frequency in Hz (19200000)
+//   ZE_FAKE_KERNEL_TIME       - duration of every kernel (10000)
+//   ZE_FAKE_COPY_TIME         - duration of every memory copy/fill (2000)
+//   ZE_FAKE_SUBMIT_LATENCY    - delay between submission and start (5000)
+//   ZE_FAKE_EVENT_LATENCY     - delay between command end and event
+//                               completion as seen by host (0)
+//   ZE_FAKE_STATS             - print number of traced API calls and kernels
+//                               to stderr at exit if set to 1
+
+#include <stdint.h>
+#include <stdlib.h>
+#include <string.h>
+
+#include <algorithm>
+#include <atomic>
+#include <chrono>
+#include <iostream>
+#include <map>
+#include <memory>
+#include <mutex>
+#include <set>
+#include <string>
+#include <thread>
+#include <vector>
+
+#include <level_zero/ze_api.h>
+#include <level_zero/zet_api.h>
+#include <level_zero/layers/zel_tracing_api.h>
+
+#include "pti_assert.h"
+#include "utils.h"
+
+// Configuration ###############################################################
+
+namespace fake {
+
+struct Config {
+  uint32_t device_count;
+  uint32_t sub_device_count;
+  uint64_t timer_frequency;
+  uint64_t kernel_time;
+  uint64_t copy_time;
+  uint64_t submit_latency;
+  uint64_t event_latency;
+  bool stats;
+};
+
+static uint64_t GetEnvValue(const char* name, uint64_t default_value) {
+  std::string value = utils::GetEnv(name);
+  if (value.empty()) {
+    return default_value;
+  }
+  return std::stoull(value);
+}
+
+static const Config& GetConfig() {
+  static Config config = {
+    static_cast<uint32_t>(GetEnvValue("ZE_FAKE_DEVICE_COUNT", 1)),
+    static_cast<uint32_t>(GetEnvValue("ZE_FAKE_SUB_DEVICE_COUNT", 0)),
+    GetEnvValue("ZE_FAKE_TIMER_FREQUENCY", 19200000),
+    GetEnvValue("ZE_FAKE_KERNEL_TIME", 10000),
+    GetEnvValue("ZE_FAKE_COPY_TIME", 2000),
+    GetEnvValue("ZE_FAKE_SUBMIT_LATENCY", 5000),
+    GetEnvValue("ZE_FAKE_EVENT_LATENCY", 0),
+    GetEnvValue("ZE_FAKE_STATS", 0) == 1};
+  PTI_ASSERT(config.device_count > 0);
+  PTI_ASSERT(config.timer_frequency > 0);
+  return config;
+}
+
+// Time ########################################################################
+
+const uint32_t kKernelTimestampValidBits = 32;
+const uint32_t kTimestampValidBits = 64;
+const uint64_t kPollInterval = 10000;
+const uint64_t kSpinInterval = 50000;
+
+// Device timer runs synchronously with CLOCK_MONOTONIC_RAW
+static uint64_t GetHostTime() {
+  return utils::GetSystemTime();
+}
+
+static uint64_t GetDeviceTicks(uint64_t host_time) {
+  return static_cast<uint64_t>(
+      static_cast<unsigned __int128>(host_time) *
+      GetConfig().timer_frequency / NSEC_IN_SEC);
+}
+
+static uint64_t GetKernelTicks(uint64_t host_time) {
+  return GetDeviceTicks(host_time) & ((1ull << kKernelTimestampValidBits) - 1);
+}
+
+static void SleepUntil(uint64_t time) {
+  uint64_t now = GetHostTime();
+  while (now < time) {
+    if (time - now > kSpinInterval) {
+      std::this_thread::sleep_for(
+          std::chrono::nanoseconds(time - now - kSpinInterval));
+    } else {
+      std::this_thread::yield();
+    }
+    now = GetHostTime();
+  }
+}
+
+// Ready time of zero means the object is not signaled
+static bool IsReady(const std::atomic<uint64_t>& ready_time) {
+  uint64_t ready = ready_time.load(std::memory_order_acquire);
+  return ready != 0 && GetHostTime() >= ready;
+}
+
+static ze_result_t WaitReady(
+    const std::atomic<uint64_t>& ready_time, uint64_t timeout) {
+  uint64_t now = GetHostTime();
+  uint64_t deadline = (timeout > UINT64_MAX - now) ? UINT64_MAX : now + timeout;
+  while (true) {
+    uint64_t ready = ready_time.load(std::memory_order_acquire);
+    now = GetHostTime();
+    if (ready != 0 && now >= ready) {
+      return ZE_RESULT_SUCCESS;
+    }
+    if (now >= deadline) {
+      return ZE_RESULT_NOT_READY;
+    }
+    // Host-signaled objects have no known ready time, so poll them
+    SleepUntil(std::min(deadline, ready != 0 ? ready : now + kPollInterval));
+  }
+}
+
+template <typename T>
+static void ResetProperties(T* props) {
+  auto stype = props->stype;
+  void* next = props->pNext;
+  memset(props, 0, sizeof(T));
+  props->stype = stype;
+  props->pNext = next;
+}
+
+template <typename T>
+static ze_result_t GetList(
+    const std::vector<T>& list, uint32_t* count, T* items) {
+  if (count == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_POINTER;
+  }
+  if (*count == 0 || items == nullptr) {
+    *count = static_cast<uint32_t>(list.size());
+    return ZE_RESULT_SUCCESS;
+  }
+  *count = std::min(*count, static_cast<uint32_t>(list.size()));
+  std::copy(list.begin(), list.begin() + *count, items);
+  return ZE_RESULT_SUCCESS;
+}
+
+// Metrics #####################################################################
+
+struct MetricInfo {
+  const char* name;
+  const char* description;
+  zet_metric_type_t type;
+  const char* units;
+};
+
+const MetricInfo kMetricInfoList[] = {
+  {"QueryBeginTime", "Measurement begin time", ZET_METRIC_TYPE_TIMESTAMP, "ns"},
+  {"GpuTime", "Time elapsed on the GPU", ZET_METRIC_TYPE_DURATION, "ns"},
+  {"GpuCoreClocks", "GPU core clocks", ZET_METRIC_TYPE_EVENT, "cycles"},
+  {"AvgGpuCoreFrequencyMHz", "Average GPU core frequency",
+   ZET_METRIC_TYPE_RATIO, "MHz"}};
+
+const uint32_t kMetricCount = sizeof(kMetricInfoList) / sizeof(MetricInfo);
+const uint64_t kCoreFrequencyMHz = 1000;
+
+// Raw metric report, times are in nanoseconds
+struct MetricReport {
+  uint64_t begin;
+  uint64_t end;
+};
+
+} // namespace fake
+
+// Objects #####################################################################
+
+struct _zet_metric_handle_t {
+  const fake::MetricInfo* info;
+};
+
+struct _zet_metric_group_handle_t {
+  std::vector<_zet_metric_handle_t> metric_list;
+};
+
+struct _ze_device_handle_t {
+  uint32_t id;
+  _ze_device_handle_t* parent;
+  std::vector<ze_device_handle_t> sub_device_list;
+};
+
+struct _ze_driver_handle_t {
+  std::vector<ze_device_handle_t> device_list;
+  _zet_metric_group_handle_t metric_group;
+};
+
+struct _ze_context_handle_t {
+  ze_driver_handle_t driver;
+};
+
+struct _ze_event_pool_handle_t {
+  ze_context_handle_t context;
+  uint32_t count;
+};
+
+struct _ze_event_handle_t {
+  ze_event_pool_handle_t pool;
+  std::atomic<uint64_t> ready_time{0};
+  uint64_t start = 0;
+  uint64_t end = 0;
+};
+
+struct _zet_metric_query_pool_handle_t {
+  ze_device_handle_t device;
+  uint32_t count;
+};
+
+struct _zet_metric_query_handle_t {
+  zet_metric_query_pool_handle_t pool;
+  std::atomic<uint64_t> ready_time{0};
+  fake::MetricReport report = {0, 0};
+};
+
+struct _zet_metric_streamer_handle_t {
+  ze_device_handle_t device;
+  uint64_t sampling_period;
+  uint64_t last_time;
+};
+
+namespace fake {
+
+enum CommandType {
+  COMMAND_KERNEL,
+  COMMAND_COPY,
+  COMMAND_FILL,
+  COMMAND_BARRIER,
+  COMMAND_SIGNAL,
+  COMMAND_RESET,
+  COMMAND_QUERY_BEGIN,
+  COMMAND_QUERY_END
+};
+
+struct Command {
+  CommandType type;
+  uint64_t duration;
+  ze_event_handle_t event;
+  std::vector<ze_event_handle_t> wait_list;
+  zet_metric_query_handle_t query;
+  void* dst;
+  const void* src;
+  size_t size;
+  std::vector<uint8_t> pattern;
+};
+
+// Commands submitted to a queue (or an immediate command list) are executed
+// one by one in submission order
+struct Timeline {
+  std::mutex lock;
+  uint64_t busy_until = 0;
+};
+
+} // namespace fake
+
+struct _ze_command_queue_handle_t {
+  ze_device_handle_t device;
+  fake::Timeline timeline;
+};
+
+struct _ze_command_list_handle_t {
+  ze_context_handle_t context;
+  ze_device_handle_t device;
+  bool immediate;
+  bool closed;
+  std::vector<fake::Command> command_list;
+  fake::Timeline timeline;
+};
+
+struct _ze_fence_handle_t {
+  ze_command_queue_handle_t queue;
+  std::atomic<uint64_t> ready_time{0};
+};
+
+struct _ze_module_build_log_handle_t {
+};
+
+struct _ze_module_handle_t {
+  ze_context_handle_t context;
+  ze_device_handle_t device;
+  std::mutex lock;
+  std::set<std::string> kernel_name_set;
+};
+
+struct _ze_kernel_handle_t {
+  ze_module_handle_t module;
+  std::string name;
+  uint32_t group_size[3];
+};
+
+struct _zel_tracer_handle_t {
+  void* user_data;
+  zel_core_callbacks_t prologues;
+  zel_core_callbacks_t epilogues;
+  std::atomic<bool> enabled{false};
+};
+
+namespace fake {
+
+// Statistics ##################################################################
+
+static std::atomic<uint64_t> api_call_count{0};
+static std::atomic<uint64_t> kernel_count{0};
+
+static void PrintStats() {
+  std::cerr << "ze_fake API calls: " << api_call_count.load() << std::endl;
+  std::cerr << "ze_fake kernels: " << kernel_count.load() << std::endl;
+}
+
+// Driver ######################################################################
+
+static std::once_flag driver_init_flag;
+static ze_driver_handle_t driver = nullptr;
+
+static void CreateDriver() {
+  const Config& config = GetConfig();
+  if (config.stats) {
+    atexit(PrintStats);
+  }
+  driver = new _ze_driver_handle_t;
+  for (uint32_t i = 0; i < config.device_count; ++i) {
+    ze_device_handle_t device = new _ze_device_handle_t{i, nullptr, {}};
+    for (uint32_t j = 0; j < config.sub_device_count; ++j) {
+      device->sub_device_list.push_back(new _ze_device_handle_t{j, device, {}});
+    }
+    driver->device_list.push_back(device);
+  }
+  for (uint32_t i = 0; i < kMetricCount; ++i) {
+    driver->metric_group.metric_list.push_back({&kMetricInfoList[i]});
+  }
+}
+
+// Memory ######################################################################
+
+struct Allocation {
+  size_t size;
+  ze_memory_type_t type;
+  ze_device_handle_t device;
+  uint64_t id;
+};
+
+static std::mutex allocation_lock;
+static std::map<uintptr_t, Allocation> allocation_map;
+static uint64_t allocation_id = 0;
+
+static ze_result_t Allocate(
+    size_t size, size_t alignment, ze_memory_type_t type,
+    ze_device_handle_t device, void** ptr) {
+  if (ptr == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_POINTER;
+  }
+  if (size == 0) {
+    return ZE_RESULT_ERROR_UNSUPPORTED_SIZE;
+  }
+  alignment = std::max(alignment, static_cast<size_t>(64));
+  if ((alignment & (alignment - 1)) != 0) {
+    return ZE_RESULT_ERROR_UNSUPPORTED_ALIGNMENT;
+  }
+  *ptr = aligned_alloc(alignment, (size + alignment - 1) / alignment * alignment);
+  if (*ptr == nullptr) {
+    return ZE_RESULT_ERROR_OUT_OF_HOST_MEMORY;
+  }
+
+  const std::lock_guard<std::mutex> lock(allocation_lock);
+  allocation_map[reinterpret_cast<uintptr_t>(*ptr)] =
+    {size, type, device, ++allocation_id};
+  return ZE_RESULT_SUCCESS;
+}
+
+static const Allocation* FindAllocation(const void* ptr) {
+  uintptr_t address = reinterpret_cast<uintptr_t>(ptr);
+  auto it = allocation_map.upper_bound(address);
+  if (it == allocation_map.begin()) {
+    return nullptr;
+  }
+  --it;
+  if (address >= it->first + it->second.size) {
+    return nullptr;
+  }
+  return &(it->second);
+}
+
+// Execution ###################################################################
+
+static void SignalEvent(ze_event_handle_t event, uint64_t start, uint64_t end) {
+  event->start = start;
+  event->end = end;
+  event->ready_time.store(
+      end + GetConfig().event_latency, std::memory_order_release);
+}
+
+static uint64_t Execute(
+    const std::vector<Command>& command_list, Timeline* timeline) {
+  const Config& config = GetConfig();
+  const std::lock_guard<std::mutex> lock(timeline->lock);
+
+  uint64_t time = std::max(
+      GetHostTime() + config.submit_latency, timeline->busy_until);
+  for (const Command& command : command_list) {
+    for (auto event : command.wait_list) {
+      time = std::max(time, event->ready_time.load(std::memory_order_acquire));
+    }
+
+    uint64_t start = time;
+    uint64_t end = start + command.duration;
+    switch (command.type) {
+      case COMMAND_COPY:
+        memcpy(command.dst, command.src, command.size);
+        break;
+      case COMMAND_FILL:
+        for (size_t i = 0; i < command.size; i += command.pattern.size()) {
+          memcpy(static_cast<uint8_t*>(command.dst) + i, command.pattern.data(),
+                 std::min(command.pattern.size(), command.size - i));
+        }
+        break;
+      case COMMAND_RESET:
+        command.event->ready_time.store(0, std::memory_order_release);
+        continue;
+      case COMMAND_QUERY_BEGIN:
+        command.query->report.begin = start;
+        break;
+      case COMMAND_QUERY_END:
+        command.query->report.end = end;
+        command.query->ready_time.store(
+            end + config.event_latency, std::memory_order_release);
+        break;
+      default:
+        break;
+    }
+
+    if (command.event != nullptr) {
+      SignalEvent(command.event, start, end);
+    }
+    time = end;
+  }
+
+  timeline->busy_until = time;
+  return time;
+}
+
+static ze_result_t AppendCommand(
+    ze_command_list_handle_t command_list, CommandType type, uint64_t duration,
+    ze_event_handle_t event, uint32_t wait_count, ze_event_handle_t* wait_list,
+    Command* result = nullptr) {
+  if (command_list == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  if (wait_count > 0 && wait_list == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_POINTER;
+  }
+  if (command_list->closed) {
+    return ZE_RESULT_ERROR_INVALID_ARGUMENT;
+  }
+
+  Command command{};
+  if (result != nullptr) {
+    command = *result;
+  }
+  command.type = type;
+  command.duration = duration;
+  command.event = event;
+  command.wait_list.assign(wait_list, wait_list + wait_count);
+
+  if (command_list->immediate) {
+    Execute(std::vector<Command>{command}, &command_list->timeline);
+  } else {
+    command_list->command_list.push_back(command);
+  }
+  return ZE_RESULT_SUCCESS;
+}
+
+// Tracing #####################################################################
+
+const uint32_t kMaxTracerCount = 32;
+
+static std::mutex tracer_lock;
+static std::atomic<zel_tracer_handle_t> tracer_list[kMaxTracerCount];
+static std::atomic<uint32_t> enabled_tracer_count{0};
+
+// Calls enabled tracers' prologues in order of creation, then function
+// implementation, then epilogues with the result, as the tracing layer does.
+// Getter returns the callback for the function from a callback table
+template <typename Getter, typename Params, typename Impl>
+static ze_result_t Trace(Getter getter, Params* params, Impl impl) {
+  if (GetConfig().stats) {
+    api_call_count.fetch_add(1, std::memory_order_relaxed);
+  }
+
+  if (enabled_tracer_count.load(std::memory_order_acquire) == 0) {
+    return impl();
+  }
+
+  zel_tracer_handle_t tracers[kMaxTracerCount];
+  void* instance_data[kMaxTracerCount];
+  uint32_t count = 0;
+  for (uint32_t i = 0; i < kMaxTracerCount; ++i) {
+    zel_tracer_handle_t tracer = tracer_list[i].load(std::memory_order_acquire);
+    if (tracer != nullptr && tracer->enabled.load(std::memory_order_acquire)) {
+      tracers[count] = tracer;
+      instance_data[count] = nullptr;
+      ++count;
+    }
+  }
+
+  for (uint32_t i = 0; i < count; ++i) {
+    auto callback = getter(tracers[i]->prologues);
+    if (callback != nullptr) {
+      callback(params, ZE_RESULT_SUCCESS,
+               tracers[i]->user_data, &instance_data[i]);
+    }
+  }
+
+  ze_result_t result = impl();
+
+  for (uint32_t i = 0; i < count; ++i) {
+    auto callback = getter(tracers[i]->epilogues);
+    if (callback != nullptr) {
+      callback(params, result, tracers[i]->user_data, &instance_data[i]);
+    }
+  }
+  return result;
+}
+
+} // namespace fake
+
+// Implementation ##############################################################
+
+namespace impl {
+
+using namespace fake;
+
+// Driver and Device
+
+ze_result_t zeInit(ze_init_flags_t flags) {
+  std::call_once(driver_init_flag, CreateDriver);
+  return ZE_RESULT_SUCCESS;
+}
+
+ze_result_t zeDriverGet(uint32_t* pCount, ze_driver_handle_t* phDrivers) {
+  if (driver == nullptr) {
+    return ZE_RESULT_ERROR_UNINITIALIZED;
+  }
+  return GetList(std::vector<ze_driver_handle_t>{driver}, pCount, phDrivers);
+}
+
+ze_result_t zeDriverGetApiVersion(
+    ze_driver_handle_t hDriver, ze_api_version_t* version) {
+  if (version == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_POINTER;
+  }
+  *version = ZE_API_VERSION_CURRENT;
+  return ZE_RESULT_SUCCESS;
+}
+
+ze_result_t zeDriverGetProperties(
+    ze_driver_handle_t hDriver, ze_driver_properties_t* pDriverProperties) {
+  if (pDriverProperties == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_POINTER;
+  }
+  ResetProperties(pDriverProperties);
+  pDriverProperties->driverVersion = 1;
+  return ZE_RESULT_SUCCESS;
+}
+
+ze_result_t zeDriverGetExtensionProperties(
+    ze_driver_handle_t hDriver, uint32_t* pCount,
+    ze_driver_extension_properties_t* pExtensionProperties) {
+  if (pCount == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_POINTER;
+  }
+  *pCount = 0;
+  return ZE_RESULT_SUCCESS;
+}
+
+ze_result_t zeDriverGetExtensionFunctionAddress(
+    ze_driver_handle_t hDriver, const char* name, void** ppFunctionAddress) {
+  return ZE_RESULT_ERROR_INVALID_ARGUMENT;
+}
+
+ze_result_t zeDeviceGet(
+    ze_driver_handle_t hDriver, uint32_t* pCount, ze_device_handle_t* phDevices) {
+  if (hDriver == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  return GetList(hDriver->device_list, pCount, phDevices);
+}
+
+ze_result_t zeDeviceGetSubDevices(
+    ze_device_handle_t hDevice, uint32_t* pCount,
+    ze_device_handle_t* phSubdevices) {
+  if (hDevice == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  return GetList(hDevice->sub_device_list, pCount, phSubdevices);
+}
+
+ze_result_t zeDeviceGetProperties(
+    ze_device_handle_t hDevice, ze_device_properties_t* pDeviceProperties) {
+  if (hDevice == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  if (pDeviceProperties == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_POINTER;
+  }
+
+  const Config& config = GetConfig();
+  ResetProperties(pDeviceProperties);
+  pDeviceProperties->type = ZE_DEVICE_TYPE_GPU;
+  pDeviceProperties->vendorId = 0x8086;
+  pDeviceProperties->deviceId = 0xFA4E;
+  if (hDevice->parent != nullptr) {
+    pDeviceProperties->flags = ZE_DEVICE_PROPERTY_FLAG_SUBDEVICE;
+    pDeviceProperties->subdeviceId = hDevice->id;
+  }
+  pDeviceProperties->coreClockRate = kCoreFrequencyMHz;
+  pDeviceProperties->maxMemAllocSize = 1ull << 32;
+  pDeviceProperties->maxHardwareContexts = 64;
+  pDeviceProperties->maxCommandQueuePriority = 0;
+  pDeviceProperties->numThreadsPerEU = 8;
+  pDeviceProperties->physicalEUSimdWidth = 8;
+  pDeviceProperties->numEUsPerSubslice = 8;
+  pDeviceProperties->numSubslicesPerSlice = 8;
+  pDeviceProperties->numSlices = 1;
+  // Since API 1.2 timer resolution is reported in cycles per second
+  if (pDeviceProperties->stype == ZE_STRUCTURE_TYPE_DEVICE_PROPERTIES_1_2) {
+    pDeviceProperties->timerResolution = config.timer_frequency;
+  } else {
+    pDeviceProperties->timerResolution =
+      std::max(NSEC_IN_SEC / config.timer_frequency, static_cast<uint64_t>(1));
+  }
+  pDeviceProperties->timestampValidBits = kTimestampValidBits;
+  pDeviceProperties->kernelTimestampValidBits = kKernelTimestampValidBits;
+  uint32_t root_id = (hDevice->parent != nullptr) ? hDevice->parent->id : hDevice->id;
+  pDeviceProperties->uuid.id[0] = static_cast<uint8_t>(root_id);
+  pDeviceProperties->uuid.id[1] = static_cast<uint8_t>(
+      (hDevice->parent != nullptr) ? hDevice->id + 1 : 0);
+  strncpy(pDeviceProperties->name, "Fake Level Zero Device", ZE_MAX_DEVICE_NAME - 1);
+  return ZE_RESULT_SUCCESS;
+}
+
+ze_result_t zeDeviceGetComputeProperties(
+    ze_device_handle_t hDevice,
+    ze_device_compute_properties_t* pComputeProperties) {
+  if (pComputeProperties == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_POINTER;
+  }
+  ResetProperties(pComputeProperties);
+  pComputeProperties->maxTotalGroupSize = 1024;
+  pComputeProperties->maxGroupSizeX = 1024;
+  pComputeProperties->maxGroupSizeY = 1024;
+  pComputeProperties->maxGroupSizeZ = 1024;
+  pComputeProperties->maxGroupCountX = UINT32_MAX;
+  pComputeProperties->maxGroupCountY = UINT32_MAX;
+  pComputeProperties->maxGroupCountZ = UINT32_MAX;
+  pComputeProperties->maxSharedLocalMemory = 64 * 1024;
+  pComputeProperties->numSubGroupSizes = 1;
+  pComputeProperties->subGroupSizes[0] = 16;
+  return ZE_RESULT_SUCCESS;
+}
+
+ze_result_t zeDeviceGetModuleProperties(
+    ze_device_handle_t hDevice,
+    ze_device_module_properties_t* pModuleProperties) {
+  if (pModuleProperties == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_POINTER;
+  }
+  ResetProperties(pModuleProperties);
+  pModuleProperties->maxArgumentsSize = 2048;
+  pModuleProperties->printfBufferSize = 4 * 1024 * 1024;
+  return ZE_RESULT_SUCCESS;
+}
+
+ze_result_t zeDeviceGetMemoryProperties(
+    ze_device_handle_t hDevice, uint32_t* pCount,
+    ze_device_memory_properties_t* pMemProperties) {
+  if (pCount == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_POINTER;
+  }
+  if (*pCount == 0 || pMemProperties == nullptr) {
+    *pCount = 1;
+    return ZE_RESULT_SUCCESS;
+  }
+  *pCount = 1;
+  ResetProperties(pMemProperties);
+  pMemProperties->maxClockRate = kCoreFrequencyMHz;
+  pMemProperties->maxBusWidth = 64;
+  pMemProperties->totalSize = 1ull << 32;
+  strncpy(pMemProperties->name, "DDR", ZE_MAX_DEVICE_NAME - 1);
+  return ZE_RESULT_SUCCESS;
+}
+
+ze_result_t zeDeviceGetCommandQueueGroupProperties(
+    ze_device_handle_t hDevice, uint32_t* pCount,
+    ze_command_queue_group_properties_t* pCommandQueueGroupProperties) {
+  if (pCount == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_POINTER;
+  }
+  if (*pCount == 0 || pCommandQueueGroupProperties == nullptr) {
+    *pCount = 1;
+    return ZE_RESULT_SUCCESS;
+  }
+  *pCount = 1;
+  ResetProperties(pCommandQueueGroupProperties);
+  pCommandQueueGroupProperties->flags =
+    ZE_COMMAND_QUEUE_GROUP_PROPERTY_FLAG_COMPUTE |
+    ZE_COMMAND_QUEUE_GROUP_PROPERTY_FLAG_COPY;
+  pCommandQueueGroupProperties->maxMemoryFillPatternSize = 128;
+  pCommandQueueGroupProperties->numQueues = 1;
+  return ZE_RESULT_SUCCESS;
+}
+
+ze_result_t zeDeviceGetGlobalTimestamps(
+    ze_device_handle_t hDevice, uint64_t* hostTimestamp,
+    uint64_t* deviceTimestamp) {
+  if (hDevice == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  if (hostTimestamp == nullptr || deviceTimestamp == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_POINTER;
+  }
+  *hostTimestamp = GetHostTime();
+  *deviceTimestamp = GetDeviceTicks(*hostTimestamp);
+  return ZE_RESULT_SUCCESS;
+}
+
+ze_result_t zeDevicePciGetPropertiesExt(
+    ze_device_handle_t hDevice, ze_pci_ext_properties_t* pPciProperties) {
+  if (hDevice == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  if (pPciProperties == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_POINTER;
+  }
+  ResetProperties(pPciProperties);
+  ze_device_handle_t root = (hDevice->parent != nullptr) ? hDevice->parent : hDevice;
+  pPciProperties->address.bus = root->id + 1;
+  return ZE_RESULT_SUCCESS;
+}
+
+// Context
+
+ze_result_t zeContextCreate(
+    ze_driver_handle_t hDriver, const ze_context_desc_t* desc,
+    ze_context_handle_t* phContext) {
+  if (hDriver == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  if (phContext == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_POINTER;
+  }
+  *phContext = new _ze_context_handle_t{hDriver};
+  return ZE_RESULT_SUCCESS;
+}
+
+ze_result_t zeContextDestroy(ze_context_handle_t hContext) {
+  if (hContext == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  delete hContext;
+  return ZE_RESULT_SUCCESS;
+}
+
+ze_result_t zeContextGetStatus(ze_context_handle_t hContext) {
+  return ZE_RESULT_SUCCESS;
+}
+
+// Command Queue
+
+ze_result_t zeCommandQueueCreate(
+    ze_context_handle_t hContext, ze_device_handle_t hDevice,
+    const ze_command_queue_desc_t* desc,
+    ze_command_queue_handle_t* phCommandQueue) {
+  if (hContext == nullptr || hDevice == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  if (phCommandQueue == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_POINTER;
+  }
+  ze_command_queue_handle_t queue = new _ze_command_queue_handle_t;
+  queue->device = hDevice;
+  *phCommandQueue = queue;
+  return ZE_RESULT_SUCCESS;
+}
+
+ze_result_t zeCommandQueueDestroy(ze_command_queue_handle_t hCommandQueue) {
+  if (hCommandQueue == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  delete hCommandQueue;
+  return ZE_RESULT_SUCCESS;
+}
+
+ze_result_t zeCommandQueueExecuteCommandLists(
+    ze_command_queue_handle_t hCommandQueue, uint32_t numCommandLists,
+    ze_command_list_handle_t* phCommandLists, ze_fence_handle_t hFence) {
+  if (hCommandQueue == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  if (numCommandLists == 0 || phCommandLists == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_SIZE;
+  }
+
+  uint64_t time = 0;
+  for (uint32_t i = 0; i < numCommandLists; ++i) {
+    ze_command_list_handle_t command_list = phCommandLists[i];
+    if (command_list == nullptr) {
+      return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+    }
+    if (command_list->immediate || !command_list->closed) {
+      return ZE_RESULT_ERROR_INVALID_ARGUMENT;
+    }
+    time = Execute(command_list->command_list, &hCommandQueue->timeline);
+  }
+
+  if (hFence != nullptr) {
+    hFence->ready_time.store(
+        std::max(time, static_cast<uint64_t>(1)), std::memory_order_release);
+  }
+  return ZE_RESULT_SUCCESS;
+}
+
+ze_result_t zeCommandQueueSynchronize(
+    ze_command_queue_handle_t hCommandQueue, uint64_t timeout) {
+  if (hCommandQueue == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  uint64_t busy_until = 0;
+  {
+    const std::lock_guard<std::mutex> lock(hCommandQueue->timeline.lock);
+    busy_until = hCommandQueue->timeline.busy_until;
+  }
+  std::atomic<uint64_t> ready_time(std::max(busy_until, static_cast<uint64_t>(1)));
+  return WaitReady(ready_time, timeout);
+}
+
+// Command List
+
+ze_result_t zeCommandListCreate(
+    ze_context_handle_t hContext, ze_device_handle_t hDevice,
+    const ze_command_list_desc_t* desc,
+    ze_command_list_handle_t* phCommandList) {
+  if (hContext == nullptr || hDevice == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  if (phCommandList == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_POINTER;
+  }
+  ze_command_list_handle_t command_list = new _ze_command_list_handle_t;
+  command_list->context = hContext;
+  command_list->device = hDevice;
+  command_list->immediate = false;
+  command_list->closed = false;
+  *phCommandList = command_list;
+  return ZE_RESULT_SUCCESS;
+}
+
+ze_result_t zeCommandListCreateImmediate(
+    ze_context_handle_t hContext, ze_device_handle_t hDevice,
+    const ze_command_queue_desc_t* altdesc,
+    ze_command_list_handle_t* phCommandList) {
+  ze_result_t status = impl::zeCommandListCreate(
+      hContext, hDevice, nullptr, phCommandList);
+  if (status == ZE_RESULT_SUCCESS) {
+    (*phCommandList)->immediate = true;
+  }
+  return status;
+}
+
+ze_result_t zeCommandListClose(ze_command_list_handle_t hCommandList) {
+  if (hCommandList == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  hCommandList->closed = true;
+  return ZE_RESULT_SUCCESS;
+}
+
+ze_result_t zeCommandListReset(ze_command_list_handle_t hCommandList) {
+  if (hCommandList == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  hCommandList->command_list.clear();
+  hCommandList->closed = false;
+  return ZE_RESULT_SUCCESS;
+}
+
+ze_result_t zeCommandListDestroy(ze_command_list_handle_t hCommandList) {
+  if (hCommandList == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  delete hCommandList;
+  return ZE_RESULT_SUCCESS;
+}
+
+ze_result_t zeCommandListAppendLaunchKernel(
+    ze_command_list_handle_t hCommandList, ze_kernel_handle_t hKernel,
+    const ze_group_count_t* pLaunchFuncArgs, ze_event_handle_t hSignalEvent,
+    uint32_t numWaitEvents, ze_event_handle_t* phWaitEvents) {
+  if (hKernel == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  if (pLaunchFuncArgs == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_POINTER;
+  }
+  if (GetConfig().stats) {
+    kernel_count.fetch_add(1, std::memory_order_relaxed);
+  }
+  return AppendCommand(hCommandList, COMMAND_KERNEL, GetConfig().kernel_time,
+                       hSignalEvent, numWaitEvents, phWaitEvents);
+}
+
+ze_result_t zeCommandListAppendMemoryCopy(
+    ze_command_list_handle_t hCommandList, void* dstptr, const void* srcptr,
+    size_t size, ze_event_handle_t hSignalEvent, uint32_t numWaitEvents,
+    ze_event_handle_t* phWaitEvents) {
+  if (dstptr == nullptr || srcptr == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_POINTER;
+  }
+  Command command{};
+  command.dst = dstptr;
+  command.src = srcptr;
+  command.size = size;
+  return AppendCommand(hCommandList, COMMAND_COPY, GetConfig().copy_time,
+                       hSignalEvent, numWaitEvents, phWaitEvents, &command);
+}
+
+ze_result_t zeCommandListAppendMemoryFill(
+    ze_command_list_handle_t hCommandList, void* ptr, const void* pattern,
+    size_t pattern_size, size_t size, ze_event_handle_t hSignalEvent,
+    uint32_t numWaitEvents, ze_event_handle_t* phWaitEvents) {
+  if (ptr == nullptr || pattern == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_POINTER;
+  }
+  if (pattern_size == 0) {
+    return ZE_RESULT_ERROR_INVALID_SIZE;
+  }
+  Command command{};
+  command.dst = ptr;
+  command.size = size;
+  command.pattern.assign(static_cast<const uint8_t*>(pattern),
+                         static_cast<const uint8_t*>(pattern) + pattern_size);
+  return AppendCommand(hCommandList, COMMAND_FILL, GetConfig().copy_time,
+                       hSignalEvent, numWaitEvents, phWaitEvents, &command);
+}
+
+ze_result_t zeCommandListAppendBarrier(
+    ze_command_list_handle_t hCommandList, ze_event_handle_t hSignalEvent,
+    uint32_t numWaitEvents, ze_event_handle_t* phWaitEvents) {
+  return AppendCommand(hCommandList, COMMAND_BARRIER, 0,
+                       hSignalEvent, numWaitEvents, phWaitEvents);
+}
+
+ze_result_t zeCommandListAppendSignalEvent(
+    ze_command_list_handle_t hCommandList, ze_event_handle_t hEvent) {
+  if (hEvent == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  return AppendCommand(hCommandList, COMMAND_SIGNAL, 0, hEvent, 0, nullptr);
+}
+
+ze_result_t zeCommandListAppendWaitOnEvents(
+    ze_command_list_handle_t hCommandList, uint32_t numEvents,
+    ze_event_handle_t* phEvents) {
+  return AppendCommand(hCommandList, COMMAND_BARRIER, 0,
+                       nullptr, numEvents, phEvents);
+}
+
+ze_result_t zeCommandListAppendEventReset(
+    ze_command_list_handle_t hCommandList, ze_event_handle_t hEvent) {
+  if (hEvent == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  return AppendCommand(hCommandList, COMMAND_RESET, 0, hEvent, 0, nullptr);
+}
+
+// Fence
+
+ze_result_t zeFenceCreate(
+    ze_command_queue_handle_t hCommandQueue, const ze_fence_desc_t* desc,
+    ze_fence_handle_t* phFence) {
+  if (hCommandQueue == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  if (phFence == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_POINTER;
+  }
+  ze_fence_handle_t fence = new _ze_fence_handle_t;
+  fence->queue = hCommandQueue;
+  *phFence = fence;
+  return ZE_RESULT_SUCCESS;
+}
+
+ze_result_t zeFenceDestroy(ze_fence_handle_t hFence) {
+  if (hFence == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  delete hFence;
+  return ZE_RESULT_SUCCESS;
+}
+
+ze_result_t zeFenceHostSynchronize(ze_fence_handle_t hFence, uint64_t timeout) {
+  if (hFence == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  return WaitReady(hFence->ready_time, timeout);
+}
+
+ze_result_t zeFenceQueryStatus(ze_fence_handle_t hFence) {
+  if (hFence == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  return IsReady(hFence->ready_time) ? ZE_RESULT_SUCCESS : ZE_RESULT_NOT_READY;
+}
+
+ze_result_t zeFenceReset(ze_fence_handle_t hFence) {
+  if (hFence == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  hFence->ready_time.store(0, std::memory_order_release);
+  return ZE_RESULT_SUCCESS;
+}
+
+// Event
+
+ze_result_t zeEventPoolCreate(
+    ze_context_handle_t hContext, const ze_event_pool_desc_t* desc,
+    uint32_t numDevices, ze_device_handle_t* phDevices,
+    ze_event_pool_handle_t* phEventPool) {
+  if (hContext == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  if (desc == nullptr || phEventPool == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_POINTER;
+  }
+  if (desc->count == 0) {
+    return ZE_RESULT_ERROR_INVALID_SIZE;
+  }
+  *phEventPool = new _ze_event_pool_handle_t{hContext, desc->count};
+  return ZE_RESULT_SUCCESS;
+}
+
+ze_result_t zeEventPoolDestroy(ze_event_pool_handle_t hEventPool) {
+  if (hEventPool == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  delete hEventPool;
+  return ZE_RESULT_SUCCESS;
+}
+
+ze_result_t zeEventCreate(
+    ze_event_pool_handle_t hEventPool, const ze_event_desc_t* desc,
+    ze_event_handle_t* phEvent) {
+  if (hEventPool == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  if (desc == nullptr || phEvent == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_POINTER;
+  }
+  if (desc->index >= hEventPool->count) {
+    return ZE_RESULT_ERROR_INVALID_ARGUMENT;
+  }
+  ze_event_handle_t event = new _ze_event_handle_t;
+  event->pool = hEventPool;
+  *phEvent = event;
+  return ZE_RESULT_SUCCESS;
+}
+
+ze_result_t zeEventDestroy(ze_event_handle_t hEvent) {
+  if (hEvent == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  delete hEvent;
+  return ZE_RESULT_SUCCESS;
+}
+
+ze_result_t zeEventHostSignal(ze_event_handle_t hEvent) {
+  if (hEvent == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  uint64_t time = GetHostTime();
+  hEvent->start = time;
+  hEvent->end = time;
+  hEvent->ready_time.store(time, std::memory_order_release);
+  return ZE_RESULT_SUCCESS;
+}
+
+ze_result_t zeEventHostSynchronize(ze_event_handle_t hEvent, uint64_t timeout) {
+  if (hEvent == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  return WaitReady(hEvent->ready_time, timeout);
+}
+
+ze_result_t zeEventQueryStatus(ze_event_handle_t hEvent) {
+  if (hEvent == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  return IsReady(hEvent->ready_time) ? ZE_RESULT_SUCCESS : ZE_RESULT_NOT_READY;
+}
+
+ze_result_t zeEventHostReset(ze_event_handle_t hEvent) {
+  if (hEvent == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  hEvent->ready_time.store(0, std::memory_order_release);
+  return ZE_RESULT_SUCCESS;
+}
+
+ze_result_t zeEventQueryKernelTimestamp(
+    ze_event_handle_t hEvent, ze_kernel_timestamp_result_t* dstptr) {
+  if (hEvent == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  if (dstptr == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_POINTER;
+  }
+  if (!IsReady(hEvent->ready_time)) {
+    return ZE_RESULT_NOT_READY;
+  }
+  dstptr->global.kernelStart = GetKernelTicks(hEvent->start);
+  dstptr->global.kernelEnd = GetKernelTicks(hEvent->end);
+  dstptr->context = dstptr->global;
+  return ZE_RESULT_SUCCESS;
+}
+
+ze_result_t zeEventQueryTimestampsExp(
+    ze_event_handle_t hEvent, ze_device_handle_t hDevice, uint32_t* pCount,
+    ze_kernel_timestamp_result_t* pTimestamps) {
+  if (hEvent == nullptr || hDevice == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  if (pCount == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_POINTER;
+  }
+  if (*pCount == 0 || pTimestamps == nullptr) {
+    *pCount = 1;
+    return ZE_RESULT_SUCCESS;
+  }
+  *pCount = 1;
+  return impl::zeEventQueryKernelTimestamp(hEvent, pTimestamps);
+}
+
+// Memory
+
+ze_result_t zeMemAllocDevice(
+    ze_context_handle_t hContext, const ze_device_mem_alloc_desc_t* device_desc,
+    size_t size, size_t alignment, ze_device_handle_t hDevice, void** pptr) {
+  if (hContext == nullptr || hDevice == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  return Allocate(size, alignment, ZE_MEMORY_TYPE_DEVICE, hDevice, pptr);
+}
+
+ze_result_t zeMemAllocHost(
+    ze_context_handle_t hContext, const ze_host_mem_alloc_desc_t* host_desc,
+    size_t size, size_t alignment, void** pptr) {
+  if (hContext == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  return Allocate(size, alignment, ZE_MEMORY_TYPE_HOST, nullptr, pptr);
+}
+
+ze_result_t zeMemAllocShared(
+    ze_context_handle_t hContext, const ze_device_mem_alloc_desc_t* device_desc,
+    const ze_host_mem_alloc_desc_t* host_desc, size_t size, size_t alignment,
+    ze_device_handle_t hDevice, void** pptr) {
+  if (hContext == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  return Allocate(size, alignment, ZE_MEMORY_TYPE_SHARED, hDevice, pptr);
+}
+
+ze_result_t zeMemFree(ze_context_handle_t hContext, void* ptr) {
+  if (hContext == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  const std::lock_guard<std::mutex> lock(allocation_lock);
+  auto it = allocation_map.find(reinterpret_cast<uintptr_t>(ptr));
+  if (it == allocation_map.end()) {
+    return ZE_RESULT_ERROR_INVALID_ARGUMENT;
+  }
+  allocation_map.erase(it);
+  free(ptr);
+  return ZE_RESULT_SUCCESS;
+}
+
+ze_result_t zeMemGetAllocProperties(
+    ze_context_handle_t hContext, const void* ptr,
+    ze_memory_allocation_properties_t* pMemAllocProperties,
+    ze_device_handle_t* phDevice) {
+  if (hContext == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  if (pMemAllocProperties == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_POINTER;
+  }
+
+  ResetProperties(pMemAllocProperties);
+  pMemAllocProperties->type = ZE_MEMORY_TYPE_UNKNOWN;
+  if (phDevice != nullptr) {
+    *phDevice = nullptr;
+  }
+
+  const std::lock_guard<std::mutex> lock(allocation_lock);
+  const Allocation* allocation = FindAllocation(ptr);
+  if (allocation != nullptr) {
+    pMemAllocProperties->type = allocation->type;
+    pMemAllocProperties->id = allocation->id;
+    pMemAllocProperties->pageSize = 4096;
+    if (phDevice != nullptr) {
+      *phDevice = allocation->device;
+    }
+  }
+  return ZE_RESULT_SUCCESS;
+}
+
+// Module and Kernel
+
+ze_result_t zeModuleCreate(
+    ze_context_handle_t hContext, ze_device_handle_t hDevice,
+    const ze_module_desc_t* desc, ze_module_handle_t* phModule,
+    ze_module_build_log_handle_t* phBuildLog) {
+  if (hContext == nullptr || hDevice == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  if (desc == nullptr || phModule == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_POINTER;
+  }
+  ze_module_handle_t module = new _ze_module_handle_t;
+  module->context = hContext;
+  module->device = hDevice;
+  *phModule = module;
+  if (phBuildLog != nullptr) {
+    *phBuildLog = new _ze_module_build_log_handle_t;
+  }
+  return ZE_RESULT_SUCCESS;
+}
+
+ze_result_t zeModuleDestroy(ze_module_handle_t hModule) {
+  if (hModule == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  delete hModule;
+  return ZE_RESULT_SUCCESS;
+}
+
+ze_result_t zeModuleBuildLogDestroy(ze_module_build_log_handle_t hModuleBuildLog) {
+  if (hModuleBuildLog == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  delete hModuleBuildLog;
+  return ZE_RESULT_SUCCESS;
+}
+
+ze_result_t zeModuleBuildLogGetString(
+    ze_module_build_log_handle_t hModuleBuildLog, size_t* pSize,
+    char* pBuildLog) {
+  if (pSize == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_POINTER;
+  }
+  if (pBuildLog != nullptr && *pSize > 0) {
+    pBuildLog[0] = '\0';
+  }
+  *pSize = 1;
+  return ZE_RESULT_SUCCESS;
+}
+
+ze_result_t zeModuleGetNativeBinary(
+    ze_module_handle_t hModule, size_t* pSize, uint8_t* pModuleNativeBinary) {
+  if (hModule == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  if (pSize == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_POINTER;
+  }
+  *pSize = 0;
+  return ZE_RESULT_SUCCESS;
+}
+
+// Module accepts any kernel name, the names of created kernels are reported
+ze_result_t zeModuleGetKernelNames(
+    ze_module_handle_t hModule, uint32_t* pCount, const char** pNames) {
+  if (hModule == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  const std::lock_guard<std::mutex> lock(hModule->lock);
+  std::vector<const char*> name_list;
+  for (auto& name : hModule->kernel_name_set) {
+    name_list.push_back(name.c_str());
+  }
+  return GetList(name_list, pCount, pNames);
+}
+
+ze_result_t zeKernelCreate(
+    ze_module_handle_t hModule, const ze_kernel_desc_t* desc,
+    ze_kernel_handle_t* phKernel) {
+  if (hModule == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  if (desc == nullptr || desc->pKernelName == nullptr || phKernel == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_POINTER;
+  }
+  {
+    const std::lock_guard<std::mutex> lock(hModule->lock);
+    hModule->kernel_name_set.insert(desc->pKernelName);
+  }
+  *phKernel = new _ze_kernel_handle_t{hModule, desc->pKernelName, {1, 1, 1}};
+  return ZE_RESULT_SUCCESS;
+}
+
+ze_result_t zeKernelDestroy(ze_kernel_handle_t hKernel) {
+  if (hKernel == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  delete hKernel;
+  return ZE_RESULT_SUCCESS;
+}
+
+ze_result_t zeKernelGetName(
+    ze_kernel_handle_t hKernel, size_t* pSize, char* pName) {
+  if (hKernel == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  if (pSize == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_POINTER;
+  }
+  size_t size = hKernel->name.size() + 1;
+  if (pName != nullptr && *pSize > 0) {
+    size = std::min(size, *pSize);
+    memcpy(pName, hKernel->name.c_str(), size - 1);
+    pName[size - 1] = '\0';
+  }
+  *pSize = size;
+  return ZE_RESULT_SUCCESS;
+}
+
+ze_result_t zeKernelGetProperties(
+    ze_kernel_handle_t hKernel, ze_kernel_properties_t* pKernelProperties) {
+  if (hKernel == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  if (pKernelProperties == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_POINTER;
+  }
+  ResetProperties(pKernelProperties);
+  pKernelProperties->maxSubgroupSize = 16;
+  pKernelProperties->maxNumSubgroups = 64;
+  return ZE_RESULT_SUCCESS;
+}
+
+ze_result_t zeKernelSetGroupSize(
+    ze_kernel_handle_t hKernel, uint32_t groupSizeX, uint32_t groupSizeY,
+    uint32_t groupSizeZ) {
+  if (hKernel == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  hKernel->group_size[0] = groupSizeX;
+  hKernel->group_size[1] = groupSizeY;
+  hKernel->group_size[2] = groupSizeZ;
+  return ZE_RESULT_SUCCESS;
+}
+
+ze_result_t zeKernelSuggestGroupSize(
+    ze_kernel_handle_t hKernel, uint32_t globalSizeX, uint32_t globalSizeY,
+    uint32_t globalSizeZ, uint32_t* groupSizeX, uint32_t* groupSizeY,
+    uint32_t* groupSizeZ) {
+  if (hKernel == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  if (groupSizeX == nullptr || groupSizeY == nullptr || groupSizeZ == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_POINTER;
+  }
+  // The largest power of two (up to 16) dividing the global size
+  uint32_t* group_size[] = {groupSizeX, groupSizeY, groupSizeZ};
+  uint32_t global_size[] = {globalSizeX, globalSizeY, globalSizeZ};
+  for (int i = 0; i < 3; ++i) {
+    *group_size[i] = 1;
+    while (*group_size[i] < 16 && global_size[i] % (*group_size[i] * 2) == 0) {
+      *group_size[i] *= 2;
+    }
+  }
+  return ZE_RESULT_SUCCESS;
+}
+
+ze_result_t zeKernelSetArgumentValue(
+    ze_kernel_handle_t hKernel, uint32_t argIndex, size_t argSize,
+    const void* pArgValue) {
+  if (hKernel == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  return ZE_RESULT_SUCCESS;
+}
+
+ze_result_t zeKernelSetIndirectAccess(
+    ze_kernel_handle_t hKernel, ze_kernel_indirect_access_flags_t flags) {
+  if (hKernel == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  return ZE_RESULT_SUCCESS;
+}
+
+// Metrics
+
+ze_result_t zetMetricGroupGet(
+    zet_device_handle_t hDevice, uint32_t* pCount,
+    zet_metric_group_handle_t* phMetricGroups) {
+  if (hDevice == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  return GetList(std::vector<zet_metric_group_handle_t>{&driver->metric_group},
+                 pCount, phMetricGroups);
+}
+
+ze_result_t zetMetricGroupGetProperties(
+    zet_metric_group_handle_t hMetricGroup,
+    zet_metric_group_properties_t* pProperties) {
+  if (hMetricGroup == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  if (pProperties == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_POINTER;
+  }
+  ResetProperties(pProperties);
+  strncpy(pProperties->name, "ComputeBasic", ZET_MAX_METRIC_GROUP_NAME - 1);
+  strncpy(pProperties->description, "Fake compute metrics",
+          ZET_MAX_METRIC_GROUP_DESCRIPTION - 1);
+  pProperties->samplingType =
+    ZET_METRIC_GROUP_SAMPLING_TYPE_FLAG_EVENT_BASED |
+    ZET_METRIC_GROUP_SAMPLING_TYPE_FLAG_TIME_BASED;
+  pProperties->domain = 0;
+  pProperties->metricCount = kMetricCount;
+  return ZE_RESULT_SUCCESS;
+}
+
+ze_result_t zetMetricGet(
+    zet_metric_group_handle_t hMetricGroup, uint32_t* pCount,
+    zet_metric_handle_t* phMetrics) {
+  if (hMetricGroup == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  std::vector<zet_metric_handle_t> metric_list;
+  for (auto& metric : hMetricGroup->metric_list) {
+    metric_list.push_back(&metric);
+  }
+  return GetList(metric_list, pCount, phMetrics);
+}
+
+ze_result_t zetMetricGetProperties(
+    zet_metric_handle_t hMetric, zet_metric_properties_t* pProperties) {
+  if (hMetric == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  if (pProperties == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_POINTER;
+  }
+  ResetProperties(pProperties);
+  strncpy(pProperties->name, hMetric->info->name, ZET_MAX_METRIC_NAME - 1);
+  strncpy(pProperties->description, hMetric->info->description,
+          ZET_MAX_METRIC_DESCRIPTION - 1);
+  strncpy(pProperties->component, "GPU", ZET_MAX_METRIC_COMPONENT - 1);
+  pProperties->tierNumber = 1;
+  pProperties->metricType = hMetric->info->type;
+  pProperties->resultType = ZET_VALUE_TYPE_UINT64;
+  strncpy(pProperties->resultUnits, hMetric->info->units,
+          ZET_MAX_METRIC_RESULT_UNITS - 1);
+  return ZE_RESULT_SUCCESS;
+}
+
+ze_result_t zetMetricGroupCalculateMetricValues(
+    zet_metric_group_handle_t hMetricGroup,
+    zet_metric_group_calculation_type_t type, size_t rawDataSize,
+    const uint8_t* pRawData, uint32_t* pMetricValueCount,
+    zet_typed_value_t* pMetricValues) {
+  if (hMetricGroup == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  if (pRawData == nullptr || pMetricValueCount == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_POINTER;
+  }
+
+  uint32_t report_count = static_cast<uint32_t>(rawDataSize / sizeof(MetricReport));
+  if (*pMetricValueCount == 0 || pMetricValues == nullptr) {
+    *pMetricValueCount = report_count * kMetricCount;
+    return ZE_RESULT_SUCCESS;
+  }
+
+  report_count = std::min(report_count, *pMetricValueCount / kMetricCount);
+  for (uint32_t i = 0; i < report_count; ++i) {
+    MetricReport report;
+    memcpy(&report, pRawData + i * sizeof(MetricReport), sizeof(MetricReport));
+    uint64_t time = report.end - report.begin;
+    uint64_t value_list[kMetricCount] = {
+      report.begin, time, time * kCoreFrequencyMHz / 1000, kCoreFrequencyMHz};
+    for (uint32_t j = 0; j < kMetricCount; ++j) {
+      pMetricValues[i * kMetricCount + j].type = ZET_VALUE_TYPE_UINT64;
+      pMetricValues[i * kMetricCount + j].value.ui64 = value_list[j];
+    }
+  }
+  *pMetricValueCount = report_count * kMetricCount;
+  return ZE_RESULT_SUCCESS;
+}
+
+ze_result_t zetMetricGroupCalculateMultipleMetricValuesExp(
+    zet_metric_group_handle_t hMetricGroup,
+    zet_metric_group_calculation_type_t type, size_t rawDataSize,
+    const uint8_t* pRawData, uint32_t* pSetCount,
+    uint32_t* pTotalMetricValueCount, uint32_t* pMetricCounts,
+    zet_typed_value_t* pMetricValues) {
+  if (pSetCount == nullptr || pTotalMetricValueCount == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_POINTER;
+  }
+  // All the reports belong to a single set (no sub-device data)
+  ze_result_t status = impl::zetMetricGroupCalculateMetricValues(
+      hMetricGroup, type, rawDataSize, pRawData,
+      pTotalMetricValueCount, pMetricValues);
+  if (status != ZE_RESULT_SUCCESS) {
+    return status;
+  }
+  *pSetCount = 1;
+  if (pMetricCounts != nullptr) {
+    pMetricCounts[0] = *pTotalMetricValueCount;
+  }
+  return ZE_RESULT_SUCCESS;
+}
+
+ze_result_t zetMetricGroupGetGlobalTimestampsExp(
+    zet_metric_group_handle_t hMetricGroup, ze_bool_t synchronizedWithHost,
+    uint64_t* globalTimestamp, uint64_t* metricTimestamp) {
+  if (hMetricGroup == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  if (globalTimestamp == nullptr || metricTimestamp == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_POINTER;
+  }
+  uint64_t time = GetHostTime();
+  *globalTimestamp = synchronizedWithHost ? time : GetDeviceTicks(time);
+  *metricTimestamp = time;
+  return ZE_RESULT_SUCCESS;
+}
+
+ze_result_t zetContextActivateMetricGroups(
+    zet_context_handle_t hContext, zet_device_handle_t hDevice, uint32_t count,
+    zet_metric_group_handle_t* phMetricGroups) {
+  if (hContext == nullptr || hDevice == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  return ZE_RESULT_SUCCESS;
+}
+
+ze_result_t zetMetricStreamerOpen(
+    zet_context_handle_t hContext, zet_device_handle_t hDevice,
+    zet_metric_group_handle_t hMetricGroup, zet_metric_streamer_desc_t* desc,
+    ze_event_handle_t hNotificationEvent,
+    zet_metric_streamer_handle_t* phMetricStreamer) {
+  if (hContext == nullptr || hDevice == nullptr || hMetricGroup == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  if (desc == nullptr || phMetricStreamer == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_POINTER;
+  }
+  if (desc->samplingPeriod == 0) {
+    return ZE_RESULT_ERROR_INVALID_ARGUMENT;
+  }
+  *phMetricStreamer = new _zet_metric_streamer_handle_t{
+      hDevice, desc->samplingPeriod, GetHostTime()};
+  return ZE_RESULT_SUCCESS;
+}
+
+ze_result_t zetMetricStreamerClose(zet_metric_streamer_handle_t hMetricStreamer) {
+  if (hMetricStreamer == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  delete hMetricStreamer;
+  return ZE_RESULT_SUCCESS;
+}
+
+// Streamer produces one report per sampling period elapsed since last read
+ze_result_t zetMetricStreamerReadData(
+    zet_metric_streamer_handle_t hMetricStreamer, uint32_t maxReportCount,
+    size_t* pRawDataSize, uint8_t* pRawData) {
+  if (hMetricStreamer == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  if (pRawDataSize == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_POINTER;
+  }
+
+  uint64_t period = hMetricStreamer->sampling_period;
+  uint64_t report_count =
+    (GetHostTime() - hMetricStreamer->last_time) / period;
+  report_count = std::min(report_count, static_cast<uint64_t>(maxReportCount));
+  if (pRawData == nullptr) {
+    *pRawDataSize = report_count * sizeof(MetricReport);
+    return ZE_RESULT_SUCCESS;
+  }
+
+  report_count = std::min(report_count, *pRawDataSize / sizeof(MetricReport));
+  for (uint64_t i = 0; i < report_count; ++i) {
+    MetricReport report = {hMetricStreamer->last_time,
+                           hMetricStreamer->last_time + period};
+    memcpy(pRawData + i * sizeof(MetricReport), &report, sizeof(MetricReport));
+    hMetricStreamer->last_time += period;
+  }
+  *pRawDataSize = report_count * sizeof(MetricReport);
+  return ZE_RESULT_SUCCESS;
+}
+
+ze_result_t zetMetricQueryPoolCreate(
+    zet_context_handle_t hContext, zet_device_handle_t hDevice,
+    zet_metric_group_handle_t hMetricGroup,
+    const zet_metric_query_pool_desc_t* desc,
+    zet_metric_query_pool_handle_t* phMetricQueryPool) {
+  if (hContext == nullptr || hDevice == nullptr || hMetricGroup == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  if (desc == nullptr || phMetricQueryPool == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_POINTER;
+  }
+  *phMetricQueryPool = new _zet_metric_query_pool_handle_t{hDevice, desc->count};
+  return ZE_RESULT_SUCCESS;
+}
+
+ze_result_t zetMetricQueryPoolDestroy(
+    zet_metric_query_pool_handle_t hMetricQueryPool) {
+  if (hMetricQueryPool == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  delete hMetricQueryPool;
+  return ZE_RESULT_SUCCESS;
+}
+
+ze_result_t zetMetricQueryCreate(
+    zet_metric_query_pool_handle_t hMetricQueryPool, uint32_t index,
+    zet_metric_query_handle_t* phMetricQuery) {
+  if (hMetricQueryPool == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  if (phMetricQuery == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_POINTER;
+  }
+  if (index >= hMetricQueryPool->count) {
+    return ZE_RESULT_ERROR_INVALID_ARGUMENT;
+  }
+  zet_metric_query_handle_t query = new _zet_metric_query_handle_t;
+  query->pool = hMetricQueryPool;
+  *phMetricQuery = query;
+  return ZE_RESULT_SUCCESS;
+}
+
+ze_result_t zetMetricQueryDestroy(zet_metric_query_handle_t hMetricQuery) {
+  if (hMetricQuery == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  delete hMetricQuery;
+  return ZE_RESULT_SUCCESS;
+}
+
+ze_result_t zetMetricQueryReset(zet_metric_query_handle_t hMetricQuery) {
+  if (hMetricQuery == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  hMetricQuery->ready_time.store(0, std::memory_order_release);
+  return ZE_RESULT_SUCCESS;
+}
+
+ze_result_t zetCommandListAppendMetricQueryBegin(
+    zet_command_list_handle_t hCommandList,
+    zet_metric_query_handle_t hMetricQuery) {
+  if (hMetricQuery == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  Command command{};
+  command.query = hMetricQuery;
+  return AppendCommand(hCommandList, COMMAND_QUERY_BEGIN, 0,
+                       nullptr, 0, nullptr, &command);
+}
+
+ze_result_t zetCommandListAppendMetricQueryEnd(
+    zet_command_list_handle_t hCommandList,
+    zet_metric_query_handle_t hMetricQuery, ze_event_handle_t hSignalEvent,
+    uint32_t numWaitEvents, ze_event_handle_t* phWaitEvents) {
+  if (hMetricQuery == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  Command command{};
+  command.query = hMetricQuery;
+  return AppendCommand(hCommandList, COMMAND_QUERY_END, 0,
+                       hSignalEvent, numWaitEvents, phWaitEvents, &command);
+}
+
+ze_result_t zetMetricQueryGetData(
+    zet_metric_query_handle_t hMetricQuery, size_t* pRawDataSize,
+    uint8_t* pRawData) {
+  if (hMetricQuery == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  if (pRawDataSize == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_POINTER;
+  }
+  if (!IsReady(hMetricQuery->ready_time)) {
+    return ZE_RESULT_NOT_READY;
+  }
+  if (pRawData != nullptr) {
+    if (*pRawDataSize < sizeof(MetricReport)) {
+      return ZE_RESULT_ERROR_INVALID_SIZE;
+    }
+    memcpy(pRawData, &hMetricQuery->report, sizeof(MetricReport));
+  }
+  *pRawDataSize = sizeof(MetricReport);
+  return ZE_RESULT_SUCCESS;
+}
+
+// Tracing Layer
+
+ze_result_t zelTracerCreate(
+    const zel_tracer_desc_t* desc, zel_tracer_handle_t* phTracer) {
+  if (desc == nullptr || phTracer == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_POINTER;
+  }
+
+  const std::lock_guard<std::mutex> lock(tracer_lock);
+  for (uint32_t i = 0; i < kMaxTracerCount; ++i) {
+    if (tracer_list[i].load(std::memory_order_acquire) == nullptr) {
+      zel_tracer_handle_t tracer = new _zel_tracer_handle_t;
+      tracer->user_data = desc->pUserData;
+      memset(&tracer->prologues, 0, sizeof(zel_core_callbacks_t));
+      memset(&tracer->epilogues, 0, sizeof(zel_core_callbacks_t));
+      tracer_list[i].store(tracer, std::memory_order_release);
+      *phTracer = tracer;
+      return ZE_RESULT_SUCCESS;
+    }
+  }
+  return ZE_RESULT_ERROR_OUT_OF_HOST_MEMORY;
+}
+
+// Tracer object is never freed since API calls in flight may still use it
+ze_result_t zelTracerDestroy(zel_tracer_handle_t hTracer) {
+  if (hTracer == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  if (hTracer->enabled.load(std::memory_order_acquire)) {
+    return ZE_RESULT_ERROR_HANDLE_OBJECT_IN_USE;
+  }
+
+  const std::lock_guard<std::mutex> lock(tracer_lock);
+  for (uint32_t i = 0; i < kMaxTracerCount; ++i) {
+    if (tracer_list[i].load(std::memory_order_acquire) == hTracer) {
+      tracer_list[i].store(nullptr, std::memory_order_release);
+      return ZE_RESULT_SUCCESS;
+    }
+  }
+  return ZE_RESULT_ERROR_INVALID_ARGUMENT;
+}
+
+ze_result_t zelTracerSetPrologues(
+    zel_tracer_handle_t hTracer, zel_core_callbacks_t* pCoreCbs) {
+  if (hTracer == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  if (pCoreCbs == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_POINTER;
+  }
+  if (hTracer->enabled.load(std::memory_order_acquire)) {
+    return ZE_RESULT_ERROR_HANDLE_OBJECT_IN_USE;
+  }
+  hTracer->prologues = *pCoreCbs;
+  return ZE_RESULT_SUCCESS;
+}
+
+ze_result_t zelTracerSetEpilogues(
+    zel_tracer_handle_t hTracer, zel_core_callbacks_t* pCoreCbs) {
+  if (hTracer == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  if (pCoreCbs == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_POINTER;
+  }
+  if (hTracer->enabled.load(std::memory_order_acquire)) {
+    return ZE_RESULT_ERROR_HANDLE_OBJECT_IN_USE;
+  }
+  hTracer->epilogues = *pCoreCbs;
+  return ZE_RESULT_SUCCESS;
+}
+
+ze_result_t zelTracerSetEnabled(zel_tracer_handle_t hTracer, ze_bool_t enable) {
+  if (hTracer == nullptr) {
+    return ZE_RESULT_ERROR_INVALID_NULL_HANDLE;
+  }
+  const std::lock_guard<std::mutex> lock(tracer_lock);
+  bool enabled = hTracer->enabled.exchange(enable != 0, std::memory_order_acq_rel);
+  if (enabled != (enable != 0)) {
+    if (enable) {
+      enabled_tracer_count.fetch_add(1, std::memory_order_release);
+    } else {
+      enabled_tracer_count.fetch_sub(1, std::memory_order_release);
+    }
+  }
+  return ZE_RESULT_SUCCESS;
+}
+
+} // namespace impl
+
+// API Entry Points ############################################################
+
+#include "tracing.gen"
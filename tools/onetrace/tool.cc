@@ -76,6 +76,16 @@ void Usage() {
     "--output [-o] <filename>       " <<
     "Print console logs into the file" <<
     std::endl;
+  std::cout <<
+    "--api-filter <list>            " <<
+    "Trace only L0 API functions matching comma separated globs or " <<
+    "categories (\"-\" to exclude)" <<
+    std::endl;
+  std::cout <<
+    "--api-sampling <list>          " <<
+    "Measure only one of N calls for L0 API functions, " <<
+    "e.g. \"zeEventQueryStatus=100\"" <<
+    std::endl;
   std::cout <<
     "--conditional-collection       " <<
     "Enable conditional collection mode" <<
@@ -148,6 +158,22 @@ int ParseArgs(int argc, char* argv[]) {
       }
       utils::SetEnv("ONETRACE_LogFilename", argv[i]);
       app_index += 2;
+    } else if (strcmp(argv[i], "--api-filter") == 0) {
+      ++i;
+      if (i >= argc) {
+        std::cerr << "[ERROR] API filter is not specified" << std::endl;
+        return -1;
+      }
+      utils::SetEnv("PTI_API_FILTER", argv[i]);
+      app_index += 2;
+    } else if (strcmp(argv[i], "--api-sampling") == 0) {
+      ++i;
+      if (i >= argc) {
+        std::cerr << "[ERROR] API sampling rates are not specified" << std::endl;
+        return -1;
+      }
+      utils::SetEnv("PTI_API_SAMPLING", argv[i]);
+      app_index += 2;
     } else if (strcmp(argv[i], "--conditional-collection") == 0) {
       utils::SetEnv("ONETRACE_ConditionalCollection", "1");
       ++app_index;
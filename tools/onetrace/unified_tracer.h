@@ -162,6 +162,8 @@ class UnifiedTracer {
       api_options.need_tid = tracer->CheckOption(TRACE_TID);
       api_options.need_pid = tracer->CheckOption(TRACE_PID);
       api_options.demangle = tracer->CheckOption(TRACE_DEMANGLE);
+      api_options.api_filter = utils::GetEnv("PTI_API_FILTER");
+      api_options.api_sampling = utils::GetEnv("PTI_API_SAMPLING");
 
       if (status == ZE_RESULT_SUCCESS) {
         ze_api_collector = ZeApiCollector::Create(
@@ -0,0 +1,145 @@
+//==============================================================
+// Copyright (C) Intel Corporation
+//
+// SPDX-License-Identifier: MIT
+// =============================================================
+
+#ifndef PTI_TOOLS_UTILS_API_FILTER_H_
+#define PTI_TOOLS_UTILS_API_FILTER_H_
+
+#include <string>
+#include <vector>
+
+#include "pti_assert.h"
+
+// API filter is a comma separated list of items, e.g.
+// "zeCommandList*,zeCommandQueue*,-*Reset". Every item is either
+// a glob pattern ('*' matches any sequence, '?' matches any symbol) or
+// a category name (see kApiCategories). Items prefixed with '-' or '!'
+// exclude matching functions. If there are no include items, all the
+// functions except excluded ones are enabled
+
+struct ApiCategory {
+  const char* name;
+  const char* patterns;
+};
+
+const ApiCategory kApiCategories[] = {
+  {"init", "zeInit*,zeDriver*,zeDevice*"},
+  {"context", "zeContext*"},
+  {"command_queue", "zeCommandQueue*"},
+  {"command_list", "zeCommandList*"},
+  {"kernel", "zeKernel*,zeModule*,zeCommandListAppendLaunch*"},
+  {"memory", "zeMem*,zeVirtualMem*,zePhysicalMem*,"
+             "zeCommandListAppendMemory*,zeCommandListAppendImage*"},
+  {"image", "zeImage*,zeSampler*"},
+  {"sync", "zeEvent*,zeFence*,zeCommandListAppendBarrier,"
+           "zeCommandListAppendSignalEvent,zeCommandListAppendWaitOnEvents,"
+           "*Synchronize"}
+};
+
+class ApiFilter {
+ public:
+  ApiFilter() {}
+
+  explicit ApiFilter(const std::string& filter) {
+    size_t start = 0;
+    while (start <= filter.size()) {
+      size_t end = filter.find(',', start);
+      if (end == std::string::npos) {
+        end = filter.size();
+      }
+      AddItem(Trim(filter.substr(start, end - start)));
+      start = end + 1;
+    }
+  }
+
+  bool IsEmpty() const {
+    return include_list_.empty() && exclude_list_.empty();
+  }
+
+  bool IsEnabled(const char* name) const {
+    PTI_ASSERT(name != nullptr);
+    for (auto& pattern : exclude_list_) {
+      if (Match(pattern.c_str(), name)) {
+        return false;
+      }
+    }
+    if (include_list_.empty()) {
+      return true;
+    }
+    for (auto& pattern : include_list_) {
+      if (Match(pattern.c_str(), name)) {
+        return true;
+      }
+    }
+    return false;
+  }
+
+  static bool Match(const char* pattern, const char* name) {
+    PTI_ASSERT(pattern != nullptr);
+    PTI_ASSERT(name != nullptr);
+
+    // Iterative matching with backtracking to the last '*'
+    const char* star = nullptr;
+    const char* resume = nullptr;
+    while (*name != '\0') {
+      if (*pattern == '*') {
+        star = pattern++;
+        resume = name;
+      } else if (*pattern == '?' || *pattern == *name) {
+        ++pattern;
+        ++name;
+      } else if (star != nullptr) {
+        pattern = star + 1;
+        name = ++resume;
+      } else {
+        return false;
+      }
+    }
+    while (*pattern == '*') {
+      ++pattern;
+    }
+    return *pattern == '\0';
+  }
+
+ private: // Implementation Details
+  static std::string Trim(const std::string& value) {
+    size_t start = value.find_first_not_of(" \t");
+    if (start == std::string::npos) {
+      return std::string();
+    }
+    size_t end = value.find_last_not_of(" \t");
+    return value.substr(start, end - start + 1);
+  }
+
+  void AddItem(const std::string& item) {
+    if (item.empty()) {
+      return;
+    }
+
+    bool exclude = (item[0] == '-' || item[0] == '!');
+    std::string pattern = exclude ? Trim(item.substr(1)) : item;
+    if (pattern.empty()) {
+      return;
+    }
+
+    std::vector<std::string>& list = exclude ? exclude_list_ : include_list_;
+    for (auto& category : kApiCategories) {
+      if (pattern == category.name) {
+        ApiFilter patterns(category.patterns);
+        list.insert(list.end(),
+                    patterns.include_list_.begin(),
+                    patterns.include_list_.end());
+        return;
+      }
+    }
+    list.push_back(pattern);
+  }
+
+ private: // Data
+  std::vector<std::string> include_list_;
+  std::vector<std::string> exclude_list_;
+};
+
+#endif // PTI_TOOLS_UTILS_API_FILTER_H_
@@ -0,0 +1,89 @@
+//==============================================================
+// Copyright (C) Intel Corporation
+//
+// SPDX-License-Identifier: MIT
+// =============================================================
+
+#ifndef PTI_TOOLS_UTILS_API_SAMPLING_H_
+#define PTI_TOOLS_UTILS_API_SAMPLING_H_
+
+#include <stdint.h>
+#include <stdlib.h>
+
+#include <iostream>
+#include <string>
+#include <utility>
+#include <vector>
+
+#include "api_filter.h"
+
+// API sampling configuration is a comma separated list of "pattern=N"
+// items, e.g. "zeEventQueryStatus=100,zeFence*=10". Pattern is a glob or
+// a category name as for API filter, N means that only one of N calls
+// is measured. The first matching item defines the rate for a function,
+// functions that match no item are measured on every call
+
+class ApiSampling {
+ public:
+  ApiSampling() {}
+
+  explicit ApiSampling(const std::string& sampling) {
+    size_t start = 0;
+    while (start <= sampling.size()) {
+      size_t end = sampling.find(',', start);
+      if (end == std::string::npos) {
+        end = sampling.size();
+      }
+      AddItem(sampling.substr(start, end - start));
+      start = end + 1;
+    }
+  }
+
+  bool IsEmpty() const {
+    return rate_list_.empty();
+  }
+
+  uint32_t GetRate(const char* name) const {
+    for (auto& item : rate_list_) {
+      if (item.first.IsEnabled(name)) {
+        return item.second;
+      }
+    }
+    return 1;
+  }
+
+ private: // Implementation Details
+  void AddItem(const std::string& item) {
+    if (item.find_first_not_of(" \t") == std::string::npos) {
+      return;
+    }
+
+    size_t pos = item.rfind('=');
+    if (pos != std::string::npos) {
+      std::string pattern = item.substr(0, pos);
+      std::string value = item.substr(pos + 1);
+
+      // Excludes make no sense here, so pattern must be an include item
+      size_t first = pattern.find_first_not_of(" \t");
+      bool is_valid_pattern = (first != std::string::npos &&
+                               pattern[first] != '-' && pattern[first] != '!');
+
+      char* end = nullptr;
+      unsigned long rate = strtoul(value.c_str(), &end, 10);
+      if (is_valid_pattern && end != value.c_str() && *end == '\0' &&
+          rate > 0 && rate <= UINT32_MAX) {
+        rate_list_.push_back(
+            std::make_pair(ApiFilter(pattern), static_cast<uint32_t>(rate)));
+        return;
+      }
+    }
+
+    std::cerr << "[WARNING] Invalid API sampling item \"" << item <<
+      "\", expected <pattern>=<rate>" << std::endl;
+  }
+
+ private: // Data
+  std::vector< std::pair<ApiFilter, uint32_t> > rate_list_;
+};
+
+#endif // PTI_TOOLS_UTILS_API_SAMPLING_H_
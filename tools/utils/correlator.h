@@ -8,6 +8,7 @@
 #define PTI_TOOLS_UTILS_CORRELATOR_H_
 
 #include <map>
+#include <string>
 #include <vector>
 
 #ifdef PTI_LEVEL_ZERO
@@ -23,6 +24,9 @@ struct ApiCollectorOptions {
   bool need_tid = false;
   bool need_pid = false;
   bool demangle = false;
+  std::string call_log_file; // binary call log, text log is used if empty
+  std::string api_filter; // see api_filter.h, all APIs are traced if empty
+  std::string api_sampling; // see api_sampling.h, no sampling if empty
 };
 
 struct KernelCollectorOptions {
@@ -29,8 +29,10 @@
 #define TRACE_PID                    13
 #define TRACE_LOG_TO_FILE            14
 #define TRACE_CONDITIONAL_COLLECTION 15
+#define TRACE_BINARY_CALL_LOGGING    16
 
 const char* kChromeTraceFileExt = "json";
+const char* kBinaryCallLogFileExt = "bin";
 
 class TraceOptions {
  public:
@@ -94,6 +96,21 @@ class TraceOptions {
         "." + kChromeTraceFileExt;
   }
 
+  static std::string GetBinaryCallLogFileName(const char* filename) {
+    std::string rank = utils::GetEnv("PMI_RANK");
+    if (!rank.empty()) {
+      return
+        std::string(filename) +
+        "." + std::to_string(utils::GetPid()) +
+        "." + rank +
+        "." + kBinaryCallLogFileExt;
+    }
+    return
+        std::string(filename) +
+        "." + std::to_string(utils::GetPid()) +
+        "." + kBinaryCallLogFileExt;
+  }
+
  private:
   uint32_t flags_;
   std::string log_file_;
@@ -0,0 +1,189 @@
+#==============================================================
+# Copyright (C) Intel Corporation
+#
+# SPDX-License-Identifier: MIT
+# =============================================================
+
+# Converts binary call log produced by ze_tracer --call-logging-binary
+# into the textual ">>>>"/"<<<<" format of --call-logging.
+#
+# API format is "name|enter fields|exit fields", where every field is
+# "style:format:name". Style "v" stands for " name = value" and style "d"
+# for " (name = value)". Format is "p" for pointers and handles, "u" and
+# "i" for unsigned and signed integers, "f" for floating point values.
+# Result table is a comma separated list of "NAME=value" pairs.
+
+import os
+import struct
+import sys
+
+MAGIC = b"ZECALLOG"
+VERSION = 1
+
+FLAG_PID = 0x1
+FLAG_TID = 0x2
+
+RECORD_ENTER = 0
+RECORD_EXIT = 1
+
+FILE_HEADER = struct.Struct("=IIII")
+RECORD_HEADER = struct.Struct("=IIIIIIQQQQ")
+
+class CallLogError(Exception):
+  pass
+
+def read_string(data, offset):
+  if offset + 4 > len(data):
+    raise CallLogError("Unexpected end of file")
+  size = struct.unpack_from("=I", data, offset)[0]
+  offset += 4
+  if offset + size > len(data):
+    raise CallLogError("Unexpected end of file")
+  return data[offset:offset + size].decode("utf-8"), offset + size
+
+def parse_fields(line):
+  fields = []
+  if not line:
+    return fields
+  for item in line.split(","):
+    items = item.split(":")
+    assert len(items) == 3
+    fields.append((items[0], items[1], items[2]))
+  return fields
+
+def parse_header(data):
+  if data[0:len(MAGIC)] != MAGIC:
+    raise CallLogError("Not a binary call log")
+  offset = len(MAGIC)
+
+  version, flags, pid, api_count = FILE_HEADER.unpack_from(data, offset)
+  offset += FILE_HEADER.size
+  if version != VERSION:
+    raise CallLogError("Unsupported call log version " + str(version))
+
+  api_list = []
+  for i in range(api_count):
+    line, offset = read_string(data, offset)
+    items = line.split("|")
+    assert len(items) == 3
+    api_list.append((items[0], parse_fields(items[1]), parse_fields(items[2])))
+
+  line, offset = read_string(data, offset)
+  result_map = {}
+  if line:
+    for item in line.split(","):
+      name, value = item.split("=")
+      if not int(value) in result_map:
+        result_map[int(value)] = name
+
+  return flags, pid, api_list, result_map, offset
+
+def read_records(data, offset):
+  record_list = []
+  while offset < len(data):
+    if offset + RECORD_HEADER.size > len(data):
+      raise CallLogError("Unexpected end of file")
+    header = RECORD_HEADER.unpack_from(data, offset)
+    size = header[0]
+    value_count = header[5]
+    if size != RECORD_HEADER.size + 8 * value_count or offset + size > len(data):
+      raise CallLogError("Broken record at offset " + str(offset))
+    values = struct.unpack_from(
+      "=" + str(value_count) + "Q", data, offset + RECORD_HEADER.size)
+    record_list.append((header, values))
+    offset += size
+  return record_list
+
+def format_value(format, value):
+  if format == "p":
+    if value == 0:
+      return "0"
+    return hex(value)
+  if format == "i":
+    if value >= (1 << 63):
+      value -= (1 << 64)
+    return str(value)
+  if format == "f":
+    return "%g" % struct.unpack("=d", struct.pack("=Q", value))[0]
+  return str(value)
+
+def format_fields(fields, values, mask):
+  line = ""
+  for i in range(min(len(fields), len(values))):
+    if not (mask & (1 << i)):
+      continue
+    style, format, name = fields[i]
+    if style == "d":
+      line += " (" + name + " = " + format_value(format, values[i]) + ")"
+    else:
+      line += " " + name + " = " + format_value(format, values[i])
+  return line
+
+def format_record(record, flags, pid, api_list, result_map):
+  header, values = record
+  size, api_id, kind, result, tid, value_count, mask, timestamp, time, kernel_id = header
+
+  if api_id < len(api_list):
+    name, enter_fields, exit_fields = api_list[api_id]
+  else:
+    name, enter_fields, exit_fields = "UNKNOWN", [], []
+
+  if kind == RECORD_ENTER:
+    line = ">>>> [" + str(timestamp) + "] "
+  else:
+    line = "<<<< [" + str(timestamp) + "] "
+  if flags & FLAG_PID:
+    line += "<PID:" + str(pid) + "> "
+  if flags & FLAG_TID:
+    line += "<TID:" + str(tid) + "> "
+
+  if kind == RECORD_ENTER:
+    line += name + ":"
+    line += format_fields(enter_fields, values, mask)
+  else:
+    line += name
+    if kernel_id > 0:
+      line += "(" + str(kernel_id) + ")"
+    line += " [" + str(time) + " ns]"
+    line += format_fields(exit_fields, values, mask)
+    line += " -> " + result_map.get(result, "UNKNOWN") + "(0x" + str(result) + ")"
+
+  return line + "\n"
+
+def decode(data, output):
+  flags, pid, api_list, result_map, offset = parse_header(data)
+  record_list = read_records(data, offset)
+
+  # Records are stored in per-thread chunks, so restore global order
+  record_list.sort(key=lambda record: record[0][7])
+
+  for record in record_list:
+    output.write(format_record(record, flags, pid, api_list, result_map))
+
+def main():
+  if len(sys.argv) < 2:
+    print("Usage: python decode_call_log.py <binary_call_log> [output_file]")
+    return 1
+
+  input_file = open(sys.argv[1], "rb")
+  data = input_file.read()
+  input_file.close()
+
+  if len(sys.argv) > 2:
+    output_file = open(sys.argv[2], "wt")
+  else:
+    output_file = sys.stdout
+
+  try:
+    decode(data, output_file)
+  except CallLogError as error:
+    sys.stderr.write("[ERROR] " + str(error) + "\n")
+    return 1
+  finally:
+    if output_file != sys.stdout:
+      output_file.close()
+
+  return 0
+
+if __name__ == "__main__":
+  sys.exit(main())
@@ -6,239 +6,181 @@
 
 import os
 import sys
-import re
 
-# Parse Level Zero Headers ####################################################
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             "..", "..", "build_utils"))
+import ze_api_parser
 
-STATE_NORMAL = 0
-STATE_CONDITION = 1
-STATE_SKIP = 2
-
-def get_comma_count(line):
-  count = 0
-  level = 0
-  for symbol in line:
-    if symbol == "(":
-      level += 1
-    elif symbol == ")":
-      assert level > 0
-      level -= 1
-    elif symbol == "," and level == 0:
-      count += 1
-  return count
-
-def remove_comments(line):
-  pos = line.find("//")
-  if pos != -1:
-    line = line[0:pos]
-  return line
-
-def get_func_name(callback_struct_name):
-  assert callback_struct_name.strip().find("ze_pfn") == 0
-  assert callback_struct_name.strip().find("Cb_t") + len("Cb_t") == len(callback_struct_name.strip())
-  body = callback_struct_name.strip()
-  body = body.split("ze_pfn")[1]
-  body = body.split("Cb_t")[0]
-  return "ze" + body
-
-def get_struct_range(lines, struct_name):
-  start = -1
-  for i in range(len(lines)):
-    if lines[i].find(struct_name) != -1:
-      start = i
-      break
-  assert start >= 0
-
-  while lines[start].find("{") == -1:
-    start +=1
-  start += 1
-  assert start < len(lines)
-
-  end = start
-  while lines[end].find("}") == -1:
-    end += 1
-  assert end < len(lines)
-
-  return start, end
+# Generate Callbacks ##########################################################
 
-def get_callback_struct_map(f, struct_name):
-  f.seek(0)
-  lines = f.readlines()
+def is_kernel_append_func(func):
+  return func == "zeCommandListAppendLaunchKernel" or\
+     func == "zeCommandListAppendLaunchCooperativeKernel" or\
+     func == "zeCommandListAppendLaunchKernelIndirect" or\
+     func == "zeCommandListAppendMemoryCopy" or\
+     func == "zeCommandListAppendMemoryFill" or\
+     func == "zeCommandListAppendBarrier" or\
+     func == "zeCommandListAppendMemoryRangesBarrier" or\
+     func == "zeCommandListAppendMemoryCopyRegion" or\
+     func == "zeCommandListAppendMemoryCopyFromContext" or\
+     func == "zeCommandListAppendImageCopy" or\
+     func == "zeCommandListAppendImageCopyRegion" or\
+     func == "zeCommandListAppendImageCopyToMemory" or\
+     func == "zeCommandListAppendImageCopyFromMemory"
 
-  start, end = get_struct_range(lines, struct_name)
+def get_api_id(func):
+  return func + "ApiId"
 
-  struct_map = {}
-  cond = ""
-  state = STATE_NORMAL
-  for i in range(start, end):
-    if lines[i].find("#if") >= 0:
-      items = lines[i].strip().split()
-      assert len(items) == 2
-      state = STATE_CONDITION
-      cond = items[1].strip()
-      continue
-    elif lines[i].find("#else") >= 0:
-      assert state == STATE_CONDITION
-      state = STATE_SKIP
+def gen_api_ids(f, func_list, group_map):
+  f.write("enum ZeApiId : uint32_t {\n")
+  for func in func_list:
+    if not func in group_map:
       continue
-    elif lines[i].find("#endif") >= 0:
-      assert state != STATE_NORMAL
-      state = STATE_NORMAL
-      cond = ""
+    f.write("  " + get_api_id(func) + ",\n")
+  f.write("  ZeApiIdCount\n")
+  f.write("};\n")
+  f.write("\n")
+  f.write("using ZeApiMask = std::bitset<ZeApiIdCount>;\n")
+  f.write("\n")
+  f.write("static const char* GetFunctionName(uint32_t id) {\n")
+  f.write("  switch (id) {\n")
+  for func in func_list:
+    if not func in group_map:
       continue
+    f.write("    case " + get_api_id(func) + ":\n")
+    f.write("      return \"" + func + "\";\n")
+  f.write("    default:\n")
+  f.write("      break;\n")
+  f.write("  }\n")
+  f.write("  return \"UNKNOWN\";\n")
+  f.write("}\n")
+  f.write("\n")
 
-    if state == STATE_SKIP:
+def get_log_format(type, struct_set):
+  type = type.replace("const ", "").strip()
+  if type in struct_set:
+    return None
+  if type.find("*") != -1 or type.find("_handle_t") != -1:
+    return "p"
+  if type == "float" or type == "double":
+    return "f"
+  if type.find("int") == 0:
+    return "i"
+  return "u"
+
+def get_log_value(ref, type, struct_set):
+  format = get_log_format(type, struct_set)
+  if format == None:
+    return None
+  return (format, "ZeCallLogger::Encode(" + ref + ")")
+
+# Every field is (style, format, name, value, condition), where style is
+# "v" for " name = value" and "d" for " (name = value)" in text log
+def get_enter_log_fields(func, params, struct_set):
+  fields = []
+  for name, type in params:
+    value = get_log_value("*(params->p" + name + ")", type, struct_set)
+    if value == None:
       continue
-
-    items = lines[i].strip().split()
-    assert len(items) == 2
-    type_name = items[0].strip()
-    field_name = items[1].strip().strip(";")
-    assert not (type_name in struct_map)
-    struct_map[type_name] = (field_name, cond)
-
-  return struct_map
-
-def get_params(f, func_name):
-  f.seek(0)
-  params = []
-
-  param_struct_name = get_param_struct_name(func_name)
-  lines = f.readlines()
-  start, end = get_struct_range(lines, param_struct_name)
-
-  for i in range(start, end):
-    items = lines[i].strip().split()
-    assert len(items) >= 2
-
-    type = ""
-    for j in range(len(items) - 1):
-      type += items[j] + " "
-    type = type.strip()
-    assert type[len(type) - 1] == "*"
-    type = type[0:len(type) - 1]
-
-    name = items[len(items) - 1].rstrip(";")
-    assert name[0] == "p"
-    name = name[1:len(name)]
-
-    assert not ((name, type) in params)
-    params.append((name, type))
-
-  return params
-
-def find_enums(f, enum_map):
-  f.seek(0)
-  lines = f.readlines()
-
-  enum_list = []
-  for line in lines:
-    if line.find("typedef enum") != -1:
-      items = line.strip().rstrip("{").split()
-      assert len(items) == 3
-      enum_list.append(items[2].strip().lstrip("_"))
-
-  for enum_name in enum_list:
-    params = {}
-    start, end = get_struct_range(lines, enum_name)
-    default_value = 0
-    has_unresolved_values = False
-    for i in range(start, end):
-      line = remove_comments(lines[i]).strip()
-      if not line:
+    fields.append(("v", value[0], name, value[1], None))
+    if name.find("ph") == 0 or name.find("pptr") == 0 or name.find("pCount") == 0:
+      assert type[len(type) - 1] == "*"
+      value = get_log_value(
+        "**(params->p" + name + ")", type[0:len(type) - 1], struct_set)
+      if value == None:
         continue
-      comma_count = get_comma_count(line)
-      assert comma_count == 0 or comma_count == 1
-      if line.find("=") == -1:
-        assert not has_unresolved_values
-        field_name = line.rstrip(",")
-        field_value = str(default_value)
-        default_value += 1
-      else:
-        items = line.split("=")
-        assert len(items) == 2
-        field_name = items[0].strip()
-        field_value = items[1].strip().rstrip(",")
-        if field_value.find("0x") == 0:
-          field_value = str(int(field_value, 16))
-        if all(symbol.isdigit() for symbol in field_value):
-          default_value = int(field_value)
-          default_value += 1
-        else:
-          has_unresolved_values = True
-      assert not (field_name in params)
-      params[field_name] = field_value
-    assert len(params) > 0
-    assert not (enum_name in enum_map)
-    enum_map[enum_name] = params
-
-def get_param_struct_name(func_name):
-  assert func_name[0] == 'z'
-  func_name = 'Z' + func_name[1:]
-  func_name = func_name.replace("CL", "Cl")
-  func_name = func_name.replace("IPC", "Ipc")
-  items = re.findall('[A-Z][^A-Z]*', func_name)
-  assert len(items) > 1
-  struct_name = ""
-  for item in items:
-    struct_name += item.lower() + "_"
-  struct_name += "params_t"
-  return struct_name
-
-def get_func_list(f):
-  f.seek(0)
-  func_list = []
-  for line in f.readlines():
-    if line.find("ZE_APICALL") != -1 and line.find("ze_pfn") != -1:
-      items = line.split("ze_pfn")
-      assert len(items) == 2
-      assert items[1].find("Cb_t") != -1
-      items = items[1].split("Cb_t")
-      assert len(items) == 2
-      func_list.append("ze" + items[0].strip())
-  return func_list
-
-def get_callback_group_map(f):
-  group_map = {}
-
-  base_map = get_callback_struct_map(f, "ze_callbacks_t")
-  assert len(base_map) > 0
-
-  for key, value in base_map.items():
-    func_map = get_callback_struct_map(f, key)
-    for fkey, fvalue in func_map.items():
-      func_name = get_func_name(fkey)
-      assert not (func_name in group_map)
-      group_map[func_name] = (value, fvalue)
-
-  return group_map
-
-def get_param_map(f):
-  param_map = {}
-  func_list = get_func_list(f)
+      fields.append(("d", value[0], name[1:], value[1],
+                     "*(params->p" + name + ") != nullptr"))
+  return fields
 
+def get_exit_log_fields(func, params, struct_set):
+  fields = []
+  for name, type in params:
+    if name.find("ph") == 0:
+      if func == "zeDeviceGet" or func == "zeDeviceGetSubDevices":
+        continue
+      output_name = name[1:]
+    elif name.find("pptr") == 0 or name == "pCount" or name == "pSize":
+      output_name = name[1:]
+    elif name.find("groupSize") == 0 and type.find("uint32_t*") == 0:
+      output_name = name
+    elif name == "pName":
+      fields.append(("v", "p", name[1:],
+                     "ZeCallLogger::Encode(*(params->p" + name + "))",
+                     "*(params->p" + name + ") != nullptr"))
+      continue
+    else:
+      continue
+    assert type[len(type) - 1] == "*"
+    value = get_log_value(
+      "**(params->p" + name + ")", type[0:len(type) - 1], struct_set)
+    if value == None:
+      continue
+    fields.append(("v", value[0], output_name, value[1],
+                   "*(params->p" + name + ") != nullptr"))
+  return fields
+
+def get_log_field_format(fields):
+  items = []
+  for style, format, name, value, cond in fields:
+    items.append(style + ":" + format + ":" + name)
+  return ",".join(items)
+
+def gen_call_log_format(f, func_list, group_map, param_map, struct_set, enum_map):
+  f.write("static const char* GetCallLogFormat(uint32_t id) {\n")
+  f.write("  switch (id) {\n")
   for func in func_list:
-    assert not (func in param_map)
-    param_map[func] = get_params(f, func)
-
-  return param_map
-
-def get_enum_map(include_path):
-  enum_map = {}
-
-  for file_name in os.listdir(include_path):
-    if file_name.endswith(".h") or file_name.endswith(".hpp"):
-      file_path = os.path.join(include_path, file_name)
-      file = open(file_path, "rt")
-      find_enums(file, enum_map)
-      file.close()
+    if not func in group_map:
+      continue
+    enter_fields = get_enter_log_fields(func, param_map[func], struct_set)
+    exit_fields = get_exit_log_fields(func, param_map[func], struct_set)
+    f.write("    case " + get_api_id(func) + ":\n")
+    f.write("      return \"" + get_log_field_format(enter_fields) + "|" +
+            get_log_field_format(exit_fields) + "\";\n")
+  f.write("    default:\n")
+  f.write("      break;\n")
+  f.write("  }\n")
+  f.write("  return \"|\";\n")
+  f.write("}\n")
+  f.write("\n")
 
-  return enum_map
+  result_enum = {}
+  for name in enum_map["ze_result_t"]:
+    result_enum[name] = int(enum_map["ze_result_t"][name])
+  result_enum = sorted(result_enum.items(), key=lambda x:x[1])
+  f.write("static const char* GetCallLogResultTable() {\n")
+  f.write("  return\n")
+  for i in range(len(result_enum)):
+    name, value = result_enum[i]
+    if i + 1 < len(result_enum):
+      f.write("    \"" + name + "=" + str(value) + ",\"\n")
+    else:
+      f.write("    \"" + name + "=" + str(value) + "\";\n")
+  f.write("}\n")
+  f.write("\n")
 
-# Generate Callbacks ##########################################################
+def gen_log_fields(f, fields):
+  assert len(fields) <= 64
+  mask = 0
+  for i in range(len(fields)):
+    if fields[i][4] == None:
+      mask |= (1 << i)
+  if len(fields) > 0:
+    f.write("    uint64_t values[" + str(len(fields)) + "] = {};\n")
+  f.write("    uint64_t mask = " + hex(mask) + ";\n")
+  for i in range(len(fields)):
+    style, format, name, value, cond = fields[i]
+    if cond == None:
+      f.write("    values[" + str(i) + "] = " + value + ";\n")
+    else:
+      f.write("    if (" + cond + ") {\n")
+      f.write("      values[" + str(i) + "] = " + value + ";\n")
+      f.write("      mask |= (1ULL << " + str(i) + ");\n")
+      f.write("    }\n")
 
 def gen_api(f, func_list, group_map):
-  f.write("static void SetTracingAPIs(zel_tracer_handle_t tracer) {\n")
+  f.write("static void SetTracingAPIs(\n")
+  f.write("    zel_tracer_handle_t tracer, const ZeApiMask& enabled) {\n")
   f.write("  zet_core_callbacks_t prologue = {};\n")
   f.write("  zet_core_callbacks_t epilogue = {};\n")
   f.write("\n")
@@ -254,8 +196,10 @@ def gen_api(f, func_list, group_map):
     callback_cond = callback[1]
     if callback_cond:
       f.write("#if " + callback_cond + "\n")
-    f.write("  prologue." + group_name + "." + callback_name + " = " + func + "OnEnter;\n")
-    f.write("  epilogue." + group_name + "." + callback_name + " = " + func + "OnExit;\n")
+    f.write("  if (enabled.test(" + get_api_id(func) + ")) {\n")
+    f.write("    prologue." + group_name + "." + callback_name + " = " + func + "OnEnter;\n")
+    f.write("    epilogue." + group_name + "." + callback_name + " = " + func + "OnExit;\n")
+    f.write("  }\n")
     if callback_cond:
       f.write("#endif //" + callback_cond + "\n")
   f.write("\n")
@@ -315,18 +259,28 @@ def gen_enum(f, enum_map, enum_name, param_name):
   f.write("        break;\n")
   f.write("    }\n")
 
-def gen_enter_callback(f, func, params, enum_map):
+def gen_enter_callback(f, func, params, enum_map, struct_set):
   f.write("  ZeApiCollector* collector =\n")
   f.write("    reinterpret_cast<ZeApiCollector*>(global_user_data);\n")
   f.write("  PTI_ASSERT(collector != nullptr);\n")
   f.write("  PTI_ASSERT(collector->correlator_ != nullptr);\n")
   f.write("\n")
-  f.write("  if (!collector->correlator_->IsCollectionEnabled()) {\n")
+  f.write("  if (!collector->correlator_->IsCollectionEnabled() ||\n")
+  f.write("      !collector->IsSampled(" + get_api_id(func) + ")) {\n")
   f.write("    *reinterpret_cast<uint64_t*>(instance_user_data) = 0;\n")
   f.write("    return;\n")
   f.write("  }\n")
   f.write("\n")
-  f.write("  if (collector->options_.call_tracing) {\n")
+  fields = get_enter_log_fields(func, params, struct_set)
+  f.write("  if (collector->call_logger_ != nullptr) {\n")
+  gen_log_fields(f, fields)
+  f.write("    collector->call_logger_->LogEnter(\n")
+  f.write("        " + get_api_id(func) + ", collector->GetTimestamp(),\n")
+  if len(fields) > 0:
+    f.write("        values, " + str(len(fields)) + ", mask);\n")
+  else:
+    f.write("        nullptr, 0, mask);\n")
+  f.write("  } else if (collector->options_.call_tracing) {\n")
   f.write("    std::stringstream stream;\n")
   f.write("    stream << \">>>> [\" << collector->GetTimestamp() << \"] \";\n")
   f.write("    if (collector->options_.need_pid) {\n")
@@ -532,23 +486,47 @@ def gen_enter_callback(f, func, params, enum_map):
   f.write("  uint64_t& start_time = *reinterpret_cast<uint64_t*>(instance_user_data);\n")
   f.write("  start_time = collector->GetTimestamp();\n")
 
-def gen_exit_callback(f, func, params, enum_map):
+def gen_exit_callback(f, func, params, enum_map, struct_set):
   f.write("  ZeApiCollector* collector =\n")
   f.write("    reinterpret_cast<ZeApiCollector*>(global_user_data);\n")
   f.write("  PTI_ASSERT(collector != nullptr);\n")
-  f.write("  uint64_t end_time = collector->GetTimestamp();\n")
   f.write("  PTI_ASSERT(collector->correlator_ != nullptr);\n")
   f.write("\n")
   f.write("  uint64_t& start_time = *reinterpret_cast<uint64_t*>(instance_user_data);\n")
   f.write("\n")
+  f.write("  // Disabled collection or call not sampled\n")
   f.write("  if (start_time == 0) {\n")
   f.write("    return;\n")
   f.write("  }\n")
   f.write("\n")
+  f.write("  uint64_t end_time = collector->GetTimestamp();\n")
   f.write("  PTI_ASSERT(start_time <= end_time);\n")
   f.write("  uint64_t time = end_time - start_time;\n")
-  f.write("  collector->AddFunctionTime(\"" + func + "\", time);\n")
-  f.write("  if (collector->options_.call_tracing) {\n")
+  f.write("  collector->AddFunctionTime(" + get_api_id(func) + ", time);\n")
+  fields = get_exit_log_fields(func, params, struct_set)
+  f.write("  if (collector->call_logger_ != nullptr) {\n")
+  if len(fields) > 0:
+    f.write("    uint64_t values[" + str(len(fields)) + "] = {};\n")
+    f.write("    uint64_t mask = 0;\n")
+    f.write("    if (result == ZE_RESULT_SUCCESS) {\n")
+    for i in range(len(fields)):
+      style, format, name, value, cond = fields[i]
+      f.write("      if (" + cond + ") {\n")
+      f.write("        values[" + str(i) + "] = " + value + ";\n")
+      f.write("        mask |= (1ULL << " + str(i) + ");\n")
+      f.write("      }\n")
+    f.write("    }\n")
+  if is_kernel_append_func(func):
+    f.write("    uint64_t kernel_id = collector->correlator_->GetKernelId();\n")
+  else:
+    f.write("    uint64_t kernel_id = 0;\n")
+  f.write("    collector->call_logger_->LogExit(\n")
+  f.write("        " + get_api_id(func) + ", result, end_time, time, kernel_id,\n")
+  if len(fields) > 0:
+    f.write("        values, " + str(len(fields)) + ", mask);\n")
+  else:
+    f.write("        nullptr, 0, 0);\n")
+  f.write("  } else if (collector->options_.call_tracing) {\n")
   f.write("    std::stringstream stream;\n")
   f.write("    stream << \"<<<< [\" << end_time << \"] \";\n")
   f.write("    if (collector->options_.need_pid) {\n")
@@ -558,19 +536,7 @@ def gen_exit_callback(f, func, params, enum_map):
   f.write("      stream << \"<TID:\" << utils::GetTid() << \"> \";\n")
   f.write("    }\n")
   f.write("    stream << \"" + func + "\";\n")
-  if func == "zeCommandListAppendLaunchKernel" or\
-     func == "zeCommandListAppendLaunchCooperativeKernel" or\
-     func == "zeCommandListAppendLaunchKernelIndirect" or\
-     func == "zeCommandListAppendMemoryCopy" or\
-     func == "zeCommandListAppendMemoryFill" or\
-     func == "zeCommandListAppendBarrier" or\
-     func == "zeCommandListAppendMemoryRangesBarrier" or\
-     func == "zeCommandListAppendMemoryCopyRegion" or\
-     func == "zeCommandListAppendMemoryCopyFromContext" or\
-     func == "zeCommandListAppendImageCopy" or\
-     func == "zeCommandListAppendImageCopyRegion" or\
-     func == "zeCommandListAppendImageCopyToMemory" or\
-     func == "zeCommandListAppendImageCopyFromMemory":
+  if is_kernel_append_func(func):
     f.write("    uint64_t kernel_id = collector->correlator_->GetKernelId();\n")
     f.write("    if (kernel_id > 0) {\n")
     f.write("      stream << \"(\" << kernel_id << \")\";\n")
@@ -642,19 +608,7 @@ def gen_exit_callback(f, func, params, enum_map):
   f.write("  }\n")
   f.write("\n")
   f.write("  if (collector->callback_ != nullptr) {\n")
-  if func == "zeCommandListAppendLaunchKernel" or\
-     func == "zeCommandListAppendLaunchCooperativeKernel" or\
-     func == "zeCommandListAppendLaunchKernelIndirect" or\
-     func == "zeCommandListAppendMemoryCopy" or\
-     func == "zeCommandListAppendMemoryFill" or\
-     func == "zeCommandListAppendBarrier" or\
-     func == "zeCommandListAppendMemoryRangesBarrier" or\
-     func == "zeCommandListAppendMemoryCopyRegion" or\
-     func == "zeCommandListAppendMemoryCopyFromContext" or\
-     func == "zeCommandListAppendImageCopy" or\
-     func == "zeCommandListAppendImageCopyRegion" or\
-     func == "zeCommandListAppendImageCopyToMemory" or\
-     func == "zeCommandListAppendImageCopyFromMemory":
+  if is_kernel_append_func(func):
     f.write("    collector->callback_(\n")
     f.write("        collector->callback_data_,\n")
     f.write("        std::to_string(collector->correlator_->GetKernelId()),\n")
@@ -694,7 +648,7 @@ def gen_exit_callback(f, func, params, enum_map):
     f.write("        start_time, end_time);\n")
   f.write("  }\n")
 
-def gen_callbacks(f, func_list, group_map, param_map, enum_map):
+def gen_callbacks(f, func_list, group_map, param_map, enum_map, struct_set):
   for func in func_list:
     if not func in group_map:
       continue
@@ -706,19 +660,19 @@ def gen_callbacks(f, func_list, group_map, param_map, enum_map):
     if callback_cond:
       f.write("#if " + callback_cond + "\n")
     f.write("static void " + func + "OnEnter(\n")
-    f.write("    " + get_param_struct_name(func) + "* params,\n")
+    f.write("    " + ze_api_parser.get_param_struct_name(func) + "* params,\n")
     f.write("    ze_result_t result,\n")
     f.write("    void* global_user_data,\n")
     f.write("    void** instance_user_data) {\n")
-    gen_enter_callback(f, func, param_map[func], enum_map)
+    gen_enter_callback(f, func, param_map[func], enum_map, struct_set)
     f.write("}\n")
     f.write("\n")
     f.write("static void " + func + "OnExit(\n")
-    f.write("    " + get_param_struct_name(func) + "* params,\n")
+    f.write("    " + ze_api_parser.get_param_struct_name(func) + "* params,\n")
     f.write("    ze_result_t result,\n")
     f.write("    void* global_user_data,\n")
     f.write("    void** instance_user_data) {\n")
-    gen_exit_callback(f, func, param_map[func], enum_map)
+    gen_exit_callback(f, func, param_map[func], enum_map, struct_set)
     f.write("}\n")
     if callback_cond:
       f.write("#endif //" + callback_cond + "\n")
@@ -740,20 +694,20 @@ def main():
   dst_file = open(dst_file_path, "wt")
 
   l0_path = sys.argv[2]
-  l0_file_path = os.path.join(l0_path, "ze_api.h")
-
-  l0_file = open(l0_file_path, "rt")
-  func_list = get_func_list(l0_file)
-  group_map = get_callback_group_map(l0_file)
-  param_map = get_param_map(l0_file)
-  enum_map = get_enum_map(l0_path)
-
+  ze_api = ze_api_parser.load(l0_path, dst_path)
+  func_list = ze_api.func_list
+  group_map = ze_api.group_map
+  param_map = ze_api.param_map
+  enum_map = ze_api.enum_map
+  struct_set = ze_api.struct_set
+
+  gen_api_ids(dst_file, func_list, group_map)
+  gen_call_log_format(dst_file, func_list, group_map, param_map, struct_set, enum_map)
   gen_result_converter(dst_file, enum_map)
   gen_structure_type_converter(dst_file, enum_map)
-  gen_callbacks(dst_file, func_list, group_map, param_map, enum_map)
+  gen_callbacks(dst_file, func_list, group_map, param_map, enum_map, struct_set)
   gen_api(dst_file, func_list, group_map)
 
-  l0_file.close()
   dst_file.close()
 
 if __name__ == "__main__":
@@ -21,6 +21,10 @@ void Usage() {
     "--call-logging [-c]            " <<
     "Trace host API calls" <<
     std::endl;
+  std::cout <<
+    "--call-logging-binary          " <<
+    "Trace host API calls into binary file" <<
+    std::endl;
   std::cout <<
     "--host-timing  [-h]            " <<
     "Report host API execution time" <<
@@ -77,6 +81,16 @@ void Usage() {
     "--output [-o] <filename>       " <<
     "Print console logs into the file" <<
     std::endl;
+  std::cout <<
+    "--api-filter <list>            " <<
+    "Trace only L0 API functions matching comma separated globs or " <<
+    "categories (\"-\" to exclude)" <<
+    std::endl;
+  std::cout <<
+    "--api-sampling <list>          " <<
+    "Measure only one of N calls for L0 API functions, " <<
+    "e.g. \"zeEventQueryStatus=100\"" <<
+    std::endl;
   std::cout <<
     "--conditional-collection       " <<
     "Enable conditional collection mode" <<
@@ -95,6 +109,9 @@ int ParseArgs(int argc, char* argv[]) {
         strcmp(argv[i], "-c") == 0) {
       utils::SetEnv("ZET_CallLogging", "1");
       ++app_index;
+    } else if (strcmp(argv[i], "--call-logging-binary") == 0) {
+      utils::SetEnv("ZET_BinaryCallLogging", "1");
+      ++app_index;
     } else if (strcmp(argv[i], "--host-timing") == 0 ||
                strcmp(argv[i], "-h") == 0) {
       utils::SetEnv("ZET_HostTiming", "1");
@@ -149,6 +166,22 @@ int ParseArgs(int argc, char* argv[]) {
       }
       utils::SetEnv("ZET_LogFilename", argv[i]);
       app_index += 2;
+    } else if (strcmp(argv[i], "--api-filter") == 0) {
+      ++i;
+      if (i >= argc) {
+        std::cout << "[ERROR] API filter is not specified" << std::endl;
+        return -1;
+      }
+      utils::SetEnv("PTI_API_FILTER", argv[i]);
+      app_index += 2;
+    } else if (strcmp(argv[i], "--api-sampling") == 0) {
+      ++i;
+      if (i >= argc) {
+        std::cout << "[ERROR] API sampling rates are not specified" << std::endl;
+        return -1;
+      }
+      utils::SetEnv("PTI_API_SAMPLING", argv[i]);
+      app_index += 2;
     } else if (strcmp(argv[i], "--conditional-collection") == 0) {
       utils::SetEnv("ZET_ConditionalCollection", "1");
       ++app_index;
@@ -197,6 +230,11 @@ static TraceOptions ReadArgs() {
     flags |= (1 << TRACE_CALL_LOGGING);
   }
 
+  value = utils::GetEnv("ZET_BinaryCallLogging");
+  if (!value.empty() && value == "1") {
+    flags |= (1 << TRACE_BINARY_CALL_LOGGING);
+  }
+
   value = utils::GetEnv("ZET_HostTiming");
   if (!value.empty() && value == "1") {
     flags |= (1 << TRACE_HOST_TIMING);
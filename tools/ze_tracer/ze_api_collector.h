@@ -7,24 +7,37 @@
 #ifndef PTI_TOOLS_ZE_TRACER_ZE_API_COLLECTOR_H_
 #define PTI_TOOLS_ZE_TRACER_ZE_API_COLLECTOR_H_
 
+#include <array>
+#include <atomic>
+#include <bitset>
 #include <chrono>
+#include <cmath>
 #include <iomanip>
 #include <iostream>
 #include <map>
+#include <memory>
 #include <mutex>
 #include <set>
+#include <vector>
 
 #include <level_zero/layers/zel_tracing_api.h>
 
+#include "api_filter.h"
+#include "api_sampling.h"
 #include "correlator.h"
 #include "utils.h"
+#include "ze_call_logger.h"
 #include "ze_utils.h"
 
+// If API is sampled, total_time is an estimate for all the calls, while
+// min_time, max_time and time_sq_sum cover sampled calls only
 struct ZeFunction {
   uint64_t total_time;
   uint64_t min_time;
   uint64_t max_time;
   uint64_t call_count;
+  uint64_t sampled_count;
+  double time_sq_sum;
 
   bool operator>(const ZeFunction& r) const {
     if (total_time != r.total_time) {
@@ -72,7 +85,10 @@ class ZeApiCollector {
     }
 
     collector->tracer_ = tracer;
-    SetTracingAPIs(tracer);
+    if (options.call_tracing && !options.call_log_file.empty()) {
+      collector->CreateCallLogger();
+    }
+    SetTracingAPIs(tracer, collector->GetEnabledApis());
 
     status = zelTracerSetEnabled(tracer, true);
     PTI_ASSERT(status == ZE_RESULT_SUCCESS);
@@ -80,7 +96,7 @@ class ZeApiCollector {
     return collector;
   }
 
-  void DisableTracing() {
+  void DisableTracing() const {
     PTI_ASSERT(tracer_ != nullptr);
 #if !defined(_WIN32)
     ze_result_t status = zelTracerSetEnabled(tracer_, false);
@@ -88,14 +104,19 @@ class ZeApiCollector {
 #endif
   }
 
+  // Per-thread tables are written by the callbacks without a lock, so no
+  // more calls are traced once the tables are merged
   const ZeFunctionInfoMap& GetFunctionInfoMap() const {
+    DisableTracing();
+    MergeFunctionTables();
     return function_info_map_;
   }
 
   void PrintFunctionsTable() const {
+    const ZeFunctionInfoMap& function_info_map = GetFunctionInfoMap();
     std::set< std::pair<std::string, ZeFunction>,
               utils::Comparator > sorted_list(
-        function_info_map_.begin(), function_info_map_.end());
+        function_info_map.begin(), function_info_map.end());
 
     uint64_t total_duration = 0;
     size_t max_name_length = kFunctionLength;
@@ -117,7 +138,12 @@ class ZeApiCollector {
       std::setw(kPercentLength) << "Time (%)" << "," <<
       std::setw(kTimeLength) << "Average (ns)" << "," <<
       std::setw(kTimeLength) << "Min (ns)" << "," <<
-      std::setw(kTimeLength) << "Max (ns)" << std::endl;
+      std::setw(kTimeLength) << "Max (ns)";
+    if (is_sampling_enabled_) {
+      stream << "," << std::setw(kCallsLength) << "Sampled" << "," <<
+        std::setw(kPercentLength) << "Error (%)";
+    }
+    stream << std::endl;
 
     for (auto& value : sorted_list) {
       const std::string& function = value.first;
@@ -134,7 +160,24 @@ class ZeApiCollector {
           std::fixed << percent_duration << "," <<
         std::setw(kTimeLength) << avg_duration << "," <<
         std::setw(kTimeLength) << min_duration << "," <<
-        std::setw(kTimeLength) << max_duration << std::endl;
+        std::setw(kTimeLength) << max_duration;
+      if (is_sampling_enabled_) {
+        stream << "," << std::setw(kCallsLength) <<
+          value.second.sampled_count << "," << std::setw(kPercentLength);
+        double error = GetTimeError(value.second);
+        if (error < 0) {
+          stream << "-";
+        } else {
+          stream << std::setprecision(2) << std::fixed << error;
+        }
+      }
+      stream << std::endl;
+    }
+
+    if (is_sampling_enabled_) {
+      stream << std::endl << "Time for sampled functions is estimated " <<
+        "from Sampled calls, Error is 95% confidence interval of Time" <<
+        std::endl;
     }
 
     PTI_ASSERT(correlator_ != nullptr);
@@ -148,6 +191,9 @@ class ZeApiCollector {
       PTI_ASSERT(status == ZE_RESULT_SUCCESS);
 #endif
     }
+    if (call_logger_ != nullptr) {
+      delete call_logger_;
+    }
   }
 
  private: // Tracing Interface
@@ -156,12 +202,31 @@ class ZeApiCollector {
     return correlator_->GetTimestamp();
   }
 
-  void AddFunctionTime(const std::string& name, uint64_t time) {
-    const std::lock_guard<std::mutex> lock(lock_);
-    if (function_info_map_.count(name) == 0) {
-      function_info_map_[name] = {time, time, time, 1};
+  // Decides if the call should be measured and logged. Unsampled APIs
+  // take no thread data lookup, sampled ones count calls down per thread
+  bool IsSampled(uint32_t id) {
+    PTI_ASSERT(id < ZeApiIdCount);
+    uint32_t rate = sampling_rates_[id];
+    if (rate == 1) {
+      return true;
+    }
+    uint32_t& countdown = GetThreadData()->countdowns[id];
+    if (--countdown > 0) {
+      return false;
+    }
+    countdown = rate;
+    return true;
+  }
+
+  // Called for every measured call, so no locks here: each thread owns its
+  // table and tables are merged into function_info_map_ on report
+  void AddFunctionTime(uint32_t id, uint64_t time) {
+    PTI_ASSERT(id < ZeApiIdCount);
+    ZeFunction& function = GetThreadData()->functions[id];
+    double time_sq = static_cast<double>(time) * time;
+    if (function.call_count == 0) {
+      function = {time, time, time, 1, 1, time_sq};
     } else {
-      ZeFunction& function = function_info_map_[name];
       function.total_time += time;
       if (time < function.min_time) {
         function.min_time = time;
@@ -170,6 +235,8 @@ class ZeApiCollector {
         function.max_time = time;
       }
       ++function.call_count;
+      ++function.sampled_count;
+      function.time_sq_sum += time_sq;
     }
   }
 
@@ -180,19 +247,175 @@ class ZeApiCollector {
       : correlator_(correlator), options_(options),
         callback_(callback), callback_data_(callback_data) {
     PTI_ASSERT(correlator_ != nullptr);
+    SetSamplingRates();
   }
 
   #include <tracing.gen> // Auto-generated callbacks
 
+  void CreateCallLogger() {
+    uint32_t flags = 0;
+    if (options_.need_pid) {
+      flags |= ZE_CALL_LOG_FLAG_PID;
+    }
+    if (options_.need_tid) {
+      flags |= ZE_CALL_LOG_FLAG_TID;
+    }
+
+    std::vector<std::string> api_formats;
+    for (uint32_t id = 0; id < ZeApiIdCount; ++id) {
+      api_formats.push_back(
+          std::string(GetFunctionName(id)) + "|" + GetCallLogFormat(id));
+    }
+
+    PTI_ASSERT(call_logger_ == nullptr);
+    call_logger_ = new ZeCallLogger(
+        options_.call_log_file, flags, api_formats, GetCallLogResultTable());
+    PTI_ASSERT(call_logger_ != nullptr);
+  }
+
+  ZeApiMask GetEnabledApis() const {
+    ZeApiMask enabled;
+    ApiFilter filter(options_.api_filter);
+    for (uint32_t id = 0; id < ZeApiIdCount; ++id) {
+      enabled.set(id, filter.IsEnabled(GetFunctionName(id)));
+    }
+    if (enabled.none()) {
+      std::cerr << "[WARNING] API filter \"" << options_.api_filter <<
+        "\" disables all Level Zero API functions" << std::endl;
+    }
+    return enabled;
+  }
+
+  void SetSamplingRates() {
+    ApiSampling sampling(options_.api_sampling);
+    for (uint32_t id = 0; id < ZeApiIdCount; ++id) {
+      sampling_rates_[id] = sampling.GetRate(GetFunctionName(id));
+      if (sampling_rates_[id] > 1) {
+        is_sampling_enabled_ = true;
+      }
+    }
+  }
+
+  // Relative half-width of 95% confidence interval for estimated total
+  // time in percent, negative if there are not enough samples
+  static double GetTimeError(const ZeFunction& function) {
+    uint64_t n = function.sampled_count;
+    uint64_t count = function.call_count;
+    if (n >= count) {
+      return 0.0;
+    }
+    if (n < 2 || function.total_time == 0) {
+      return -1.0;
+    }
+
+    double mean = static_cast<double>(function.total_time) / count;
+    double variance = (function.time_sq_sum - n * mean * mean) / (n - 1);
+    if (variance < 0.0) {
+      variance = 0.0;
+    }
+    // Finite population correction, as every call is sampled at most once
+    double correction = static_cast<double>(count - n) / (count - 1);
+    return 100.0 * 1.96 * std::sqrt(variance * correction / n) / mean;
+  }
+
+  using ZeFunctionTable = std::array<ZeFunction, ZeApiIdCount>;
+
+  struct ZeThreadData {
+    ZeFunctionTable functions; // measured calls only
+    std::array<uint32_t, ZeApiIdCount> countdowns; // calls till next sample
+  };
+
+  static uint64_t NextGeneration() {
+    static std::atomic<uint64_t> generation_count(0);
+    return ++generation_count;
+  }
+
+  // Keyed by generation rather than by address, as a new collector may take
+  // the address of a destroyed one
+  ZeThreadData* GetThreadData() {
+    struct LocalData {
+      uint64_t generation;
+      ZeThreadData* data;
+    };
+    thread_local LocalData local = {0, nullptr};
+    if (local.generation != generation_) {
+      std::unique_ptr<ZeThreadData> data(new ZeThreadData());
+      // First call of every API is sampled
+      data->countdowns.fill(1);
+      local.generation = generation_;
+      local.data = data.get();
+
+      const std::lock_guard<std::mutex> lock(lock_);
+      thread_data_.push_back(std::move(data));
+    }
+    return local.data;
+  }
+
+  void MergeFunctionTables() const {
+    const std::lock_guard<std::mutex> lock(lock_);
+    function_info_map_.clear();
+
+    std::array<ZeFunction, ZeApiIdCount> total_table = {};
+    std::array<uint64_t, ZeApiIdCount> call_counts = {};
+    for (auto& data : thread_data_) {
+      for (uint32_t id = 0; id < ZeApiIdCount; ++id) {
+        const ZeFunction& function = data->functions[id];
+        // Countdown starts from 1 and is reset to the rate on each sample,
+        // so the number of calls is known exactly
+        call_counts[id] += function.sampled_count * sampling_rates_[id] +
+          1 - data->countdowns[id];
+        if (function.sampled_count == 0) {
+          continue;
+        }
+
+        ZeFunction& total = total_table[id];
+        if (total.sampled_count == 0) {
+          total = function;
+        } else {
+          total.total_time += function.total_time;
+          if (function.min_time < total.min_time) {
+            total.min_time = function.min_time;
+          }
+          if (function.max_time > total.max_time) {
+            total.max_time = function.max_time;
+          }
+          total.call_count += function.call_count;
+          total.sampled_count += function.sampled_count;
+          total.time_sq_sum += function.time_sq_sum;
+        }
+      }
+    }
+
+    for (uint32_t id = 0; id < ZeApiIdCount; ++id) {
+      ZeFunction& total = total_table[id];
+      if (total.sampled_count == 0) {
+        continue;
+      }
+      if (call_counts[id] > total.sampled_count) {
+        total.total_time = static_cast<uint64_t>(
+            static_cast<double>(total.total_time) *
+            call_counts[id] / total.sampled_count);
+        total.call_count = call_counts[id];
+      }
+      function_info_map_[GetFunctionName(id)] = total;
+    }
+  }
+
  private: // Data
   zel_tracer_handle_t tracer_ = nullptr;
 
-  ZeFunctionInfoMap function_info_map_;
-  std::mutex lock_;
+  mutable ZeFunctionInfoMap function_info_map_;
+  std::vector< std::unique_ptr<ZeThreadData> > thread_data_;
+  mutable std::mutex lock_;
+  uint64_t generation_ = NextGeneration();
 
   Correlator* correlator_ = nullptr;
+  ZeCallLogger* call_logger_ = nullptr;
   ApiCollectorOptions options_;
 
+  std::array<uint32_t, ZeApiIdCount> sampling_rates_;
+  bool is_sampling_enabled_ = false;
+
   OnZeFunctionFinishCallback callback_ = nullptr;
   void* callback_data_ = nullptr;
 
@@ -0,0 +1,217 @@
+//==============================================================
+// Copyright (C) Intel Corporation
+//
+// SPDX-License-Identifier: MIT
+// =============================================================
+
+#ifndef PTI_TOOLS_ZE_TRACER_ZE_CALL_LOGGER_H_
+#define PTI_TOOLS_ZE_TRACER_ZE_CALL_LOGGER_H_
+
+#include <string.h>
+
+#include <atomic>
+#include <fstream>
+#include <memory>
+#include <mutex>
+#include <string>
+#include <vector>
+
+#include "pti_assert.h"
+#include "utils.h"
+
+// Binary call log layout (native byte order):
+//   "ZECALLOG", uint32_t version, uint32_t flags, uint32_t pid,
+//   uint32_t api_count, api_count x (uint32_t size, char[size] format),
+//   uint32_t size, char[size] result table,
+// followed by ZeCallRecord entries, each trailed by value_count uint64_t
+// values. API formats and result table are described in
+// decode_call_log.py, which turns the log into textual form
+
+#define ZE_CALL_LOG_MAGIC "ZECALLOG"
+#define ZE_CALL_LOG_VERSION 1
+
+#define ZE_CALL_LOG_FLAG_PID 0x1
+#define ZE_CALL_LOG_FLAG_TID 0x2
+
+enum ZeCallRecordKind : uint32_t {
+  ZE_CALL_RECORD_ENTER = 0,
+  ZE_CALL_RECORD_EXIT = 1
+};
+
+struct ZeCallRecord {
+  uint32_t size;
+  uint32_t api_id;
+  uint32_t kind;
+  uint32_t result;
+  uint32_t tid;
+  uint32_t value_count;
+  uint64_t mask;
+  uint64_t timestamp;
+  uint64_t time;
+  uint64_t kernel_id;
+};
+
+class ZeCallLogger {
+ public:
+  ZeCallLogger(const std::string& filename, uint32_t flags,
+               const std::vector<std::string>& api_formats,
+               const std::string& result_table)
+      : file_(filename, std::ios::out | std::ios::binary | std::ios::trunc),
+        generation_(NextGeneration()) {
+    PTI_ASSERT(file_.is_open());
+
+    uint32_t version = ZE_CALL_LOG_VERSION;
+    uint32_t pid = utils::GetPid();
+    uint32_t api_count = api_formats.size();
+
+    file_.write(ZE_CALL_LOG_MAGIC, strlen(ZE_CALL_LOG_MAGIC));
+    file_.write(reinterpret_cast<const char*>(&version), sizeof(version));
+    file_.write(reinterpret_cast<const char*>(&flags), sizeof(flags));
+    file_.write(reinterpret_cast<const char*>(&pid), sizeof(pid));
+    file_.write(reinterpret_cast<const char*>(&api_count), sizeof(api_count));
+    for (auto& format : api_formats) {
+      WriteString(format);
+    }
+    WriteString(result_table);
+  }
+
+  ~ZeCallLogger() {
+    std::vector< std::shared_ptr<ZeCallBuffer> > buffer_list;
+    {
+      const std::lock_guard<std::mutex> lock(lock_);
+      buffer_list.swap(buffer_list_);
+    }
+    // Callbacks may still be in flight, so owner threads see their buffers
+    // detached and drop the records
+    for (auto& buffer : buffer_list) {
+      const std::lock_guard<std::mutex> buffer_lock(buffer->lock);
+      buffer->detached = true;
+      const std::lock_guard<std::mutex> lock(lock_);
+      file_.write(
+          reinterpret_cast<const char*>(buffer->data.data()),
+          buffer->data.size());
+      buffer->data.clear();
+    }
+    const std::lock_guard<std::mutex> lock(lock_);
+    file_.close();
+  }
+
+  void LogEnter(uint32_t api_id, uint64_t timestamp,
+                const uint64_t* values, uint32_t value_count, uint64_t mask) {
+    ZeCallRecord record = {
+        0, api_id, ZE_CALL_RECORD_ENTER, 0, 0, value_count,
+        mask, timestamp, 0, 0};
+    Append(record, values);
+  }
+
+  void LogExit(uint32_t api_id, uint32_t result, uint64_t timestamp,
+               uint64_t time, uint64_t kernel_id,
+               const uint64_t* values, uint32_t value_count, uint64_t mask) {
+    ZeCallRecord record = {
+        0, api_id, ZE_CALL_RECORD_EXIT, result, 0, value_count,
+        mask, timestamp, time, kernel_id};
+    Append(record, values);
+  }
+
+  template <typename T>
+  static uint64_t Encode(T* value) {
+    return reinterpret_cast<uint64_t>(value);
+  }
+
+  static uint64_t Encode(double value) {
+    uint64_t result = 0;
+    memcpy(&result, &value, sizeof(value));
+    return result;
+  }
+
+  static uint64_t Encode(float value) {
+    return Encode(static_cast<double>(value));
+  }
+
+  template <typename T>
+  static uint64_t Encode(T value) {
+    return static_cast<uint64_t>(value);
+  }
+
+  ZeCallLogger(const ZeCallLogger& copy) = delete;
+  ZeCallLogger& operator=(const ZeCallLogger& copy) = delete;
+
+ private:
+  // Filled by the owner thread, taken by the logger on destruction
+  struct ZeCallBuffer {
+    std::mutex lock;
+    bool detached = false;
+    uint32_t tid;
+    std::vector<uint8_t> data;
+  };
+
+  static const size_t kBufferSize = 1 << 20;
+
+  void WriteString(const std::string& value) {
+    uint32_t size = value.size();
+    file_.write(reinterpret_cast<const char*>(&size), sizeof(size));
+    file_.write(value.data(), size);
+  }
+
+  static uint64_t NextGeneration() {
+    static std::atomic<uint64_t> generation_count(0);
+    return ++generation_count;
+  }
+
+  // Keyed by generation rather than by address, as a new logger may take
+  // the address of a destroyed one
+  std::shared_ptr<ZeCallBuffer> GetBuffer() {
+    struct LocalBuffer {
+      uint64_t generation = 0;
+      std::shared_ptr<ZeCallBuffer> buffer;
+    };
+    thread_local LocalBuffer local;
+    if (local.generation != generation_) {
+      std::shared_ptr<ZeCallBuffer> buffer = std::make_shared<ZeCallBuffer>();
+      buffer->tid = utils::GetTid();
+      buffer->data.reserve(kBufferSize);
+      local.generation = generation_;
+      local.buffer = buffer;
+
+      const std::lock_guard<std::mutex> lock(lock_);
+      buffer_list_.push_back(std::move(buffer));
+    }
+    return local.buffer;
+  }
+
+  void Append(ZeCallRecord& record, const uint64_t* values) {
+    std::shared_ptr<ZeCallBuffer> buffer = GetBuffer();
+    PTI_ASSERT(buffer != nullptr);
+
+    const std::lock_guard<std::mutex> buffer_lock(buffer->lock);
+    if (buffer->detached) {
+      return;
+    }
+
+    size_t values_size = record.value_count * sizeof(uint64_t);
+    record.size = sizeof(ZeCallRecord) + values_size;
+    record.tid = buffer->tid;
+
+    std::vector<uint8_t>& data = buffer->data;
+    if (data.size() + record.size > kBufferSize) {
+      const std::lock_guard<std::mutex> lock(lock_);
+      file_.write(reinterpret_cast<const char*>(data.data()), data.size());
+      data.clear();
+    }
+
+    size_t offset = data.size();
+    data.resize(offset + record.size);
+    memcpy(data.data() + offset, &record, sizeof(ZeCallRecord));
+    if (values_size > 0) {
+      memcpy(data.data() + offset + sizeof(ZeCallRecord), values, values_size);
+    }
+  }
+
+ private:
+  std::ofstream file_;
+  std::vector< std::shared_ptr<ZeCallBuffer> > buffer_list_;
+  std::mutex lock_;
+  uint64_t generation_;
+};
+
+#endif // PTI_TOOLS_ZE_TRACER_ZE_CALL_LOGGER_H_
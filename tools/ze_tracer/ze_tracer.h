@@ -20,6 +20,7 @@
 #include "ze_kernel_collector.h"
 
 const char* kChromeTraceFileName = "zet_trace";
+const char* kBinaryCallLogFileName = "zet_calls";
 
 class ZeTracer {
  public:
@@ -86,6 +87,7 @@ class ZeTracer {
 
     ZeApiCollector* api_collector = nullptr;
     if (tracer->CheckOption(TRACE_CALL_LOGGING) ||
+        tracer->CheckOption(TRACE_BINARY_CALL_LOGGING) ||
         tracer->CheckOption(TRACE_CHROME_CALL_LOGGING) ||
         tracer->CheckOption(TRACE_HOST_TIMING)) {
 
@@ -99,6 +101,14 @@ class ZeTracer {
       api_options.need_tid = tracer->CheckOption(TRACE_TID);
       api_options.need_pid = tracer->CheckOption(TRACE_PID);
       api_options.demangle = tracer->CheckOption(TRACE_DEMANGLE);
+      api_options.api_filter = utils::GetEnv("PTI_API_FILTER");
+      api_options.api_sampling = utils::GetEnv("PTI_API_SAMPLING");
+      if (tracer->CheckOption(TRACE_BINARY_CALL_LOGGING)) {
+        tracer->call_log_file_name_ =
+          TraceOptions::GetBinaryCallLogFileName(kBinaryCallLogFileName);
+        api_options.call_tracing = true;
+        api_options.call_log_file = tracer->call_log_file_name_;
+      }
 
       api_collector = ZeApiCollector::Create(
           &(tracer->correlator_), api_options, callback, tracer);
@@ -137,6 +147,11 @@ class ZeTracer {
         options_.GetLogFileName() << std::endl;
     }
 
+    if (!call_log_file_name_.empty()) {
+      std::cerr << "[INFO] Binary call log was stored to " <<
+        call_log_file_name_ << std::endl;
+    }
+
     if (chrome_logger_ != nullptr) {
       delete chrome_logger_;
       std::cerr << "[INFO] Timeline was stored to " <<
@@ -586,6 +601,7 @@ class ZeTracer {
   TraceOptions options_;
 
   std::string chrome_trace_file_name_;
+  std::string call_log_file_name_;
   Logger* chrome_logger_ = nullptr;
 
   Correlator correlator_;
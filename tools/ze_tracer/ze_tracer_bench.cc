@@ -0,0 +1,205 @@
+//==============================================================
+// Copyright (C) Intel Corporation
+//
+// SPDX-License-Identifier: MIT
+// =============================================================
+
+// Host-side micro-benchmark for generated ze_tracer callbacks.
+// Tracer entry points are provided here to capture callback tables,
+// so neither Level Zero loader nor GPU is required to run it.
+
+#include <chrono>
+#include <cstdlib>
+#include <iomanip>
+#include <iostream>
+#include <string>
+#include <thread>
+#include <vector>
+
+#include "ze_api_collector.h"
+
+static zet_core_callbacks_t prologue = {};
+static zet_core_callbacks_t epilogue = {};
+static void* global_user_data = nullptr;
+
+ze_result_t ZE_APICALL zelTracerCreate(
+    const zel_tracer_desc_t* desc, zel_tracer_handle_t* tracer) {
+  PTI_ASSERT(desc != nullptr);
+  PTI_ASSERT(tracer != nullptr);
+  global_user_data = desc->pUserData;
+  *tracer = reinterpret_cast<zel_tracer_handle_t>(&global_user_data);
+  return ZE_RESULT_SUCCESS;
+}
+
+ze_result_t ZE_APICALL zelTracerDestroy(zel_tracer_handle_t tracer) {
+  return ZE_RESULT_SUCCESS;
+}
+
+ze_result_t ZE_APICALL zelTracerSetPrologues(
+    zel_tracer_handle_t tracer, zel_core_callbacks_t* callbacks) {
+  PTI_ASSERT(callbacks != nullptr);
+  prologue = *callbacks;
+  return ZE_RESULT_SUCCESS;
+}
+
+ze_result_t ZE_APICALL zelTracerSetEpilogues(
+    zel_tracer_handle_t tracer, zel_core_callbacks_t* callbacks) {
+  PTI_ASSERT(callbacks != nullptr);
+  epilogue = *callbacks;
+  return ZE_RESULT_SUCCESS;
+}
+
+ze_result_t ZE_APICALL zelTracerSetEnabled(
+    zel_tracer_handle_t tracer, ze_bool_t enable) {
+  return ZE_RESULT_SUCCESS;
+}
+
+// Emulates tracing layer dispatch: API functions without installed
+// callbacks are called directly, so filtered out APIs have no overhead
+template <typename Params, typename Callback>
+static inline void Call(Callback on_enter, Callback on_exit, Params* params) {
+  void* instance_user_data = nullptr;
+  if (on_enter != nullptr) {
+    on_enter(params, ZE_RESULT_SUCCESS, global_user_data, &instance_user_data);
+  }
+  if (on_exit != nullptr) {
+    on_exit(params, ZE_RESULT_SUCCESS, global_user_data, &instance_user_data);
+  }
+}
+
+// Synthetic call mix: event polling and synchronization calls
+// interleaved with kernel submissions
+static const uint32_t kCallsPerIteration = 4;
+
+static void Run(uint32_t call_count) {
+  ze_event_handle_t event = nullptr;
+  uint64_t timeout = UINT64_MAX;
+  ze_event_query_status_params_t query_params = {&event};
+  ze_event_host_synchronize_params_t sync_params = {&event, &timeout};
+
+  ze_command_list_handle_t command_list = nullptr;
+  ze_kernel_handle_t kernel = nullptr;
+  ze_group_count_t group_count = {1, 1, 1};
+  const ze_group_count_t* group_count_ptr = &group_count;
+  uint32_t wait_event_count = 0;
+  ze_event_handle_t* wait_events = nullptr;
+  ze_command_list_append_launch_kernel_params_t launch_params = {
+      &command_list, &kernel, &group_count_ptr, &event,
+      &wait_event_count, &wait_events};
+
+  for (uint32_t i = 0; i < call_count; ++i) {
+    Call(prologue.CommandList.pfnAppendLaunchKernelCb,
+         epilogue.CommandList.pfnAppendLaunchKernelCb, &launch_params);
+    Call(prologue.Event.pfnQueryStatusCb,
+         epilogue.Event.pfnQueryStatusCb, &query_params);
+    Call(prologue.Event.pfnQueryStatusCb,
+         epilogue.Event.pfnQueryStatusCb, &query_params);
+    Call(prologue.Event.pfnHostSynchronizeCb,
+         epilogue.Event.pfnHostSynchronizeCb, &sync_params);
+  }
+}
+
+static uint64_t GetCallCount(const ZeFunctionInfoMap& function_info_map,
+                             const char* name) {
+  if (function_info_map.count(name) == 0) {
+    return 0;
+  }
+  return function_info_map.at(name).call_count;
+}
+
+// Returns time per API call in nanoseconds
+static double Measure(const ApiCollectorOptions& options,
+                      const std::string& mode,
+                      uint32_t thread_count, uint32_t call_count) {
+  Correlator correlator(mode == "text" ? "/dev/null" : "", false);
+  ZeApiCollector* collector = ZeApiCollector::Create(&correlator, options);
+  PTI_ASSERT(collector != nullptr);
+
+  std::vector<std::thread> thread_list;
+  auto start = std::chrono::steady_clock::now();
+  for (uint32_t i = 0; i < thread_count; ++i) {
+    thread_list.push_back(std::thread(Run, call_count));
+  }
+  for (auto& thread : thread_list) {
+    thread.join();
+  }
+  auto end = std::chrono::steady_clock::now();
+
+  // Call counts are exact even for sampled APIs
+  ApiFilter filter(options.api_filter);
+  const ZeFunctionInfoMap& function_info_map =
+    collector->GetFunctionInfoMap();
+  uint64_t total_count = static_cast<uint64_t>(call_count) * thread_count;
+  PTI_ASSERT(GetCallCount(function_info_map, "zeCommandListAppendLaunchKernel") ==
+             (filter.IsEnabled("zeCommandListAppendLaunchKernel") ?
+              total_count : 0));
+  PTI_ASSERT(GetCallCount(function_info_map, "zeEventQueryStatus") ==
+             (filter.IsEnabled("zeEventQueryStatus") ? 2 * total_count : 0));
+  PTI_ASSERT(GetCallCount(function_info_map, "zeEventHostSynchronize") ==
+             (filter.IsEnabled("zeEventHostSynchronize") ? total_count : 0));
+
+  collector->DisableTracing();
+  delete collector;
+
+  // All threads run concurrently, so the value shows per-call cost
+  // as seen by a single thread under contention
+  double time = std::chrono::duration<double, std::nano>(end - start).count();
+  return time / (call_count * kCallsPerIteration);
+}
+
+int main(int argc, char* argv[]) {
+  uint32_t call_count = 1000000;
+  if (argc > 1) {
+    call_count = std::strtoul(argv[1], nullptr, 0);
+  }
+
+  // Call logging output is discarded to measure tracing overhead only
+  std::string mode = "timing";
+  if (argc > 2) {
+    mode = argv[2];
+  }
+  if (mode != "timing" && mode != "text" && mode != "binary") {
+    std::cerr << "Usage: ./ze_tracer_bench [calls_per_thread] " <<
+      "[timing|text|binary] [api_filter] [api_sampling]" << std::endl;
+    return 1;
+  }
+
+  std::string api_filter = "zeCommandList*,zeCommandQueue*";
+  if (argc > 3) {
+    api_filter = argv[3];
+  }
+
+  ApiCollectorOptions options;
+  if (argc > 4) {
+    options.api_sampling = argv[4];
+  }
+  options.call_tracing = (mode != "timing");
+  if (mode == "binary") {
+    options.call_log_file = "/dev/null";
+  }
+
+  ApiCollectorOptions filtered_options = options;
+  filtered_options.api_filter = api_filter;
+
+  std::cout << "Filter: " << api_filter << std::endl;
+  if (!options.api_sampling.empty()) {
+    std::cout << "Sampling: " << options.api_sampling << std::endl;
+  }
+  std::cout << std::setw(8) << "Threads" << "," <<
+    std::setw(12) << "Calls" << "," <<
+    std::setw(16) << "Full ns/call" << "," <<
+    std::setw(16) << "Filtered ns/call" << std::endl;
+
+  for (uint32_t thread_count = 1; thread_count <= 64; thread_count *= 2) {
+    double full_time = Measure(options, mode, thread_count, call_count);
+    double filtered_time =
+      Measure(filtered_options, mode, thread_count, call_count);
+    std::cout << std::setw(8) << thread_count << "," <<
+      std::setw(12) << call_count * kCallsPerIteration << "," <<
+      std::setw(16) << std::fixed << std::setprecision(2) << full_time << "," <<
+      std::setw(16) << std::fixed << std::setprecision(2) << filtered_time <<
+      std::endl;
+  }
+
+  return 0;
+}